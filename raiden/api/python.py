@@ -7,16 +7,12 @@ from raiden import waiting
 from raiden.blockchain.events import (
     ALL_EVENTS,
     get_all_netting_channel_events,
+    get_indexed_contract_events,
     get_token_network_events,
     get_token_network_registry_events,
 )
 from raiden.transfer import views
-from raiden.transfer.events import (
-    EventPaymentSentSuccess,
-    EventPaymentSentFailed,
-    EventPaymentReceivedSuccess,
-    ContractSendChannelSettle,
-)
+from raiden.transfer.events import EVENTS_PAYMENT_HISTORY_RELATED
 from raiden.transfer.state import NettingChannelState
 from raiden.transfer.state_change import ActionChannelClose
 from raiden.exceptions import (
@@ -41,11 +37,10 @@ from raiden.utils.gas_reserve import has_enough_gas_reserve
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
-EVENTS_PAYMENT_HISTORY_RELATED = (
-    EventPaymentSentSuccess,
-    EventPaymentSentFailed,
-    EventPaymentReceivedSuccess,
-)
+PAYMENT_HISTORY_EVENT_TYPES = [
+    event_type.__name__
+    for event_type in EVENTS_PAYMENT_HISTORY_RELATED
+]
 
 
 class RaidenAPI:
@@ -537,7 +532,7 @@ class RaidenAPI:
             )
 
         elif partner_address:
-            result = views.list_channelstate_for_tokennetwork(
+            result = views.list_channelstate_for_partner(
                 views.state_from_raiden(self.raiden),
                 registry_address,
                 partner_address,
@@ -646,97 +641,113 @@ class RaidenAPI:
             from_block: typing.BlockSpecification = 0,
             to_block: typing.BlockSpecification = 'latest',
     ):
-        return sorted(get_token_network_registry_events(
-            self.raiden.chain,
+        returned_events = get_indexed_contract_events(
+            self.raiden.wal.storage,
             registry_address,
-            events=ALL_EVENTS,
             from_block=from_block,
             to_block=to_block,
-        ), key=lambda evt: evt.get('block_number'), reverse=True)
+        )
+        if returned_events is None:
+            returned_events = get_token_network_registry_events(
+                self.raiden.chain,
+                registry_address,
+                events=ALL_EVENTS,
+                from_block=from_block,
+                to_block=to_block,
+            )
+
+        return sorted(returned_events, key=lambda evt: evt.get('block_number'), reverse=True)
+
+    def _token_network_identifiers(self, token_address: typing.TokenAddress):
+        """ Identifiers of the token networks of `token_address`, in all the
+        payment networks.
+        """
+        chain_state = views.state_from_raiden(self.raiden)
+        token_network_identifiers = [
+            views.get_token_network_identifier_by_token_address(
+                chain_state,
+                payment_network_identifier,
+                token_address,
+            )
+            for payment_network_identifier in chain_state.identifiers_to_paymentnetworks
+        ]
+        return [
+            token_network_identifier
+            for token_network_identifier in token_network_identifiers
+            if token_network_identifier is not None
+        ]
 
     def get_payment_history(
             self,
             from_block: typing.BlockSpecification = 0,
             to_block: typing.BlockSpecification = 'latest',
+            limit: int = None,
+            offset: int = None,
     ):
-        raiden_events = self.raiden.wal.storage.get_events_by_block(
+        # filtering only for externally visible events
+        return self.raiden.wal.storage.get_events(
             from_block=from_block,
             to_block=to_block,
+            event_types=PAYMENT_HISTORY_EVENT_TYPES,
+            limit=limit,
+            offset=offset,
         )
 
-        # filtering only for externally visible events
-        events = [
-            (block_number, event)
-            for block_number, event in raiden_events
-            if isinstance(event, EVENTS_PAYMENT_HISTORY_RELATED)
-        ]
-
-        events.sort(key=lambda event: event[0], reverse=True)
-        return events
-
     def get_payment_history_for_token(
             self,
             token_address: typing.TokenAddress,
             from_block: typing.BlockSpecification = 0,
             to_block: typing.BlockSpecification = 'latest',
+            limit: int = None,
+            offset: int = None,
     ):
         if not is_binary_address(token_address):
             raise InvalidAddress(
                 'Expected binary address format for token in get_payment_history_for_token',
             )
 
-        raiden_events = self.get_payment_history(
+        return self.raiden.wal.storage.get_events(
             from_block=from_block,
             to_block=to_block,
+            event_types=PAYMENT_HISTORY_EVENT_TYPES,
+            token_network_identifiers=self._token_network_identifiers(token_address),
+            limit=limit,
+            offset=offset,
         )
 
-        events = []
-        if len(raiden_events) > 0:
-            event_tuple = raiden_events[0]
-            event_data = event_tuple[1]
-            token_network_identifier = views.get_token_network_identifier_by_token_address(
-                views.state_from_raiden(self.raiden),
-                event_data.payment_network_identifier,
-                token_address,
-            )
-
-            # filtering for the events which have the same token network identifier
-            events = [
-                (block_number, event)
-                for block_number, event in raiden_events
-                if token_network_identifier == event.token_network_identifier
-            ]
-
-        return events
-
     def get_payment_history_for_token_and_target(
             self,
             token_address: typing.TokenAddress,
             target_address: typing.Address,
             from_block: typing.BlockSpecification = 0,
             to_block: typing.BlockSpecification = 'latest',
+            limit: int = None,
+            offset: int = None,
     ):
+        if not is_binary_address(token_address):
+            raise InvalidAddress(
+                'Expected binary address format for token in '
+                'get_payment_history_for_token_and_target',
+            )
+
         if target_address and not is_binary_address(target_address):
             raise InvalidAddress(
                 'Expected binary address format for '
                 'target_address in get_payment_history_for_token_and_target',
             )
 
-        raiden_events = self.get_payment_history_for_token(
-            token_address=token_address,
+        # the target of the sent payments and the initiator of the received
+        # payments
+        return self.raiden.wal.storage.get_events(
             from_block=from_block,
             to_block=to_block,
+            event_types=PAYMENT_HISTORY_EVENT_TYPES,
+            token_network_identifiers=self._token_network_identifiers(token_address),
+            address=target_address,
+            limit=limit,
+            offset=offset,
         )
 
-        events = [
-            (block_number, event)
-            for block_number, event in raiden_events
-            if (hasattr(event, 'target') and event.target == target_address) or
-               (hasattr(event, 'initiator') and event.initiator == target_address)
-        ]
-
-        return events
-
     def get_channel_events_blockchain(
             self,
             token_address: typing.TokenAddress,
@@ -759,15 +770,23 @@ class RaidenAPI:
             token_address=token_address,
             partner_address=partner_address,
         )
-        returned_events = []
-        for channel in channel_list:
-            returned_events.extend(get_all_netting_channel_events(
-                self.raiden.chain,
-                token_network_address,
-                channel.identifier,
-                from_block=from_block,
-                to_block=to_block,
-            ))
+        returned_events = get_indexed_contract_events(
+            self.raiden.wal.storage,
+            token_network_address,
+            from_block=from_block,
+            to_block=to_block,
+            channel_identifiers=[channel.identifier for channel in channel_list],
+        )
+        if returned_events is None:
+            returned_events = []
+            for channel in channel_list:
+                returned_events.extend(get_all_netting_channel_events(
+                    self.raiden.chain,
+                    token_network_address,
+                    channel.identifier,
+                    from_block=from_block,
+                    to_block=to_block,
+                ))
         returned_events.sort(key=lambda evt: evt.get('block_number'), reverse=True)
         return returned_events
 
@@ -777,6 +796,8 @@ class RaidenAPI:
             partner_address: typing.Address = None,
             from_block: typing.BlockSpecification = 0,
             to_block: typing.BlockSpecification = 'latest',
+            limit: int = None,
+            offset: int = None,
     ):
 
         if not is_binary_address(token_address):
@@ -784,40 +805,17 @@ class RaidenAPI:
                 'Expected binary address format for token in get_channel_events_raiden',
             )
 
-        returned_events = []
-        raiden_events = self.raiden.wal.storage.get_events_by_block(
+        # The partner is the recipient of the messages, the initiator or target
+        # of the payments, or the sender of the partner's balance proof
+        return self.raiden.wal.storage.get_events(
             from_block=from_block,
             to_block=to_block,
+            token_address=token_address,
+            token_network_identifiers=self._token_network_identifiers(token_address),
+            address=partner_address,
+            limit=limit,
+            offset=offset,
         )
-        # Here choose which raiden internal events we want to expose to the end user
-        if partner_address:
-            def _contains_partner_address(event):
-                if getattr(event, 'recipient', None) == partner_address:
-                    return True
-                elif getattr(event, 'initiator', None) == partner_address:
-                    return True
-                elif getattr(event, 'target', None) == partner_address:
-                    return True
-                elif hasattr(event, 'partner_balance_proof'):
-                    if event.partner_balance_proof.sender == partner_address:
-                        return True
-                return False
-
-            returned_events = [
-                (block_number, event)
-                for block_number, event in raiden_events
-                if _contains_partner_address(event) and
-                self._is_internal_event(event, token_address)
-            ]
-        else:
-            returned_events = [
-                (block_number, event)
-                for block_number, event in raiden_events
-                if self._is_internal_event(event, token_address)
-            ]
-
-        returned_events.sort(key=lambda event: event[0], reverse=True)
-        return returned_events
 
     def get_token_network_events_blockchain(
             self,
@@ -838,13 +836,20 @@ class RaidenAPI:
         if token_network_address is None:
             raise UnknownTokenAddress('Token address is not known.')
 
-        returned_events = get_token_network_events(
-            self.raiden.chain,
+        returned_events = get_indexed_contract_events(
+            self.raiden.wal.storage,
             token_network_address,
-            events=ALL_EVENTS,
             from_block=from_block,
             to_block=to_block,
         )
+        if returned_events is None:
+            returned_events = get_token_network_events(
+                self.raiden.chain,
+                token_network_address,
+                events=ALL_EVENTS,
+                from_block=from_block,
+                to_block=to_block,
+            )
 
         for event in returned_events:
             if event.get('args'):
@@ -858,6 +863,8 @@ class RaidenAPI:
             token_address,
             from_block,
             to_block='latest',
+            limit: int = None,
+            offset: int = None,
     ):
         """Returns a list of internal events coresponding to the token_address."""
         if not is_binary_address(token_address):
@@ -865,47 +872,13 @@ class RaidenAPI:
                 'Expected binary address format for token in get_token_network_events_raiden',
             )
 
-        returned_events = []
-        raiden_events = self.raiden.wal.storage.get_events_by_block(
+        return self.raiden.wal.storage.get_events(
             from_block=from_block,
             to_block=to_block,
+            token_address=token_address,
+            token_network_identifiers=self._token_network_identifiers(token_address),
+            limit=limit,
+            offset=offset,
         )
 
-        returned_events = [
-            (block_number, event)
-            for block_number, event in raiden_events
-            if self._is_internal_event(event, token_address)
-        ]
-
-        returned_events.sort(key=lambda event: event[0], reverse=True)
-        return returned_events
-
-    def _is_internal_event(
-            self,
-            event,
-            token_address,
-    ):
-        if hasattr(event, 'transfer') and event.transfer.token == token_address:
-            return True
-        elif getattr(event, 'token', None) == token_address:
-            return True
-        elif getattr(event, 'token_address', None) == token_address:
-            return True
-        elif isinstance(event, EVENTS_PAYMENT_HISTORY_RELATED):
-            token_network_identifier = views.get_token_network_identifier_by_token_address(
-                views.state_from_raiden(self.raiden),
-                event.payment_network_identifier,
-                token_address,
-            )
-            if token_network_identifier == event.token_network_identifier:
-                return True
-        elif type(event) == ContractSendChannelSettle:
-            token_network_state = views.get_token_network_by_identifier(
-                views.state_from_raiden(self.raiden),
-                event.token_network_identifier,
-            )
-            if token_network_state.token_address == token_address:
-                return True
-        return False
-
     transfer = transfer_and_wait
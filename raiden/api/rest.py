@@ -751,23 +751,34 @@ class RestAPI:
             self,
             token_address: typing.TokenAddress = None,
             target_address: typing.Address = None,
+            limit: int = None,
+            offset: int = None,
     ):
         log.debug(
             'Getting payment history',
             token_address=optional_address_to_string(token_address),
             target_address=optional_address_to_string(target_address),
+            limit=limit,
+            offset=offset,
         )
         try:
             if token_address is None and target_address is None:
-                raiden_service_result = self.raiden_api.get_payment_history()
+                raiden_service_result = self.raiden_api.get_payment_history(
+                    limit=limit,
+                    offset=offset,
+                )
             elif target_address is None:
                 raiden_service_result = self.raiden_api.get_payment_history_for_token(
                     token_address,
+                    limit=limit,
+                    offset=offset,
                 )
             else:
                 raiden_service_result = self.raiden_api.get_payment_history_for_token_and_target(
                     token_address,
                     target_address,
+                    limit=limit,
+                    offset=offset,
                 )
         except (InvalidBlockNumberInput, InvalidAddress) as e:
             return api_error(str(e), status_code=HTTPStatus.CONFLICT)
@@ -795,18 +806,24 @@ class RestAPI:
             token_address: typing.TokenAddress,
             from_block: typing.BlockSpecification,
             to_block: typing.BlockSpecification,
+            limit: int = None,
+            offset: int = None,
     ):
         log.debug(
             'Getting token network internal events',
             token_address=to_checksum_address(token_address),
             from_block=from_block,
             to_block=to_block,
+            limit=limit,
+            offset=offset,
         )
         try:
             raiden_service_result = self.raiden_api.get_token_network_events_raiden(
                 token_address,
                 from_block,
                 to_block,
+                limit=limit,
+                offset=offset,
             )
             raiden_service_result = convert_to_serializable(raiden_service_result)
             return api_response(result=normalize_events_list(raiden_service_result))
@@ -846,6 +863,8 @@ class RestAPI:
             partner_address: typing.Address = None,
             from_block: typing.BlockSpecification = None,
             to_block: typing.BlockSpecification = None,
+            limit: int = None,
+            offset: int = None,
     ):
         log.debug(
             'Getting channel internal events',
@@ -853,6 +872,8 @@ class RestAPI:
             partner_address=optional_address_to_string(partner_address),
             from_block=from_block,
             to_block=to_block,
+            limit=limit,
+            offset=offset,
         )
         try:
             raiden_service_result = self.raiden_api.get_channel_events_raiden(
@@ -860,6 +881,8 @@ class RestAPI:
                 partner_address,
                 from_block,
                 to_block,
+                limit=limit,
+                offset=offset,
             )
             raiden_service_result = convert_to_serializable(raiden_service_result)
             return api_response(result=normalize_events_list(raiden_service_result))
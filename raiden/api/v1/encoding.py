@@ -152,6 +152,23 @@ class EventRequestSchema(BaseSchema):
         decoding_class = dict
 
 
+class PaginationSchema(BaseSchema):
+    limit = fields.Integer(missing=None, validate=validate.Range(min=0))
+    offset = fields.Integer(missing=None, validate=validate.Range(min=0))
+
+    class Meta:
+        strict = True
+        # decoding to a dict is required by the @use_kwargs decorator from webargs
+        decoding_class = dict
+
+
+class RaidenEventsRequestSchema(EventRequestSchema, PaginationSchema):
+    class Meta:
+        strict = True
+        # decoding to a dict is required by the @use_kwargs decorator from webargs
+        decoding_class = dict
+
+
 class AddressSchema(BaseSchema):
     address = AddressField()
 
@@ -5,7 +5,9 @@ from raiden.api.v1.encoding import (
     ChannelPutSchema,
     ChannelPatchSchema,
     EventRequestSchema,
+    PaginationSchema,
     PaymentSchema,
+    RaidenEventsRequestSchema,
     ConnectionsConnectSchema,
     ConnectionsLeaveSchema,
 )
@@ -126,16 +128,18 @@ class TokenBlockchainEventsResource(BaseResource):
 
 class TokenRaidenEventsResource(BaseResource):
 
-    get_schema = EventRequestSchema()
+    get_schema = RaidenEventsRequestSchema()
 
     @use_kwargs(get_schema, locations=('query',))
-    def get(self, token_address, from_block, to_block):
+    def get(self, token_address, from_block, to_block, limit, offset):
         from_block = from_block or self.rest_api.raiden_api.raiden.query_start_block
         to_block = to_block or 'latest'
         return self.rest_api.get_token_network_events_raiden(
             token_address=token_address,
             from_block=from_block,
             to_block=to_block,
+            limit=limit,
+            offset=offset,
         )
 
 
@@ -157,10 +161,18 @@ class ChannelBlockchainEventsResource(BaseResource):
 
 class ChannelRaidenEventsResource(BaseResource):
 
-    get_schema = EventRequestSchema()
+    get_schema = RaidenEventsRequestSchema()
 
     @use_kwargs(get_schema, locations=('query',))
-    def get(self, token_address, partner_address=None, from_block=None, to_block=None):
+    def get(
+            self,
+            token_address,
+            partner_address=None,
+            from_block=None,
+            to_block=None,
+            limit=None,
+            offset=None,
+    ):
         from_block = from_block or self.rest_api.raiden_api.raiden.query_start_block
         to_block = to_block or 'latest'
         return self.rest_api.get_channel_events_raiden(
@@ -168,6 +180,8 @@ class ChannelRaidenEventsResource(BaseResource):
             partner_address=partner_address,
             from_block=from_block,
             to_block=to_block,
+            limit=limit,
+            offset=offset,
         )
 
 
@@ -222,15 +236,21 @@ class PaymentResource(BaseResource):
     post_schema = PaymentSchema(
         only=('amount', 'identifier'),
     )
+    get_schema = PaginationSchema()
 
+    @use_kwargs(get_schema, locations=('query',))
     def get(
             self,
             token_address: typing.TokenAddress = None,
             target_address: typing.Address = None,
+            limit: int = None,
+            offset: int = None,
     ):
         return self.rest_api.get_payment_history(
             token_address=token_address,
             target_address=target_address,
+            limit=limit,
+            offset=offset,
         )
 
     @use_kwargs(post_schema, locations=('json',))
@@ -12,17 +12,30 @@ from raiden.network.proxies import (
 )
 from raiden.raiden_service import RaidenService
 from raiden.settings import (
+    DEFAULT_DATABASE_CACHE_SIZE,
+    DEFAULT_DATABASE_COMPACTION,
+    DEFAULT_DATABASE_FULL_SNAPSHOT_INTERVAL,
+    DEFAULT_DATABASE_JOURNAL_MODE,
+    DEFAULT_DATABASE_MAX_BATCH_LATENCY,
+    DEFAULT_DATABASE_MMAP_SIZE,
+    DEFAULT_DATABASE_READ_CONNECTIONS,
+    DEFAULT_DATABASE_SERIALIZER,
+    DEFAULT_DATABASE_SYNCHRONOUS,
     DEFAULT_NAT_INVITATION_TIMEOUT,
     DEFAULT_NAT_KEEPALIVE_RETRIES,
     DEFAULT_NAT_KEEPALIVE_TIMEOUT,
     DEFAULT_REVEAL_TIMEOUT,
     DEFAULT_SETTLE_TIMEOUT,
     DEFAULT_SHUTDOWN_TIMEOUT,
+    DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY,
     DEFAULT_TRANSPORT_MATRIX_RETRY_INTERVAL,
     DEFAULT_TRANSPORT_RETRIES_BEFORE_BACKOFF,
     DEFAULT_TRANSPORT_THROTTLE_CAPACITY,
     DEFAULT_TRANSPORT_THROTTLE_FILL_RATE,
+    DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+    DEFAULT_TRANSPORT_UDP_IO_BATCH_SIZE,
     DEFAULT_TRANSPORT_UDP_RETRY_INTERVAL,
+    DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
     INITIAL_PORT,
 )
 from raiden.utils import pex
@@ -38,6 +51,18 @@ class App:  # pylint: disable=too-few-public-methods
         'reveal_timeout': DEFAULT_REVEAL_TIMEOUT,
         'settle_timeout': DEFAULT_SETTLE_TIMEOUT,
         'database_path': '',
+        'database_max_batch_latency': DEFAULT_DATABASE_MAX_BATCH_LATENCY,
+        'database_full_snapshot_interval': DEFAULT_DATABASE_FULL_SNAPSHOT_INTERVAL,
+        'database_compaction': DEFAULT_DATABASE_COMPACTION,
+        'database_archive_path': None,
+        'database_serializer': DEFAULT_DATABASE_SERIALIZER,
+        'database': {
+            'journal_mode': DEFAULT_DATABASE_JOURNAL_MODE,
+            'synchronous': DEFAULT_DATABASE_SYNCHRONOUS,
+            'cache_size': DEFAULT_DATABASE_CACHE_SIZE,
+            'mmap_size': DEFAULT_DATABASE_MMAP_SIZE,
+            'read_connections': DEFAULT_DATABASE_READ_CONNECTIONS,
+        },
         'transport_type': 'udp',
         'transport': {
             'udp': {
@@ -50,6 +75,9 @@ class App:  # pylint: disable=too-few-public-methods
                 'port': INITIAL_PORT,
                 'retries_before_backoff': DEFAULT_TRANSPORT_RETRIES_BEFORE_BACKOFF,
                 'retry_interval': DEFAULT_TRANSPORT_UDP_RETRY_INTERVAL,
+                'send_window': DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
+                'delivered_batch_latency': DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+                'io_batch_size': DEFAULT_TRANSPORT_UDP_IO_BATCH_SIZE,
                 'throttle_capacity': DEFAULT_TRANSPORT_THROTTLE_CAPACITY,
                 'throttle_fill_rate': DEFAULT_TRANSPORT_THROTTLE_FILL_RATE,
             },
@@ -65,6 +93,7 @@ class App:  # pylint: disable=too-few-public-methods
                 },
                 'retries_before_backoff': DEFAULT_TRANSPORT_RETRIES_BEFORE_BACKOFF,
                 'retry_interval': DEFAULT_TRANSPORT_MATRIX_RETRY_INTERVAL,
+                'batch_latency': DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY,
                 'server': 'auto',
             },
         },
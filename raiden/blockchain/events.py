@@ -1,5 +1,6 @@
 from collections import namedtuple
-from typing import List, Dict
+from collections.abc import Mapping
+from typing import List, Dict, Optional
 
 import structlog
 from eth_utils import (
@@ -21,10 +22,17 @@ from raiden.constants import UINT64_MAX
 from raiden.exceptions import InvalidBlockNumberInput
 from raiden.network.blockchain_service import BlockChainService
 from raiden.network.proxies import SecretRegistry
+from raiden.settings import (
+    DEFAULT_CATCH_UP_CHUNK_SIZE,
+    DEFAULT_CATCH_UP_CONCURRENCY,
+    DEFAULT_CATCH_UP_MAX_CHUNK_SIZE,
+)
 from raiden.utils import pex, typing
 from raiden.utils.filters import (
     decode_event,
+    get_entries_chunked,
     get_filter_args_for_all_events_from_channel,
+    get_new_entries_merged,
     StatelessFilter,
 )
 from raiden.utils.typing import Address, BlockSpecification, ChannelID
@@ -83,6 +91,81 @@ def get_contract_events(
     return result
 
 
+def get_indexed_contract_events(
+        storage,
+        contract_address: Address,
+        from_block: BlockSpecification = 0,
+        to_block: BlockSpecification = 'latest',
+        channel_identifiers: List[ChannelID] = None,
+) -> Optional[List[Dict]]:
+    """ Return all the events of the smart contract at `contract_address` in
+    the block range from the events index of `storage`, in the format of
+    `get_contract_events`, or None if the range is not indexed.
+
+    The index is filled by the event polling, 'latest' is the last polled
+    block.
+
+    Args:
+        channel_identifiers: Only the events of these channels of a token
+            network.
+    """
+    verify_block_number(from_block, 'from_block')
+    verify_block_number(to_block, 'to_block')
+
+    indexed_range = storage.get_blockchain_events_range(contract_address)
+    if indexed_range is None:
+        return None
+
+    indexed_from, indexed_to = indexed_range
+    if to_block == 'latest':
+        to_block = indexed_to
+
+    if not isinstance(from_block, int) or not isinstance(to_block, int):
+        return None
+
+    if from_block < indexed_from or to_block > indexed_to:
+        return None
+
+    return storage.get_blockchain_events(
+        contract_address,
+        from_block,
+        to_block,
+        channel_identifiers,
+    )
+
+
+def _plain_event_data(value):
+    """ The decoded events contain AttributeDict and HexBytes values, these
+    are saved in the events index as dicts and bytes.
+    """
+    if isinstance(value, Mapping):
+        return {key: _plain_event_data(item) for key, item in value.items()}
+
+    if isinstance(value, bytes):
+        return bytes(value)
+
+    if isinstance(value, (list, tuple)):
+        return type(value)(_plain_event_data(item) for item in value)
+
+    return value
+
+
+def _event_index_entry(contract_address: Address, decoded_event: Dict):
+    """ The entry of `decoded_event` for `SQLiteStorage.write_blockchain_events`. """
+    data = _plain_event_data(decoded_event)
+
+    # the same format as `get_contract_events`
+    data.pop('blockNumber', None)
+
+    return (
+        contract_address,
+        data['args'].get('channel_identifier'),
+        data['block_number'],
+        data.get('logIndex'),
+        data,
+    )
+
+
 # These helpers have a better descriptive name and provide the translator for
 # the caller.
 
@@ -314,6 +397,11 @@ class BlockchainEvents:
     def __init__(self):
         self.event_listeners = list()
 
+        # The storage of the events index, the events of the stateless filters
+        # which include all the events of their contract are saved once they
+        # have been handled
+        self.storage = None
+
     def reset(self):
         listeners = [
             event_listener._replace(first_run=True)
@@ -322,13 +410,110 @@ class BlockchainEvents:
         self.event_listeners = listeners
 
     def poll_blockchain_events(self, block_number: int = None):
+        # The stateless filters are queried together, with a single
+        # eth_getLogs for all the contracts
+        stateless_filters = [
+            event_listener.filter
+            for event_listener in self.event_listeners
+            if isinstance(event_listener.filter, StatelessFilter)
+        ]
+        filters_to_from_block = {
+            id(stateless_filter): stateless_filter.next_block
+            for stateless_filter in stateless_filters
+        }
+        filters_to_entries = {
+            id(stateless_filter): entries
+            for stateless_filter, entries in zip(
+                stateless_filters,
+                get_new_entries_merged(stateless_filters, block_number),
+            )
+        }
+
+        return self._poll_listeners(block_number, filters_to_entries, filters_to_from_block)
+
+    def catch_up_blockchain_events(
+            self,
+            target_block_number: int,
+            chunk_size: int = DEFAULT_CATCH_UP_CHUNK_SIZE,
+            max_chunk_size: int = DEFAULT_CATCH_UP_MAX_CHUNK_SIZE,
+            concurrency: int = DEFAULT_CATCH_UP_CONCURRENCY,
+    ):
+        """ Poll the events up to `target_block_number` in chunks of blocks,
+        used when many blocks were mined since the filters were installed.
+
+        Yields the last block of every chunk with the events of the chunk, in
+        order. The events of a chunk must be handled before the next chunk is
+        requested, the chunks are fetched concurrently by
+        `get_entries_chunked`. Nothing is polled if the filters are close to
+        the target, `poll_blockchain_events` polls these blocks.
+        """
+        while True:
+            stateless_filters = [
+                event_listener.filter
+                for event_listener in self.event_listeners
+                if isinstance(event_listener.filter, StatelessFilter)
+            ]
+            next_blocks = {stateless_filter.next_block for stateless_filter in stateless_filters}
+
+            # Only the filters polled from the same block are caught up
+            if len(stateless_filters) != len(self.event_listeners) or len(next_blocks) != 1:
+                return
+
+            from_block = next_blocks.pop()
+            if not isinstance(from_block, int) or target_block_number - from_block < chunk_size:
+                return
+
+            number_of_listeners = len(self.event_listeners)
+            chunks = get_entries_chunked(
+                stateless_filters,
+                from_block,
+                target_block_number,
+                chunk_size,
+                max_chunk_size,
+                concurrency,
+            )
+
+            for chunk_from, chunk_to, entries in chunks:
+                filters_to_entries = dict()
+                filters_to_from_block = dict()
+                for stateless_filter, filter_entries in zip(stateless_filters, entries):
+                    stateless_filter.mark_fetched(chunk_to)
+                    filters_to_entries[id(stateless_filter)] = filter_entries
+                    filters_to_from_block[id(stateless_filter)] = chunk_from
+
+                yield chunk_to, self._poll_listeners(
+                    chunk_to,
+                    filters_to_entries,
+                    filters_to_from_block,
+                )
+
+                # A listener was added while the events were handled, e.g.
+                # for a new token network, the next chunks must include it
+                if len(self.event_listeners) != number_of_listeners:
+                    chunks.close()
+                    break
+            else:
+                return
+
+    def _poll_listeners(self, block_number, filters_to_entries, filters_to_from_block):
         # When we test with geth if the contracts have already been deployed
         # before the filter creation we need to use `get_all_entries` to make
         # sure we get all the events. With tester this is not required.
 
+        indexed_events = list()
+        indexed_ranges = list()
+
+        # Listeners may be added while the events are handled, e.g. for a new
+        # token network, these are polled on their own
         for event_listener in self.event_listeners:
+            from_block = None
             if isinstance(event_listener.filter, StatelessFilter):
-                events = event_listener.filter.get_new_entries(block_number)
+                events = filters_to_entries.pop(id(event_listener.filter), None)
+                if events is None:
+                    from_block = event_listener.filter.next_block
+                    events = event_listener.filter.get_new_entries(block_number)
+                else:
+                    from_block = filters_to_from_block.pop(id(event_listener.filter))
             elif event_listener.first_run is True:
                 events = event_listener.filter.get_all_entries()
                 index = self.event_listeners.index(event_listener)
@@ -336,6 +521,10 @@ class BlockchainEvents:
             else:
                 events = event_listener.filter.get_new_entries()
 
+            indexed_address = None
+            if self.storage is not None and isinstance(from_block, int):
+                indexed_address = self._indexed_address(event_listener)
+
             for log_event in events:
                 decoded_event = dict(decode_event(
                     event_listener.abi,
@@ -348,8 +537,48 @@ class BlockchainEvents:
                         to_canonical_address(log_event['address']),
                         decoded_event,
                     )
+
+                    if indexed_address is not None:
+                        indexed_events.append(_event_index_entry(indexed_address, decoded_event))
+
+                        # A token network has no events before its creation
+                        if decoded_event['event'] == EVENT_TOKEN_NETWORK_CREATED:
+                            indexed_ranges.append((
+                                to_canonical_address(
+                                    decoded_event['args']['token_network_address'],
+                                ),
+                                0,
+                                decoded_event['block_number'] - 1,
+                            ))
+
                     yield decode_event_to_internal(event)
 
+            if indexed_address is not None:
+                indexed_ranges.append((
+                    indexed_address,
+                    from_block,
+                    event_listener.filter.next_block - 1,
+                ))
+
+        # The events are indexed after they have been handled, the blocks of
+        # an interrupted poll are polled again
+        if indexed_events or indexed_ranges:
+            self.storage.write_blockchain_events(indexed_events, indexed_ranges)
+
+    @staticmethod
+    def _indexed_address(event_listener) -> Optional[Address]:
+        """ The address of the contract of which all the events are returned
+        by the stateless filter of `event_listener`, or None.
+        """
+        filter_address = event_listener.filter.filter_params.get('address')
+        if not isinstance(filter_address, str):
+            return None
+
+        if not event_listener.filter.includes_all_events(event_listener.abi):
+            return None
+
+        return to_canonical_address(filter_address)
+
     def uninstall_all_event_listeners(self):
         for listener in self.event_listeners:
             if listener.filter.filter_id:
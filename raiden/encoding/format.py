@@ -1,6 +1,18 @@
+import struct
 from collections import namedtuple, Counter
 
-__all__ = ('Field', 'namedbuffer', 'buffer_for')
+from raiden.encoding.encoders import integer
+
+__all__ = ('Field', 'namedbuffer', 'namedstruct', 'buffer_for')
+
+# struct codes of the integers packed natively by `namedstruct`, the wider
+# integers are packed as bytes by their encoder
+INTEGER_FORMATS = {
+    1: 'B',
+    2: 'H',
+    4: 'I',
+    8: 'Q',
+}
 
 
 Field = namedtuple(
@@ -53,15 +65,8 @@ def compute_slices(fields_spec):
     return name_to_slice
 
 
-def namedbuffer(buffer_name, fields_spec):  # noqa (ignore ciclomatic complexity)
-    """ Class factory, returns a class to wrap a buffer instance and expose the
-    data as fields.
-
-    The field spec specifies how many bytes should be used for a field and what
-    is the encoding / decoding function.
-    """
-    # pylint: disable=protected-access,unused-argument
-
+def check_fields_spec(buffer_name, fields_spec):
+    """ Validate the spec and return its fields without the paddings. """
     if not len(buffer_name):
         raise ValueError('buffer_name is empty')
 
@@ -91,6 +96,24 @@ def namedbuffer(buffer_name, fields_spec):  # noqa (ignore ciclomatic complexity
     if any(count > 1 for count in Counter(field.name for field in fields).values()):
         raise ValueError('repeated field name')
 
+    return fields
+
+
+def namedbuffer(buffer_name, fields_spec):  # noqa (ignore ciclomatic complexity)
+    """ Class factory, returns a class to wrap a buffer instance and expose the
+    data as fields.
+
+    The field spec specifies how many bytes should be used for a field and what
+    is the encoding / decoding function.
+    """
+    # pylint: disable=protected-access,unused-argument
+
+    fields = check_fields_spec(buffer_name, fields_spec)
+    names_fields = {
+        field.name: field
+        for field in fields
+    }
+
     # big endian format
     fields_format = '>' + ''.join(field.format_string for field in fields_spec)
     size = sum(field.size_bytes for field in fields_spec)
@@ -183,3 +206,127 @@ def namedbuffer(buffer_name, fields_spec):  # noqa (ignore ciclomatic complexity
     }
 
     return type(buffer_name, (), attributes)
+
+
+def struct_format(field):
+    """ Returns the struct code used by `namedstruct` for `field`. """
+    if isinstance(field, Pad):
+        return field.format_string
+
+    if isinstance(field.encoder, integer) and field.size_bytes in INTEGER_FORMATS:
+        return INTEGER_FORMATS[field.size_bytes]
+
+    return '{}s'.format(field.size_bytes)
+
+
+def pad_bytes(field, value):
+    """ Left pad `value` to the size of `field`, as done by `namedbuffer`. """
+    if isinstance(value, str):
+        value = value.encode()
+
+    length = len(value)
+    if length > field.size_bytes:
+        msg = 'value with length {length} for {attr} is too big'.format(
+            length=length,
+            attr=field.name,
+        )
+        raise ValueError(msg)
+
+    return b'\x00' * (field.size_bytes - length) + value
+
+
+def namedstruct(struct_name, fields_spec):
+    """ Class factory, returns a class with the fields of the spec as
+    attributes, which are encoded to and decoded from the same bytes as the
+    `namedbuffer` of the spec.
+
+    A `struct.Struct` is compiled for the spec, `decode` reads all the fields
+    with a single `unpack_from` on the buffer, a bytes, bytearray or
+    memoryview which is not sliced nor copied, and `encode` writes them with
+    a single `pack`. The values are validated by `encode`.
+    """
+    fields = check_fields_spec(struct_name, fields_spec)
+    names = tuple(field.name for field in fields)
+
+    # big endian format
+    fields_format = '>' + ''.join(struct_format(field) for field in fields_spec)
+    compiled = struct.Struct(fields_format)
+    size = sum(field.size_bytes for field in fields_spec)
+    assert compiled.size == size, 'the struct codes do not match the sizes'
+
+    native_integers = list()
+    encoded = list()
+    raw_bytes = list()
+    defaults = list()
+    for index, field in enumerate(fields):
+        if field.encoder is None:
+            raw_bytes.append((index, field))
+            defaults.append(b'')
+        elif struct_format(field) in INTEGER_FORMATS.values():
+            native_integers.append((index, field.encoder))
+            defaults.append(0)
+        else:
+            encoded.append((index, field))
+            defaults.append(0)
+
+    unpack_from = compiled.unpack_from
+    pack = compiled.pack
+
+    def __init__(self):
+        for name, default in zip(names, defaults):
+            setattr(self, name, default)
+
+    @classmethod
+    def decode(cls, data):
+        if len(data) != size:
+            raise ValueError('data buffer has the wrong size, expected {}'.format(size))
+
+        values = unpack_from(data)
+
+        instance = cls.__new__(cls)
+        for name, value in zip(names, values):
+            setattr(instance, name, value)
+
+        for index, field in encoded:
+            setattr(instance, names[index], field.encoder.decode(values[index]))
+
+        return instance
+
+    def encode(self):
+        values = [getattr(self, name) for name in names]
+
+        for index, encoder in native_integers:
+            encoder.validate(values[index])
+
+        for index, field in encoded:
+            field.encoder.validate(values[index])
+            values[index] = field.encoder.encode(values[index], field.size_bytes)
+
+        for index, field in raw_bytes:
+            value = values[index]
+            if len(value) != field.size_bytes or isinstance(value, str):
+                values[index] = pad_bytes(field, value)
+
+        return pack(*values)
+
+    def __repr__(self):
+        return '<{} [...]>'.format(struct_name)
+
+    def __len__(self):
+        return size
+
+    attributes = {
+        '__init__': __init__,
+        '__slots__': names,
+        '__repr__': __repr__,
+        '__len__': __len__,
+        'decode': decode,
+        'encode': encode,
+
+        'fields_spec': fields_spec,
+        'format': fields_format,
+        'size': size,
+        'struct': compiled,
+    }
+
+    return type(struct_name, (), attributes)
@@ -4,7 +4,7 @@ from raiden.constants import UINT64_MAX, UINT256_MAX
 from raiden.encoding.encoders import integer
 from raiden.encoding.format import (
     make_field,
-    namedbuffer,
+    namedstruct,
     pad,
 )
 
@@ -58,7 +58,7 @@ fee = make_field('fee', 32, '32s', integer(0, UINT256_MAX))
 
 signature = make_field('signature', 65, '65s')
 
-Processed = namedbuffer(
+Processed = namedstruct(
     'processed',
     [
         cmdid(PROCESSED),
@@ -68,7 +68,7 @@ Processed = namedbuffer(
     ],
 )
 
-Delivered = namedbuffer(
+Delivered = namedstruct(
     'delivered',
     [
         cmdid(DELIVERED),
@@ -78,7 +78,7 @@ Delivered = namedbuffer(
     ],
 )
 
-Ping = namedbuffer(
+Ping = namedstruct(
     'ping',
     [
         cmdid(PING),
@@ -88,7 +88,7 @@ Ping = namedbuffer(
     ],
 )
 
-Pong = namedbuffer(
+Pong = namedstruct(
     'pong',
     [
         cmdid(PONG),
@@ -98,7 +98,7 @@ Pong = namedbuffer(
     ],
 )
 
-SecretRequest = namedbuffer(
+SecretRequest = namedstruct(
     'secret_request',
     [
         cmdid(SECRETREQUEST),
@@ -111,7 +111,7 @@ SecretRequest = namedbuffer(
     ],
 )
 
-Secret = namedbuffer(
+Secret = namedstruct(
     'secret',
     [
         cmdid(SECRET),
@@ -130,7 +130,7 @@ Secret = namedbuffer(
     ],
 )
 
-RevealSecret = namedbuffer(
+RevealSecret = namedstruct(
     'reveal_secret',
     [
         cmdid(REVEALSECRET),
@@ -141,7 +141,7 @@ RevealSecret = namedbuffer(
     ],
 )
 
-DirectTransfer = namedbuffer(
+DirectTransfer = namedstruct(
     'direct_transfer',
     [
         cmdid(DIRECTTRANSFER),
@@ -161,7 +161,7 @@ DirectTransfer = namedbuffer(
     ],
 )
 
-LockedTransfer = namedbuffer(
+LockedTransfer = namedstruct(
     'mediated_transfer',
     [
         cmdid(LOCKEDTRANSFER),
@@ -187,7 +187,7 @@ LockedTransfer = namedbuffer(
     ],
 )
 
-RefundTransfer = namedbuffer(
+RefundTransfer = namedstruct(
     'refund_transfer',
     [
         cmdid(REFUNDTRANSFER),
@@ -213,7 +213,7 @@ RefundTransfer = namedbuffer(
     ],
 )
 
-Lock = namedbuffer(
+Lock = namedstruct(
     'lock',
     [
         expiration,
@@ -252,9 +252,36 @@ def wrap(data):
         return
 
     try:
-        message = message_type(data)
+        message = message_type.decode(data)
     except ValueError:
         log.error('trying to decode invalid message')
         return
 
     return message
+
+
+def split_packet(data):
+    """ Split a packet in the data of the messages it contains.
+
+    The layouts have a fixed size, so several messages may be sent back to
+    back in a single packet. The data is not copied, the remainder of the
+    packet from an unknown cmdid is returned as a single message, which is
+    invalid.
+    """
+    view = memoryview(data)
+    length = len(view)
+    messages_data = list()
+
+    start = 0
+    while start < length:
+        message_type = CMDID_MESSAGE.get(view[start])
+
+        if message_type is None:
+            end = length
+        else:
+            end = min(start + message_type.size, length)
+
+        messages_data.append(view[start:end])
+        start = end
+
+    return messages_data
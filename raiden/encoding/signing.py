@@ -1,4 +1,9 @@
+import os
+from collections import namedtuple
+
+from cachetools import LRUCache
 from coincurve import PublicKey
+from gevent.threadpool import ThreadPool
 import structlog
 
 from raiden.utils import sha3, publickey_to_address
@@ -6,6 +11,67 @@ from raiden.utils import sha3, publickey_to_address
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
+# Number of recovered addresses kept, shared by the messages of every
+# transport and the signatures of the matrix display names
+RECOVERY_CACHE_SIZE = 4096
+# Worker threads used to recover a batch of signatures, the secp256k1
+# library releases the GIL. The threads only help if there is a core left
+# for them, otherwise the batches are recovered by the event loop.
+RECOVERY_POOL_SIZE = min(4, (os.cpu_count() or 1) - 1)
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+class RecoveryCache:
+    """ Bounded LRU cache of the addresses recovered from signatures.
+
+    The entries are keyed by the signed data and the signature, the same
+    signature over different data must not be mistaken for a known sender.
+    Failed recoveries are cached as None.
+    """
+
+    def __init__(self, maxsize: int):
+        self.cache = LRUCache(maxsize=maxsize)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        try:
+            address = self.cache[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        return address
+
+    def set(self, key, address):
+        self.cache[key] = address
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.cache.maxsize, self.cache.currsize)
+
+
+recovery_cache = RecoveryCache(RECOVERY_CACHE_SIZE)
+_recovery_pool = None
+
+
+def get_recovery_pool():
+    """ Return the default recovery pool, or None if there are no worker
+    threads.
+    """
+    global _recovery_pool  # pylint: disable=global-statement
+
+    if _recovery_pool is None and RECOVERY_POOL_SIZE > 0:
+        _recovery_pool = ThreadPool(RECOVERY_POOL_SIZE)
+
+    return _recovery_pool
+
 
 def recover_publickey(messagedata, signature, hasher=sha3):
     if len(signature) != 65:
@@ -38,13 +104,76 @@ def recover_publickey_safe(messagedata, signature, hasher=sha3):
     return publickey
 
 
-def recover_address(messagedata, signature, hasher=sha3):
+def _recover_address(messagedata, signature, hasher=sha3):
     public_key = recover_publickey_safe(messagedata, signature, hasher)
     if public_key is None:
         return None
     return publickey_to_address(public_key)
 
 
+def recover_address(messagedata, signature, hasher=sha3):
+    key = (bytes(messagedata), bytes(signature), hasher)
+
+    try:
+        return recovery_cache.get(key)
+    except KeyError:
+        pass
+
+    address = _recover_address(messagedata, signature, hasher)
+    recovery_cache.set(key, address)
+    return address
+
+
+def _recover_chunk(keys):
+    return [_recover_address(*key) for key in keys]
+
+
+def recover_addresses(signed_data, hasher=sha3, pool=None):
+    """ Recover the addresses of a batch of `(messagedata, signature)` pairs.
+
+    The signatures which are not in the cache are recovered by the worker
+    threads of `pool`, the default recovery pool if None, so that the event
+    loop is not blocked by a burst of signatures. They are recovered inline
+    if there is no pool.
+    """
+    keys = [
+        (bytes(messagedata), bytes(signature), hasher)
+        for messagedata, signature in signed_data
+    ]
+
+    addresses = dict()
+    missing = list()
+    for key in dict.fromkeys(keys):
+        try:
+            addresses[key] = recovery_cache.get(key)
+        except KeyError:
+            missing.append(key)
+
+    if pool is None:
+        pool = get_recovery_pool()
+
+    if pool is not None and len(missing) > 1:
+        # one task per worker, the handoff to a thread costs about as much as
+        # a recovery
+        chunks = [missing[start::pool.maxsize] for start in range(pool.maxsize)]
+        chunks = [chunk for chunk in chunks if chunk]
+        missing = [key for chunk in chunks for key in chunk]
+        recovered = [
+            address
+            for addresses_chunk in pool.map(_recover_chunk, chunks)
+            for address in addresses_chunk
+        ]
+    else:
+        # a single signature is not worth the switch to a worker thread
+        recovered = [_recover_address(*key) for key in missing]
+
+    for key, address in zip(missing, recovered):
+        recovery_cache.set(key, address)
+        addresses[key] = address
+
+    return [addresses[key] for key in keys]
+
+
 def sign(messagedata, private_key, hasher=sha3):
     signature = private_key.sign_recoverable(messagedata, hasher=hasher)
     if len(signature) != 65:
@@ -14,7 +14,6 @@ from raiden.constants import (
     UINT64_MAX,
 )
 from raiden.encoding import messages, signing
-from raiden.encoding.format import buffer_for
 from raiden.exceptions import InvalidProtocolMessage
 from raiden.transfer.balance_proof import pack_signing_data
 from raiden.transfer.utils import hash_balance_data
@@ -36,6 +35,7 @@ from raiden.transfer.mediated_transfer.events import (
     SendSecretRequest,
 )
 from raiden.utils.typing import (
+    List,
     Optional,
     Address,
     BlockExpiration,
@@ -67,7 +67,6 @@ __all__ = (
 )
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
-_senders_cache = LRUCache(maxsize=128)
 _hashes_cache = LRUCache(maxsize=128)
 _lock_bytes_cache = LRUCache(maxsize=128)
 
@@ -129,6 +128,22 @@ def decode(data):
     return klass.decode(data)
 
 
+def recover_senders(messages: List['Message'], pool=None):
+    """ Recover the senders of a burst of received messages on the worker
+    threads of `pool`, the next accesses to `SignedMessage.sender` are served
+    by the recovery cache.
+    """
+    signed_messages = [
+        message
+        for message in messages
+        if isinstance(message, SignedMessage) and message.signature
+    ]
+    signing.recover_addresses(
+        [(message._data_to_sign(), message.signature) for message in signed_messages],
+        pool=pool,
+    )
+
+
 def from_dict(data):
     try:
         klass = CLASSNAME_TO_CLASS[data['type']]
@@ -167,7 +182,7 @@ class Message:
     @property
     def hash(self):
         packed = self.packed()
-        return sha3(packed.data)
+        return sha3(packed.encode())
 
     def __eq__(self, other):
         return isinstance(other, self.__class__) and self.hash == other.hash
@@ -191,13 +206,12 @@ class Message:
 
     def encode(self):
         packed = self.packed()
-        return bytes(packed.data)
+        return packed.encode()
 
     def packed(self):
         klass = messages.CMDID_MESSAGE[self.cmdid]
-        data = buffer_for(klass)
-        data[0] = self.cmdid
-        packed = klass(data)
+        packed = klass()
+        packed.cmdid = self.cmdid
         self.pack(packed)
 
         return packed
@@ -233,7 +247,7 @@ class SignedMessage(Message):
         assert field.name == 'signature', 'signature is not the last field'
 
         # this slice must be from the end of the buffer
-        return packed.data[:-field.size_bytes]
+        return packed.encode()[:-field.size_bytes]
 
     def sign(self, private_key):
         """ Sign message using `private_key`. """
@@ -241,13 +255,13 @@ class SignedMessage(Message):
         self.signature = signing.sign(message_data, private_key)
 
     @property
-    @cached(_senders_cache, key=attrgetter('signature'))
     def sender(self) -> Optional[Address]:
         if not self.signature:
             return None
         data_that_was_signed = self._data_to_sign()
         message_signature = self.signature
 
+        # the recovered addresses are cached by `signing.recover_address`
         address = signing.recover_address(data_that_was_signed, message_signature)
         if address is None:
             return None
@@ -298,7 +312,7 @@ class EnvelopeMessage(SignedMessage):
         field = klass.fields_spec[-1]
         assert field.name == 'signature', 'signature is not the last field'
 
-        data = packed.data
+        data = packed.encode()
         message_data = data[:-field.size_bytes]
         message_hash = sha3(message_data)
 
@@ -956,13 +970,12 @@ class Lock:
     @property
     @cached(_lock_bytes_cache, key=attrgetter('amount', 'expiration', 'secrethash'))
     def as_bytes(self):
-        packed = messages.Lock(buffer_for(messages.Lock))
+        packed = messages.Lock()
         packed.amount = self.amount
         packed.expiration = self.expiration
         packed.secrethash = self.secrethash
 
-        # convert bytearray to bytes
-        return bytes(packed.data)
+        return packed.encode()
 
     @property
     @cached(_hashes_cache, key=attrgetter('as_bytes'))
@@ -971,7 +984,7 @@ class Lock:
 
     @classmethod
     def from_bytes(cls, serialized):
-        packed = messages.Lock(serialized)
+        packed = messages.Lock.decode(serialized)
 
         return cls(
             amount=packed.amount,
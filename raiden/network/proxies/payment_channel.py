@@ -74,7 +74,14 @@ class PaymentChannel:
 
     def settle_timeout(self) -> int:
         """ Returns the channels settle_timeout. """
+        # The settle timeout of a channel never changes
+        return self.token_network.client.call_cache.call(
+            (self.token_network.address, 'settle_timeout', self.channel_identifier),
+            self._settle_timeout_from_event,
+            permanent=True,
+        )
 
+    def _settle_timeout_from_event(self) -> int:
         # There is no way to get the settle timeout after the channel has been closed as
         # we're saving gas. Therefore get the ChannelOpened event and get the timeout there.
         filter_args = get_filter_args_for_specific_event_from_channel(
@@ -138,7 +138,10 @@ class SecretRegistry:
         return transaction_hash
 
     def get_register_block_for_secrethash(self, secrethash: typing.Keccak256) -> int:
-        return self.proxy.contract.functions.getSecretRevealBlockHeight(secrethash).call()
+        return self.client.call_cache.call(
+            (self.address, 'getSecretRevealBlockHeight', secrethash),
+            self.proxy.contract.functions.getSecretRevealBlockHeight(secrethash).call,
+        )
 
     def check_registered(self, secrethash: typing.Keccak256) -> bool:
         return self.get_register_block_for_secrethash(secrethash) > 0
@@ -94,9 +94,10 @@ class Token:
 
     def balance_of(self, address):
         """ Return the balance of `address`. """
-        return self.proxy.contract.functions.balanceOf(
-            to_checksum_address(address),
-        ).call()
+        return self.client.call_cache.call(
+            (self.address, 'balanceOf', address),
+            self.proxy.contract.functions.balanceOf(to_checksum_address(address)).call,
+        )
 
     def transfer(self, to_address, amount):
         transaction_hash = self.proxy.transact(
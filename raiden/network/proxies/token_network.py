@@ -1,4 +1,6 @@
 from collections import defaultdict
+
+import gevent
 from gevent.event import AsyncResult
 from typing import List, NamedTuple, Optional
 
@@ -77,6 +79,16 @@ class ChannelDetails(NamedTuple):
     participants_data: ParticipantsDetails
 
 
+def _concurrent_calls(*functions):
+    """ Call the functions in concurrent greenlets and return their results,
+    the calls made to the ethereum node at the same time are sent in a single
+    batch by the BatchingHTTPProvider.
+    """
+    greenlets = [gevent.spawn(function) for function in functions]
+    gevent.joinall(greenlets)
+    return [greenlet.get() for greenlet in greenlets]
+
+
 class TokenNetwork:
     def __init__(
             self,
@@ -116,16 +128,30 @@ class TokenNetwork:
 
     def _call_and_check_result(self, function_name: str, *args):
         fn = getattr(self.proxy.contract.functions, function_name)
-        call_result = fn(*args).call()
+        call_result = self.client.call_cache.call(
+            (self.address, function_name, args),
+            fn(*args).call,
+        )
 
         if call_result == b'':
             raise RuntimeError(f"Call to '{function_name}' returned nothing")
 
         return call_result
 
+    def _call_immutable(self, function_name: str):
+        """ Call a function whose result never changes, e.g. a constant of
+        the contract, the result is cached permanently.
+        """
+        fn = getattr(self.proxy.contract.functions, function_name)
+        return self.client.call_cache.call(
+            (self.address, function_name),
+            fn().call,
+            permanent=True,
+        )
+
     def token_address(self) -> typing.Address:
         """ Return the token of this manager. """
-        return to_canonical_address(self.proxy.contract.functions.token().call())
+        return to_canonical_address(self._call_immutable('token'))
 
     def new_netting_channel(
             self,
@@ -144,14 +170,18 @@ class TokenNetwork:
         if not is_binary_address(partner):
             raise InvalidAddress('Expected binary address format for channel partner')
 
+        timeout_min, timeout_max = _concurrent_calls(
+            self.settlement_timeout_min,
+            self.settlement_timeout_max,
+        )
         invalid_timeout = (
-            settle_timeout < self.settlement_timeout_min() or
-            settle_timeout > self.settlement_timeout_max()
+            settle_timeout < timeout_min or
+            settle_timeout > timeout_max
         )
         if invalid_timeout:
             raise InvalidSettleTimeout('settle_timeout must be in range [{}, {}], is {}'.format(
-                self.settlement_timeout_min(),
-                self.settlement_timeout_max(),
+                timeout_min,
+                timeout_max,
                 settle_timeout,
             ))
 
@@ -177,7 +207,17 @@ class TokenNetwork:
             # All other concurrent threads should block on the result of opening this channel
             self.open_channel_transactions[partner].get()
 
-        channel_created = self.channel_exists_and_not_settled(self.node_address, partner)
+        # The channel state and identifier are read with the same calls
+        try:
+            channel_data = self.detail_channel(self.node_address, partner)
+        except RaidenRecoverableError:
+            channel_data = None
+
+        channel_created = (
+            channel_data is not None and
+            channel_data.state > ChannelState.NONEXISTENT and
+            channel_data.state < ChannelState.SETTLED
+        )
         if channel_created is False:
             log.error(
                 'creating new channel failed',
@@ -186,7 +226,7 @@ class TokenNetwork:
             )
             raise RaidenUnrecoverableError('creating new channel failed')
 
-        channel_identifier = self.detail_channel(self.node_address, partner).channel_identifier
+        channel_identifier = channel_data.channel_identifier
 
         log.info(
             'new_netting_channel called',
@@ -338,8 +378,10 @@ class TokenNetwork:
             channel_identifier=channel_identifier,
         )
 
-        our_data = self.detail_participant(channel_identifier, participant1, participant2)
-        partner_data = self.detail_participant(channel_identifier, participant2, participant1)
+        our_data, partner_data = _concurrent_calls(
+            lambda: self.detail_participant(channel_identifier, participant1, participant2),
+            lambda: self.detail_participant(channel_identifier, participant2, participant1),
+        )
         return ParticipantsDetails(our_details=our_data, partner_details=partner_data)
 
     def detail(
@@ -360,13 +402,17 @@ class TokenNetwork:
         if self.node_address == participant2:
             participant1, participant2 = participant2, participant1
 
-        channel_data = self.detail_channel(participant1, participant2, channel_identifier)
-        participants_data = self.detail_participants(
-            participant1,
-            participant2,
-            channel_data.channel_identifier,
+        channel_identifier = self._inspect_channel_identifier(
+            participant1=participant1,
+            participant2=participant2,
+            called_by_fn='detail',
+            channel_identifier=channel_identifier,
+        )
+        channel_data, participants_data, chain_id = _concurrent_calls(
+            lambda: self.detail_channel(participant1, participant2, channel_identifier),
+            lambda: self.detail_participants(participant1, participant2, channel_identifier),
+            lambda: self._call_immutable('chain_id'),
         )
-        chain_id = self.proxy.contract.functions.chain_id().call()
 
         return ChannelDetails(
             chain_id=chain_id,
@@ -376,11 +422,11 @@ class TokenNetwork:
 
     def settlement_timeout_min(self) -> int:
         """ Returns the minimal settlement timeout for the token network. """
-        return self.proxy.contract.functions.settlement_timeout_min().call()
+        return self._call_immutable('settlement_timeout_min')
 
     def settlement_timeout_max(self) -> int:
         """ Returns the maximal settlement timeout for the token network. """
-        return self.proxy.contract.functions.settlement_timeout_max().call()
+        return self._call_immutable('settlement_timeout_max')
 
     def settle_block_number(
             self,
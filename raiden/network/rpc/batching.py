@@ -0,0 +1,162 @@
+""" Batched JSON-RPC requests to the ethereum node.
+
+The HTTPProvider of web3 sends one HTTP request per call, the greenlets which
+call the node concurrently, e.g. when several channels are opened at once,
+wait for one round-trip each. `BatchingHTTPProvider` sends the requests made
+in the same iteration of the event loop in a single JSON-RPC batch:
+
+- The first request of an iteration spawns the greenlet which sends the
+  batch, the requests made before it runs join the batch.
+- An `eth_call` identical to a call which is waiting for its response, the
+  same contract, data and block, waits for that response instead of being
+  sent again.
+- The batches are sent over a pool of keep-alive connections.
+"""
+import json
+
+import gevent
+import requests
+import structlog
+from gevent.event import AsyncResult
+from requests.adapters import HTTPAdapter
+from web3 import HTTPProvider
+from web3.utils.encoding import FriendlyJsonSerde
+
+from raiden.settings import DEFAULT_RPC_CONNECTION_POOL_SIZE, DEFAULT_RPC_MAX_BATCH_SIZE
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Requests without side effects, identical requests in flight at the same time
+# return the same response. The connectivity check of the JSONRPCClient calls
+# web3_clientVersion before every request.
+COALESCED_METHODS = ('eth_call', 'web3_clientVersion')
+
+# The same default as the web3 HTTPProvider
+DEFAULT_REQUEST_TIMEOUT = 10
+
+
+class BatchingHTTPProvider(HTTPProvider):
+    """ An HTTPProvider which sends the concurrent requests in JSON-RPC
+    batches, see the module documentation.
+
+    A batch of a single request is sent as a plain request. If the node
+    doesn't support batches the requests are sent one by one.
+    """
+
+    def __init__(
+            self,
+            endpoint_uri=None,
+            request_kwargs=None,
+            max_batch_size: int = DEFAULT_RPC_MAX_BATCH_SIZE,
+            pool_size: int = DEFAULT_RPC_CONNECTION_POOL_SIZE,
+    ):
+        if not isinstance(max_batch_size, int) or max_batch_size < 1:
+            raise ValueError('max_batch_size must be a positive integer')
+
+        super().__init__(endpoint_uri, request_kwargs)
+
+        self.max_batch_size = max_batch_size
+        self.batches_supported = True
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.pending = list()
+        self.in_flight = dict()
+
+    def make_request(self, method, params):
+        key = None
+        if method in COALESCED_METHODS:
+            try:
+                key = (method, json.dumps(params, sort_keys=True))
+            except TypeError:
+                key = None
+
+            in_flight = self.in_flight.get(key)
+            if in_flight is not None:
+                return in_flight.get()
+
+        async_result = AsyncResult()
+        if key is not None:
+            self.in_flight[key] = async_result
+
+        self.pending.append((method, params, key, async_result))
+        if len(self.pending) == 1:
+            gevent.spawn(self.flush)
+
+        return async_result.get()
+
+    def flush(self):
+        """ Send the pending requests, in batches of at most `max_batch_size`
+        requests sent concurrently.
+        """
+        pending = self.pending
+        self.pending = list()
+
+        batches = [
+            pending[start:start + self.max_batch_size]
+            for start in range(0, len(pending), self.max_batch_size)
+        ]
+        for batch in batches[1:]:
+            gevent.spawn(self.send_batch, batch)
+        self.send_batch(batches[0])
+
+    def send_batch(self, batch):
+        rpc_requests = [
+            {
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params or [],
+                'id': next(self.request_counter),
+            }
+            for method, params, _, _ in batch
+        ]
+
+        try:
+            if len(rpc_requests) == 1 or not self.batches_supported:
+                responses = [self._post(rpc_request) for rpc_request in rpc_requests]
+            else:
+                responses = self._post(rpc_requests)
+
+                # the node answers a batch it doesn't support with an error
+                if not isinstance(responses, list):
+                    log.warning('The ethereum node does not support batch requests')
+                    self.batches_supported = False
+                    responses = [self._post(rpc_request) for rpc_request in rpc_requests]
+        except Exception as e:  # pylint: disable=broad-except
+            self._done(batch)
+            for _, _, _, async_result in batch:
+                async_result.set_exception(e)
+            return
+
+        ids_to_responses = {response.get('id'): response for response in responses}
+        self._done(batch)
+
+        for rpc_request, (_, _, _, async_result) in zip(rpc_requests, batch):
+            response = ids_to_responses.get(rpc_request['id'])
+            if response is None:
+                async_result.set_exception(ValueError(
+                    f'No response for the request {rpc_request["id"]} of the batch',
+                ))
+            else:
+                async_result.set(response)
+
+    def _done(self, batch):
+        """ The identical requests made from now on are sent again. """
+        for _, _, key, async_result in batch:
+            if key is not None and self.in_flight.get(key) is async_result:
+                del self.in_flight[key]
+
+    def _post(self, data):
+        request_kwargs = self.get_request_kwargs()
+        request_kwargs.setdefault('timeout', DEFAULT_REQUEST_TIMEOUT)
+
+        response = self.session.post(
+            self.endpoint_uri,
+            data=FriendlyJsonSerde().json_encode(data),
+            **request_kwargs,
+        )
+        response.raise_for_status()
+
+        return self.decode_rpc_response(response.content)
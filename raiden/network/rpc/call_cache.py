@@ -0,0 +1,91 @@
+""" Cache of the contract calls made by the proxies.
+
+The state of the contracts changes at most once per block, the calls made
+several times in the same block, e.g. the channel details read by the API and
+by the payment handling, can share the result of the first call:
+
+- The block entries are valid until the next block, they are dropped by the
+  `new_block` callback of the AlarmTask and when a transaction of this node is
+  mined, so that the proxies read the effects of their own transactions.
+- The permanent entries are for the values which never change, like the token
+  of a token network or the settle timeout of a channel.
+
+Before the first block is known only the permanent entries are used.
+"""
+from typing import Any, Callable, Hashable
+
+import structlog
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+class CallCache:
+    """ Caches the results of the contract calls, keyed by the contract, the
+    function and its arguments, see the module documentation.
+    """
+
+    def __init__(self):
+        self.block_number = None
+        self.block_entries = dict()
+        self.permanent_entries = dict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """ The fraction of the calls answered by the cache. """
+        total = self.hits + self.misses
+
+        if total == 0:
+            return 0.0
+
+        return self.hits / total
+
+    def new_block(
+            self,
+            block_number: int,
+            chain_id: int = None,  # pylint: disable=unused-argument
+    ):
+        """ AlarmTask callback, drops the entries of the previous block. """
+        if block_number != self.block_number:
+            log.debug(
+                'call cache new block',
+                block_number=block_number,
+                hits=self.hits,
+                misses=self.misses,
+                entries=len(self.block_entries),
+            )
+            self.block_number = block_number
+            self.invalidate()
+
+    def invalidate(self):
+        """ Drop the block entries, the state of the contracts changed. """
+        self.block_entries = dict()
+
+    def call(self, key: Hashable, function: Callable[[], Any], permanent: bool = False) -> Any:
+        """ Return the cached result for `key`, calling `function` on a miss.
+
+        The errors raised by `function` are not cached.
+        """
+        if permanent:
+            entries = self.permanent_entries
+        elif self.block_number is not None:
+            entries = self.block_entries
+        else:
+            self.misses += 1
+            return function()
+
+        if key in entries:
+            self.hits += 1
+            return entries[key]
+
+        self.misses += 1
+        result = function()
+
+        # If the entries were invalidated while the call was in flight the
+        # result is stored in the dropped dictionary, it may predate the
+        # change which caused the invalidation.
+        entries[key] = result
+
+        return result
@@ -40,6 +40,7 @@ from raiden.utils.typing import (
     Optional,
 )
 from raiden.utils.filters import StatelessFilter
+from raiden.network.rpc.call_cache import CallCache
 from raiden.network.rpc.smartcontract_proxy import ContractProxy
 from raiden.utils.solc import (
     solidity_unresolved_symbols,
@@ -217,6 +218,8 @@ class JSONRPCClient:
         # gets constructed before the RaidenService Object.
         self.stop_event = None
         self.web3 = web3
+        # The contract calls of the proxies, invalidated on every block
+        self.call_cache = CallCache()
 
         self._gaslimit_cache = TTLCache(maxsize=16, ttl=RPC_CACHE_TTL)
         self._gasprice_cache = TTLCache(maxsize=16, ttl=RPC_CACHE_TTL)
@@ -506,6 +509,9 @@ class JSONRPCClient:
             last_result = transaction
             gevent.sleep(.5)
 
+        # the calls made from now on must see the effects of the transaction
+        self.call_cache.invalidate()
+
         if confirmations:
             # this will wait for both APPLIED and REVERTED transactions
             transaction_block = transaction['blockNumber']
@@ -43,10 +43,12 @@ from raiden.messages import (
     SignedMessage,
     Message,
     Processed,
+    recover_senders,
 )
 from raiden.network.transport.udp import udp_utils
 from raiden.network.utils import get_http_rtt
 from raiden.raiden_service import RaidenService
+from raiden.settings import DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY
 from raiden.transfer import events as transfer_events
 from raiden.transfer.architecture import Event
 from raiden.transfer.mediated_transfer import events as mediated_transfer_events
@@ -125,6 +127,9 @@ class MatrixTransport:
     _room_prefix = 'raiden'
     _room_sep = '_'
     _userid_re = re.compile(r'^@(0x[0-9a-f]{40})(?:\.[0-9a-f]{8})?(?::.+)?$')
+    # Maximum size of the body of a room event with batched messages, the
+    # homeservers reject events larger than 65536 bytes
+    _batch_max_size = 32 * 1024
 
     def __init__(self, config: dict):
         self._raiden_service: RaidenService = None
@@ -182,6 +187,10 @@ class MatrixTransport:
         self._running = False
         self._health_semaphore = gevent.lock.Semaphore()
 
+        # The messages waiting to be sent in a single event, by room id
+        self._batch_latency = config.get('batch_latency', DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY)
+        self._roomids_to_batch: Dict[str, List[str]] = dict()
+
         self._client.add_invite_listener(self._handle_invite)
         self._client.add_presence_listener(self._handle_presence_change)
 
@@ -463,7 +472,42 @@ class MatrixTransport:
             # user not start_health_check'ed
             return
 
-        data = event['content']['body']
+        # The messages batched in a single event are separated by newlines,
+        # which are escaped by the JSON and hex encodings
+        messages = list()
+        for data in event['content']['body'].split('\n'):
+            message = self._parse_message(data, peer_address)
+            if message is not None:
+                messages.append(message)
+
+        recover_senders(messages)
+
+        for message in messages:
+            if isinstance(message, Delivered):
+                self._receive_delivered(message)
+            elif isinstance(message, Ping):
+                self.log.warning(
+                    'Not required Ping received',
+                    message=message,
+                )
+            elif isinstance(message, SignedMessage):
+                if message.sender != peer_address:
+                    self.log.warning(
+                        'Message not signed by sender!',
+                        message=message,
+                        signer=message.sender,
+                        peer_address=peer_address,
+                    )
+                    continue
+                self._receive_message(message)
+            else:
+                self.log.error(
+                    'Invalid message',
+                    message=message,
+                )
+
+    def _parse_message(self, data: str, peer_address: Address) -> Optional[Message]:
+        """ Decode a message sent as hex encoded binary data or as JSON """
         if data.startswith('0x'):
             try:
                 message = message_from_bytes(decode_hex(data))
@@ -475,7 +519,7 @@ class MatrixTransport:
                     peer_address=pex(peer_address),
                     exception=ex,
                 )
-                return
+                return None
         else:
             try:
                 message_dict = json.loads(data)
@@ -488,30 +532,9 @@ class MatrixTransport:
                     peer_address=pex(peer_address),
                     exception=ex,
                 )
-                return
+                return None
 
-        if isinstance(message, Delivered):
-            self._receive_delivered(message)
-        elif isinstance(message, Ping):
-            self.log.warning(
-                'Not required Ping received',
-                message=data,
-            )
-        elif isinstance(message, SignedMessage):
-            if message.sender != peer_address:
-                self.log.warning(
-                    'Message not signed by sender!',
-                    message=message,
-                    signer=message.sender,
-                    peer_address=peer_address,
-                )
-                return
-            self._receive_message(message)
-        else:
-            self.log.error(
-                'Invalid message',
-                message=data,
-            )
+        return message
 
     def _receive_delivered(self, delivered: Delivered):
         # FIXME: The signature doesn't seem to be verified - check in UDPTransport as well
@@ -602,7 +625,36 @@ class MatrixTransport:
         room = self._get_room_for_address(receiver_address)
         if not room:
             return
-        self.log.debug('SEND', room=room, data=data)
+
+        if not self._batch_latency:
+            self.log.debug('SEND', room=room, data=data)
+            room.send_text(data)
+            return
+
+        batch = self._roomids_to_batch.setdefault(room.room_id, list())
+        if data in batch:
+            # a retry of a message which was not sent yet
+            return
+
+        batch_size = sum(len(queued) + 1 for queued in batch)
+        if batch and batch_size + len(data) > self._batch_max_size:
+            self._send_batch(room)
+            batch = self._roomids_to_batch.setdefault(room.room_id, list())
+
+        batch.append(data)
+        if len(batch) == 1:
+            self.greenlets.append(
+                gevent.spawn_later(self._batch_latency, self._send_batch, room),
+            )
+
+    def _send_batch(self, room: Room):
+        """ Send the messages batched for room in a single event. """
+        batch = self._roomids_to_batch.pop(room.room_id, None)
+        if not batch:
+            return
+
+        data = '\n'.join(batch)
+        self.log.debug('SEND', room=room, data=data, messages=len(batch))
         room.send_text(data)
 
     def _get_room_for_address(
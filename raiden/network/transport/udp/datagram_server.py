@@ -0,0 +1,110 @@
+""" Batched datagram I/O for the UDP transport.
+
+The gevent DatagramServer reads a single datagram per wakeup of the socket
+and spawns a greenlet to handle it, every packet sent goes through the
+gevent socket. Python doesn't expose recvmmsg/sendmmsg, `BatchDatagramServer`
+gives the same batching with the non-blocking socket:
+
+- When the socket is readable all the pending datagrams are read, up to
+  `max_batch`, into a preallocated buffer, and a single greenlet handles the
+  batch.
+- The packets sent in the same iteration of the event loop are queued and
+  sent together at the end of it.
+"""
+from errno import EWOULDBLOCK
+from socket import error as SocketError
+
+import gevent
+import structlog
+from gevent.server import DatagramServer
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+# The same read size as the gevent DatagramServer, the packets larger than the
+# transport's maximum are detected and rejected instead of being truncated
+DATAGRAM_MAX_SIZE = 8192
+
+
+class BatchDatagramServer(DatagramServer):
+    """ A DatagramServer which handles the datagrams in batches, `handle` is
+    called with a list of `(data, address)` tuples.
+
+    The datagrams are read into a preallocated buffer and copied out of it.
+    The handlers may run concurrently and the packets of the protocol are
+    small, so reusing a single buffer is cheaper than keeping one per batch.
+    """
+
+    def __init__(self, *args, max_batch: int = 64, max_size: int = DATAGRAM_MAX_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_batch = max_batch
+        self.buffer = bytearray(max_size)
+        self.outgoing = list()
+
+    def do_read(self):
+        recvfrom_into = self._socket.recvfrom_into
+        buffer_ = self.buffer
+        view = memoryview(buffer_)
+        datagrams = list()
+
+        while len(datagrams) < self.max_batch:
+            try:
+                size, address = recvfrom_into(buffer_)
+            except SocketError as err:
+                if err.args[0] == EWOULDBLOCK:
+                    break
+
+                # handle the datagrams already read, the error is raised by
+                # the next read
+                if datagrams:
+                    break
+
+                raise
+
+            datagrams.append((view[:size].tobytes(), address))
+
+        if not datagrams:
+            return None
+
+        return (datagrams, )
+
+    def sendto(self, data, address):
+        """ Queue the datagram, the datagrams queued in the same iteration of
+        the event loop are sent together.
+        """
+        self.outgoing.append((data, address))
+
+        if len(self.outgoing) == 1:
+            self.loop.run_callback(self.flush)
+
+    def flush(self):
+        """ Send the queued datagrams, this runs in the hub and must not
+        block, the datagrams which don't fit in the socket buffer are sent
+        by a greenlet.
+        """
+        outgoing = self.outgoing
+        self.outgoing = list()
+
+        # the server was stopped
+        if not hasattr(self, 'socket'):
+            return
+
+        sendto = self._socket.sendto
+        for position, (data, address) in enumerate(outgoing):
+            try:
+                sendto(data, address)
+            except SocketError as err:
+                if err.args[0] == EWOULDBLOCK:
+                    gevent.spawn(self.send_blocking, outgoing[position:])
+                    return
+
+                log.error('error sending packet', address=address, error=err)
+
+    def send_blocking(self, outgoing):
+        for data, address in outgoing:
+            if not hasattr(self, 'socket'):
+                return
+
+            try:
+                DatagramServer.sendto(self, data, address)
+            except SocketError as err:
+                log.error('error sending packet', address=address, error=err)
@@ -7,13 +7,16 @@ from gevent.event import (
     AsyncResult,
     Event,
 )
+from gevent.pool import Pool
 from gevent.server import DatagramServer
 import structlog
 from eth_utils import is_binary_address
 
+from raiden.encoding import messages as encoding_messages
 from raiden.transfer.mediated_transfer.events import CHANNEL_IDENTIFIER_GLOBAL_QUEUE
 from raiden.exceptions import (
     InvalidAddress,
+    InvalidProtocolMessage,
     UnknownAddress,
     RaidenShuttingDown,
 )
@@ -24,14 +27,21 @@ from raiden.messages import (
     Message,
     Ping,
     Pong,
+    recover_senders,
+)
+from raiden.settings import (
+    CACHE_TTL,
+    DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+    DEFAULT_TRANSPORT_UDP_IO_BATCH_SIZE,
+    DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
 )
-from raiden.settings import CACHE_TTL
 from raiden.utils import pex, typing
 from raiden.utils.notifying_queue import NotifyingQueue
 from raiden.message_handler import on_message
 from raiden.transfer.state_change import ReceiveDelivered
 from raiden.transfer.state_change import ActionChangeNodeNetworkState
 from raiden.network.transport.udp import healthcheck
+from raiden.network.transport.udp.datagram_server import BatchDatagramServer
 from raiden.network.transport.udp.udp_utils import (
     event_first_of,
     timeout_exponential_backoff,
@@ -141,6 +151,95 @@ def single_queue_send(
                     return
 
 
+def retry_in_window(*args):
+    try:
+        retry_with_recovery(*args)
+    except RaidenShuttingDown:  # For a clean shutdown process
+        pass
+
+
+def windowed_queue_send(
+        transport: 'UDPTransport',
+        recipient: typing.Address,
+        queue: Queue_T,
+        event_stop: Event,
+        event_healthy: Event,
+        event_unhealthy: Event,
+        send_window: int,
+        message_retries: int,
+        message_retry_timeout: int,
+        message_retry_max_timeout: int,
+):
+    """ Handles a single message queue for `recipient`, with up to
+    `send_window` unacknowledged messages in flight.
+
+    Notes:
+    - The same requirements as `single_queue_send` apply.
+    - Every message in flight is retried with its own backoff, only the
+      unacknowledged messages are sent again.
+    - The messages are sent in order, but if a packet is lost the next
+      messages may be processed before it. The partner acknowledges every
+      message it knows, even a balance proof it rejects because of its nonce,
+      so this must only be used for the global queue, whose messages don't
+      depend on each other. The channel queues send one message at a time.
+    """
+    if not isinstance(queue, NotifyingQueue):
+        raise ValueError('queue must be a NotifyingQueue.')
+
+    # Reusing the event, clear must be carefully done
+    data_or_stop = event_first_of(
+        queue,
+        event_stop,
+    )
+
+    # Wait for the endpoint registration or to quit
+    event_first_of(
+        event_healthy,
+        event_stop,
+    ).wait()
+
+    window = Pool(send_window)
+
+    while not event_stop.is_set():
+        data_or_stop.wait()
+
+        # The messages in flight return once they are acknowledged or the
+        # stop event is set.
+        window.wait_available()
+
+        if event_stop.is_set():
+            break
+
+        # This task being the only consumer is a requirement, the message is
+        # removed from the queue while it's in flight.
+        (messagedata, message_id) = queue.get(block=False)
+
+        backoff = timeout_exponential_backoff(
+            message_retries,
+            message_retry_timeout,
+            message_retry_max_timeout,
+        )
+
+        window.spawn(
+            retry_in_window,
+            transport,
+            messagedata,
+            message_id,
+            recipient,
+            event_stop,
+            event_healthy,
+            event_unhealthy,
+            backoff,
+        )
+
+        # See single_queue_send
+        if not queue:
+            data_or_stop.clear()
+
+    # The transport closes the socket once this task is finished
+    window.join()
+
+
 class UDPTransport:
     UDP_MAX_MESSAGE_SIZE = 1200
 
@@ -157,6 +256,14 @@ class UDPTransport:
         self.nat_keepalive_retries = config['nat_keepalive_retries']
         self.nat_keepalive_timeout = config['nat_keepalive_timeout']
         self.nat_invitation_timeout = config['nat_invitation_timeout']
+        self.send_window = config.get('send_window', DEFAULT_TRANSPORT_UDP_SEND_WINDOW)
+        self.delivered_batch_latency = config.get(
+            'delivered_batch_latency',
+            DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+        )
+        self.delivered_per_packet = (
+            self.UDP_MAX_MESSAGE_SIZE // encoding_messages.Delivered.size
+        )
 
         self.event_stop = Event()
 
@@ -165,6 +272,9 @@ class UDPTransport:
 
         self.messageids_to_asyncresults = dict()
 
+        # The encoded Delivered messages waiting to be sent in a single packet
+        self.addresses_to_delivered = dict()
+
         # Maps the addresses to a dict with the latest nonce (using a dict
         # because python integers are immutable)
         self.nodeaddresses_to_nonces = dict()
@@ -177,7 +287,18 @@ class UDPTransport:
         self.get_host_port = cache_wrapper(discovery.get)
 
         self.throttle_policy = throttle_policy
-        self.server = DatagramServer(udpsocket, handle=self._receive)
+
+        io_batch_size = config.get('io_batch_size', DEFAULT_TRANSPORT_UDP_IO_BATCH_SIZE)
+        if io_batch_size > 1:
+            self.server_handle = self._receive_batch
+            self.server = BatchDatagramServer(
+                udpsocket,
+                handle=self.server_handle,
+                max_batch=io_batch_size,
+            )
+        else:
+            self.server_handle = self._receive
+            self.server = DatagramServer(udpsocket, handle=self.server_handle)
 
     def start(
             self,
@@ -189,7 +310,7 @@ class UDPTransport:
 
         # server.stop() clears the handle. Since this may be a restart the
         # handle must always be set
-        self.server.set_handle(self._receive)
+        self.server.set_handle(self.server_handle)
 
         for queue_identifier, queue in queueids_to_queues.items():
             encoded_queue = list()
@@ -290,20 +411,38 @@ class UDPTransport:
 
         events = self.get_health_events(recipient)
 
-        greenlet_queue = gevent.spawn(
-            single_queue_send,
-            self,
-            recipient,
-            queue,
-            self.event_stop,
-            events.event_healthy,
-            events.event_unhealthy,
-            self.retries_before_backoff,
-            self.retry_interval,
-            self.retry_interval * 10,
+        is_global_queue = (
+            queue_identifier.channel_identifier == CHANNEL_IDENTIFIER_GLOBAL_QUEUE
         )
+        if self.send_window > 1 and is_global_queue:
+            greenlet_queue = gevent.spawn(
+                windowed_queue_send,
+                self,
+                recipient,
+                queue,
+                self.event_stop,
+                events.event_healthy,
+                events.event_unhealthy,
+                self.send_window,
+                self.retries_before_backoff,
+                self.retry_interval,
+                self.retry_interval * 10,
+            )
+        else:
+            greenlet_queue = gevent.spawn(
+                single_queue_send,
+                self,
+                recipient,
+                queue,
+                self.event_stop,
+                events.event_healthy,
+                events.event_unhealthy,
+                self.retries_before_backoff,
+                self.retry_interval,
+                self.retry_interval * 10,
+            )
 
-        if queue_identifier.channel_identifier == CHANNEL_IDENTIFIER_GLOBAL_QUEUE:
+        if is_global_queue:
             greenlet_queue.name = f'Queue for {pex(recipient)} - global'
         else:
             greenlet_queue.name = (
@@ -433,10 +572,50 @@ class UDPTransport:
         except RaidenShuttingDown:  # For a clean shutdown
             return
 
+    def _receive_batch(self, datagrams):
+        try:
+            self.receive_batch([data for data, _ in datagrams])
+        except RaidenShuttingDown:  # For a clean shutdown
+            return
+
     def receive(self, messagedata: bytes):
         """ Handle an UDP packet. """
-        # pylint: disable=unidiomatic-typecheck
+        for message in self._decode(messagedata):
+            self._dispatch(message)
+
+    def receive_batch(self, messagedatas: typing.List[bytes]):
+        """ Handle a burst of UDP packets.
 
+        The packets are decoded first and the senders of the messages are
+        recovered on the worker threads of the signature recovery pool, the
+        messages are then handled in order as done by `receive`. An invalid
+        packet, or a message which fails to be handled, doesn't affect the
+        other messages of the burst.
+        """
+        messages = [
+            message
+            for messagedata in messagedatas
+            for message in self._decode(messagedata)
+        ]
+
+        recover_senders(messages)
+
+        for message in messages:
+            try:
+                self._dispatch(message)
+            except RaidenShuttingDown:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                log.exception(
+                    'Failed to handle the message',
+                    node=pex(self.raiden.address),
+                    message=message,
+                )
+
+    def _decode(self, messagedata: bytes) -> typing.List[Message]:
+        """ Decode the messages of an UDP packet, a packet may contain
+        several messages, e.g. coalesced Delivered messages.
+        """
         if len(messagedata) > self.UDP_MAX_MESSAGE_SIZE:
             log.error(
                 'INVALID MESSAGE: Packet larger than maximum size',
@@ -444,9 +623,42 @@ class UDPTransport:
                 message=hexlify(messagedata),
                 length=len(messagedata),
             )
-            return
-
-        message = decode(messagedata)
+            return []
+
+        messages = list()
+        for data in encoding_messages.split_packet(messagedata):
+            try:
+                message = decode(data)
+            except InvalidProtocolMessage:
+                log.error(
+                    'INVALID MESSAGE: Unknown cmdid',
+                    node=pex(self.raiden.address),
+                    message=hexlify(data),
+                )
+                continue
+            except Exception as e:  # pylint: disable=broad-except
+                # the fields of the message are validated when it's decoded
+                log.error(
+                    'INVALID MESSAGE: Decoding failed',
+                    node=pex(self.raiden.address),
+                    message=hexlify(data),
+                    error=str(e),
+                )
+                continue
+
+            if message is None:
+                log.error(
+                    'INVALID MESSAGE: Invalid message data',
+                    node=pex(self.raiden.address),
+                    message=hexlify(data),
+                )
+            else:
+                messages.append(message)
+
+        return messages
+
+    def _dispatch(self, message: Message):
+        # pylint: disable=unidiomatic-typecheck
 
         if type(message) == Pong:
             self.receive_pong(message)
@@ -454,14 +666,8 @@ class UDPTransport:
             self.receive_ping(message)
         elif type(message) == Delivered:
             self.receive_delivered(message)
-        elif message is not None:
-            self.receive_message(message)
         else:
-            log.error(
-                'INVALID MESSAGE: Unknown cmdid',
-                node=pex(self.raiden.address),
-                message=hexlify(messagedata),
-            )
+            self.receive_message(message)
 
     def receive_message(self, message: Message):
         """ Handle a Raiden protocol message.
@@ -489,11 +695,50 @@ class UDPTransport:
             delivered_message = Delivered(message.message_identifier)
             self.raiden.sign(delivered_message)
 
-            self.maybe_send(
+            self.send_delivered(
                 message.sender,
                 delivered_message,
             )
 
+    def send_delivered(self, recipient: typing.Address, delivered: Delivered):
+        """ Send the Delivered message to recipient, the messages sent
+        within `delivered_batch_latency` to the same node are sent in a single
+        packet.
+        """
+        if not self.delivered_batch_latency:
+            self.maybe_send(recipient, delivered)
+            return
+
+        if not is_binary_address(recipient):
+            raise InvalidAddress('Invalid address {}'.format(pex(recipient)))
+
+        pending = self.addresses_to_delivered.setdefault(recipient, list())
+        pending.append(delivered.encode())
+
+        if len(pending) >= self.delivered_per_packet:
+            self.flush_delivered(recipient)
+        elif len(pending) == 1:
+            gevent.spawn_later(
+                self.delivered_batch_latency,
+                self.flush_delivered,
+                recipient,
+            )
+
+    def flush_delivered(self, recipient: typing.Address):
+        """ Send the pending Delivered messages for recipient. """
+        pending = self.addresses_to_delivered.pop(recipient, None)
+
+        if not pending:
+            return
+
+        try:
+            host_port = self.get_host_port(recipient)
+        except (InvalidAddress, UnknownAddress) as e:
+            log.debug("Couldn't send the `Delivered` messages", e=e)
+            return
+
+        self.maybe_sendraw(host_port, b''.join(pending))
+
     def receive_delivered(self, delivered: Delivered):
         """ Handle a Delivered message.
 
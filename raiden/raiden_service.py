@@ -1,6 +1,7 @@
 # pylint: disable=too-many-lines
 import os
 import random
+from functools import partial
 
 import filelock
 import gevent
@@ -24,9 +25,9 @@ from raiden.network.proxies import (
 from raiden.blockchain_events_handler import on_blockchain_event
 from raiden.blockchain.events import BlockchainEvents
 from raiden.raiden_event_handler import on_raiden_event
-from raiden.storage import wal, serialize, sqlite
+from raiden.storage import compaction, wal, serialize, snapshot, sqlite
 from raiden.tasks import AlarmTask
-from raiden.transfer import views, node
+from raiden.transfer import copy_on_write, views, node
 from raiden.transfer.state import RouteState, PaymentNetworkState
 from raiden.transfer.mediated_transfer.state import (
     lockedtransfersigned_from_message,
@@ -213,10 +214,30 @@ class RaidenService:
             )
 
         # The database may be :memory:
-        storage = sqlite.SQLiteStorage(self.database_path, serialize.PickleSerializer())
+        storage = sqlite.SQLiteStorage(
+            self.database_path,
+            serialize.SERIALIZERS[self.config['database_serializer']](),
+            **self.config['database'],
+        )
+        # The polled blockchain events are indexed for the REST API
+        self.blockchain_events.storage = storage
+
+        compact_storage = None
+        if self.config['database_compaction']:
+            compact_storage = partial(
+                compaction.compact,
+                archive_path=self.config['database_archive_path'],
+            )
+
         self.wal = wal.restore_from_latest_snapshot(
             node.state_transition,
             storage,
+            copy_on_write.copy_chain_state,
+            self.config['database_max_batch_latency'],
+            snapshot.ChainStateDeltas,
+            self.config['database_full_snapshot_interval'],
+            background_snapshots=True,
+            compaction=compact_storage,
         )
 
         if self.wal.state_manager.current_state is None:
@@ -262,6 +283,11 @@ class RaidenService:
             last_log_block_number,
         )
 
+        # Handle the events of the blocks mined while the node was offline
+        # before the first run of the alarm task, which polls all the blocks
+        # up to the latest at once.
+        self._catch_up_blockchain_events()
+
         # Complete the first_run of the alarm task and synchronize with the
         # blockchain since the last run.
         #
@@ -270,6 +296,9 @@ class RaidenService:
         # otherwise the state changes won't have effect.
         # - The alarm must complete its first run  before the transport is started,
         #  to avoid rejecting messages for unknown channels.
+        # The cached contract calls are invalidated before the blockchain events
+        # of the new block are handled.
+        self.alarm.register_callback(self.chain.client.call_cache.new_block)
         self.alarm.register_callback(self._callback_new_block)
 
         self.alarm.first_run()
@@ -342,6 +371,10 @@ class RaidenService:
 
         self.blockchain_events.reset()
 
+        # Save the state changes still waiting for a group commit
+        self.wal.flush()
+        self.wal.wait_for_snapshot()
+
         if self.db_lock is not None:
             self.db_lock.release()
 
@@ -386,6 +419,34 @@ class RaidenService:
     def start_health_check_for(self, node_address):
         self.transport.start_health_check(node_address)
 
+    def _catch_up_blockchain_events(self):
+        """ Handle the events of the blocks mined since the filters were
+        installed, chunk by chunk.
+
+        A `Block` state change is dispatched after the events of every chunk,
+        the filters of a node restarted while catching up are installed from
+        the last handled chunk.
+        """
+        chain_id = self.chain.network_id
+        target_block_number = self.chain.block_number()
+
+        with self.event_poll_lock:
+            chunks = self.blockchain_events.catch_up_blockchain_events(target_block_number)
+
+            for block_number, events in chunks:
+                for event in events:
+                    on_blockchain_event(self, event, block_number, chain_id)
+
+                state_change = Block(block_number)
+                self.handle_state_change(state_change, block_number)
+
+                log.info(
+                    'Catching up with the blockchain events',
+                    node=pex(self.address),
+                    block_number=block_number,
+                    target_block_number=target_block_number,
+                )
+
     def _callback_new_block(self, current_block_number, chain_id):
         """Called once a new block is detected by the alarm task.
 
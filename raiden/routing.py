@@ -1,10 +1,12 @@
-from typing import List
-from heapq import heappush, heappop
+from collections import namedtuple
+from typing import Any, Callable, List
+from heapq import heappush
 
 import networkx
 import structlog
 
 from raiden.transfer import channel, views
+from raiden.transfer.routing_index import RoutingIndex, get_routing_index
 from raiden.transfer.state import (
     ChainState,
     CHANNEL_STATE_OPENED,
@@ -22,29 +24,77 @@ def get_ordered_partners(
         from_address: typing.Address,
         to_address: typing.Address,
 ) -> List:
-    paths = list()
+    """ Return a heap of the neighbors of `from_address` which have a path to
+    `to_address`, ordered by the length of the path.
+    """
+    index = get_routing_index(network_graph)
 
-    try:
-        all_neighbors = networkx.all_neighbors(network_graph, from_address)
-    except networkx.NetworkXError:
+    if from_address not in index:
         # If `our_address` is not in the graph, no channels opened with the
         # address
         return []
 
-    for neighbor in all_neighbors:
-        try:
-            length = networkx.shortest_path_length(
-                network_graph,
-                neighbor,
-                to_address,
-            )
+    neighbors = index.neighbors(from_address)
+    distances = index.distances_to(to_address, neighbors)
+
+    paths = list()
+    for neighbor in neighbors:
+        length = distances.get(neighbor)
+
+        if length is not None:
             heappush(paths, (length, neighbor))
-        except (networkx.NetworkXNoPath, networkx.NodeNotFound):
-            pass
 
     return paths
 
 
+RouteCandidate = namedtuple(
+    'RouteCandidate',
+    'partner_address channel_identifier capacity distance',
+)
+
+
+def score_by_distance(candidate: RouteCandidate):
+    """ Prefer the partners with the shortest path to the target. """
+    return candidate.distance
+
+
+def score_by_distance_and_capacity(candidate: RouteCandidate):
+    """ Prefer the partners with the shortest path to the target, and among
+    these the channels with the largest capacity, which are the least likely
+    to be exhausted by the next payments.
+    """
+    return (candidate.distance, -candidate.capacity)
+
+
+DEFAULT_SCORE_ROUTE = score_by_distance_and_capacity
+
+
+def rank_candidates(
+        routing_index: RoutingIndex,
+        candidates: List[RouteCandidate],
+        to_address: typing.Address,
+        max_routes: int = None,
+        score_route: Callable[[RouteCandidate], Any] = DEFAULT_SCORE_ROUTE,
+) -> List[RouteCandidate]:
+    """ Set the distance of the `candidates` to `to_address` and return the
+    `max_routes` best candidates, ordered by `score_route` (lower is better).
+    The candidates without a path to the target are dropped.
+    """
+    distances = routing_index.distances_to(
+        to_address,
+        [candidate.partner_address for candidate in candidates],
+    )
+
+    ranked = [
+        candidate._replace(distance=distances[candidate.partner_address])
+        for candidate in candidates
+        if candidate.partner_address in distances
+    ]
+    ranked.sort(key=lambda candidate: (score_route(candidate), candidate.partner_address))
+
+    return ranked[:max_routes]
+
+
 def get_best_routes(
         chain_state: ChainState,
         token_network_id: typing.Address,
@@ -52,40 +102,38 @@ def get_best_routes(
         to_address: typing.Address,
         amount: int,
         previous_address: typing.Address,
+        max_routes: int = None,
+        score_route: Callable[[RouteCandidate], Any] = DEFAULT_SCORE_ROUTE,
 ) -> List[RouteState]:
     """ Returns a list of channels that can be used to make a transfer.
 
-    This will filter out channels that are not open and don't have enough
-    capacity.
+    This will filter out channels that are not open, don't have enough
+    capacity or whose partner is not reachable, and return at most
+    `max_routes` of the remaining channels ranked by `score_route`.
     """
-    # TODO: Route ranking.
-    # Rate each route to optimize the fee price/quality of each route and add a
-    # rate from in the range [0.0,1.0].
-
-    available_routes = list()
-
     token_network = views.get_token_network_by_identifier(
         chain_state,
         token_network_id,
     )
+    index = get_routing_index(token_network.network_graph.network)
 
-    network_statuses = views.get_networkstatuses(chain_state)
-
-    neighbors_heap = get_ordered_partners(
-        token_network.network_graph.network,
-        from_address,
-        to_address,
-    )
-
-    if not neighbors_heap:
+    if from_address not in index:
         log.warning(
             'No routes available',
             from_address=pex(from_address),
             to_address=pex(to_address),
         )
+        return list()
+
+    network_statuses = views.get_networkstatuses(chain_state)
 
-    while neighbors_heap:
-        _, partner_address = heappop(neighbors_heap)
+    # the known capacities and reachability are checked before the paths are
+    # searched, only the usable channels are ranked
+    candidates = list()
+    for partner_address in index.neighbors(from_address):
+        # don't send the message backwards
+        if partner_address == previous_address:
+            continue
 
         channel_state = views.get_channelstate_by_token_network_and_partner(
             chain_state,
@@ -93,10 +141,6 @@ def get_best_routes(
             partner_address,
         )
 
-        # don't send the message backwards
-        if partner_address == previous_address:
-            continue
-
         assert channel_state is not None
 
         if channel.get_status(channel_state) != CHANNEL_STATE_OPENED:
@@ -132,7 +176,23 @@ def get_best_routes(
             )
             continue
 
-        route_state = RouteState(partner_address, channel_state.identifier)
-        available_routes.append(route_state)
+        candidates.append(RouteCandidate(
+            partner_address,
+            channel_state.identifier,
+            distributable,
+            None,
+        ))
+
+    ranked = rank_candidates(index, candidates, to_address, max_routes, score_route)
+
+    if not ranked:
+        log.warning(
+            'No routes available',
+            from_address=pex(from_address),
+            to_address=pex(to_address),
+        )
 
-    return available_routes
+    return [
+        RouteState(candidate.partner_address, candidate.channel_identifier)
+        for candidate in ranked
+    ]
@@ -12,8 +12,21 @@ DEFAULT_TRANSPORT_RETRIES_BEFORE_BACKOFF = 5
 DEFAULT_TRANSPORT_THROTTLE_CAPACITY = 10.
 DEFAULT_TRANSPORT_THROTTLE_FILL_RATE = 10.
 DEFAULT_TRANSPORT_UDP_RETRY_INTERVAL = 1.
+# Maximum number of unacknowledged messages in flight in the global queue of a
+# node, with one the messages are sent one at a time. The messages of the
+# channel queues are always sent one at a time, they must be processed in order
+DEFAULT_TRANSPORT_UDP_SEND_WINDOW = 1
+# Maximum time in seconds a Delivered waits to be sent in a single packet with
+# the other Delivered messages to the same node, zero disables the coalescing
+DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY = 0
+# Maximum number of packets read from the socket and handled together, with
+# one every packet is handled by its own greenlet
+DEFAULT_TRANSPORT_UDP_IO_BATCH_SIZE = 64
 # matrix gets spammed with the default retry-interval of 1s, wait a little more
 DEFAULT_TRANSPORT_MATRIX_RETRY_INTERVAL = 5.
+# Maximum time in seconds a message waits to be sent in a single room event
+# with the other messages to the same room, zero disables the batching
+DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY = 0
 
 DEFAULT_REVEAL_TIMEOUT = 10
 DEFAULT_SETTLE_TIMEOUT = 500
@@ -30,6 +43,44 @@ DEFAULT_NAT_INVITATION_TIMEOUT = 15
 
 DEFAULT_SHUTDOWN_TIMEOUT = 2
 
+# The events of the blocks mined while the node was offline are fetched in
+# chunks of blocks, the size of the chunks adapts to the responses of the
+# ethereum node up to the maximum, and several chunks are fetched at once
+DEFAULT_CATCH_UP_CHUNK_SIZE = 1000
+DEFAULT_CATCH_UP_MAX_CHUNK_SIZE = 100000
+DEFAULT_CATCH_UP_CONCURRENCY = 4
+
+# Maximum number of requests sent to the ethereum node in a single JSON-RPC
+# batch, the requests made concurrently by the greenlets are batched
+DEFAULT_RPC_MAX_BATCH_SIZE = 100
+# Maximum number of keep-alive HTTP connections to the ethereum node
+DEFAULT_RPC_CONNECTION_POOL_SIZE = 10
+
+# Maximum time in seconds a state change waits to be saved together with other
+# state changes in a single database transaction, zero disables group commit
+DEFAULT_DATABASE_MAX_BATCH_LATENCY = 0
+
+# Every this many snapshots a full snapshot is saved, the snapshots in between
+# only contain the channels that changed since the last full snapshot
+DEFAULT_DATABASE_FULL_SNAPSHOT_INTERVAL = 10
+
+# Delete the state changes and events which are not needed to restore the
+# state after every full snapshot, see raiden.storage.compaction
+DEFAULT_DATABASE_COMPACTION = False
+
+# Format of the state changes, events and snapshots, see raiden.storage.serialize
+DEFAULT_DATABASE_SERIALIZER = 'pickle'
+
+# SQLite tuning, see https://www.sqlite.org/pragma.html
+DEFAULT_DATABASE_JOURNAL_MODE = 'WAL'
+# FULL syncs every commit, with NORMAL and WAL the last transactions may be
+# lost on a power loss, including balance proofs already acknowledged to the
+# partner. NORMAL is only an opt-in through config['database'].
+DEFAULT_DATABASE_SYNCHRONOUS = 'FULL'
+DEFAULT_DATABASE_CACHE_SIZE = -16 * 1024  # in KiB
+DEFAULT_DATABASE_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_DATABASE_READ_CONNECTIONS = 4
+
 ORACLE_BLOCKNUMBER_DRIFT_TOLERANCE = 3
 ETHERSCAN_API = 'https://{network}.etherscan.io/api?module=proxy&action={action}'
 
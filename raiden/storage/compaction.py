@@ -0,0 +1,223 @@
+""" Compaction of the database.
+
+The state changes are only needed to restore the state that is not in a
+snapshot, once a full snapshot is saved the older state changes, snapshots and
+deltas can be deleted. The events are kept if the API can return them, that
+is the events of the payment history and the events of a token network or a
+token, which are the channel and token network events of the REST API.
+
+The compaction is done in small batches, each in its own transaction, and
+yields to the other greenlets between batches so it can run while the node is
+running. The free pages are returned to the file system with an incremental
+vacuum, databases created before the incremental auto vacuum was enabled need
+one offline `vacuum`.
+
+Optionally the deleted state changes and events are appended to a gzip
+compressed archive, see `read_archive`.
+"""
+import gzip
+import struct
+import time
+from typing import NamedTuple
+
+import gevent
+import structlog
+
+from raiden.exceptions import InvalidDBData
+from raiden.storage.sqlite import event_columns
+from raiden.transfer.events import EVENTS_PAYMENT_HISTORY_RELATED
+
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Number of rows deleted in a single transaction
+COMPACTION_BATCH_SIZE = 500
+
+# Number of pages returned to the file system in a single transaction
+VACUUM_BATCH_PAGES = 256
+
+# Id of the first state change that was not yet compacted
+COMPACTED_SETTING = 'compacted_statechange_id'
+
+ARCHIVE_STATE_CHANGE = b'C'
+ARCHIVE_EVENT = b'E'
+# kind, identifier, length of the serialized data
+ARCHIVE_RECORD_HEADER = struct.Struct('>cQI')
+
+
+class CompactionStatistics(NamedTuple):
+    snapshot_state_change_id: int
+    deleted_state_changes: int
+    deleted_events: int
+    deleted_snapshots: int
+    vacuumed_pages: int
+    duration: float
+
+
+def is_payment_history_event(event):
+    return isinstance(event, EVENTS_PAYMENT_HISTORY_RELATED)
+
+
+def is_api_event(event):
+    """ True if the event can be returned by the API, either in the payment
+    history or filtered by its token network or token address.
+    """
+    _, token_network_identifier, token_address = event_columns(event)[:3]
+    return (
+        is_payment_history_event(event) or
+        token_network_identifier is not None or
+        token_address is not None
+    )
+
+
+def read_archive(archive_path):
+    """ Yield the (kind, identifier, serialized_data) records of an archive,
+    the data is serialized with the serializer of the storage.
+    """
+    with gzip.open(archive_path, 'rb') as archive:
+        while True:
+            header = archive.read(ARCHIVE_RECORD_HEADER.size)
+            if not header:
+                return
+
+            if len(header) != ARCHIVE_RECORD_HEADER.size:
+                raise InvalidDBData('Truncated archive record')
+
+            kind, identifier, size = ARCHIVE_RECORD_HEADER.unpack(header)
+            data = archive.read(size)
+            if len(data) != size:
+                raise InvalidDBData('Truncated archive record')
+
+            yield kind, identifier, data
+
+
+def _archive_records(archive, kind, rows):
+    if archive is None:
+        return
+
+    for identifier, data in rows:
+        archive.write(ARCHIVE_RECORD_HEADER.pack(kind, identifier, len(data)))
+        archive.write(data)
+
+    # every batch must be archived before it is deleted
+    archive.flush()
+
+
+def _compact_events(storage, archive, from_statechange_id, to_statechange_id, keep_event):
+    deleted = 0
+    chunks = storage.iterate_serialized_events(
+        from_statechange_id,
+        to_statechange_id,
+        COMPACTION_BATCH_SIZE,
+    )
+    for chunk in chunks:
+        prunable = [
+            (identifier, data)
+            for identifier, data in chunk
+            if not keep_event(storage.serializer.deserialize(data))
+        ]
+
+        if prunable:
+            _archive_records(archive, ARCHIVE_EVENT, prunable)
+            storage.delete_events([identifier for identifier, _ in prunable])
+            deleted += len(prunable)
+
+        gevent.sleep(0)
+
+    return deleted
+
+
+def _compact_state_changes(storage, archive, from_statechange_id, to_statechange_id):
+    deleted = 0
+    chunks = storage.iterate_unreferenced_statechanges(
+        from_statechange_id,
+        to_statechange_id,
+        COMPACTION_BATCH_SIZE,
+    )
+    for chunk in chunks:
+        _archive_records(archive, ARCHIVE_STATE_CHANGE, chunk)
+        storage.delete_statechanges([identifier for identifier, _ in chunk])
+        deleted += len(chunk)
+
+        gevent.sleep(0)
+
+    return deleted
+
+
+def _incremental_vacuum(storage):
+    vacuumed_pages = storage.incremental_vacuum(VACUUM_BATCH_PAGES)
+
+    if vacuumed_pages is None:
+        log.debug('Incremental vacuum is disabled, the database must be vacuumed offline')
+        return 0
+
+    total_pages = vacuumed_pages
+    while vacuumed_pages == VACUUM_BATCH_PAGES:
+        gevent.sleep(0)
+        vacuumed_pages = storage.incremental_vacuum(VACUUM_BATCH_PAGES)
+        total_pages += vacuumed_pages
+
+    return total_pages
+
+
+def compact(storage, keep_event=is_api_event, archive_path=None):
+    """ Delete the data which is not needed to restore the state from the
+    latest full snapshot.
+
+    Args:
+        storage: The SQLiteStorage to compact.
+        keep_event: Predicate of the events that must be kept, by default
+            the events which can be returned by the API.
+        archive_path: If given, the deleted state changes and events are
+            appended to this gzip file.
+
+    Returns:
+        The CompactionStatistics, or None if there is no snapshot.
+    """
+    start = time.monotonic()
+
+    snapshot_state_change_id = storage.get_latest_state_snapshot_statechange_id()
+    if snapshot_state_change_id is None:
+        return None
+
+    compacted_state_change_id = int(storage.get_setting(COMPACTED_SETTING) or 0)
+
+    deleted_snapshots = storage.delete_state_snapshots_before(snapshot_state_change_id)
+
+    archive = None
+    if archive_path is not None:
+        archive = gzip.open(archive_path, 'ab')
+
+    try:
+        deleted_events = _compact_events(
+            storage,
+            archive,
+            compacted_state_change_id,
+            snapshot_state_change_id,
+            keep_event,
+        )
+        deleted_state_changes = _compact_state_changes(
+            storage,
+            archive,
+            compacted_state_change_id,
+            snapshot_state_change_id,
+        )
+    finally:
+        if archive is not None:
+            archive.close()
+
+    # The state changes kept for the events are not examined again
+    storage.write_setting(COMPACTED_SETTING, str(snapshot_state_change_id))
+
+    vacuumed_pages = _incremental_vacuum(storage)
+
+    statistics = CompactionStatistics(
+        snapshot_state_change_id,
+        deleted_state_changes,
+        deleted_events,
+        deleted_snapshots,
+        vacuumed_pages,
+        time.monotonic() - start,
+    )
+    log.info('Database compacted', **statistics._asdict())
+
+    return statistics
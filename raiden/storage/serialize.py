@@ -1,4 +1,187 @@
+import importlib
+import keyword
 import pickle
+import random
+import struct
+from collections import defaultdict
+from functools import lru_cache
+from operator import attrgetter
+
+import msgpack
+import networkx
+
+from raiden.exceptions import InvalidDBData
+from raiden.transfer.architecture import Event, State, StateChange
+
+# Data written by the MsgpackSerializer starts with the magic followed by the
+# format version, pickle protocol 4 data starts with b'\x80\x04'.
+MSGPACK_MAGIC = b'RM'
+MSGPACK_FORMAT_VERSION = 1
+MSGPACK_HEADER = MSGPACK_MAGIC + bytes([MSGPACK_FORMAT_VERSION])
+
+# The header is followed by the schema table and the interned table, each
+# prefixed by its length
+TABLE_LENGTH = struct.Struct('>I')
+
+# Number of schema tables kept parsed
+SCHEMA_TABLE_CACHE_SIZE = 256
+
+# Only classes from these packages are instantiated by the deserializer.
+ALLOWED_MODULE_PREFIX = 'raiden.'
+
+# bytes fields with at least this length and the integers which don't fit in
+# a msgpack integer are written once per serialized object in the tables and
+# then referenced by index, this is mostly addresses, hashes and identifiers.
+INTERN_MIN_LENGTH = 20
+MSGPACK_MIN_INT = -2 ** 63
+MSGPACK_MAX_INT = 2 ** 64 - 1
+
+# msgpack extension types. The values which don't have a msgpack type are
+# written as an array which starts with an extension, the extension tells how
+# to restore the array once its items are unpacked.
+EXT_OBJECT = 1
+EXT_REFERENCE = 2
+EXT_INTERNED = 3
+EXT_TUPLE = 4
+EXT_SET = 5
+EXT_FROZENSET = 6
+EXT_DEFAULTDICT = 7
+EXT_RANDOM = 8
+EXT_GRAPH = 9
+EXT_SHARED = 12
+# only used in the tables, for the integers which don't fit in 64 bits
+EXT_INT = 10
+EXT_NEGATIVE_INT = 11
+
+# namedtuples which only have these types are written once and then referenced
+ATOM_TYPES = frozenset([type(None), bool, int, float, str, bytes])
+
+DEFAULT_FACTORIES = {
+    'dict': dict,
+    'list': list,
+    'set': set,
+}
+
+_layout_cache = dict()
+_class_cache = dict()
+_finish_cache = dict()
+
+
+def _ext(code, data):
+    # ExtType.__new__ checks its arguments in Python, these are known to be
+    # valid
+    return tuple.__new__(msgpack.ExtType, (code, data))
+
+
+def _index_ext(code, index):
+    if index < 0x100:
+        length = 1
+    elif index < 0x10000:
+        length = 2
+    else:
+        length = 4
+
+    return _ext(code, index.to_bytes(length, 'big'))
+
+
+_TUPLE_EXT = _index_ext(EXT_TUPLE, 0)
+_SET_EXT = _index_ext(EXT_SET, 0)
+_FROZENSET_EXT = _index_ext(EXT_FROZENSET, 0)
+_RANDOM_EXT = _index_ext(EXT_RANDOM, 0)
+_GRAPH_EXT = _index_ext(EXT_GRAPH, 0)
+
+
+def _class_layout(cls):
+    """ Return the names of the fields of `cls`, a getter for their values and
+    whether the instances also have a `__dict__`.
+
+    The getter is None for namedtuples, which are their own values.
+    """
+    layout = _layout_cache.get(cls)
+
+    if layout is not None:
+        return layout
+
+    if issubclass(cls, tuple) and hasattr(cls, '_fields'):
+        layout = (cls._fields, None, False)
+    elif issubclass(cls, (State, StateChange, Event)):
+        slots = list()
+        for base in reversed(cls.__mro__):
+            base_slots = base.__dict__.get('__slots__', ())
+            if isinstance(base_slots, str):
+                base_slots = (base_slots,)
+            slots.extend(
+                name
+                for name in base_slots
+                if name not in ('__dict__', '__weakref__')
+            )
+        slots = tuple(slots)
+
+        if len(slots) == 1:
+            single_getter = attrgetter(slots[0])
+
+            def getter(value):
+                return (single_getter(value),)
+        elif slots:
+            getter = attrgetter(*slots)
+        else:
+            def getter(value):  # pylint: disable=unused-argument
+                return ()
+
+        layout = (slots, getter, cls.__dictoffset__ != 0)
+    else:
+        raise TypeError(f'Cannot serialize objects of type {cls.__qualname__}')
+
+    _layout_cache[cls] = layout
+    return layout
+
+
+def _resolve_class(name):
+    cls = _class_cache.get(name)
+
+    if cls is None:
+        module_name, _, qualname = name.partition(':')
+        if not module_name.startswith(ALLOWED_MODULE_PREFIX):
+            raise InvalidDBData(f'Class {name} is not allowed')
+
+        try:
+            cls = importlib.import_module(module_name)
+            for attribute in qualname.split('.'):
+                cls = getattr(cls, attribute)
+        except (ImportError, AttributeError):
+            raise InvalidDBData(f'Unknown class {name}')
+
+        is_class = isinstance(cls, type)
+        is_namedtuple = is_class and issubclass(cls, tuple) and hasattr(cls, '_fields')
+        is_transfer_object = is_class and issubclass(cls, (State, StateChange, Event))
+        if not is_namedtuple and not is_transfer_object:
+            raise InvalidDBData(f'Class {name} is not serializable')
+
+        _class_cache[name] = cls
+
+    return cls
+
+
+def _encode_table_int(value):
+    if type(value) is not int:
+        raise TypeError(f'Cannot serialize objects of type {type(value).__qualname__}')
+
+    if value >= 0:
+        code = EXT_INT
+    else:
+        code = EXT_NEGATIVE_INT
+        value = -value
+
+    return _ext(code, value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+
+def _decode_table_int(code, data):
+    if code == EXT_INT:
+        return int.from_bytes(data, 'big')
+    if code == EXT_NEGATIVE_INT:
+        return -int.from_bytes(data, 'big')
+
+    raise InvalidDBData(f'Unexpected extension type {code} in the tables')
 
 
 class PickleSerializer:
@@ -8,4 +191,512 @@ class PickleSerializer:
 
     @staticmethod
     def deserialize(data):
+        # the database may have been written with the MsgpackSerializer
+        if data[:len(MSGPACK_MAGIC)] == MSGPACK_MAGIC:
+            return MsgpackSerializer.deserialize(data)
+
         return pickle.loads(data)
+
+
+class _MsgpackEncoder:
+    """ Turns the values msgpack doesn't know into arrays.
+
+    This is the `default` of the msgpack Packer, the arrays are packed by the
+    msgpack C extension in the same pass, so the encoder is called once per
+    object and not once per value.
+    """
+
+    def __init__(self):
+        self.memo = dict()
+        self.memo_length = 0
+        self.schemas = dict()
+        self.schema_table = list()
+        self.interned = dict()
+        self.interned_table = list()
+        self.candidates = dict()
+        self.shared = dict()
+        self.interned_references = dict()
+
+    def memoize(self, value):
+        """ Return a reference if `value` was already serialized.
+
+        Shared references are kept, e.g. a channel is reachable both by its
+        identifier and by its partner address in the TokenNetworkState. The
+        lists and dicts are packed by msgpack and are written by value, the
+        state doesn't share them.
+        """
+        index = self.memo.get(id(value))
+
+        if index is not None:
+            return _index_ext(EXT_REFERENCE, index)
+
+        self.memo[id(value)] = self.memo_length
+        self.memo_length += 1
+        return None
+
+    def add_schema(self, schema_key):
+        cls, fields, interned_fields = schema_key
+        marker = _index_ext(EXT_OBJECT, len(self.schema_table))
+        self.schemas[schema_key] = marker
+        self.schema_table.append([
+            f'{cls.__module__}:{cls.__qualname__}',
+            list(fields),
+            interned_fields,
+        ])
+        return marker
+
+    def intern(self, value):
+        index = self.interned.get(value)
+
+        if index is None:
+            index = len(self.interned_table)
+            self.interned[value] = index
+            self.interned_table.append(value)
+
+        return index
+
+    def encode_int(self, value):
+        # only called for the integers which don't fit in 64 bits outside of
+        # the fields, e.g. the channel identifiers used as keys
+        reference = self.interned_references.get(value)
+
+        if reference is None:
+            reference = _index_ext(EXT_INTERNED, self.intern(value))
+            self.interned_references[value] = reference
+
+        return reference
+
+    def encode_set(self, value):
+        return self.memoize(value) or [_SET_EXT, *value]
+
+    def encode_frozenset(self, value):  # pylint: disable=no-self-use
+        return [_FROZENSET_EXT, *value]
+
+    def encode_defaultdict(self, value):
+        factory = value.default_factory
+        if factory is None or DEFAULT_FACTORIES.get(factory.__name__) is not factory:
+            raise TypeError(f'Cannot serialize defaultdict with factory {factory}')
+
+        marker = _ext(EXT_DEFAULTDICT, factory.__name__.encode())
+        return self.memoize(value) or [marker, dict(value)]
+
+    def encode_random(self, value):
+        reference = self.memoize(value)
+        if reference is not None:
+            return reference
+
+        version, internal_state, gauss_next = value.getstate()
+        return [
+            _RANDOM_EXT,
+            version,
+            struct.pack(f'>{len(internal_state)}I', *internal_state),
+            gauss_next,
+        ]
+
+    def encode_graph(self, value):
+        reference = self.memoize(value)
+        if reference is not None:
+            return reference
+
+        return [
+            _GRAPH_EXT,
+            value.graph,
+            [[node, node_data] for node, node_data in value.nodes(data=True)],
+            [[node1, node2, edge_data] for node1, node2, edge_data in value.edges(data=True)],
+        ]
+
+    def default(self, value):
+        cls = type(value)
+        layout = _layout_cache.get(cls)
+
+        if layout is None:
+            if cls is tuple:
+                return [_TUPLE_EXT, *value]
+
+            method = self.dispatch.get(cls)
+            if method is not None:
+                return method(self, value)
+
+            layout = _class_layout(cls)
+
+        fields, getter, has_dict = layout
+
+        if getter is None:
+            # namedtuples are immutable, equal values of atoms are shared,
+            # e.g. the QueueIdentifiers used as keys. The types are part of
+            # the key since 1 == 1.0 == True.
+            item_types = tuple(map(type, value))
+            shared = ATOM_TYPES.issuperset(item_types)
+
+            if shared:
+                shared_key = (cls, item_types, value)
+                index = self.shared.get(shared_key)
+                if index is not None:
+                    return _index_ext(EXT_REFERENCE, index)
+
+                self.shared[shared_key] = self.memo_length
+                self.memo_length += 1
+
+            items = value
+        else:
+            shared = False
+
+            # inlined memoize, this is called for every object
+            index = self.memo.get(id(value))
+            if index is not None:
+                return _index_ext(EXT_REFERENCE, index)
+            self.memo[id(value)] = self.memo_length
+            self.memo_length += 1
+
+            try:
+                items = getter(value)
+            except AttributeError:
+                # the schema only has the slots which are set
+                fields = tuple(name for name in fields if hasattr(value, name))
+                items = [getattr(value, name) for name in fields]
+
+            if has_dict:
+                fields = fields + tuple(value.__dict__)
+                items = (*items, *value.__dict__.values())
+
+        # The addresses, hashes and large integers of the fields are replaced
+        # by their index in the interned table, the schema has a bit set for
+        # these fields. Only the fields which had such a value in the first
+        # instance of the class are checked, the others are written as is.
+        layout_key = (cls, fields)
+        candidates = self.candidates.get(layout_key)
+        if candidates is None:
+            candidates = tuple(
+                (position, 1 << (position - 1))
+                for position in range(1, len(fields) + 1)
+            )
+            self.candidates[layout_key] = None
+
+        values = [None, *items]
+        interned = self.interned
+        interned_fields = 0
+        for position, field_bit in candidates:
+            item = values[position]
+            item_type = type(item)
+            if (
+                (item_type is bytes and len(item) >= INTERN_MIN_LENGTH) or
+                (item_type is int and not MSGPACK_MIN_INT <= item <= MSGPACK_MAX_INT)
+            ):
+                index = interned.get(item)
+                values[position] = self.intern(item) if index is None else index
+                interned_fields |= field_bit
+
+        if self.candidates[layout_key] is None:
+            self.candidates[layout_key] = tuple(
+                (position, field_bit)
+                for position, field_bit in candidates
+                if interned_fields & field_bit
+            )
+
+        schema_key = (cls, fields, interned_fields)
+        marker = self.schemas.get(schema_key) or self.add_schema(schema_key)
+        values[0] = _ext(EXT_SHARED, marker.data) if shared else marker
+        return values
+
+    dispatch = {
+        int: encode_int,
+        set: encode_set,
+        frozenset: encode_frozenset,
+        defaultdict: encode_defaultdict,
+        random.Random: encode_random,
+        networkx.Graph: encode_graph,
+    }
+
+
+class _Pending(list):
+    """ First item of an array which is restored once its items are unpacked,
+    holds the function which restores the array and the value to restore.
+
+    The mutable values are created before their items are unpacked, in the
+    same order as they were memoized by the encoder.
+    """
+    __slots__ = ()
+
+
+def _finish_tuple(pending, items, interned):  # pylint: disable=unused-argument
+    return tuple(items[1:])
+
+
+def _finish_set(pending, items, interned):  # pylint: disable=unused-argument
+    value = pending[1]
+    value.update(items[1:])
+    return value
+
+
+def _finish_frozenset(pending, items, interned):  # pylint: disable=unused-argument
+    return frozenset(items[1:])
+
+
+def _finish_defaultdict(pending, items, interned):  # pylint: disable=unused-argument
+    _, mapping = items
+    value = pending[1]
+    value.update(mapping)
+    return value
+
+
+def _finish_random(pending, items, interned):  # pylint: disable=unused-argument
+    _, version, internal_state, gauss_next = items
+    value = pending[1]
+    value.setstate((
+        version,
+        struct.unpack(f'>{len(internal_state) // 4}I', internal_state),
+        gauss_next,
+    ))
+    return value
+
+
+def _finish_graph(pending, items, interned):  # pylint: disable=unused-argument
+    _, graph, nodes, edges = items
+
+    value = pending[1]
+    value.graph.update(graph)
+    value.add_nodes_from((node, node_data) for node, node_data in nodes)
+    value.add_edges_from((node1, node2, edge_data) for node1, node2, edge_data in edges)
+    return value
+
+
+def _finish_shared(pending, items, interned):
+    memo, index, finish = pending[1]
+    value = finish(pending, items, interned)
+    memo[index] = value
+    return value
+
+
+_TUPLE_PENDING = _Pending((_finish_tuple, None))
+_FROZENSET_PENDING = _Pending((_finish_frozenset, None))
+
+
+def _make_finish(cls, fields, interned_fields):
+    """ Return the function which restores an instance of `cls` from the
+    items of its array.
+
+    The code is generated for every schema, setting the fields in straight
+    line code is about three times faster than calling setattr in a loop.
+    """
+    cache_key = (cls, fields, interned_fields)
+    finish = _finish_cache.get(cache_key)
+
+    if finish is not None:
+        return finish
+
+    if not isinstance(interned_fields, int) or not 0 <= interned_fields < 2 ** len(fields):
+        raise InvalidDBData(f'Invalid interned fields for {cls.__qualname__}')
+
+    for name in fields:
+        if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name):
+            raise InvalidDBData(f'Invalid field name {name!r} for {cls.__qualname__}')
+
+    item_expressions = [
+        f'interned[items[{position}]]' if interned_fields & (1 << (position - 1)) else
+        f'items[{position}]'
+        for position in range(1, len(fields) + 1)
+    ]
+
+    lines = [
+        'def finish(pending, items, interned):',
+        f'    if len(items) != {len(fields) + 1}:',
+        '        raise InvalidDBData(WRONG_NUMBER_OF_FIELDS)',
+    ]
+
+    if not issubclass(cls, tuple):
+        lines.append('    value = pending[1]')
+        lines.extend(
+            f'    value.{name} = {expression}'
+            for name, expression in zip(fields, item_expressions)
+        )
+        lines.append('    return value')
+    elif fields == cls._fields:
+        # tuple.__new__ skips the generated __new__ of the namedtuple
+        lines.append(f'    return tuple_new(cls, ({"".join(e + ", " for e in item_expressions)}))')
+    else:
+        # restore by field name, the fields of the class changed
+        arguments = ', '.join(
+            f'{name}={expression}'
+            for name, expression in zip(fields, item_expressions)
+        )
+        lines.append(f'    return cls({arguments})')
+
+    namespace = {
+        'cls': cls,
+        'tuple_new': tuple.__new__,
+        'InvalidDBData': InvalidDBData,
+        'WRONG_NUMBER_OF_FIELDS': f'Wrong number of fields for {cls.__qualname__}',
+    }
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+
+    finish = namespace['finish']
+    _finish_cache[cache_key] = finish
+    return finish
+
+
+@lru_cache(maxsize=SCHEMA_TABLE_CACHE_SIZE)
+def _load_schema_table(data):
+    """ Return, for every schema of the table, the class to create when the
+    schema is unpacked, None for namedtuples, and how to finish the value.
+
+    Most serialized objects have the same schemas, e.g. the state changes of
+    a given type, so the tables are cached.
+    """
+    schemas = list()
+
+    for name, fields, interned_fields in msgpack.unpackb(data, raw=False):
+        cls = _resolve_class(name)
+        finish = _make_finish(cls, tuple(fields), interned_fields)
+
+        if issubclass(cls, tuple):
+            # immutable, the instance is created once its items are known
+            schemas.append((None, _Pending((finish, None))))
+        else:
+            schemas.append((cls, finish))
+
+    return tuple(schemas)
+
+
+class _MsgpackDecoder:
+    def __init__(self, schemas, interned):
+        self.schemas = schemas
+        self.interned = interned
+        self.memo = list()
+
+    def unpack(self, data):
+        return msgpack.unpackb(
+            data,
+            ext_hook=self.ext_hook,
+            list_hook=self.list_hook,
+            raw=False,
+            strict_map_key=False,
+        )
+
+    def ext_hook(self, code, data):
+        if code == EXT_OBJECT:
+            cls, finish = self.schemas[int.from_bytes(data, 'big')]
+            if cls is None:
+                return finish
+
+            value = cls.__new__(cls)
+            self.memo.append(value)
+            return _Pending((finish, value))
+        if code == EXT_TUPLE:
+            return _TUPLE_PENDING
+        if code == EXT_SHARED:
+            _, pending = self.schemas[int.from_bytes(data, 'big')]
+            self.memo.append(None)
+            return _Pending((_finish_shared, (self.memo, len(self.memo) - 1, pending[0])))
+        if code == EXT_INTERNED:
+            return self.interned[int.from_bytes(data, 'big')]
+        if code == EXT_REFERENCE:
+            return self.memo[int.from_bytes(data, 'big')]
+        if code == EXT_FROZENSET:
+            return _FROZENSET_PENDING
+
+        if code == EXT_SET:
+            pending = _Pending((_finish_set, set()))
+        elif code == EXT_DEFAULTDICT:
+            factory = DEFAULT_FACTORIES.get(bytes(data).decode())
+            if factory is None:
+                raise InvalidDBData('Unknown defaultdict factory')
+            pending = _Pending((_finish_defaultdict, defaultdict(factory)))
+        elif code == EXT_RANDOM:
+            pending = _Pending((_finish_random, random.Random()))
+        elif code == EXT_GRAPH:
+            pending = _Pending((_finish_graph, networkx.Graph()))
+        else:
+            raise InvalidDBData(f'Unknown extension type {code}')
+
+        self.memo.append(pending[1])
+        return pending
+
+    def list_hook(self, items):
+        if items and type(items[0]) is _Pending:
+            pending = items[0]
+            return pending[0](pending, items, self.interned)
+
+        return items
+
+
+class MsgpackSerializer:
+    """ Compact serializer for the State, StateChange and Event objects.
+
+    Every class has a schema, its name and the names of its fields, which is
+    written once per serialized object in a table before the data, followed
+    by a table with the addresses, hashes and identifiers. An instance is a
+    msgpack array with the index of its schema followed by the values of its
+    fields. The data is packed by the msgpack C extension and does not depend
+    on the pickle layout of the classes, only classes from the raiden package
+    are loaded.
+
+    Data written by the PickleSerializer can still be read.
+    """
+
+    @staticmethod
+    def serialize(transaction):
+        encoder = _MsgpackEncoder()
+        data = msgpack.packb(
+            transaction,
+            default=encoder.default,
+            use_bin_type=True,
+            strict_types=True,
+        )
+        schema_table = msgpack.packb(encoder.schema_table, use_bin_type=True)
+        interned_table = msgpack.packb(
+            encoder.interned_table,
+            default=_encode_table_int,
+            use_bin_type=True,
+        )
+
+        return b''.join((
+            MSGPACK_HEADER,
+            TABLE_LENGTH.pack(len(schema_table)),
+            schema_table,
+            TABLE_LENGTH.pack(len(interned_table)),
+            interned_table,
+            data,
+        ))
+
+    @staticmethod
+    def deserialize(data):
+        if data[:len(MSGPACK_MAGIC)] != MSGPACK_MAGIC:
+            return pickle.loads(data)
+
+        data = memoryview(data)
+        if data[len(MSGPACK_MAGIC)] != MSGPACK_FORMAT_VERSION:
+            raise InvalidDBData(
+                f'Unsupported serialization format version {data[len(MSGPACK_MAGIC)]}',
+            )
+
+        try:
+            schema_start = len(MSGPACK_HEADER) + TABLE_LENGTH.size
+            schema_end = schema_start + TABLE_LENGTH.unpack_from(data, len(MSGPACK_HEADER))[0]
+            interned_start = schema_end + TABLE_LENGTH.size
+            interned_end = interned_start + TABLE_LENGTH.unpack_from(data, schema_end)[0]
+
+            schemas = _load_schema_table(bytes(data[schema_start:schema_end]))
+            interned = msgpack.unpackb(
+                data[interned_start:interned_end],
+                ext_hook=_decode_table_int,
+                raw=False,
+            )
+
+            decoder = _MsgpackDecoder(schemas, interned)
+            return decoder.unpack(data[interned_end:])
+        except (
+            AttributeError,
+            IndexError,
+            KeyError,
+            TypeError,
+            ValueError,
+            struct.error,
+            msgpack.UnpackException,
+        ):
+            raise InvalidDBData('Serialized data is corrupted')
+
+
+SERIALIZERS = {
+    'msgpack': MsgpackSerializer,
+    'pickle': PickleSerializer,
+}
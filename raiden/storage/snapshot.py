@@ -0,0 +1,279 @@
+""" Delta snapshots of the ChainState.
+
+A full snapshot contains every token network, channel and network graph of
+the node, so its size and the time it takes to write it grow with the number
+of channels. Usually only a few channels change between two snapshots.
+
+A delta is a skeleton of the ChainState, the channels, network graphs and
+token networks which are equal to the ones from the base snapshot are
+replaced by an `Unchanged` placeholder. The deltas are cumulative, a delta
+always refers to the latest full snapshot, so a state is restored from one
+full snapshot and at most one delta.
+
+The base state must be kept in memory to compute the deltas. It must not be
+modified, the same requirement the StateManager has for the previous states.
+"""
+from collections import defaultdict
+from copy import copy
+
+from raiden.transfer.architecture import State
+from raiden.transfer.state import ChainState, PaymentNetworkState, TokenNetworkState
+
+# Above this ratio of changed channels a full snapshot is written instead of a
+# delta, to bound the size of the deltas
+MAX_CHANGED_CHANNELS_RATIO = 0.5
+
+
+class Unchanged(State):
+    """ Placeholder for a value that is equal to the value at the same
+    position in the base snapshot.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return '<Unchanged>'
+
+    def __eq__(self, other):
+        return isinstance(other, Unchanged)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+UNCHANGED = Unchanged()
+
+
+class _DeltaStatistics:
+    def __init__(self):
+        self.channels = 0
+        self.changed_channels = 0
+
+
+def _is_unchanged(base_value, value):
+    return base_value is value or base_value == value
+
+
+def _diff_token_network(base_token_network, token_network, statistics):
+    base_channels = base_token_network.channelidentifiers_to_channels
+    base_partners = base_token_network.partneraddresses_to_channels
+
+    unchanged_channels = set()
+    channels = dict()
+    for channel_identifier, channel_state in token_network.channelidentifiers_to_channels.items():
+        statistics.channels += 1
+
+        base_channel_state = base_channels.get(channel_identifier)
+        if base_channel_state is not None and _is_unchanged(base_channel_state, channel_state):
+            unchanged_channels.add(channel_identifier)
+            channels[channel_identifier] = UNCHANGED
+        else:
+            statistics.changed_channels += 1
+            channels[channel_identifier] = channel_state
+
+    partners = defaultdict(dict)
+    for partner_address, partner_channels in token_network.partneraddresses_to_channels.items():
+        # the partner index of the base must not be modified, don't use the
+        # defaultdict's __getitem__
+        base_partner_channels = base_partners.get(partner_address, {})
+
+        partners[partner_address] = {
+            channel_identifier: (
+                UNCHANGED
+                if (
+                    channel_identifier in unchanged_channels and
+                    channel_identifier in base_partner_channels
+                ) else
+                channel_state
+            )
+            for channel_identifier, channel_state in partner_channels.items()
+        }
+
+    network_graph = token_network.network_graph
+    if _is_unchanged(base_token_network.network_graph, network_graph):
+        network_graph = UNCHANGED
+
+    is_unchanged = (
+        base_token_network.address == token_network.address and
+        base_token_network.token_address == token_network.token_address and
+        network_graph is UNCHANGED and
+        len(unchanged_channels) == len(base_channels) == len(channels) and
+        partners.keys() == base_partners.keys() and
+        all(
+            partner_channels.keys() == base_partners[partner_address].keys()
+            for partner_address, partner_channels in partners.items()
+        ) and
+        all(
+            value is UNCHANGED
+            for partner_channels in partners.values()
+            for value in partner_channels.values()
+        )
+    )
+
+    if is_unchanged:
+        return UNCHANGED
+
+    skeleton = copy(token_network)
+    skeleton.network_graph = network_graph
+    skeleton.channelidentifiers_to_channels = channels
+    skeleton.partneraddresses_to_channels = partners
+    return skeleton
+
+
+def _diff_payment_network(base_payment_network, payment_network, statistics):
+    base_token_networks = base_payment_network.tokenidentifiers_to_tokennetworks
+
+    # the token networks are indexed by identifier and by token address, both
+    # mappings must use the same skeleton
+    skeletons = dict()
+    for identifier, token_network in payment_network.tokenidentifiers_to_tokennetworks.items():
+        base_token_network = base_token_networks.get(identifier)
+
+        if isinstance(base_token_network, TokenNetworkState):
+            skeletons[id(token_network)] = _diff_token_network(
+                base_token_network,
+                token_network,
+                statistics,
+            )
+        else:
+            statistics.channels += len(token_network.channelidentifiers_to_channels)
+            statistics.changed_channels += len(token_network.channelidentifiers_to_channels)
+            skeletons[id(token_network)] = token_network
+
+    skeleton = copy(payment_network)
+    skeleton.tokenidentifiers_to_tokennetworks = {
+        identifier: skeletons[id(token_network)]
+        for identifier, token_network in payment_network.tokenidentifiers_to_tokennetworks.items()
+    }
+    skeleton.tokenaddresses_to_tokennetworks = {
+        token_address: skeletons.get(id(token_network), token_network)
+        for token_address, token_network in payment_network.tokenaddresses_to_tokennetworks.items()
+    }
+    return skeleton
+
+
+def _apply_token_network(base_token_network, skeleton):
+    if isinstance(skeleton, Unchanged):
+        return base_token_network
+
+    # a new token network is saved in full
+    if base_token_network is None:
+        return skeleton
+
+    base_channels = base_token_network.channelidentifiers_to_channels
+    base_partners = base_token_network.partneraddresses_to_channels
+
+    token_network = copy(skeleton)
+
+    if isinstance(skeleton.network_graph, Unchanged):
+        token_network.network_graph = base_token_network.network_graph
+
+    token_network.channelidentifiers_to_channels = {
+        channel_identifier: (
+            base_channels[channel_identifier]
+            if isinstance(channel_state, Unchanged) else
+            channel_state
+        )
+        for channel_identifier, channel_state in skeleton.channelidentifiers_to_channels.items()
+    }
+
+    token_network.partneraddresses_to_channels = defaultdict(dict)
+    for partner_address, partner_channels in skeleton.partneraddresses_to_channels.items():
+        token_network.partneraddresses_to_channels[partner_address] = {
+            channel_identifier: (
+                base_partners[partner_address][channel_identifier]
+                if isinstance(channel_state, Unchanged) else
+                channel_state
+            )
+            for channel_identifier, channel_state in partner_channels.items()
+        }
+
+    return token_network
+
+
+def _apply_payment_network(base_payment_network, skeleton):
+    token_networks = dict()
+
+    def apply_token_network(base_token_network, token_network_skeleton):
+        # Unchanged placeholders may be shared, only the skeletons identify
+        # a token network
+        if isinstance(token_network_skeleton, Unchanged):
+            return base_token_network
+
+        key = id(token_network_skeleton)
+        if key not in token_networks:
+            token_networks[key] = _apply_token_network(base_token_network, token_network_skeleton)
+        return token_networks[key]
+
+    payment_network = copy(skeleton)
+    payment_network.tokenidentifiers_to_tokennetworks = {
+        identifier: apply_token_network(
+            base_payment_network.tokenidentifiers_to_tokennetworks.get(identifier),
+            token_network,
+        )
+        for identifier, token_network in skeleton.tokenidentifiers_to_tokennetworks.items()
+    }
+    payment_network.tokenaddresses_to_tokennetworks = {
+        token_address: apply_token_network(
+            base_payment_network.tokenaddresses_to_tokennetworks.get(token_address),
+            token_network,
+        )
+        for token_address, token_network in skeleton.tokenaddresses_to_tokennetworks.items()
+    }
+    return payment_network
+
+
+class ChainStateDeltas:
+    """ Computes and applies the deltas between two ChainStates. """
+
+    @staticmethod
+    def diff(base_state, state):
+        """ Return the delta from `base_state` to `state`, or None if a full
+        snapshot should be written instead.
+
+        The delta shares objects with `state`, it must be serialized before
+        `state` is modified.
+        """
+        if not isinstance(base_state, ChainState) or not isinstance(state, ChainState):
+            return None
+
+        statistics = _DeltaStatistics()
+        base_payment_networks = base_state.identifiers_to_paymentnetworks
+
+        payment_networks = dict()
+        for identifier, payment_network in state.identifiers_to_paymentnetworks.items():
+            base_payment_network = base_payment_networks.get(identifier)
+
+            if isinstance(base_payment_network, PaymentNetworkState):
+                payment_networks[identifier] = _diff_payment_network(
+                    base_payment_network,
+                    payment_network,
+                    statistics,
+                )
+            else:
+                payment_networks[identifier] = payment_network
+
+        changed_ratio = statistics.changed_channels / max(statistics.channels, 1)
+        if changed_ratio > MAX_CHANGED_CHANNELS_RATIO:
+            return None
+
+        delta = copy(state)
+        delta.identifiers_to_paymentnetworks = payment_networks
+        return delta
+
+    @staticmethod
+    def apply(base_state, delta):
+        """ Return the state described by `delta`, the objects which did not
+        change are shared with `base_state`.
+        """
+        base_payment_networks = base_state.identifiers_to_paymentnetworks
+
+        state = copy(delta)
+        state.identifiers_to_paymentnetworks = {
+            identifier: (
+                _apply_payment_network(base_payment_networks[identifier], payment_network)
+                if identifier in base_payment_networks else
+                payment_network
+            )
+            for identifier, payment_network in delta.identifiers_to_paymentnetworks.items()
+        }
+        return state
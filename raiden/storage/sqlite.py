@@ -1,9 +1,26 @@
+import pathlib
+import queue
 import sqlite3
 import threading
+from contextlib import contextmanager
+from raiden.constants import UINT64_MAX
 from raiden.exceptions import InvalidDBData
-from raiden.storage.utils import DB_SCRIPT_CREATE_TABLES
+from raiden.settings import (
+    DEFAULT_DATABASE_CACHE_SIZE,
+    DEFAULT_DATABASE_JOURNAL_MODE,
+    DEFAULT_DATABASE_MMAP_SIZE,
+    DEFAULT_DATABASE_READ_CONNECTIONS,
+    DEFAULT_DATABASE_SYNCHRONOUS,
+)
+from raiden.storage.utils import (
+    DB_SCRIPT_CREATE_STATE_EVENTS_INDEXES,
+    DB_SCRIPT_CREATE_TABLES,
+    STATE_EVENTS_INDEXED_COLUMNS,
+)
 from typing import (
     Any,
+    Iterable,
+    List,
     Optional,
     Tuple,
 )
@@ -11,14 +28,173 @@ from typing import (
 # The latest DB version
 RAIDEN_DB_VERSION = 0
 
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+# Value of PRAGMA auto_vacuum for INCREMENTAL
+INCREMENTAL_AUTO_VACUUM = 2
+
+# Number of prepared statements cached by each connection, the storage uses a
+# small fixed set of queries so all of them stay prepared
+CACHED_STATEMENTS = 64
+
+# Number of events deserialized at once to fill the indexed columns of an
+# older database
+EVENTS_UPDATE_CHUNK_SIZE = 1000
+
+INSERT_EVENT_QUERY = (
+    'INSERT INTO state_events(source_statechange_id, block_number, data, {}) '
+    'VALUES(?, ?, ?, {})'
+).format(
+    ', '.join(name for name, _ in STATE_EVENTS_INDEXED_COLUMNS),
+    ', '.join('?' for _ in STATE_EVENTS_INDEXED_COLUMNS),
+)
+
+INSERT_BLOCKCHAIN_EVENT_QUERY = (
+    'INSERT OR IGNORE INTO blockchain_events('
+    '   contract_address, channel_identifier, block_number, log_index, data'
+    ') VALUES(?, ?, ?, ?, ?)'
+)
+
+INT64_MIN = -2 ** 63
+
+
+def _column_value(value):
+    if isinstance(value, (bytes, str)):
+        return value
+    return None
+
+
+def _integer_column_value(value):
+    """ SQLite integers are signed 64 bits, the unsigned 64 bits payment
+    identifiers are stored in two's complement.
+    """
+    if not isinstance(value, int) or isinstance(value, bool):
+        return None
+
+    if 0 <= value <= UINT64_MAX:
+        return value if value < 2 ** 63 else value - 2 ** 64
+
+    if INT64_MIN <= value < 0:
+        return value
+
+    return None
+
+
+def _channel_identifier_column_value(channel_identifier):
+    """ The channel identifiers are uint256, stored as 32 big endian bytes. """
+    if channel_identifier is None:
+        return None
+    return channel_identifier.to_bytes(32, 'big')
+
+
+def event_columns(event) -> Tuple:
+    """ Return the values of the indexed columns of `event`, in the order of
+    `STATE_EVENTS_INDEXED_COLUMNS`. A value is None if the event doesn't have
+    the attribute.
+    """
+    transfer = getattr(event, 'transfer', None)
+    token_address = (
+        getattr(transfer, 'token', None) or
+        getattr(event, 'token', None) or
+        getattr(event, 'token_address', None)
+    )
+
+    # the partner of a sent message is its recipient, for the on-chain
+    # settlement it's the sender of the partner's balance proof
+    partner_address = getattr(event, 'recipient', None)
+    if partner_address is None:
+        partner_balance_proof = getattr(event, 'partner_balance_proof', None)
+        partner_address = getattr(partner_balance_proof, 'sender', None)
+
+    payment_identifier = getattr(event, 'payment_identifier', None)
+    if payment_identifier is None:
+        payment_identifier = getattr(event, 'identifier', None)
+
+    return (
+        type(event).__name__,
+        _column_value(getattr(event, 'token_network_identifier', None)),
+        _column_value(token_address),
+        _column_value(partner_address),
+        _column_value(getattr(event, 'initiator', None)),
+        _column_value(getattr(event, 'target', None)),
+        _integer_column_value(payment_identifier),
+    )
+
 
 class SQLiteStorage:
-    def __init__(self, database_path, serializer):
-        conn = sqlite3.connect(database_path)
+    def __init__(
+            self,
+            database_path,
+            serializer,
+            journal_mode: str = DEFAULT_DATABASE_JOURNAL_MODE,
+            synchronous: str = DEFAULT_DATABASE_SYNCHRONOUS,
+            cache_size: int = DEFAULT_DATABASE_CACHE_SIZE,
+            mmap_size: int = DEFAULT_DATABASE_MMAP_SIZE,
+            read_connections: int = DEFAULT_DATABASE_READ_CONNECTIONS,
+    ):
+        """ Open the database at `database_path`.
+
+        Args:
+            database_path: Path of the database file, or ':memory:'.
+            serializer: Used to (de)serialize the state changes, events and
+                snapshots.
+            journal_mode: SQLite journal mode, with `WAL` readers don't block
+                the writer.
+            synchronous: SQLite synchronous level. `FULL` is durable, `NORMAL`
+                with `WAL` is faster but may lose the last transactions on a
+                power loss.
+            cache_size: Page cache size of every connection, in pages if
+                positive or in KiB if negative.
+            mmap_size: Maximum number of bytes of the database file to memory
+                map, zero disables memory mapped I/O.
+            read_connections: Size of the pool of read-only connections used by
+                the queries. With zero, or with an in-memory database, queries
+                use the write connection.
+        """
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError('journal_mode must be one of {}'.format(', '.join(JOURNAL_MODES)))
+
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(
+                'synchronous must be one of {}'.format(', '.join(SYNCHRONOUS_LEVELS)),
+            )
+
+        if not isinstance(cache_size, int):
+            raise ValueError('cache_size must be an integer')
+
+        if not isinstance(mmap_size, int) or mmap_size < 0:
+            raise ValueError('mmap_size must be a non-negative integer')
+
+        if not isinstance(read_connections, int) or read_connections < 0:
+            raise ValueError('read_connections must be a non-negative integer')
+
+        conn = sqlite3.connect(
+            database_path,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
         conn.text_factory = str
         conn.execute('PRAGMA foreign_keys=ON')
         self.conn = conn
 
+        try:
+            # Lets the compaction return the free pages to the file system
+            # without a full VACUUM. Only has an effect on a new database, it
+            # must be set before the journal mode.
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            # The journal mode is persistent, it applies to all connections
+            conn.execute(f'PRAGMA journal_mode={journal_mode}')
+            self._set_connection_pragmas(conn, synchronous, cache_size, mmap_size)
+        except sqlite3.DatabaseError:
+            raise InvalidDBData(
+                'Existing DB {} was found to be corrupt at Raiden startup. '
+                'Manual user intervention required. Bailing ...'.format(database_path),
+            )
+
         with conn:
             try:
                 conn.executescript(DB_SCRIPT_CREATE_TABLES)
@@ -28,8 +204,27 @@ class SQLiteStorage:
                     'Manual user intervention required. Bailing ...'.format(database_path),
                 )
 
+        # the updates may need to deserialize the existing data
+        self.serializer = serializer
         self._run_updates()
 
+        # An in-memory database is private to its connection
+        self.read_pool = None
+        if read_connections and database_path != ':memory:':
+            database_uri = pathlib.Path(database_path).absolute().as_uri() + '?mode=ro'
+
+            self.read_pool = queue.Queue()
+            for _ in range(read_connections):
+                read_conn = sqlite3.connect(
+                    database_uri,
+                    uri=True,
+                    check_same_thread=False,
+                    cached_statements=CACHED_STATEMENTS,
+                )
+                read_conn.text_factory = str
+                self._set_connection_pragmas(read_conn, synchronous, cache_size, mmap_size)
+                self.read_pool.put(read_conn)
+
         # When writting to a table where the primary key is the identifier and we want
         # to return said identifier we use cursor.lastrowid, which uses sqlite's last_insert_rowid
         # https://github.com/python/cpython/blob/2.7/Modules/_sqlite/cursor.c#L727-L732
@@ -43,11 +238,78 @@ class SQLiteStorage:
         # Improve on this and find a better way to protect against this potential race
         # condition.
         self.write_lock = threading.Lock()
-        self.serializer = serializer
+
+    @staticmethod
+    def _set_connection_pragmas(conn, synchronous, cache_size, mmap_size):
+        # The values are validated by the constructor, pragmas cannot be
+        # parameterized
+        conn.execute(f'PRAGMA synchronous={synchronous}')
+        conn.execute(f'PRAGMA cache_size={cache_size}')
+        conn.execute(f'PRAGMA mmap_size={mmap_size}')
+
+    @contextmanager
+    def _read_connection(self):
+        """ Borrow a connection from the read-only pool, readers don't block
+        the writer when the journal mode is WAL.
+        """
+        if self.read_pool is None:
+            yield self.conn
+            return
+
+        conn = self.read_pool.get()
+        try:
+            yield conn
+        finally:
+            self.read_pool.put(conn)
+
+    def _add_state_events_columns(self):
+        """ Add the indexed columns to the events of an older database. """
+        existing = {
+            row[1]
+            for row in self.conn.execute('PRAGMA table_info(state_events)')
+        }
+        missing = [
+            (name, column_type)
+            for name, column_type in STATE_EVENTS_INDEXED_COLUMNS
+            if name not in existing
+        ]
+
+        if not missing:
+            return
+
+        with self.conn:
+            for name, column_type in missing:
+                self.conn.execute(f'ALTER TABLE state_events ADD COLUMN {name} {column_type}')
+
+        last_identifier = 0
+        while True:
+            chunk = self.conn.execute(
+                'SELECT identifier, data FROM state_events WHERE identifier > ? '
+                'ORDER BY identifier LIMIT ?',
+                (last_identifier, EVENTS_UPDATE_CHUNK_SIZE),
+            ).fetchall()
+
+            if not chunk:
+                break
+
+            with self.conn:
+                self.conn.executemany(
+                    'UPDATE state_events SET {} WHERE identifier = ?'.format(
+                        ', '.join(f'{name} = ?' for name, _ in STATE_EVENTS_INDEXED_COLUMNS),
+                    ),
+                    (
+                        event_columns(self.serializer.deserialize(data)) + (identifier,)
+                        for identifier, data in chunk
+                    ),
+                )
+
+            last_identifier = chunk[-1][0]
 
     def _run_updates(self):
         # TODO: Here add upgrade mechanism depending on the version
         # current_version = self.get_version()
+        self._add_state_events_columns()
+        self.conn.executescript(DB_SCRIPT_CREATE_STATE_EVENTS_INDEXES)
 
         # And finally at the end write the latest version in the DB
         cursor = self.conn.cursor()
@@ -69,6 +331,18 @@ class SQLiteStorage:
 
         return int(query[0][0])
 
+    def get_setting(self, name: str) -> Optional[str]:
+        cursor = self.conn.execute('SELECT value FROM settings WHERE name=?', (name,))
+        result = cursor.fetchone()
+        return result[0] if result else None
+
+    def write_setting(self, name: str, value: str):
+        with self.write_lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO settings(name, value) VALUES(?, ?)',
+                (name, value),
+            )
+
     def write_state_change(self, state_change):
         serialized_data = self.serializer.serialize(state_change)
 
@@ -83,7 +357,10 @@ class SQLiteStorage:
 
     def write_state_snapshot(self, statechange_id, snapshot):
         serialized_data = self.serializer.serialize(snapshot)
+        return self.write_serialized_state_snapshot(statechange_id, serialized_data)
 
+    def write_serialized_state_snapshot(self, statechange_id, serialized_data):
+        """ Save a snapshot which was already serialized with `self.serializer`. """
         with self.write_lock, self.conn:
             cursor = self.conn.execute(
                 'INSERT INTO state_snapshot(statechange_id, data) VALUES(?, ?)',
@@ -93,6 +370,43 @@ class SQLiteStorage:
 
         return last_id
 
+    def write_state_snapshot_delta(self, base_statechange_id, statechange_id, delta):
+        """ Save a delta snapshot.
+
+        Args:
+            base_statechange_id: Id of the state change of the full snapshot
+                the delta applies to.
+            statechange_id: Id of the last state change applied to the state
+                described by the delta.
+            delta: The delta from the full snapshot to the current state.
+        """
+        serialized_data = self.serializer.serialize(delta)
+        return self.write_serialized_state_snapshot_delta(
+            base_statechange_id,
+            statechange_id,
+            serialized_data,
+        )
+
+    def write_serialized_state_snapshot_delta(
+            self,
+            base_statechange_id,
+            statechange_id,
+            serialized_data,
+    ):
+        """ Save a delta snapshot which was already serialized with
+        `self.serializer`.
+        """
+        with self.write_lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO state_snapshot_delta('
+                '   base_statechange_id, statechange_id, data'
+                ') VALUES(?, ?, ?)',
+                (base_statechange_id, statechange_id, serialized_data),
+            )
+            last_id = cursor.lastrowid
+
+        return last_id
+
     def write_events(self, state_change_id, block_number, events):
         """ Save events.
 
@@ -102,24 +416,64 @@ class SQLiteStorage:
             events: List of Event objects.
         """
         events_data = [
-            (None, state_change_id, block_number, self.serializer.serialize(event))
+            (state_change_id, block_number, self.serializer.serialize(event)) +
+            event_columns(event)
             for event in events
         ]
 
         with self.write_lock, self.conn:
-            self.conn.executemany(
-                'INSERT INTO state_events('
-                '   identifier, source_statechange_id, block_number, data'
-                ') VALUES(?, ?, ?, ?)',
-                events_data,
+            self.conn.executemany(INSERT_EVENT_QUERY, events_data)
+
+    def write_state_changes_and_events(self, batch) -> List[int]:
+        """ Save a batch of state changes and their events in a single
+        transaction.
+
+        Args:
+            batch: List of (state_change, block_number, events) tuples, in the
+                order in which the state changes were dispatched.
+
+        Returns:
+            The identifiers of the saved state changes, in the same order.
+        """
+        serialized_batch = [
+            (
+                self.serializer.serialize(state_change),
+                block_number,
+                [
+                    (self.serializer.serialize(event),) + event_columns(event)
+                    for event in events
+                ],
             )
+            for state_change, block_number, events in batch
+        ]
+
+        state_change_ids = list()
+        with self.write_lock, self.conn:
+            for serialized_state_change, block_number, serialized_events in serialized_batch:
+                cursor = self.conn.execute(
+                    'INSERT INTO state_changes(identifier, data) VALUES(null, ?)',
+                    (serialized_state_change,),
+                )
+                state_change_id = cursor.lastrowid
+                state_change_ids.append(state_change_id)
+
+                self.conn.executemany(
+                    INSERT_EVENT_QUERY,
+                    [
+                        (state_change_id, block_number) + event_row
+                        for event_row in serialized_events
+                    ],
+                )
+
+        return state_change_ids
 
     def get_latest_state_snapshot(self) -> Optional[Tuple[int, Any]]:
         """ Return the tuple of (last_applied_state_change_id, snapshot) or None"""
-        cursor = self.conn.execute(
-            'SELECT statechange_id, data from state_snapshot ORDER BY identifier DESC LIMIT 1',
-        )
-        serialized = cursor.fetchall()
+        with self._read_connection() as conn:
+            cursor = conn.execute(
+                'SELECT statechange_id, data from state_snapshot ORDER BY identifier DESC LIMIT 1',
+            )
+            serialized = cursor.fetchall()
 
         result = None
         if serialized:
@@ -130,6 +484,82 @@ class SQLiteStorage:
 
         return result
 
+    def get_latest_state_snapshot_statechange_id(self) -> Optional[int]:
+        """ Return the state change id of the latest full snapshot, without
+        deserializing it.
+        """
+        with self._read_connection() as conn:
+            cursor = conn.execute(
+                'SELECT statechange_id FROM state_snapshot ORDER BY identifier DESC LIMIT 1',
+            )
+            result = cursor.fetchone()
+
+        return result[0] if result else None
+
+    def get_latest_state_snapshot_delta(
+            self,
+            base_statechange_id: int,
+    ) -> Optional[Tuple[int, Any]]:
+        """ Return the tuple of (last_applied_state_change_id, delta) for the
+        latest delta of the full snapshot taken at `base_statechange_id`, or
+        None.
+        """
+        with self._read_connection() as conn:
+            cursor = conn.execute(
+                'SELECT statechange_id, data FROM state_snapshot_delta '
+                'WHERE base_statechange_id = ? ORDER BY identifier DESC LIMIT 1',
+                (base_statechange_id,),
+            )
+            serialized = cursor.fetchone()
+
+        if serialized is None:
+            return None
+
+        last_applied_state_change_id = serialized[0]
+        delta = self.serializer.deserialize(serialized[1])
+        return (last_applied_state_change_id, delta)
+
+    def count_statechanges(self, from_identifier):
+        """ Return the number of state changes with an identifier greater or
+        equal to `from_identifier`.
+        """
+        with self._read_connection() as conn:
+            cursor = conn.execute(
+                'SELECT COUNT(*) FROM state_changes WHERE identifier >= ?',
+                (from_identifier,),
+            )
+            return cursor.fetchone()[0]
+
+    def iterate_serialized_statechanges(self, from_identifier, chunk_size):
+        """ Yield the state changes with an identifier greater or equal to
+        `from_identifier`, in order, as lists of at most `chunk_size`
+        (identifier, serialized_data) pairs.
+
+        Only one chunk is kept in memory and the read connection is released
+        between chunks. The data must be deserialized with `self.serializer`.
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        while True:
+            with self._read_connection() as conn:
+                cursor = conn.execute(
+                    'SELECT identifier, data FROM state_changes WHERE identifier >= ? '
+                    'ORDER BY identifier LIMIT ?',
+                    (from_identifier, chunk_size),
+                )
+                chunk = cursor.fetchall()
+
+            if not chunk:
+                return
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+
+            from_identifier = chunk[-1][0] + 1
+
     def get_statechanges_by_identifier(self, from_identifier, to_identifier):
         if not (from_identifier == 'latest' or isinstance(from_identifier, int)):
             raise ValueError("from_identifier must be an integer or 'latest'")
@@ -137,38 +567,39 @@ class SQLiteStorage:
         if not (to_identifier == 'latest' or isinstance(to_identifier, int)):
             raise ValueError("to_identifier must be an integer or 'latest'")
 
-        cursor = self.conn.cursor()
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
 
-        if from_identifier == 'latest':
-            assert to_identifier is None
+            if from_identifier == 'latest':
+                assert to_identifier is None
 
-            cursor.execute(
-                'SELECT identifier FROM state_changes ORDER BY identifier DESC LIMIT 1',
-            )
-            from_identifier = cursor.fetchone()
+                cursor.execute(
+                    'SELECT identifier FROM state_changes ORDER BY identifier DESC LIMIT 1',
+                )
+                from_identifier = cursor.fetchone()
 
-        if to_identifier == 'latest':
-            cursor.execute(
-                'SELECT data FROM state_changes WHERE identifier >= ?',
-                (from_identifier,),
-            )
-        else:
-            cursor.execute(
-                'SELECT data FROM state_changes WHERE identifier '
-                'BETWEEN ? AND ?', (from_identifier, to_identifier),
-            )
+            if to_identifier == 'latest':
+                cursor.execute(
+                    'SELECT data FROM state_changes WHERE identifier >= ?',
+                    (from_identifier,),
+                )
+            else:
+                cursor.execute(
+                    'SELECT data FROM state_changes WHERE identifier '
+                    'BETWEEN ? AND ?', (from_identifier, to_identifier),
+                )
 
-        try:
-            result = [
-                self.serializer.deserialize(entry[0])
-                for entry in cursor.fetchall()
-            ]
-        except AttributeError:
-            raise InvalidDBData(
-                'Your local database is corrupt. Bailing ...',
-            )
+            try:
+                result = [
+                    self.serializer.deserialize(entry[0])
+                    for entry in cursor.fetchall()
+                ]
+            except AttributeError:
+                raise InvalidDBData(
+                    'Your local database is corrupt. Bailing ...',
+                )
 
-        return result
+            return result
 
     def get_events_by_identifier(self, from_identifier, to_identifier):
         if not (from_identifier == 'latest' or isinstance(from_identifier, int)):
@@ -177,32 +608,33 @@ class SQLiteStorage:
         if not (to_identifier == 'latest' or isinstance(to_identifier, int)):
             raise ValueError("to_identifier must be an integer or 'latest'")
 
-        cursor = self.conn.cursor()
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
 
-        if from_identifier == 'latest':
-            assert to_identifier is None
+            if from_identifier == 'latest':
+                assert to_identifier is None
 
-            cursor.execute(
-                'SELECT identifier FROM state_events ORDER BY identifier DESC LIMIT 1',
-            )
-            from_identifier = cursor.fetchone()
+                cursor.execute(
+                    'SELECT identifier FROM state_events ORDER BY identifier DESC LIMIT 1',
+                )
+                from_identifier = cursor.fetchone()
 
-        if to_identifier == 'latest':
-            cursor.execute(
-                'SELECT block_number, data FROM state_events WHERE identifier >= ?',
-                (from_identifier,),
-            )
-        else:
-            cursor.execute(
-                'SELECT block_number, data FROM state_events WHERE identifier '
-                'BETWEEN ? AND ?', (from_identifier, to_identifier),
-            )
+            if to_identifier == 'latest':
+                cursor.execute(
+                    'SELECT block_number, data FROM state_events WHERE identifier >= ?',
+                    (from_identifier,),
+                )
+            else:
+                cursor.execute(
+                    'SELECT block_number, data FROM state_events WHERE identifier '
+                    'BETWEEN ? AND ?', (from_identifier, to_identifier),
+                )
 
-        result = [
-            (entry[0], self.serializer.deserialize(entry[1]))
-            for entry in cursor.fetchall()
-        ]
-        return result
+            result = [
+                (entry[0], self.serializer.deserialize(entry[1]))
+                for entry in cursor.fetchall()
+            ]
+            return result
 
     def get_events_by_block(self, from_block, to_block):
         if not (from_block == 'latest' or isinstance(from_block, int)):
@@ -211,35 +643,357 @@ class SQLiteStorage:
         if not (to_block == 'latest' or isinstance(to_block, int)):
             raise ValueError("to_block must be an integer or 'latest'")
 
-        cursor = self.conn.cursor()
+        with self._read_connection() as conn:
+            cursor = conn.cursor()
+
+            if from_block is None:
+                from_block = 0
 
-        if from_block is None:
-            from_block = 0
+            if from_block == 'latest':
+                assert to_block is None
 
-        if from_block == 'latest':
-            assert to_block is None
+                cursor.execute(
+                    'SELECT block_number FROM state_events ORDER BY block_number DESC LIMIT 1',
+                )
+                from_block = cursor.fetchone()
+
+            if to_block == 'latest':
+                cursor.execute(
+                    'SELECT block_number, data FROM state_events WHERE block_number >= ?',
+                    (from_block, ),
+                )
+            else:
+                cursor.execute(
+                    'SELECT block_number, data FROM state_events WHERE block_number '
+                    'BETWEEN ? AND ?', (from_block, to_block),
+                )
+
+            result = [
+                (entry[0], self.serializer.deserialize(entry[1]))
+                for entry in cursor.fetchall()
+            ]
+            return result
+
+    def get_events(
+            self,
+            from_block: int = 0,
+            to_block='latest',
+            event_types: Optional[Iterable[str]] = None,
+            token_address: Optional[bytes] = None,
+            token_network_identifiers: Optional[Iterable[bytes]] = None,
+            address: Optional[bytes] = None,
+            payment_identifier: Optional[int] = None,
+            limit: Optional[int] = None,
+            offset: Optional[int] = None,
+    ) -> List[Tuple[int, Any]]:
+        """ Return the (block_number, event) pairs which match all the given
+        filters, the most recent block first and in the order they were saved
+        within a block. The filtering uses the indexed columns, only the
+        returned events are deserialized.
+
+        Args:
+            event_types: Names of the event classes.
+            token_address: Events of the token, either through their token
+                address or through one of the `token_network_identifiers`.
+            token_network_identifiers: Events of these token networks.
+            address: Events whose partner, initiator or target is `address`.
+            payment_identifier: Events of the payment.
+            limit: Maximum number of events to return.
+            offset: Number of matching events to skip.
+        """
+        if not isinstance(from_block, int):
+            raise ValueError('from_block must be an integer')
+
+        if not (to_block == 'latest' or isinstance(to_block, int)):
+            raise ValueError("to_block must be an integer or 'latest'")
+
+        conditions = ['block_number >= ?']
+        parameters = [from_block]
+
+        if to_block != 'latest':
+            conditions.append('block_number <= ?')
+            parameters.append(to_block)
+
+        if event_types is not None:
+            event_types = list(event_types)
+            conditions.append('event_type IN ({})'.format(', '.join('?' * len(event_types))))
+            parameters.extend(event_types)
+
+        token_conditions = list()
+        if token_address is not None:
+            token_conditions.append('token_address = ?')
+            parameters.append(token_address)
+
+        if token_network_identifiers is not None:
+            token_network_identifiers = list(token_network_identifiers)
+            token_conditions.append('token_network_identifier IN ({})'.format(
+                ', '.join('?' * len(token_network_identifiers)),
+            ))
+            parameters.extend(token_network_identifiers)
+
+        if token_conditions:
+            conditions.append('({})'.format(' OR '.join(token_conditions)))
+
+        if address is not None:
+            conditions.append('(partner_address = ? OR initiator = ? OR target = ?)')
+            parameters.extend([address, address, address])
+
+        if payment_identifier is not None:
+            conditions.append('payment_identifier = ?')
+            parameters.append(_integer_column_value(payment_identifier))
+
+        query = (
+            'SELECT block_number, data FROM state_events WHERE {} '
+            'ORDER BY block_number DESC, identifier ASC'
+        ).format(' AND '.join(conditions))
+
+        if limit is not None or offset is not None:
+            query += ' LIMIT ? OFFSET ?'
+            parameters.extend([-1 if limit is None else limit, offset or 0])
+
+        with self._read_connection() as conn:
+            rows = conn.execute(query, parameters).fetchall()
+
+        return [
+            (block_number, self.serializer.deserialize(data))
+            for block_number, data in rows
+        ]
 
-            cursor.execute(
-                'SELECT block_number FROM state_events ORDER BY block_number DESC LIMIT 1',
+    def write_blockchain_events(self, events, ranges):
+        """ Save decoded blockchain events and extend the indexed block ranges
+        of their contracts, in a single transaction. The events which are
+        already saved are ignored, the blocks of a poll that was interrupted
+        are polled again.
+
+        Args:
+            events: List of (contract_address, channel_identifier,
+                block_number, log_index, event) tuples.
+            ranges: List of (contract_address, from_block, to_block) tuples,
+                all the events of the contract in these blocks are saved. A
+                range which is not contiguous with the indexed range of the
+                contract replaces it.
+        """
+        events_data = [
+            (
+                contract_address,
+                _channel_identifier_column_value(channel_identifier),
+                block_number,
+                log_index,
+                self.serializer.serialize(event),
             )
-            from_block = cursor.fetchone()
+            for contract_address, channel_identifier, block_number, log_index, event in events
+        ]
+
+        with self.write_lock, self.conn:
+            self.conn.executemany(INSERT_BLOCKCHAIN_EVENT_QUERY, events_data)
+
+            for contract_address, from_block, to_block in ranges:
+                indexed_range = self.conn.execute(
+                    'SELECT from_block, to_block FROM blockchain_events_ranges '
+                    'WHERE contract_address = ?',
+                    (contract_address,),
+                ).fetchone()
+
+                if indexed_range is not None:
+                    indexed_from, indexed_to = indexed_range
+                    if from_block <= indexed_to + 1 and indexed_from <= to_block + 1:
+                        from_block = min(from_block, indexed_from)
+                        to_block = max(to_block, indexed_to)
+
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO blockchain_events_ranges('
+                    '   contract_address, from_block, to_block'
+                    ') VALUES(?, ?, ?)',
+                    (contract_address, from_block, to_block),
+                )
 
-        if to_block == 'latest':
-            cursor.execute(
-                'SELECT block_number, data FROM state_events WHERE block_number >= ?',
-                (from_block, ),
+    def get_blockchain_events_range(self, contract_address) -> Optional[Tuple[int, int]]:
+        """ Return the (from_block, to_block) range of which all the events of
+        `contract_address` are saved, or None.
+        """
+        with self._read_connection() as conn:
+            cursor = conn.execute(
+                'SELECT from_block, to_block FROM blockchain_events_ranges '
+                'WHERE contract_address = ?',
+                (contract_address,),
             )
-        else:
-            cursor.execute(
-                'SELECT block_number, data FROM state_events WHERE block_number '
-                'BETWEEN ? AND ?', (from_block, to_block),
+            result = cursor.fetchone()
+
+        return tuple(result) if result else None
+
+    def get_blockchain_events(
+            self,
+            contract_address,
+            from_block: int,
+            to_block: int,
+            channel_identifiers: Optional[Iterable[int]] = None,
+    ) -> List[Any]:
+        """ Return the saved events of `contract_address` in the block range,
+        in the order they were emitted.
+
+        Args:
+            channel_identifiers: Only the events of these channels.
+        """
+        conditions = ['contract_address = ?', 'block_number BETWEEN ? AND ?']
+        parameters = [contract_address, from_block, to_block]
+
+        if channel_identifiers is not None:
+            channel_identifiers = [
+                _channel_identifier_column_value(channel_identifier)
+                for channel_identifier in channel_identifiers
+            ]
+            conditions.append('channel_identifier IN ({})'.format(
+                ', '.join('?' * len(channel_identifiers)),
+            ))
+            parameters.extend(channel_identifiers)
+
+        query = (
+            'SELECT data FROM blockchain_events WHERE {} '
+            'ORDER BY block_number, log_index'
+        ).format(' AND '.join(conditions))
+
+        with self._read_connection() as conn:
+            rows = conn.execute(query, parameters).fetchall()
+
+        return [self.serializer.deserialize(data) for data, in rows]
+
+    def delete_state_snapshots_before(self, statechange_id: int) -> int:
+        """ Delete the full snapshots taken before `statechange_id` and the
+        deltas which apply to them. Returns the number of deleted rows.
+        """
+        with self.write_lock, self.conn:
+            deltas = self.conn.execute(
+                'DELETE FROM state_snapshot_delta WHERE base_statechange_id < ?',
+                (statechange_id,),
+            )
+            snapshots = self.conn.execute(
+                'DELETE FROM state_snapshot WHERE statechange_id < ?',
+                (statechange_id,),
             )
 
-        result = [
-            (entry[0], self.serializer.deserialize(entry[1]))
-            for entry in cursor.fetchall()
-        ]
-        return result
+        return deltas.rowcount + snapshots.rowcount
+
+    def iterate_serialized_events(
+            self,
+            from_statechange_id: int,
+            to_statechange_id: int,
+            chunk_size: int,
+    ):
+        """ Yield the events of the state changes with an id in the range
+        [from_statechange_id, to_statechange_id), as lists of at most
+        `chunk_size` (identifier, serialized_data) pairs.
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        last_identifier = 0
+        while True:
+            with self._read_connection() as conn:
+                cursor = conn.execute(
+                    'SELECT identifier, data FROM state_events '
+                    'WHERE identifier > ? AND source_statechange_id BETWEEN ? AND ? '
+                    'ORDER BY identifier LIMIT ?',
+                    (last_identifier, from_statechange_id, to_statechange_id - 1, chunk_size),
+                )
+                chunk = cursor.fetchall()
+
+            if not chunk:
+                return
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+
+            last_identifier = chunk[-1][0]
+
+    def iterate_unreferenced_statechanges(
+            self,
+            from_statechange_id: int,
+            to_statechange_id: int,
+            chunk_size: int,
+    ):
+        """ Yield the state changes with an id in the range
+        [from_statechange_id, to_statechange_id) which are not referenced by
+        an event or a snapshot, as lists of at most `chunk_size`
+        (identifier, serialized_data) pairs.
+        """
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer')
+
+        while True:
+            with self._read_connection() as conn:
+                cursor = conn.execute(
+                    'SELECT identifier, data FROM state_changes AS s '
+                    'WHERE identifier BETWEEN ? AND ? '
+                    'AND NOT EXISTS ('
+                    '   SELECT 1 FROM state_events WHERE source_statechange_id = s.identifier'
+                    ') '
+                    'AND NOT EXISTS ('
+                    '   SELECT 1 FROM state_snapshot WHERE statechange_id = s.identifier'
+                    ') '
+                    'AND NOT EXISTS ('
+                    '   SELECT 1 FROM state_snapshot_delta '
+                    '   WHERE base_statechange_id = s.identifier '
+                    '   OR statechange_id = s.identifier'
+                    ') '
+                    'ORDER BY identifier LIMIT ?',
+                    (from_statechange_id, to_statechange_id - 1, chunk_size),
+                )
+                chunk = cursor.fetchall()
+
+            if not chunk:
+                return
+
+            yield chunk
+
+            if len(chunk) < chunk_size:
+                return
+
+            from_statechange_id = chunk[-1][0] + 1
+
+    def delete_events(self, identifiers: List[int]):
+        with self.write_lock, self.conn:
+            self.conn.executemany(
+                'DELETE FROM state_events WHERE identifier = ?',
+                ((identifier,) for identifier in identifiers),
+            )
+
+    def delete_statechanges(self, identifiers: List[int]):
+        with self.write_lock, self.conn:
+            self.conn.executemany(
+                'DELETE FROM state_changes WHERE identifier = ?',
+                ((identifier,) for identifier in identifiers),
+            )
+
+    def incremental_vacuum(self, pages: int) -> Optional[int]:
+        """ Return at most `pages` free pages to the file system.
+
+        Returns the number of pages returned, or None if the database was not
+        created with incremental auto vacuum, see `vacuum`.
+        """
+        with self.write_lock:
+            auto_vacuum = self.conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+            if auto_vacuum != INCREMENTAL_AUTO_VACUUM:
+                return None
+
+            free_pages = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # execute only steps the pragma once, freeing a single page
+            self.conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+            return free_pages - self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def vacuum(self):
+        """ Rebuild the database file and enable the incremental auto vacuum.
+
+        Rewrites the whole file, it should only be used offline.
+        """
+        with self.write_lock:
+            self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            self.conn.execute('VACUUM')
 
     def __del__(self):
+        read_pool = getattr(self, 'read_pool', None)
+        while read_pool is not None and not read_pool.empty():
+            read_pool.get_nowait().close()
+
         self.conn.close()
@@ -21,25 +21,116 @@ CREATE TABLE IF NOT EXISTS state_snapshot (
 );
 '''
 
+DB_CREATE_SNAPSHOT_DELTA = '''
+CREATE TABLE IF NOT EXISTS state_snapshot_delta (
+    identifier INTEGER PRIMARY KEY,
+    base_statechange_id INTEGER NOT NULL,
+    statechange_id INTEGER NOT NULL,
+    data BINARY,
+    FOREIGN KEY(base_statechange_id) REFERENCES state_changes(identifier),
+    FOREIGN KEY(statechange_id) REFERENCES state_changes(identifier)
+);
+'''
+
+# Columns extracted from the events when they are saved, used to filter the
+# events without deserializing them. Added to older databases on startup.
+STATE_EVENTS_INDEXED_COLUMNS = (
+    ('event_type', 'TEXT'),
+    ('token_network_identifier', 'BLOB'),
+    ('token_address', 'BLOB'),
+    ('partner_address', 'BLOB'),
+    ('initiator', 'BLOB'),
+    ('target', 'BLOB'),
+    ('payment_identifier', 'INTEGER'),
+)
+
 DB_CREATE_STATE_EVENTS = '''
 CREATE TABLE IF NOT EXISTS state_events (
     identifier INTEGER PRIMARY KEY,
     source_statechange_id INTEGER NOT NULL,
     block_number INTEGER NOT NULL,
     data BINARY,
+    event_type TEXT,
+    token_network_identifier BLOB,
+    token_address BLOB,
+    partner_address BLOB,
+    initiator BLOB,
+    target BLOB,
+    payment_identifier INTEGER,
     FOREIGN KEY(source_statechange_id) REFERENCES state_changes(identifier)
 );
 '''
 
+# Used by the compaction to find the state changes referenced by events, and
+# by SQLite to check the foreign key when a state change is deleted
+DB_CREATE_STATE_EVENTS_SOURCE_INDEX = '''
+CREATE INDEX IF NOT EXISTS state_events_source_statechange_id
+ON state_events(source_statechange_id);
+'''
+
+# Index of the decoded blockchain events polled by the node, the ranges are
+# the blocks of which all the events of a contract were saved
+DB_CREATE_BLOCKCHAIN_EVENTS = '''
+CREATE TABLE IF NOT EXISTS blockchain_events (
+    identifier INTEGER PRIMARY KEY,
+    contract_address BLOB NOT NULL,
+    channel_identifier BLOB,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER,
+    data BINARY,
+    UNIQUE(contract_address, block_number, log_index)
+);
+'''
+
+DB_CREATE_BLOCKCHAIN_EVENTS_CHANNEL_INDEX = '''
+CREATE INDEX IF NOT EXISTS blockchain_events_channel_identifier
+ON blockchain_events(contract_address, channel_identifier, block_number);
+'''
+
+DB_CREATE_BLOCKCHAIN_EVENTS_RANGES = '''
+CREATE TABLE IF NOT EXISTS blockchain_events_ranges (
+    contract_address BLOB NOT NULL PRIMARY KEY,
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL
+);
+'''
+
 DB_SCRIPT_CREATE_TABLES = """
 PRAGMA foreign_keys=off;
 BEGIN TRANSACTION;
-{}{}{}{}
+{}{}{}{}{}{}{}{}{}
 COMMIT;
 PRAGMA foreign_keys=on;
 """.format(
     DB_CREATE_SETTINGS,
     DB_CREATE_STATE_CHANGES,
     DB_CREATE_SNAPSHOT,
+    DB_CREATE_SNAPSHOT_DELTA,
     DB_CREATE_STATE_EVENTS,
+    DB_CREATE_STATE_EVENTS_SOURCE_INDEX,
+    DB_CREATE_BLOCKCHAIN_EVENTS,
+    DB_CREATE_BLOCKCHAIN_EVENTS_CHANNEL_INDEX,
+    DB_CREATE_BLOCKCHAIN_EVENTS_RANGES,
 )
+
+# Created once the indexed columns exist, after the update of older databases
+DB_SCRIPT_CREATE_STATE_EVENTS_INDEXES = """
+BEGIN TRANSACTION;
+CREATE INDEX IF NOT EXISTS state_events_block_number
+ON state_events(block_number);
+CREATE INDEX IF NOT EXISTS state_events_event_type
+ON state_events(event_type, block_number);
+CREATE INDEX IF NOT EXISTS state_events_token_network_identifier
+ON state_events(token_network_identifier, block_number);
+CREATE INDEX IF NOT EXISTS state_events_token_address
+ON state_events(token_address, block_number);
+CREATE INDEX IF NOT EXISTS state_events_partner_address
+ON state_events(partner_address);
+CREATE INDEX IF NOT EXISTS state_events_initiator
+ON state_events(initiator);
+CREATE INDEX IF NOT EXISTS state_events_target
+ON state_events(target);
+CREATE INDEX IF NOT EXISTS state_events_payment_identifier
+ON state_events(payment_identifier);
+COMMIT;
+"""
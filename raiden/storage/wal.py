@@ -1,43 +1,272 @@
+import os
+import pickle
+import time
+from typing import NamedTuple, Optional
+
+import gevent
+import gevent.os
 import structlog
+from gevent.event import AsyncResult
 
-from raiden.transfer.architecture import StateManager
+from raiden.exceptions import InvalidDBData, RaidenError, RaidenUnrecoverableError
+from raiden.transfer.architecture import StateManager, deepcopy_state
 
 log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
 
+# Number of state changes read and deserialized at once during a restore
+RESTORE_CHUNK_SIZE = 1000
+
+# Minimum interval in seconds between the progress reports of a restore
+RESTORE_PROGRESS_INTERVAL = 5
+
+# Size of the reads of a serialized snapshot from the child process
+SNAPSHOT_PIPE_READ_SIZE = 2 ** 16
+
+
+class SnapshotStatistics(NamedTuple):
+    """ Metrics of a saved snapshot, durations are in seconds. """
+    state_change_id: int
+    base_state_change_id: Optional[int]  # None for a full snapshot
+    size: int
+    serialize_duration: float
+    write_duration: float
+
+
+def _deserialize_chunk(serializer, chunk):
+    try:
+        return [serializer.deserialize(data) for _, data in chunk]
+    except AttributeError:
+        raise InvalidDBData(
+            'Your local database is corrupt. Bailing ...',
+        )
+
+
+def _run_in_child_process(function, *args):
+    """ Call `function` in a forked child process and return its result.
+
+    The child works on a copy-on-write copy of the memory of this process,
+    so it doesn't hold the GIL of this process and the hub keeps running
+    while `function` runs. The child must not use the database connections,
+    the sockets, or the hub it inherited, the result is pickled and sent
+    through a pipe which is read cooperatively.
+    """
+    read_fd, write_fd = os.pipe()
+
+    pid = gevent.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.close(read_fd)
+            try:
+                result = (True, function(*args))
+            except Exception as e:  # pylint: disable=broad-except
+                result = (False, repr(e))
+            data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+            view = memoryview(data)
+            while view:
+                view = view[os.write(write_fd, view):]
+        except BaseException:  # pylint: disable=broad-except
+            exit_code = 1
+        finally:
+            # skip the atexit handlers and the flush of the inherited buffers
+            os._exit(exit_code)
+
+    os.close(write_fd)
+    try:
+        gevent.os.make_nonblocking(read_fd)
+        chunks = list()
+        chunk = gevent.os.nb_read(read_fd, SNAPSHOT_PIPE_READ_SIZE)
+        while chunk:
+            chunks.append(chunk)
+            chunk = gevent.os.nb_read(read_fd, SNAPSHOT_PIPE_READ_SIZE)
+    finally:
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+
+    if not chunks:
+        raise RaidenError('The child process exited without a result')
+
+    success, result = pickle.loads(b''.join(chunks))
+    if not success:
+        raise RaidenError(f'The child process failed: {result}')
+
+    return result
+
+
+def _deserialized_state_changes(storage, from_identifier, chunk_size):
+    """ Yield the deserialized state changes, in order.
+
+    The state changes are read in chunks by the calling greenlet, the read
+    pool is not safe to use from a native thread, and deserialized by the
+    hub's threadpool. The next chunk is deserialized while the current chunk
+    is replayed.
+    """
+    threadpool = gevent.get_hub().threadpool
 
-def restore_from_latest_snapshot(transition_function, storage):
+    pending = None
+    for chunk in storage.iterate_serialized_statechanges(from_identifier, chunk_size):
+        deserialized = threadpool.spawn(_deserialize_chunk, storage.serializer, chunk)
+
+        if pending is not None:
+            yield from pending.get()
+
+        pending = deserialized
+
+    if pending is not None:
+        yield from pending.get()
+
+
+def restore_from_latest_snapshot(
+        transition_function,
+        storage,
+        copy_state=deepcopy_state,
+        max_batch_latency=0,
+        snapshot_deltas=None,
+        full_snapshot_interval=1,
+        background_snapshots=False,
+        chunk_size=RESTORE_CHUNK_SIZE,
+        compaction=None,
+):
+    start = time.monotonic()
     snapshot = storage.get_latest_state_snapshot()
+    snapshot_base = None
 
     if snapshot:
         log.debug('Restoring from snapshot')
         last_applied_state_change_id, state = snapshot
-        unapplied_state_changes = storage.get_statechanges_by_identifier(
-            from_identifier=last_applied_state_change_id,
-            to_identifier='latest',
-        )
+        snapshot_base = snapshot
+
+        # Without the snapshot_deltas the deltas are ignored, all the state
+        # changes since the full snapshot are replayed
+        delta = None
+        if snapshot_deltas is not None:
+            delta = storage.get_latest_state_snapshot_delta(last_applied_state_change_id)
+
+        if delta:
+            log.debug('Applying snapshot delta')
+            last_applied_state_change_id, state_delta = delta
+            state = snapshot_deltas.apply(state, state_delta)
+
+        # the snapshot already contains the state change it was taken at
+        from_identifier = last_applied_state_change_id + 1
     else:
         log.debug('No snapshot found, replaying all state changes')
         state = None
-        unapplied_state_changes = storage.get_statechanges_by_identifier(
-            from_identifier=0,
-            to_identifier='latest',
-        )
+        from_identifier = 0
 
-    state_manager = StateManager(transition_function, state)
-    wal = WriteAheadLog(state_manager, storage)
+    state_manager = StateManager(transition_function, state, copy_state)
+    wal = WriteAheadLog(
+        state_manager,
+        storage,
+        max_batch_latency,
+        snapshot_deltas,
+        full_snapshot_interval,
+        background_snapshots,
+        compaction,
+    )
+    wal.snapshot_base = snapshot_base
 
-    log.debug('Replaying state changes', num_state_changes=len(unapplied_state_changes))
-    for state_change in unapplied_state_changes:
+    snapshot_loaded = time.monotonic()
+    num_state_changes = storage.count_statechanges(from_identifier)
+    log.info(
+        'Replaying state changes',
+        num_state_changes=num_state_changes,
+        snapshot_duration=snapshot_loaded - start,
+    )
+
+    num_replayed = 0
+    last_report = snapshot_loaded
+    state_changes = _deserialized_state_changes(storage, from_identifier, chunk_size)
+    for state_change in state_changes:
         state_manager.dispatch(state_change)
+        num_replayed += 1
+
+        now = time.monotonic()
+        if now - last_report >= RESTORE_PROGRESS_INTERVAL:
+            last_report = now
+            log.info(
+                'Restore progress',
+                num_replayed=num_replayed,
+                num_state_changes=num_state_changes,
+                replay_duration=now - snapshot_loaded,
+            )
+
+    replayed = time.monotonic()
+    log.info(
+        'State restored',
+        num_replayed=num_replayed,
+        snapshot_duration=snapshot_loaded - start,
+        replay_duration=replayed - snapshot_loaded,
+    )
 
     return wal
 
 
 class WriteAheadLog:
-    def __init__(self, state_manager, storage):
+    def __init__(
+            self,
+            state_manager,
+            storage,
+            max_batch_latency=0,
+            snapshot_deltas=None,
+            full_snapshot_interval=1,
+            background_snapshots=False,
+            compaction=None,
+    ):
+        """ Initialize the write-ahead-log.
+
+        Args:
+            state_manager: The StateManager used to apply the state changes.
+            storage: The SQLiteStorage used to save the state changes.
+            max_batch_latency: If larger than zero, enables group commit. State
+                changes dispatched by concurrent greenlets within this many
+                seconds are saved, together with their events, in a single
+                transaction.
+            snapshot_deltas: Object with the `diff(base_state, state)` and
+                `apply(base_state, delta)` functions, used to save only the
+                changes since the last full snapshot.
+            full_snapshot_interval: Every this many snapshots a full snapshot
+                is saved, the other snapshots are deltas. One disables the
+                delta snapshots.
+            background_snapshots: If True, `snapshot` only captures the
+                current state, the snapshot is serialized in a child process
+                and saved by a separate greenlet.
+            compaction: Function called with the storage after a full
+                snapshot is saved, to delete the data the snapshot makes
+                unnecessary, see `raiden.storage.compaction.compact`.
+        """
+        if max_batch_latency < 0:
+            raise ValueError('max_batch_latency must be non-negative')
+
+        if not isinstance(full_snapshot_interval, int) or full_snapshot_interval < 1:
+            raise ValueError('full_snapshot_interval must be a positive integer')
+
         self.state_manager = state_manager
         self.state_change_id = None
         self.storage = storage
+        self.max_batch_latency = max_batch_latency
+        self.snapshot_deltas = snapshot_deltas
+        self.full_snapshot_interval = full_snapshot_interval
+
+        # The (state_change_id, state) of the last full snapshot, the deltas
+        # are computed against this state
+        self.snapshot_base = None
+        self.snapshots_since_full = 0
+
+        self.background_snapshots = background_snapshots
+        self.last_snapshot_statistics = None
+        self._pending_snapshot = None
+
+        self.compaction = compaction
+
+        self._pending_batch = list()
+        self._pending_result = None
+        self._pending_flush = None
+        # The state before the first state change of the pending batch
+        self._pending_base_state = None
+        # The error of a batch which could not be saved
+        self._write_error = None
 
     def log_and_dispatch(self, state_change, block_number):
         """ Log and apply a state change.
@@ -47,28 +276,211 @@ class WriteAheadLog:
         to restore the node state.
 
         Events produced by applying state change are also saved.
+
+        With group commit enabled the state change is applied first and this
+        function blocks until the batch it belongs to is saved, the events are
+        only returned, and therefore handled, once the state change is durable.
+        If the batch can not be saved the state is rolled back to the state
+        before the batch, and no state change is accepted afterwards: the next
+        batches would be saved on top of the missing state changes.
         """
-        state_change_id = self.storage.write_state_change(state_change)
+        if not self.max_batch_latency:
+            state_change_id = self.storage.write_state_change(state_change)
+
+            events = self.state_manager.dispatch(state_change)
+
+            self.state_change_id = state_change_id
+            self.storage.write_events(state_change_id, block_number, events)
+
+            return events
 
+        if self._write_error is not None:
+            raise RaidenUnrecoverableError(
+                'A batch of state changes could not be saved, the state changes '
+                'are not accepted anymore',
+            ) from self._write_error
+
+        # The state changes must be saved in the order they are applied, there
+        # is no context switch between the dispatch and adding the state
+        # change to the batch.
+        base_state = self.state_manager.current_state
         events = self.state_manager.dispatch(state_change)
 
-        self.state_change_id = state_change_id
-        self.storage.write_events(state_change_id, block_number, events)
+        if not self._pending_batch:
+            self._pending_result = AsyncResult()
+            self._pending_base_state = base_state
+            self._pending_flush = gevent.spawn_later(self.max_batch_latency, self.flush)
+
+        pending_result = self._pending_result
+        self._pending_batch.append((state_change, block_number, events))
+
+        # raises if the batch could not be saved
+        pending_result.get()
 
         return events
 
+    def flush(self):
+        """ Save the pending batch of state changes and wake up the greenlets
+        waiting on it.
+        """
+        pending_flush = self._pending_flush
+        if pending_flush is not None and pending_flush is not gevent.getcurrent():
+            pending_flush.kill()
+
+        batch = self._pending_batch
+        pending_result = self._pending_result
+        base_state = self._pending_base_state
+
+        self._pending_batch = list()
+        self._pending_result = None
+        self._pending_flush = None
+        self._pending_base_state = None
+
+        if not batch:
+            return
+
+        try:
+            state_change_ids = self.storage.write_state_changes_and_events(batch)
+        except Exception as e:  # pylint: disable=broad-except
+            log.critical('Failed to save the state changes', num_state_changes=len(batch))
+
+            # The in-memory state must not advance past the saved state
+            # changes, the batch dispatched since then is discarded too.
+            self._write_error = e
+            self.state_manager.current_state = base_state
+
+            if self._pending_batch:
+                self._pending_flush.kill()
+                self._pending_result.set_exception(e)
+                self._pending_batch = list()
+                self._pending_result = None
+                self._pending_flush = None
+                self._pending_base_state = None
+
+            pending_result.set_exception(e)
+        else:
+            self.state_change_id = state_change_ids[-1]
+            pending_result.set(state_change_ids)
+
     def snapshot(self):
         """ Snapshot the application state.
 
         Snapshots are used to restore the application state, either after a
         restart or a crash.
+
+        With background snapshots this only captures the current state and
+        returns, the state objects are never modified by the StateManager so
+        a child process can serialize them while new state changes are
+        applied. The dispatch is only stalled by the fork and by the write of
+        the serialized snapshot, which is a synchronous sqlite call. If the
+        previous snapshot is still being saved this snapshot is skipped, the
+        state changes are already durable.
         """
+        # the snapshot must not include state changes which are not saved yet
+        self.flush()
+
         current_state = self.state_manager.current_state
         state_change_id = self.state_change_id
 
         # otherwise no state change was dispatched
-        if state_change_id:
-            self.storage.write_state_snapshot(state_change_id, current_state)
+        if not state_change_id:
+            return
+
+        if not self.background_snapshots:
+            self._save_snapshot(state_change_id, current_state)
+            return
+
+        if self._pending_snapshot is not None and not self._pending_snapshot.ready():
+            log.warning(
+                'Previous snapshot still being saved, skipping snapshot',
+                state_change_id=state_change_id,
+            )
+            return
+
+        self._pending_snapshot = gevent.spawn(
+            self._save_snapshot,
+            state_change_id,
+            current_state,
+        )
+        self._pending_snapshot.link_exception(self._on_snapshot_error)
+
+    def wait_for_snapshot(self):
+        """ Block until the snapshot being saved in the background, if any, is
+        saved. A snapshot which could not be saved is only logged, the state
+        changes are already durable.
+        """
+        pending_snapshot = self._pending_snapshot
+        if pending_snapshot is not None:
+            pending_snapshot.join()
+
+    @staticmethod
+    def _on_snapshot_error(greenlet):
+        log.critical('Failed to save the snapshot', error=str(greenlet.exception))
+
+    def _serialize_snapshot(self, state):
+        """ Return the id of the base snapshot and the serialized delta, or
+        None and the serialized state for a full snapshot.
+
+        Only reads `state` and `self.snapshot_base`, it is safe to run in a
+        child process.
+        """
+        take_delta = (
+            self.snapshot_deltas is not None and
+            self.snapshot_base is not None and
+            self.snapshots_since_full + 1 < self.full_snapshot_interval
+        )
+        if take_delta:
+            base_state_change_id, base_state = self.snapshot_base
+            delta = self.snapshot_deltas.diff(base_state, state)
+
+            if delta is not None:
+                return base_state_change_id, self.storage.serializer.serialize(delta)
+
+        return None, self.storage.serializer.serialize(state)
+
+    def _save_snapshot(self, state_change_id, state):
+        start = time.monotonic()
+
+        if self.background_snapshots:
+            # The serialization is CPU bound and holds the GIL, a native
+            # thread would still stall the hub, so it runs in a child process
+            base_state_change_id, serialized_data = _run_in_child_process(
+                self._serialize_snapshot,
+                state,
+            )
+        else:
+            base_state_change_id, serialized_data = self._serialize_snapshot(state)
+
+        serialized = time.monotonic()
+
+        # The write is done by the greenlet, the storage's write lock is not
+        # safe to be used from a native thread. It blocks the hub for the
+        # duration of the insert and its commit.
+        if base_state_change_id is None:
+            self.storage.write_serialized_state_snapshot(state_change_id, serialized_data)
+            self.snapshot_base = (state_change_id, state)
+            self.snapshots_since_full = 0
+        else:
+            self.storage.write_serialized_state_snapshot_delta(
+                base_state_change_id,
+                state_change_id,
+                serialized_data,
+            )
+            self.snapshots_since_full += 1
+
+        statistics = SnapshotStatistics(
+            state_change_id,
+            base_state_change_id,
+            len(serialized_data),
+            serialized - start,
+            time.monotonic() - serialized,
+        )
+        self.last_snapshot_statistics = statistics
+
+        log.debug('Snapshot saved', **statistics._asdict())
+
+        if base_state_change_id is None and self.compaction is not None:
+            self.compaction(self.storage)
 
     @property
     def version(self):
@@ -0,0 +1,87 @@
+""" Time the dispatch of a Block state change for a node with many channels.
+
+Only one channel has a pending deposit, the other channels are not affected
+by the blocks.
+
+    python -m raiden.tests.benchmark.speed_block --channels 100 1000 5000
+"""
+import argparse
+import random
+import time
+
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.state import (
+    ChainState,
+    PaymentNetworkState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def make_state_manager(number_of_channels):
+    our_address = factories.make_address()
+    payment_network_identifier = factories.make_payment_network_identifier()
+    token_network = TokenNetworkState(factories.make_address(), factories.make_address())
+    payment_network = PaymentNetworkState(payment_network_identifier, [token_network])
+
+    chain_state = ChainState(random.Random(), 1, our_address, factories.UNIT_CHAIN_ID)
+    chain_state.identifiers_to_paymentnetworks[payment_network_identifier] = payment_network
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network.token_address,
+            payment_network_identifier=payment_network_identifier,
+            token_network_identifier=token_network.address,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network.address,
+            channel_state,
+        ))
+
+    state_manager.dispatch(ContractReceiveChannelNewBalance(
+        factories.make_transaction_hash(),
+        token_network.address,
+        channel_state.identifier,
+        TransactionChannelNewBalance(our_address, 200, 2),
+    ))
+
+    return state_manager
+
+
+def bench(number_of_channels, blocks):
+    state_manager = make_state_manager(number_of_channels)
+
+    start = time.perf_counter()
+    for block_number in range(2, blocks + 2):
+        state_manager.dispatch(Block(block_number))
+    elapsed = time.perf_counter() - start
+
+    print('{:>10} {:>12.3f}'.format(number_of_channels, elapsed / blocks * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=[100, 1000, 5000], type=int, nargs='+')
+    parser.add_argument('--blocks', default=100, type=int)
+    args = parser.parse_args()
+
+    print('{:>10} {:>12}'.format('channels', 'block ms'))
+    for number_of_channels in args.channels:
+        bench(number_of_channels, args.blocks)
+
+
+if __name__ == '__main__':
+    main()
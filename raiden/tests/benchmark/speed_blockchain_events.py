@@ -0,0 +1,181 @@
+""" Compare the latency of the blockchain events queries of the REST API when
+they are answered by the Ethereum node and by the events index.
+
+The node is a JSON-RPC server on the loopback which answers eth_getLogs from
+memory, `--rpc-latency` is added to every request to emulate a remote node.
+As done by `RaidenAPI`, the channel events are requested with one eth_getLogs
+per channel, the index answers them with a single query. The time spent
+decoding the logs is not included, the indexed events are already decoded.
+
+    python -m raiden.tests.benchmark.speed_blockchain_events --channels 50 --rpc-latency 0.005
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+from eth_utils import encode_hex
+
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.tests.utils.factories import make_address
+
+
+def make_logs(token_network, number_of_channels, events_per_channel):
+    logs = list()
+    events = list()
+
+    for block_number in range(events_per_channel):
+        for channel_identifier in range(1, number_of_channels + 1):
+            log_index = len(logs)
+            logs.append({
+                'address': encode_hex(token_network),
+                'topics': ['0x' + '11' * 32, '0x{:064x}'.format(channel_identifier)],
+                'data': '0x' + '00' * 64,
+                'blockNumber': hex(block_number),
+                'logIndex': hex(log_index),
+                'transactionHash': '0x' + '22' * 32,
+            })
+            event = {
+                'event': 'ChannelNewDeposit',
+                'args': {
+                    'channel_identifier': channel_identifier,
+                    'participant': encode_hex(make_address()),
+                    'total_deposit': block_number,
+                },
+                'logIndex': log_index,
+                'transactionHash': b'\x22' * 32,
+                'block_number': block_number,
+            }
+            events.append((token_network, channel_identifier, block_number, log_index, event))
+
+    return logs, events
+
+
+def make_rpc_server(logs, rpc_latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            filter_params = request['params'][0]
+            from_block = int(filter_params['fromBlock'], 16)
+            to_block = int(filter_params['toBlock'], 16)
+            topics = filter_params.get('topics') or []
+            channel_topic = topics[1] if len(topics) > 1 else None
+
+            result = [
+                log
+                for log in logs
+                if from_block <= int(log['blockNumber'], 16) <= to_block and
+                (channel_topic is None or log['topics'][1] == channel_topic)
+            ]
+
+            time.sleep(rpc_latency)
+            body = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': result})
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def get_logs(session, url, token_network, from_block, to_block, channel_identifier=None):
+    topics = None
+    if channel_identifier is not None:
+        topics = [None, '0x{:064x}'.format(channel_identifier)]
+
+    response = session.post(url, json={
+        'jsonrpc': '2.0',
+        'id': 1,
+        'method': 'eth_getLogs',
+        'params': [{
+            'address': encode_hex(token_network),
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+            'topics': topics,
+        }],
+    })
+    return response.json()['result']
+
+
+def measure(query, repetitions):
+    latencies = list()
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        result = query()
+        latencies.append(time.perf_counter() - start)
+    return len(result), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=50, type=int)
+    parser.add_argument('--events-per-channel', default=10, type=int)
+    parser.add_argument('--rpc-latency', default=0.0, type=float)
+    parser.add_argument('--repetitions', default=20, type=int)
+    args = parser.parse_args()
+
+    token_network = make_address()
+    logs, events = make_logs(token_network, args.channels, args.events_per_channel)
+    to_block = args.events_per_channel - 1
+    channel_identifiers = list(range(1, args.channels + 1))
+
+    server = make_rpc_server(logs, args.rpc_latency)
+    url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    session = requests.Session()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = SQLiteStorage(os.path.join(tmpdir, 'log.db'), PickleSerializer)
+        storage.write_blockchain_events(events, [(token_network, 0, to_block)])
+
+        queries = [
+            ('channel events', 'rpc', lambda: [
+                log
+                for channel_identifier in channel_identifiers
+                for log in get_logs(
+                    session, url, token_network, 0, to_block, channel_identifier,
+                )
+            ]),
+            ('channel events', 'index', lambda: storage.get_blockchain_events(
+                token_network, 0, to_block, channel_identifiers,
+            )),
+            ('token network', 'rpc', lambda: get_logs(session, url, token_network, 0, to_block)),
+            ('token network', 'index', lambda: storage.get_blockchain_events(
+                token_network, 0, to_block,
+            )),
+        ]
+
+        print('{:<16} {:<8} {:>8} {:>12} {:>12}'.format(
+            'query',
+            'source',
+            'events',
+            'median ms',
+            'max ms',
+        ))
+        for name, source, query in queries:
+            number_of_events, latencies = measure(query, args.repetitions)
+            print('{:<16} {:<8} {:>8} {:>12.3f} {:>12.3f}'.format(
+                name,
+                source,
+                number_of_events,
+                statistics.median(latencies) * 1000,
+                max(latencies) * 1000,
+            ))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+""" Compare the encoding and decoding of every message type with a namedbuffer
+and with the precompiled namedstruct used by raiden.encoding.messages.
+
+The encoding sets every field and serializes the message, the decoding reads
+every field of the serialized message, as done by `Message.pack` and
+`Message.unpack`.
+
+    python -m raiden.tests.benchmark.speed_encoding --number 10000
+"""
+import argparse
+import os
+import random
+import timeit
+
+from raiden.encoding import messages
+from raiden.encoding.format import Pad, buffer_for, namedbuffer
+
+MESSAGE_TYPES = dict(
+    [(klass.__name__, klass) for klass in messages.CMDID_MESSAGE.values()] +
+    [('lock', messages.Lock)],
+)
+
+
+def random_value(field):
+    if field.encoder is None:
+        return os.urandom(field.size_bytes)
+    return random.randint(field.encoder.minimum, field.encoder.maximum)
+
+
+def buffer_encode(klass, values):
+    packed = klass(buffer_for(klass))
+
+    for name, value in values:
+        setattr(packed, name, value)
+
+    return bytes(packed.data)
+
+
+def buffer_decode(klass, names, data):
+    packed = klass(data)
+    return [getattr(packed, name) for name in names]
+
+
+def struct_encode(klass, values):
+    packed = klass()
+
+    for name, value in values:
+        setattr(packed, name, value)
+
+    return packed.encode()
+
+
+def struct_decode(klass, names, data):
+    packed = klass.decode(data)
+    return [getattr(packed, name) for name in names]
+
+
+def per_second(function, number, *args):
+    return number / timeit.timeit(lambda: function(*args), number=number)
+
+
+def bench(name, number):
+    struct_klass = MESSAGE_TYPES[name]
+    buffer_klass = namedbuffer(name, struct_klass.fields_spec)
+
+    fields = [field for field in struct_klass.fields_spec if not isinstance(field, Pad)]
+    names = [field.name for field in fields]
+    values = [(field.name, random_value(field)) for field in fields]
+
+    data = buffer_encode(buffer_klass, values)
+    assert struct_encode(struct_klass, values) == data
+    assert struct_decode(struct_klass, names, data) == buffer_decode(buffer_klass, names, data)
+
+    print('{:>16} {:>6} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f}'.format(
+        name,
+        struct_klass.size,
+        per_second(buffer_encode, number, buffer_klass, values),
+        per_second(struct_encode, number, struct_klass, values),
+        per_second(buffer_decode, number, buffer_klass, names, data),
+        per_second(struct_decode, number, struct_klass, names, data),
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', default=10000, type=int)
+    parser.add_argument('--messages', default=sorted(MESSAGE_TYPES), nargs='+')
+    args = parser.parse_args()
+
+    print('{:>16} {:>6} {:>14} {:>14} {:>14} {:>14}'.format(
+        'message',
+        'bytes',
+        'buffer enc/s',
+        'struct enc/s',
+        'buffer dec/s',
+        'struct dec/s',
+    ))
+    for name in args.messages:
+        bench(name, args.number)
+
+
+if __name__ == '__main__':
+    main()
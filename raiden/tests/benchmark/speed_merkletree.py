@@ -0,0 +1,86 @@
+""" Compare the incremental update of the merkle tree with the computation of
+the whole tree, for a channel with a growing number of pending locks.
+
+    python -m raiden.tests.benchmark.speed_merkletree --locks 10 100 1000
+"""
+import argparse
+import os
+import timeit
+
+from raiden.transfer.merkle_tree import (
+    compute_layers,
+    compute_layers_with,
+    compute_layers_without,
+    compute_merkleproof_for,
+)
+from raiden.transfer.state import MerkleTreeState
+
+
+def full_with(leaves, lockhash):
+    return compute_layers(leaves + [lockhash])
+
+
+def full_without(leaves, lockhash):
+    leaves = list(leaves)
+    leaves.remove(lockhash)
+    return compute_layers(leaves)
+
+
+def bench(number_of_locks, repeat):
+    leaves = [os.urandom(32) for _ in range(number_of_locks)]
+    layers = compute_layers(leaves)
+    tree = MerkleTreeState(layers)
+
+    new_lockhashes = [os.urandom(32) for _ in range(repeat)]
+    removed_lockhashes = leaves[:repeat]
+
+    added = [(leaves, lockhash) for lockhash in new_lockhashes]
+    added_incremental = [(layers, lockhash) for lockhash in new_lockhashes]
+    removed = [(leaves, lockhash) for lockhash in removed_lockhashes]
+    removed_incremental = [(layers, lockhash) for lockhash in removed_lockhashes]
+
+    def time_per_call(function, arguments):
+        return timeit.timeit(
+            lambda: [function(*args) for args in arguments],
+            number=1,
+        ) / len(arguments) * 1000
+
+    results = [
+        time_per_call(full_with, added),
+        time_per_call(compute_layers_with, added_incremental),
+        time_per_call(full_without, removed),
+        time_per_call(compute_layers_without, removed_incremental),
+    ]
+
+    # the first proof is computed, the next ones are cached
+    arguments = [(tree, lockhash) for lockhash in removed_lockhashes]
+    results.append(time_per_call(compute_merkleproof_for, arguments))
+    results.append(time_per_call(compute_merkleproof_for, arguments))
+
+    print('{:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f} {:>10.3f} {:>10.3f}'.format(
+        number_of_locks,
+        *results,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--locks', default=[10, 100, 1000], type=int, nargs='+')
+    parser.add_argument('--repeat', default=100, type=int)
+    args = parser.parse_args()
+
+    print('{:>8} {:>12} {:>12} {:>12} {:>12} {:>10} {:>10}'.format(
+        'locks',
+        'add ms',
+        'add incr ms',
+        'remove ms',
+        'remove incr',
+        'proof ms',
+        'cached ms',
+    ))
+    for number_of_locks in args.locks:
+        bench(number_of_locks, min(args.repeat, number_of_locks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+""" Time the acknowledgement of a message with many outstanding messages.
+
+The messages are spread over the queues of a number of partners, every
+`ReceiveProcessed` is dispatched through the StateManager with the copy on
+write of the ChainState, as done by the node.
+
+    python -m raiden.tests.benchmark.speed_message_queues --messages 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager, TransitionResult
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.events import SendProcessed
+from raiden.transfer.mediated_transfer.events import CHANNEL_IDENTIFIER_GLOBAL_QUEUE
+from raiden.transfer.state import ChainState, message_identifier_from_prng
+from raiden.transfer.state_change import Block, ReceiveProcessed
+
+
+def make_chain_state(number_of_messages, number_of_partners):
+    chain_state = ChainState(random.Random(), 1, factories.make_address(), factories.UNIT_CHAIN_ID)
+    partners = [factories.make_address() for _ in range(number_of_partners)]
+
+    events = [
+        SendProcessed(
+            random.choice(partners),
+            CHANNEL_IDENTIFIER_GLOBAL_QUEUE,
+            message_identifier_from_prng(chain_state.pseudo_random_generator),
+        )
+        for _ in range(number_of_messages)
+    ]
+    node.update_queues(TransitionResult(chain_state, events), Block(1))
+
+    return chain_state, events
+
+
+def bench(number_of_messages, number_of_partners, acknowledgements):
+    chain_state, events = make_chain_state(number_of_messages, number_of_partners)
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    acknowledged = random.sample(events, acknowledgements)
+
+    start = time.perf_counter()
+    for event in acknowledged:
+        state_manager.dispatch(ReceiveProcessed(event.message_identifier))
+    elapsed = time.perf_counter() - start
+
+    queues = state_manager.current_state.queueids_to_queues
+    remaining = sum(len(queue) for queue in queues.values())
+    assert remaining == number_of_messages - acknowledgements
+
+    print('{:>10} {:>10} {:>16.3f}'.format(
+        number_of_messages,
+        number_of_partners,
+        elapsed / acknowledgements * 1000,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', default=[1000, 10000, 50000], type=int, nargs='+')
+    parser.add_argument('--partners', default=100, type=int)
+    parser.add_argument('--acknowledgements', default=1000, type=int)
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>16}'.format('messages', 'partners', 'processed ms'))
+    for number_of_messages in args.messages:
+        bench(number_of_messages, args.partners, args.acknowledgements)
+
+
+if __name__ == '__main__':
+    main()
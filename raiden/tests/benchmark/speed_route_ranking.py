@@ -0,0 +1,188 @@
+""" Simulate mediated payments on a random token network and compare the
+scoring functions of the route ranking.
+
+Every node ranks its own channels with the capacities it knows and the
+reachability of its partners, the payment is forwarded to the first route
+and the next routes are tried if the payment is refunded, as done by the
+mediators. The capacities are updated by the successful payments.
+
+    python -m raiden.tests.benchmark.speed_route_ranking --nodes 10000 --payments 1000
+"""
+import argparse
+import random
+import time
+
+from raiden.routing import (
+    RouteCandidate,
+    rank_candidates,
+    score_by_distance,
+    score_by_distance_and_capacity,
+)
+from raiden.tests.utils import factories
+from raiden.transfer import routing_index
+from raiden.transfer.state import TokenNetworkGraphState
+
+SCORE_FUNCTIONS = {
+    'distance': score_by_distance,
+    'capacity': score_by_distance_and_capacity,
+}
+
+
+class Simulation:
+    def __init__(self, index, capacities, reachable, score_route, max_routes, max_hops):
+        self.index = index
+        self.capacities = dict(capacities)
+        self.reachable = reachable
+        self.score_route = score_route
+        self.max_routes = max_routes
+        self.max_hops = max_hops
+        self.rankings = 0
+        self.ranking_time = 0
+
+    def ranked_routes(self, node, previous, target, amount):
+        start = time.perf_counter()
+
+        candidates = [
+            RouteCandidate(partner, None, self.capacities[node, partner], None)
+            for partner in self.index.neighbors(node)
+            if partner != previous and
+            partner in self.reachable and
+            self.capacities[node, partner] >= amount
+        ]
+        ranked = rank_candidates(
+            self.index,
+            candidates,
+            target,
+            self.max_routes,
+            self.score_route,
+        )
+
+        self.ranking_time += time.perf_counter() - start
+        self.rankings += 1
+
+        return ranked
+
+    def forward(self, path, target, amount):
+        node = path[-1]
+        if node == target:
+            return True
+
+        if len(path) > self.max_hops:
+            return False
+
+        previous = path[-2] if len(path) > 1 else None
+        for candidate in self.ranked_routes(node, previous, target, amount):
+            partner = candidate.partner_address
+            if partner in path:
+                continue
+
+            path.append(partner)
+            if self.forward(path, target, amount):
+                return True
+            path.pop()
+
+        return False
+
+    def pay(self, initiator, target, amount):
+        path = [initiator]
+
+        if not self.forward(path, target, amount):
+            return False
+
+        for payer, payee in zip(path, path[1:]):
+            self.capacities[payer, payee] -= amount
+            self.capacities[payee, payer] += amount
+
+        return True
+
+
+def make_network(number_of_nodes, channels_per_node, max_capacity, reachable_ratio):
+    network_graph_state = TokenNetworkGraphState()
+    network = network_graph_state.network
+    addresses = [factories.make_address() for _ in range(number_of_nodes)]
+    capacities = dict()
+
+    for participant1 in addresses:
+        for participant2 in random.sample(addresses, channels_per_node):
+            if participant1 != participant2 and (participant1, participant2) not in capacities:
+                routing_index.add_edge(network, participant1, participant2)
+                capacities[participant1, participant2] = random.randint(0, max_capacity)
+                capacities[participant2, participant1] = random.randint(0, max_capacity)
+
+    reachable = set(random.sample(addresses, int(number_of_nodes * reachable_ratio)))
+
+    return network_graph_state, addresses, capacities, reachable
+
+
+def bench(args):
+    network_graph_state, addresses, capacities, reachable = make_network(
+        args.nodes,
+        args.channels_per_node,
+        args.max_capacity,
+        args.reachable,
+    )
+    online = list(reachable)
+    payments = [
+        (*random.sample(online, 2), random.randint(1, args.max_amount))
+        for _ in range(args.payments)
+    ]
+
+    print('{} nodes, {} channels, {} payments'.format(
+        args.nodes,
+        len(capacities) // 2,
+        args.payments,
+    ))
+    print('{:>10} {:>8} {:>12} {:>12} {:>10}'.format(
+        'score',
+        'routes',
+        'ranking ms',
+        'payment ms',
+        'success %',
+    ))
+
+    for name in args.score:
+        # the index and its searches are not shared by the simulations
+        index = routing_index.RoutingIndex(network_graph_state.network)
+        simulation = Simulation(
+            index,
+            capacities,
+            reachable,
+            SCORE_FUNCTIONS[name],
+            args.routes or None,
+            args.max_hops,
+        )
+
+        start = time.perf_counter()
+        successes = sum(
+            simulation.pay(initiator, target, amount)
+            for initiator, target, amount in payments
+        )
+        elapsed = time.perf_counter() - start
+
+        print('{:>10} {:>8} {:>12.3f} {:>12.3f} {:>10.1f}'.format(
+            name,
+            args.routes or 'all',
+            simulation.ranking_time / simulation.rankings * 1000,
+            elapsed / args.payments * 1000,
+            successes / args.payments * 100,
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', default=10000, type=int)
+    parser.add_argument('--channels-per-node', default=2, type=int)
+    parser.add_argument('--max-capacity', default=100, type=int)
+    parser.add_argument('--max-amount', default=50, type=int)
+    parser.add_argument('--reachable', default=0.9, type=float)
+    parser.add_argument('--payments', default=1000, type=int)
+    parser.add_argument('--routes', default=3, type=int, help='0 to use all the routes')
+    parser.add_argument('--max-hops', default=10, type=int)
+    parser.add_argument('--score', default=sorted(SCORE_FUNCTIONS), nargs='+')
+    args = parser.parse_args()
+
+    bench(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+""" Compare the ordering of the partners with a BFS per neighbor in the networkx
+graph and with the routing index, on random token networks.
+
+    python -m raiden.tests.benchmark.speed_routing --nodes 100 1000 10000
+"""
+import argparse
+import random
+import time
+from heapq import heappush
+
+import networkx
+
+from raiden.routing import get_ordered_partners
+from raiden.tests.utils import factories
+from raiden.transfer import routing_index
+from raiden.transfer.state import TokenNetworkGraphState
+
+
+def networkx_ordered_partners(network_graph, from_address, to_address):
+    paths = list()
+
+    for neighbor in networkx.all_neighbors(network_graph, from_address):
+        try:
+            length = networkx.shortest_path_length(network_graph, neighbor, to_address)
+            heappush(paths, (length, neighbor))
+        except (networkx.NetworkXNoPath, networkx.NodeNotFound):
+            pass
+
+    return paths
+
+
+def make_network_graph(number_of_nodes, channels_per_node, our_channels):
+    network_graph_state = TokenNetworkGraphState()
+    addresses = [factories.make_address() for _ in range(number_of_nodes)]
+    our_address = addresses[0]
+
+    for participant1 in addresses:
+        for participant2 in random.sample(addresses, channels_per_node):
+            if participant1 != participant2:
+                routing_index.add_edge(network_graph_state.network, participant1, participant2)
+
+    for partner in random.sample(addresses[1:], our_channels):
+        routing_index.add_edge(network_graph_state.network, our_address, partner)
+
+    return network_graph_state, our_address, addresses
+
+
+def time_per_call(function, arguments):
+    start = time.perf_counter()
+    results = [function(*args) for args in arguments]
+    elapsed = time.perf_counter() - start
+    return results, elapsed / len(arguments) * 1000
+
+
+def bench(number_of_nodes, channels_per_node, our_channels, payments, targets):
+    network_graph_state, our_address, addresses = make_network_graph(
+        number_of_nodes,
+        channels_per_node,
+        our_channels,
+    )
+    network = network_graph_state.network
+
+    # a few targets receive most of the payments
+    payment_targets = random.sample(addresses[1:], targets)
+    arguments = [
+        (network, our_address, random.choice(payment_targets))
+        for _ in range(payments)
+    ]
+
+    expected, networkx_ms = time_per_call(networkx_ordered_partners, arguments)
+    results, index_ms = time_per_call(get_ordered_partners, arguments)
+    assert [sorted(paths) for paths in results] == [sorted(paths) for paths in expected]
+
+    # the searches are kept until the topology changes
+    _, cached_ms = time_per_call(get_ordered_partners, arguments)
+
+    print('{:>8} {:>10} {:>14.3f} {:>12.3f} {:>12.3f}'.format(
+        number_of_nodes,
+        len(network.edges()),
+        networkx_ms,
+        index_ms,
+        cached_ms,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', default=[100, 1000, 10000], type=int, nargs='+')
+    parser.add_argument('--channels-per-node', default=3, type=int)
+    parser.add_argument('--our-channels', default=10, type=int)
+    parser.add_argument('--payments', default=100, type=int)
+    parser.add_argument('--targets', default=10, type=int)
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>14} {:>12} {:>12}'.format(
+        'nodes',
+        'edges',
+        'networkx ms',
+        'index ms',
+        'cached ms',
+    ))
+    for number_of_nodes in args.nodes:
+        bench(
+            number_of_nodes,
+            args.channels_per_node,
+            args.our_channels,
+            args.payments,
+            args.targets,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+""" Compare the round-trips and latency of the calls made to the ethereum node
+to open many channels concurrently, one HTTP request per call and with the
+BatchingHTTPProvider.
+
+The node is a JSON-RPC server on the loopback which answers every call with a
+32 bytes word, `--rpc-latency` is added to every HTTP request to emulate a
+remote node. A channel opening makes the calls of
+`TokenNetwork.new_netting_channel`, each one preceded by the connectivity
+check of the JSONRPCClient, the transaction itself is not included:
+
+- sequential: the settlement timeouts, then the channel identifier and info
+  twice, to check the channel state and to get its identifier.
+- batching: the settlement timeouts concurrently, then the channel identifier
+  and info once.
+
+    python -m raiden.tests.benchmark.speed_rpc_batching --channels 50 --rpc-latency 0.005
+"""
+from gevent import monkey  # isort:skip # noqa
+monkey.patch_all()  # isort:skip # noqa
+
+import argparse
+import json
+import socket
+import statistics
+import time
+
+import gevent
+import requests
+from gevent.pywsgi import WSGIServer
+
+from raiden.network.rpc.batching import BatchingHTTPProvider
+
+WORD = '0x' + '00' * 31 + '01'
+
+
+class StubNode:
+    def __init__(self, rpc_latency):
+        self.rpc_latency = rpc_latency
+        self.http_requests = 0
+        self.rpc_requests = 0
+
+    def __call__(self, environ, start_response):
+        body = json.loads(environ['wsgi.input'].read())
+        self.http_requests += 1
+
+        if isinstance(body, list):
+            self.rpc_requests += len(body)
+            response = [self.answer(request) for request in body]
+        else:
+            self.rpc_requests += 1
+            response = self.answer(body)
+
+        gevent.sleep(self.rpc_latency)
+        data = json.dumps(response).encode()
+        start_response('200 OK', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(data))),
+        ])
+        return [data]
+
+    @staticmethod
+    def answer(request):
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': WORD}
+
+
+class NoDelayWSGIServer(WSGIServer):
+    """ Sends the responses without waiting for the ACK of the previous
+    segment, as the ethereum clients do.
+    """
+
+    def handle(self, sock, address):  # pylint: disable=arguments-differ
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return super().handle(sock, address)
+
+
+class SequentialProvider:
+    """ One HTTP request per call, as the web3 HTTPProvider. """
+
+    def __init__(self, endpoint_uri):
+        self.endpoint_uri = endpoint_uri
+        self.session = requests.Session()
+        self.request_id = 0
+
+    def make_request(self, method, params):
+        self.request_id += 1
+        response = self.session.post(self.endpoint_uri, json={
+            'jsonrpc': '2.0',
+            'id': self.request_id,
+            'method': method,
+            'params': params,
+        })
+        return response.json()
+
+
+def eth_call(provider, contract, data):
+    provider.make_request('web3_clientVersion', [])
+    return provider.make_request('eth_call', [{'to': contract, 'data': data}, 'latest'])
+
+
+def concurrently(*functions):
+    greenlets = [gevent.spawn(function) for function in functions]
+    gevent.joinall(greenlets, raise_error=True)
+
+
+def open_channel_sequential(provider, token_network, partner):
+    eth_call(provider, token_network, '0x01')
+    eth_call(provider, token_network, '0x02')
+    for _ in range(2):
+        eth_call(provider, token_network, '0x03' + partner)
+        eth_call(provider, token_network, '0x04' + partner)
+
+
+def open_channel_batching(provider, token_network, partner):
+    concurrently(
+        lambda: eth_call(provider, token_network, '0x01'),
+        lambda: eth_call(provider, token_network, '0x02'),
+    )
+    eth_call(provider, token_network, '0x03' + partner)
+    eth_call(provider, token_network, '0x04' + partner)
+
+
+def measure(open_channel, provider, number_of_channels):
+    token_network = '0x' + '11' * 20
+    latencies = list()
+
+    def timed_open(partner):
+        start = time.perf_counter()
+        open_channel(provider, token_network, partner)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    concurrently(*[
+        lambda partner='{:040x}'.format(channel): timed_open(partner)
+        for channel in range(number_of_channels)
+    ])
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=50, type=int)
+    parser.add_argument('--rpc-latency', default=0.0, type=float)
+    parser.add_argument('--max-batch-size', default=100, type=int)
+    args = parser.parse_args()
+
+    print('{:<12} {:>8} {:>8} {:>10} {:>12} {:>12}'.format(
+        'provider',
+        'http',
+        'rpc',
+        'total ms',
+        'median ms',
+        'max ms',
+    ))
+
+    for name, make_provider, open_channel in (
+            ('sequential', SequentialProvider, open_channel_sequential),
+            (
+                'batching',
+                lambda uri: BatchingHTTPProvider(uri, max_batch_size=args.max_batch_size),
+                open_channel_batching,
+            ),
+    ):
+        node = StubNode(args.rpc_latency)
+        server = NoDelayWSGIServer(('127.0.0.1', 0), node, log=None)
+        server.start()
+        provider = make_provider('http://127.0.0.1:{}'.format(server.server_port))
+
+        total, latencies = measure(open_channel, provider, args.channels)
+        print('{:<12} {:>8} {:>8} {:>10.1f} {:>12.1f} {:>12.1f}'.format(
+            name,
+            node.http_requests,
+            node.rpc_requests,
+            total * 1000,
+            statistics.median(latencies) * 1000,
+            max(latencies) * 1000,
+        ))
+
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+""" Compare the MsgpackSerializer with the PickleSerializer.
+
+Measures the size of the serialized ChainState snapshots and the time to
+serialize and deserialize them, for a node with a growing number of channels
+and pending payments.
+
+    python -m raiden.tests.benchmark.speed_serialize --channels 10 100 500
+"""
+import argparse
+import random
+import timeit
+
+from raiden.storage.serialize import MsgpackSerializer, PickleSerializer
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import (
+    ChainState,
+    PaymentNetworkState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveRouteNew,
+)
+from raiden.utils import random_secret
+
+SERIALIZERS = {
+    'pickle': PickleSerializer,
+    'msgpack': MsgpackSerializer,
+}
+
+
+def make_chain_state(number_of_channels):
+    our_address = factories.make_address()
+    payment_network_identifier = factories.make_payment_network_identifier()
+    token_network = TokenNetworkState(factories.make_address(), factories.make_address())
+    payment_network = PaymentNetworkState(payment_network_identifier, [token_network])
+
+    chain_state = ChainState(random.Random(), 1, our_address, factories.UNIT_CHAIN_ID)
+    chain_state.identifiers_to_paymentnetworks[payment_network_identifier] = payment_network
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    for block_number in range(2, number_of_channels + 2):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network.token_address,
+            payment_network_identifier=payment_network_identifier,
+            token_network_identifier=token_network.address,
+        )
+        state_changes = [
+            ContractReceiveChannelNew(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state,
+            ),
+            ContractReceiveRouteNew(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state.identifier,
+                our_address,
+                channel_state.partner_state.address,
+            ),
+            ContractReceiveChannelNewBalance(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state.identifier,
+                TransactionChannelNewBalance(our_address, 200, block_number),
+            ),
+            ActionTransferDirect(
+                token_network.address,
+                channel_state.partner_state.address,
+                block_number,
+                1,
+            ),
+            ActionInitInitiator(
+                factories.make_transfer_description(
+                    payment_network_identifier=payment_network_identifier,
+                    token_network=token_network.address,
+                    initiator=our_address,
+                    target=channel_state.partner_state.address,
+                    secret=random_secret(),
+                ),
+                [factories.route_from_channel(channel_state)],
+            ),
+            Block(block_number),
+        ]
+        for state_change in state_changes:
+            state_manager.dispatch(state_change)
+
+    return state_manager.current_state
+
+
+def bench(number_of_channels, repeat):
+    chain_state = make_chain_state(number_of_channels)
+
+    for name, serializer in SERIALIZERS.items():
+        data = serializer.serialize(chain_state)
+        assert serializer.deserialize(data) == chain_state
+
+        serialize_time = min(timeit.repeat(
+            lambda: serializer.serialize(chain_state),  # pylint: disable=cell-var-from-loop
+            number=1,
+            repeat=repeat,
+        ))
+        deserialize_time = min(timeit.repeat(
+            lambda: serializer.deserialize(data),  # pylint: disable=cell-var-from-loop
+            number=1,
+            repeat=repeat,
+        ))
+
+        print('{:>8} {:<8} {:>12} {:>14.3f} {:>16.3f}'.format(
+            number_of_channels,
+            name,
+            len(data),
+            serialize_time * 1000,
+            deserialize_time * 1000,
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=[10, 100, 500], type=int, nargs='+')
+    parser.add_argument('--repeat', default=5, type=int)
+    args = parser.parse_args()
+
+    print('{:>8} {:<8} {:>12} {:>14} {:>16}'.format(
+        'channels',
+        'format',
+        'bytes',
+        'serialize ms',
+        'deserialize ms',
+    ))
+    for number_of_channels in args.channels:
+        bench(number_of_channels, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
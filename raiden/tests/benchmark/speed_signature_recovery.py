@@ -0,0 +1,108 @@
+""" Compare the recovery of the senders of a burst of received messages one by
+one on the event loop, with the recovery cache and with the batch recovery on
+the worker threads.
+
+Every burst is made of new messages, the cached run decodes the same burst
+again, as done for retransmitted messages.
+
+    python -m raiden.tests.benchmark.speed_signature_recovery --messages 100 1000 --threads 1 4
+"""
+import argparse
+import time
+
+from gevent.threadpool import ThreadPool
+
+from raiden.encoding import signing
+from raiden.messages import Ping, decode, recover_senders
+from raiden.tests.utils.factories import make_privkey_address
+
+
+def make_messagedatas(number_of_messages, number_of_senders):
+    privkeys = [make_privkey_address()[0] for _ in range(number_of_senders)]
+    messagedatas = list()
+
+    for nonce in range(number_of_messages):
+        ping = Ping(nonce=nonce)
+        ping.sign(privkeys[nonce % number_of_senders])
+        messagedatas.append(ping.encode())
+
+    return messagedatas
+
+
+def uncached_senders(messagedatas):
+    senders = list()
+
+    for messagedata in messagedatas:
+        message = decode(messagedata)
+        senders.append(signing._recover_address(message._data_to_sign(), message.signature))
+
+    return senders
+
+
+def serial_senders(messagedatas):
+    return [decode(messagedata).sender for messagedata in messagedatas]
+
+
+def batch_senders(messagedatas, pool):
+    messages = [decode(messagedata) for messagedata in messagedatas]
+    recover_senders(messages, pool=pool)
+    return [message.sender for message in messages]
+
+
+def time_per_message(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    return result, elapsed / len(args[0]) * 1000 * 1000
+
+
+def bench(number_of_messages, number_of_senders, number_of_threads):
+    messagedatas = make_messagedatas(number_of_messages, number_of_senders)
+    pool = ThreadPool(number_of_threads)
+
+    expected, uncached_us = time_per_message(uncached_senders, messagedatas)
+
+    signing.recovery_cache.clear()
+    senders, serial_us = time_per_message(serial_senders, messagedatas)
+    assert senders == expected
+
+    _, cached_us = time_per_message(serial_senders, messagedatas)
+
+    signing.recovery_cache.clear()
+    senders, batch_us = time_per_message(batch_senders, messagedatas, pool)
+    assert senders == expected
+
+    pool.kill()
+
+    print('{:>10} {:>8} {:>12.1f} {:>12.1f} {:>12.1f} {:>12.1f}'.format(
+        number_of_messages,
+        number_of_threads,
+        uncached_us,
+        serial_us,
+        cached_us,
+        batch_us,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', default=[100, 1000], type=int, nargs='+')
+    parser.add_argument('--senders', default=10, type=int)
+    parser.add_argument('--threads', default=[1, 4], type=int, nargs='+')
+    args = parser.parse_args()
+
+    print('{:>10} {:>8} {:>12} {:>12} {:>12} {:>12}'.format(
+        'messages',
+        'threads',
+        'uncached us',
+        'serial us',
+        'cached us',
+        'batch us',
+    ))
+    for number_of_messages in args.messages:
+        for number_of_threads in args.threads:
+            bench(number_of_messages, args.senders, number_of_threads)
+
+
+if __name__ == '__main__':
+    main()
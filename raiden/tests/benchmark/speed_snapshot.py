@@ -0,0 +1,203 @@
+""" Measure the dispatch stall caused by a snapshot.
+
+A greenlet ticks every millisecond while a ChainState snapshot is saved, the
+longest interval between two ticks is the time the hub could not run the
+other greenlets, e.g. to dispatch a state change or answer a message.
+
+- foreground: the snapshot is serialized and written by the caller.
+- thread: the snapshot is serialized in the hub's threadpool, the
+  serialization holds the GIL so the hub is stalled anyway.
+- child process: the snapshot is serialized in a forked child, only the fork
+  and the write stall the hub.
+
+    python -m raiden.tests.benchmark.speed_snapshot --channels 100 1000
+"""
+import argparse
+import random
+import time
+
+import gevent
+
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.storage.wal import WriteAheadLog
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import (
+    ChainState,
+    PaymentNetworkState,
+    TokenNetworkState,
+    TransactionChannelNewBalance,
+)
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveRouteNew,
+)
+from raiden.utils import random_secret
+
+TICK_INTERVAL = 0.001
+
+
+def make_state_manager(number_of_channels):
+    our_address = factories.make_address()
+    payment_network_identifier = factories.make_payment_network_identifier()
+    token_network = TokenNetworkState(factories.make_address(), factories.make_address())
+    payment_network = PaymentNetworkState(payment_network_identifier, [token_network])
+
+    chain_state = ChainState(random.Random(), 1, our_address, factories.UNIT_CHAIN_ID)
+    chain_state.identifiers_to_paymentnetworks[payment_network_identifier] = payment_network
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    for block_number in range(2, number_of_channels + 2):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network.token_address,
+            payment_network_identifier=payment_network_identifier,
+            token_network_identifier=token_network.address,
+        )
+        state_changes = [
+            ContractReceiveChannelNew(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state,
+            ),
+            ContractReceiveRouteNew(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state.identifier,
+                our_address,
+                channel_state.partner_state.address,
+            ),
+            ContractReceiveChannelNewBalance(
+                factories.make_transaction_hash(),
+                token_network.address,
+                channel_state.identifier,
+                TransactionChannelNewBalance(our_address, 200, block_number),
+            ),
+            ActionTransferDirect(
+                token_network.address,
+                channel_state.partner_state.address,
+                block_number,
+                1,
+            ),
+            ActionInitInitiator(
+                factories.make_transfer_description(
+                    payment_network_identifier=payment_network_identifier,
+                    token_network=token_network.address,
+                    initiator=our_address,
+                    target=channel_state.partner_state.address,
+                    secret=random_secret(),
+                ),
+                [factories.route_from_channel(channel_state)],
+            ),
+            Block(block_number),
+        ]
+        for state_change in state_changes:
+            state_manager.dispatch(state_change)
+
+    return state_manager
+
+
+def max_stall(function):
+    """ Call `function` and return the longest interval between the ticks of
+    a concurrent greenlet, and the duration of the call.
+    """
+    intervals = list()
+
+    def ticker():
+        last = time.monotonic()
+        while True:
+            gevent.sleep(TICK_INTERVAL)
+            now = time.monotonic()
+            intervals.append(now - last)
+            last = now
+
+    ticker_greenlet = gevent.spawn(ticker)
+    gevent.sleep(TICK_INTERVAL * 10)
+
+    start = time.monotonic()
+    function()
+    duration = time.monotonic() - start
+
+    gevent.sleep(TICK_INTERVAL * 10)
+    ticker_greenlet.kill()
+
+    return max(intervals), duration
+
+
+def snapshot_foreground(state_manager, storage):
+    wal = WriteAheadLog(state_manager, storage)
+    wal.state_change_id = storage.write_state_change(Block(0))
+    wal.snapshot()
+
+
+def snapshot_thread(state_manager, storage):
+    state_change_id = storage.write_state_change(Block(0))
+    threadpool = gevent.get_hub().threadpool
+    serialized_data = threadpool.apply(
+        storage.serializer.serialize,
+        (state_manager.current_state,),
+    )
+    storage.write_serialized_state_snapshot(state_change_id, serialized_data)
+
+
+def snapshot_child_process(state_manager, storage):
+    wal = WriteAheadLog(state_manager, storage, background_snapshots=True)
+    wal.state_change_id = storage.write_state_change(Block(0))
+    wal.snapshot()
+    wal.wait_for_snapshot()
+
+
+MODES = {
+    'foreground': snapshot_foreground,
+    'thread': snapshot_thread,
+    'child process': snapshot_child_process,
+}
+
+
+def bench(number_of_channels, repeat):
+    state_manager = make_state_manager(number_of_channels)
+
+    for name, snapshot in MODES.items():
+        stalls = list()
+        durations = list()
+        for _ in range(repeat):
+            storage = SQLiteStorage(':memory:', PickleSerializer)
+            stall, duration = max_stall(lambda: snapshot(state_manager, storage))
+            stalls.append(stall)
+            durations.append(duration)
+
+        print('{:>8} {:<14} {:>14.1f} {:>13.1f}'.format(
+            number_of_channels,
+            name,
+            min(stalls) * 1000,
+            min(durations) * 1000,
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=[100, 1000], type=int, nargs='+')
+    parser.add_argument('--repeat', default=5, type=int)
+    args = parser.parse_args()
+
+    print('{:>8} {:<14} {:>14} {:>13}'.format(
+        'channels',
+        'mode',
+        'max stall ms',
+        'duration ms',
+    ))
+    for number_of_channels in args.channels:
+        bench(number_of_channels, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+""" Compare the SQLiteStorage configurations.
+
+Measures the state change insert throughput of the writer, and the latency of
+the event queries used by the REST API, while readers query the database
+concurrently.
+
+    python -m raiden.tests.benchmark.speed_sqlite --state-changes 5000 --readers 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.transfer.events import EventPaymentSentFailed
+from raiden.transfer.state_change import Block
+
+CONFIGURATIONS = {
+    'rollback-journal': dict(
+        journal_mode='DELETE',
+        synchronous='FULL',
+        cache_size=-2000,
+        mmap_size=0,
+        read_connections=1,
+    ),
+    'wal': dict(),  # the defaults
+    'wal-normal': dict(synchronous='NORMAL'),
+}
+
+
+def run_readers(storage, number_of_readers, stop_event):
+    latencies = list()
+
+    def reader():
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            storage.get_events_by_block(0, 'latest')
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=reader) for _ in range(number_of_readers)]
+    for thread in threads:
+        thread.start()
+
+    return threads, latencies
+
+
+def bench(name, config, number_of_state_changes, number_of_readers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        storage = SQLiteStorage(os.path.join(tmpdir, 'log.db'), PickleSerializer, **config)
+        event = EventPaymentSentFailed(2, 3, 1, 'address', 'whatever')
+
+        stop_event = threading.Event()
+        threads, latencies = run_readers(storage, number_of_readers, stop_event)
+
+        start = time.perf_counter()
+        for block_number in range(number_of_state_changes):
+            state_change_id = storage.write_state_change(Block(block_number))
+            storage.write_events(state_change_id, block_number, [event])
+        elapsed = time.perf_counter() - start
+
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+        print('{:<18} {:>10.1f} {:>10} {:>12.3f} {:>12.3f}'.format(
+            name,
+            number_of_state_changes / elapsed,
+            len(latencies),
+            statistics.median(latencies) * 1000 if latencies else 0,
+            max(latencies) * 1000 if latencies else 0,
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--state-changes', default=2000, type=int)
+    parser.add_argument('--readers', default=4, type=int)
+    args = parser.parse_args()
+
+    print('{:<18} {:>10} {:>10} {:>12} {:>12}'.format(
+        'configuration',
+        'writes/s',
+        'queries',
+        'median ms',
+        'max ms',
+    ))
+    for name, config in CONFIGURATIONS.items():
+        bench(name, config, args.state_changes, args.readers)
+
+
+if __name__ == '__main__':
+    main()
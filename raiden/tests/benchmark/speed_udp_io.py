@@ -0,0 +1,129 @@
+""" Compare the gevent DatagramServer with the BatchDatagramServer used by the
+UDP transport, sending packets between two servers over the loopback.
+
+The packets are sent in bursts, as the messages of the queues and the
+Delivered messages, and are counted by the handler of the receiving server,
+`--decode` also decodes them. The sender waits when `--in-flight` packets are
+not received yet, as done by the send window, the packets dropped by the
+kernel are reported.
+
+    python -m raiden.tests.benchmark.speed_udp_io --packets 100000 --burst 64
+"""
+import argparse
+import time
+
+import gevent
+from gevent.event import Event
+from gevent.server import DatagramServer
+
+from raiden.messages import Delivered, decode
+from raiden.network.transport.udp.datagram_server import BatchDatagramServer
+from raiden.tests.utils.factories import make_privkey_address
+
+
+class Counter:
+    def __init__(self, packets, decode_packets):
+        self.packets = packets
+        self.decode_packets = decode_packets
+        self.received = 0
+        self.dropped = 0
+        self.progress = Event()
+
+    def add(self, messagedatas):
+        if self.decode_packets:
+            for messagedata in messagedatas:
+                decode(messagedata)
+
+        self.received += len(messagedatas)
+        self.progress.set()
+
+    def handle(self, data, address):  # pylint: disable=unused-argument
+        self.add([data])
+
+    def handle_batch(self, datagrams):
+        self.add([data for data, _ in datagrams])
+
+
+def make_server(name, handle, max_batch):
+    if name == 'batch':
+        server = BatchDatagramServer(('127.0.0.1', 0), handle=handle, max_batch=max_batch)
+    else:
+        server = DatagramServer(('127.0.0.1', 0), handle=handle)
+
+    server.start()
+    return server
+
+
+def bench(name, args, messagedata):
+    counter = Counter(args.packets, args.decode)
+    handle = counter.handle_batch if name == 'batch' else counter.handle
+
+    sender = make_server(name, handle, args.max_batch)
+    receiver = make_server(name, handle, args.max_batch)
+    address = receiver.address
+
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+
+    for sent in range(1, args.packets + 1):
+        sender.sendto(messagedata, address)
+
+        if sent % args.burst == 0:
+            gevent.sleep(0)
+
+            while sent - counter.received > args.in_flight:
+                counter.progress.clear()
+                if not counter.progress.wait(timeout=args.timeout):
+                    # the packets in flight were dropped
+                    counter.received = sent
+                    counter.dropped += args.in_flight
+
+    while counter.received < args.packets:
+        counter.progress.clear()
+        if not counter.progress.wait(timeout=args.timeout):
+            break
+
+    elapsed = time.perf_counter() - start
+    elapsed_cpu = time.process_time() - start_cpu
+
+    print('{:>8} {:>8} {:>12.0f} {:>12.2f} {:>10}'.format(
+        name,
+        args.burst,
+        args.packets / elapsed,
+        elapsed_cpu / args.packets * 1000 * 1000,
+        counter.dropped + args.packets - min(counter.received, args.packets),
+    ))
+
+    sender.stop()
+    receiver.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packets', default=100000, type=int)
+    parser.add_argument('--burst', default=64, type=int)
+    parser.add_argument('--max-batch', default=64, type=int)
+    parser.add_argument('--in-flight', default=128, type=int)
+    parser.add_argument('--decode', action='store_true')
+    parser.add_argument('--timeout', default=1, type=float)
+    parser.add_argument('--servers', default=['gevent', 'batch'], nargs='+')
+    args = parser.parse_args()
+
+    privkey, _ = make_privkey_address()
+    delivered = Delivered(1)
+    delivered.sign(privkey)
+    messagedata = delivered.encode()
+
+    print('{:>8} {:>8} {:>12} {:>12} {:>10}'.format(
+        'server',
+        'burst',
+        'packets/s',
+        'cpu us/pkt',
+        'dropped',
+    ))
+    for name in args.servers:
+        bench(name, args, messagedata)
+
+
+if __name__ == '__main__':
+    main()
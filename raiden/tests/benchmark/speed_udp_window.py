@@ -0,0 +1,158 @@
+""" Send messages between two UDP transports over the loopback and compare the
+send windows and the coalescing of the Delivered messages.
+
+The transports run in the same process with a minimal node, the messages are
+signed Processed messages which are acknowledged by the partner. `--loss`
+drops a fraction of the packets sent by both transports to exercise the
+retries.
+
+    python -m raiden.tests.benchmark.speed_udp_window --messages 2000 --windows 1 8 32
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+import gevent
+from gevent import server
+
+from raiden.log_config import configure_logging
+from raiden.messages import Processed
+from raiden.network.discovery import Discovery
+from raiden.network.throttle import DummyPolicy
+from raiden.network.transport.udp.udp_transport import UDPTransport
+from raiden.tests.utils.factories import UNIT_CHAIN_ID, make_privkey_address
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.mediated_transfer.events import CHANNEL_IDENTIFIER_GLOBAL_QUEUE
+from raiden.transfer.state import ChainState
+from raiden.utils.typing import QueueIdentifier
+
+
+class Node:
+    """ The parts of the RaidenService used by the transport, the state
+    changes are ignored.
+    """
+
+    def __init__(self, transport):
+        self.privkey, self.address = make_privkey_address()
+        self.transport = transport
+
+        chain_state = ChainState(random.Random(), 1, self.address, UNIT_CHAIN_ID)
+        self.wal = SimpleNamespace(
+            state_manager=StateManager(node.state_transition, chain_state),
+        )
+
+    def sign(self, message):
+        message.sign(self.privkey)
+
+    def handle_state_change(self, state_change):
+        pass
+
+
+class LossyTransport(UDPTransport):
+    loss = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.packets = 0
+
+    def maybe_sendraw(self, host_port, messagedata):
+        self.packets += 1
+
+        if random.random() >= self.loss:
+            super().maybe_sendraw(host_port, messagedata)
+
+
+def make_node(discovery, config):
+    udpsocket = server._udp_socket(('127.0.0.1', 0))  # pylint: disable=protected-access
+    transport = LossyTransport(discovery, udpsocket, DummyPolicy(), config)
+    raiden = Node(transport)
+
+    host, port = udpsocket.getsockname()
+    discovery.register(raiden.address, host, port)
+    transport.start(raiden, dict())
+
+    return raiden
+
+
+def bench(args, send_window, delivered_batch_latency):
+    config = {
+        'retry_interval': args.retry_interval,
+        'retries_before_backoff': 5,
+        'nat_keepalive_retries': 5,
+        'nat_keepalive_timeout': 5,
+        'nat_invitation_timeout': 15,
+        'send_window': send_window,
+        'delivered_batch_latency': delivered_batch_latency,
+    }
+    LossyTransport.loss = args.loss
+
+    discovery = Discovery()
+    sender = make_node(discovery, config)
+    receiver = make_node(discovery, config)
+
+    queue_identifier = QueueIdentifier(receiver.address, CHANNEL_IDENTIFIER_GLOBAL_QUEUE)
+    messages = list()
+    for message_identifier in range(args.messages):
+        message = Processed(message_identifier)
+        sender.sign(message)
+        messages.append(message)
+
+    # wait for the healthcheck
+    sender.transport.get_health_events(receiver.address).event_healthy.wait()
+    sender.transport.packets = receiver.transport.packets = 0
+
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+
+    results = list()
+    for message in messages:
+        sender.transport.send_async(queue_identifier, message)
+        results.append(sender.transport.messageids_to_asyncresults[message.message_identifier])
+    gevent.wait(results)
+
+    elapsed = time.perf_counter() - start
+    elapsed_cpu = time.process_time() - start_cpu
+
+    print('{:>8} {:>10} {:>6} {:>12.0f} {:>12.3f} {:>10} {:>10}'.format(
+        send_window,
+        delivered_batch_latency,
+        args.loss,
+        args.messages / elapsed,
+        elapsed_cpu / args.messages * 1000,
+        sender.transport.packets,
+        receiver.transport.packets,
+    ))
+
+    sender.transport.stop_and_wait()
+    receiver.transport.stop_and_wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', default=2000, type=int)
+    parser.add_argument('--windows', default=[1, 8, 32], type=int, nargs='+')
+    parser.add_argument('--latencies', default=[0, 0.001], type=float, nargs='+')
+    parser.add_argument('--loss', default=0, type=float)
+    parser.add_argument('--retry-interval', default=0.1, type=float)
+    args = parser.parse_args()
+
+    configure_logging({'': 'ERROR'}, disable_debug_logfile=True)
+
+    print('{:>8} {:>10} {:>6} {:>12} {:>12} {:>10} {:>10}'.format(
+        'window',
+        'latency',
+        'loss',
+        'messages/s',
+        'cpu ms/msg',
+        'sent',
+        'acks',
+    ))
+    for send_window in args.windows:
+        for delivered_batch_latency in args.latencies:
+            bench(args, send_window, delivered_batch_latency)
+
+
+if __name__ == '__main__':
+    main()
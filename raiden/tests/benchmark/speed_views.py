@@ -0,0 +1,156 @@
+""" Compare the views of the REST API using the indexes of the ChainState
+with the scan of the payment networks and channels.
+
+The channels are spread over a number of token networks, a tenth of them is
+closed.
+
+    python -m raiden.tests.benchmark.speed_views --channels 1000 5000 --token-networks 10
+"""
+import argparse
+import random
+import timeit
+
+from raiden.tests.utils import factories
+from raiden.transfer import channel, node, views
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.state import (
+    CHANNEL_STATE_OPENED,
+    ChainState,
+    PaymentNetworkState,
+    TokenNetworkState,
+)
+from raiden.transfer.state_change import (
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveNewPaymentNetwork,
+)
+
+
+def scan_token_network_by_identifier(chain_state, token_network_id):
+    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
+        token_network_state = payment_network_state.tokenidentifiers_to_tokennetworks.get(
+            token_network_id,
+        )
+        if token_network_state:
+            return token_network_state
+
+
+def scan_channelstate_open(chain_state, payment_network_id, token_address):
+    channel_states = views.get_channelstate_filter(
+        chain_state,
+        payment_network_id,
+        token_address,
+        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_OPENED,
+    )
+    return sorted(channel_states, key=lambda channel_state: channel_state.identifier)
+
+
+def scan_neighbour_nodes(chain_state):
+    addresses = set()
+
+    for payment_network in chain_state.identifiers_to_paymentnetworks.values():
+        for token_network in payment_network.tokenidentifiers_to_tokennetworks.values():
+            for channel_state in token_network.channelidentifiers_to_channels.values():
+                addresses.add(channel_state.partner_state.address)
+
+    return addresses
+
+
+def make_chain_state(number_of_channels, number_of_token_networks):
+    our_address = factories.make_address()
+    payment_network_identifier = factories.make_payment_network_identifier()
+    token_networks = [
+        TokenNetworkState(factories.make_address(), factories.make_address())
+        for _ in range(number_of_token_networks)
+    ]
+
+    chain_state = ChainState(random.Random(), 1, our_address, factories.UNIT_CHAIN_ID)
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+    state_manager.dispatch(ContractReceiveNewPaymentNetwork(
+        factories.make_transaction_hash(),
+        PaymentNetworkState(payment_network_identifier, token_networks),
+    ))
+
+    for channel_number in range(number_of_channels):
+        token_network = token_networks[channel_number % number_of_token_networks]
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            token_address=token_network.token_address,
+            payment_network_identifier=payment_network_identifier,
+            token_network_identifier=token_network.address,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network.address,
+            channel_state,
+        ))
+
+        if channel_number % 10 == 0:
+            state_manager.dispatch(ContractReceiveChannelClosed(
+                factories.make_transaction_hash(),
+                channel_state.partner_state.address,
+                token_network.address,
+                channel_state.identifier,
+                1,
+            ))
+
+    return state_manager.current_state, payment_network_identifier, token_networks
+
+
+def bench(number_of_channels, number_of_token_networks, number):
+    chain_state, payment_network_identifier, token_networks = make_chain_state(
+        number_of_channels,
+        number_of_token_networks,
+    )
+    token_network = token_networks[-1]
+
+    comparisons = [
+        (
+            'token network',
+            scan_token_network_by_identifier,
+            views.get_token_network_by_identifier,
+            (chain_state, token_network.address),
+        ),
+        (
+            'open channels',
+            scan_channelstate_open,
+            views.get_channelstate_open,
+            (chain_state, payment_network_identifier, token_network.token_address),
+        ),
+        (
+            'neighbours',
+            scan_neighbour_nodes,
+            views.all_neighbour_nodes,
+            (chain_state, ),
+        ),
+    ]
+
+    for name, scan, view, args in comparisons:
+        assert scan(*args) == view(*args)
+        scan_ms = timeit.timeit(lambda: scan(*args), number=number) / number * 1000
+        index_ms = timeit.timeit(lambda: view(*args), number=number) / number * 1000
+
+        print('{:>10} {:>14} {:>12.4f} {:>12.4f}'.format(
+            number_of_channels,
+            name,
+            scan_ms,
+            index_ms,
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--channels', default=[1000, 5000], type=int, nargs='+')
+    parser.add_argument('--token-networks', default=10, type=int)
+    parser.add_argument('--number', default=100, type=int)
+    args = parser.parse_args()
+
+    print('{:>10} {:>14} {:>12} {:>12}'.format('channels', 'view', 'scan ms', 'index ms'))
+    for number_of_channels in args.channels:
+        bench(number_of_channels, args.token_networks, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,10 @@ import random
 
 import pytest
 
+from raiden.encoding.messages import split_packet
 from raiden.messages import (
     decode,
+    Delivered,
     Processed,
     Ping,
 )
@@ -46,6 +48,21 @@ def test_hash():
     assert sha3(decoded_ping.encode()) == msghash
 
 
+def test_split_packet():
+    messages = [Delivered(identifier) for identifier in range(3)] + [Ping(nonce=0)]
+    for message in messages:
+        message.sign(PRIVKEY)
+
+    packet = b''.join(message.encode() for message in messages)
+    messages_data = split_packet(packet)
+    assert [decode(data) for data in messages_data] == messages
+    assert split_packet(messages[0].encode()) == [messages[0].encode()]
+
+    # the truncated messages and the unknown cmdids are kept to be rejected
+    assert split_packet(packet[:-1])[-1] == messages[-1].encode()[:-1]
+    assert split_packet(packet + b'\xff\x00')[-1] == b'\xff\x00'
+
+
 def test_processed():
     message_identifier = random.randint(0, UINT64_MAX)
     processed_message = Processed(message_identifier)
@@ -0,0 +1,92 @@
+import pytest
+
+from raiden.network.rpc.call_cache import CallCache
+
+
+class Contract:
+    """ Counts the calls made to the contract. """
+
+    def __init__(self):
+        self.value = 0
+        self.calls = 0
+
+    def call(self):
+        self.calls += 1
+        return self.value
+
+
+def test_call_cache_block_entries():
+    cache = CallCache()
+    contract = Contract()
+    key = (b'contract', 'getChannelInfo', (1,))
+
+    # nothing is cached before the first block
+    assert cache.call(key, contract.call) == 0
+    assert cache.call(key, contract.call) == 0
+    assert contract.calls == 2
+
+    cache.new_block(10, 1)
+    contract.value = 1
+    assert cache.call(key, contract.call) == 1
+    assert cache.call(key, contract.call) == 1
+    assert cache.call((b'contract', 'getChannelInfo', (2,)), contract.call) == 1
+    assert contract.calls == 4
+
+    # the same block doesn't invalidate the entries
+    contract.value = 2
+    cache.new_block(10, 1)
+    assert cache.call(key, contract.call) == 1
+
+    cache.new_block(11, 1)
+    assert cache.call(key, contract.call) == 2
+
+    # a mined transaction of the node invalidates the entries
+    contract.value = 3
+    cache.invalidate()
+    assert cache.call(key, contract.call) == 3
+
+    assert (cache.hits, cache.misses) == (2, 6)
+    assert cache.hit_rate == pytest.approx(2 / 8)
+
+
+def test_call_cache_permanent_entries():
+    cache = CallCache()
+    contract = Contract()
+    key = (b'contract', 'token')
+
+    assert cache.hit_rate == 0.0
+    assert cache.call(key, contract.call, permanent=True) == 0
+
+    contract.value = 1
+    cache.new_block(10, 1)
+    cache.invalidate()
+    assert cache.call(key, contract.call, permanent=True) == 0
+    assert contract.calls == 1
+
+
+def test_call_cache_errors_are_not_cached():
+    cache = CallCache()
+    cache.new_block(10, 1)
+    contract = Contract()
+
+    def failing_call():
+        raise ValueError('node unavailable')
+
+    with pytest.raises(ValueError):
+        cache.call('key', failing_call)
+
+    assert cache.call('key', contract.call) == 0
+    assert contract.calls == 1
+
+
+def test_call_cache_invalidated_while_in_flight():
+    cache = CallCache()
+    cache.new_block(10, 1)
+
+    def call_mined_concurrently():
+        # a transaction is mined while the call is waiting for the node
+        cache.invalidate()
+        return 'outdated'
+
+    assert cache.call('key', call_mined_concurrently) == 'outdated'
+    assert cache.call('key', lambda: 'current') == 'current'
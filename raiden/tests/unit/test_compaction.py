@@ -0,0 +1,152 @@
+import os
+
+from raiden.storage import compaction
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.storage.wal import WriteAheadLog, restore_from_latest_snapshot
+from raiden.transfer.architecture import State, StateManager, TransitionResult
+from raiden.transfer.events import (
+    ContractSendChannelClose,
+    EventPaymentReceivedSuccess,
+    SendProcessed,
+)
+from raiden.transfer.state_change import Block
+
+
+class BlockState(State):
+    def __init__(self):
+        self.block_numbers = list()
+
+
+def state_transition_events(state, state_change):
+    state = state or BlockState()
+    state.block_numbers.append(state_change.block_number)
+
+    events = [SendProcessed(b'partner', 0, state_change.block_number)]
+    if state_change.block_number % 3 == 0:
+        events.append(EventPaymentReceivedSuccess(
+            b'payment_network',
+            b'token_network',
+            state_change.block_number,
+            1,
+            b'initiator',
+        ))
+
+    return TransitionResult(state, events)
+
+
+def new_wal(storage, compact=None):
+    state_manager = StateManager(state_transition_events, None)
+    return WriteAheadLog(state_manager, storage, compaction=compact)
+
+
+def test_compaction(tmpdir):
+    storage = SQLiteStorage(os.path.join(tmpdir, 'log.db'), PickleSerializer)
+    archive_path = os.path.join(tmpdir, 'archive.gz')
+    wal = new_wal(storage)
+
+    assert compaction.compact(storage) is None
+
+    for block_number in range(1, 11):
+        wal.log_and_dispatch(Block(block_number), block_number)
+    wal.snapshot()
+    first_snapshot = wal.state_change_id
+
+    for block_number in range(11, 21):
+        wal.log_and_dispatch(Block(block_number), block_number)
+    wal.snapshot()
+
+    payments_before = [
+        event
+        for _, event in storage.get_events_by_block(0, 'latest')
+        if isinstance(event, EventPaymentReceivedSuccess)
+    ]
+
+    statistics = compaction.compact(storage, archive_path=archive_path)
+
+    # the payment events and the state changes they reference are kept, the
+    # state change of the latest snapshot is needed to restore
+    assert statistics.snapshot_state_change_id == 20
+    assert statistics.deleted_snapshots == 1
+    assert statistics.deleted_events == 19
+    assert statistics.deleted_state_changes == 19 - len(payments_before)
+
+    payments_after = [event for _, event in storage.get_events_by_block(0, 'latest')]
+    assert payments_after[:len(payments_before)] == payments_before
+    assert storage.get_latest_state_snapshot()[0] == 20
+
+    archived = list(compaction.read_archive(archive_path))
+    kinds = [kind for kind, _, _ in archived]
+    assert kinds.count(compaction.ARCHIVE_EVENT) == statistics.deleted_events
+    assert kinds.count(compaction.ARCHIVE_STATE_CHANGE) == statistics.deleted_state_changes
+    archived_state_changes = [
+        PickleSerializer.deserialize(data)
+        for kind, identifier, data in archived
+        if kind == compaction.ARCHIVE_STATE_CHANGE and identifier <= first_snapshot
+    ]
+    assert Block(1) in archived_state_changes
+
+    # nothing left to compact, the retained state changes are not examined
+    statistics = compaction.compact(storage)
+    assert statistics.deleted_events == statistics.deleted_state_changes == 0
+
+    wal.log_and_dispatch(Block(21), 21)
+    restored = restore_from_latest_snapshot(state_transition_events, storage)
+    assert restored.state_manager.current_state.block_numbers == list(range(1, 22))
+
+
+def test_compaction_after_full_snapshot():
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = new_wal(storage, compaction.compact)
+
+    for block_number in range(1, 5):
+        wal.log_and_dispatch(Block(block_number), block_number)
+    wal.snapshot()
+    wal.log_and_dispatch(Block(5), 5)
+    wal.snapshot()
+
+    # only the state change of block 3 is referenced by a payment event
+    state_changes = storage.get_statechanges_by_identifier(0, 'latest')
+    assert state_changes == [Block(3), Block(5)]
+
+
+def channel_events(state, state_change):
+    state = state or BlockState()
+    state.block_numbers.append(state_change.block_number)
+
+    events = [SendProcessed(b'partner', 0, state_change.block_number)]
+    if state_change.block_number % 2 == 0:
+        events.append(ContractSendChannelClose(
+            state_change.block_number,
+            b'token',
+            b'token_network',
+            None,
+        ))
+
+    return TransitionResult(state, events)
+
+
+def test_compaction_keeps_the_channel_events():
+    """ The channel and token network endpoints of the API return every event
+    of the token, these must survive the compaction.
+    """
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    state_manager = StateManager(channel_events, None)
+    wal = WriteAheadLog(state_manager, storage)
+
+    for block_number in range(1, 7):
+        wal.log_and_dispatch(Block(block_number), block_number)
+    wal.snapshot()
+
+    def channel_identifiers(**filters):
+        return sorted(
+            event.channel_identifier
+            for _, event in storage.get_events(**filters)
+        )
+
+    statistics = compaction.compact(storage)
+
+    # the events of the snapshot's state change are not compacted
+    assert statistics.deleted_events == 5
+    assert channel_identifiers(token_address=b'token') == [2, 4, 6]
+    assert channel_identifiers(token_network_identifiers=[b'token_network']) == [2, 4, 6]
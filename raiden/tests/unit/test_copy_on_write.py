@@ -0,0 +1,435 @@
+import random
+
+from raiden.messages import Secret
+from raiden.tests.utils import factories
+from raiden.tests.utils.events import must_contain_entry
+from raiden.tests.utils.factories import (
+    HOP1,
+    HOP1_KEY,
+    HOP2,
+    HOP2_KEY,
+    HOP3,
+    UNIT_CHAIN_ID,
+    UNIT_PAYMENT_NETWORK_IDENTIFIER,
+    UNIT_SECRET,
+    UNIT_TOKEN_ADDRESS,
+    UNIT_TOKEN_NETWORK_ADDRESS,
+    UNIT_TRANSFER_AMOUNT,
+    UNIT_TRANSFER_IDENTIFIER,
+    UNIT_TRANSFER_INITIATOR,
+)
+from raiden.transfer import deadlines, node, views
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.events import ContractSendChannelSettle, SendDirectTransfer
+from raiden.transfer.mediated_transfer.events import (
+    SendBalanceProof,
+    SendLockedTransfer,
+    SendRevealSecret,
+    SendSecretRequest,
+)
+from raiden.transfer.mediated_transfer.mediator import TRANSIT_BLOCKS
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+    ReceiveTransferRefundCancelRoute,
+)
+from raiden.transfer.state import (
+    ChainState,
+    PaymentNetworkState,
+    TokenNetworkState,
+    EMPTY_MERKLE_ROOT,
+    TransactionChannelNewBalance,
+    balanceproof_from_envelope,
+)
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveRouteNew,
+    ReceiveProcessed,
+    ReceiveUnlock,
+)
+from raiden.utils import random_secret, sha3
+
+
+def make_channels(chain_state, token_network_state, our_address, number_of_channels):
+    state_manager = StateManager(
+        node.state_transition,
+        chain_state,
+        copy_chain_state,
+        verify_copy_state=True,
+    )
+
+    channels = list()
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network_state.token_address,
+            token_network_identifier=token_network_state.address,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            channel_state,
+        ))
+        channels.append(channel_state)
+
+    return state_manager, channels
+
+
+def test_copy_on_write_matches_deepcopy(chain_state, token_network_state, our_address):
+    state_manager, channels = make_channels(chain_state, token_network_state, our_address, 3)
+
+    state_manager.dispatch(ContractReceiveRouteNew(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        factories.make_channel_identifier(),
+        factories.make_address(),
+        factories.make_address(),
+    ))
+
+    partner_address = channels[0].partner_state.address
+    deposit_transaction = TransactionChannelNewBalance(our_address, 200, 2)
+    state_manager.dispatch(ContractReceiveChannelNewBalance(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        channels[0].identifier,
+        deposit_transaction,
+    ))
+
+    events = state_manager.dispatch(ActionTransferDirect(
+        token_network_state.address,
+        partner_address,
+        1,
+        10,
+    ))
+    direct_transfer = next(e for e in events if isinstance(e, SendDirectTransfer))
+
+    state_manager.dispatch(ReceiveProcessed(direct_transfer.message_identifier))
+    queues = state_manager.current_state.queueids_to_queues
+    assert not any(direct_transfer in queue for queue in queues.values())
+
+    state_manager.dispatch(Block(3))
+    state_manager.dispatch(ContractReceiveChannelClosed(
+        factories.make_transaction_hash(),
+        partner_address,
+        token_network_state.address,
+        channels[1].identifier,
+        4,
+    ))
+
+
+def test_copy_on_write_shares_untouched_channels(chain_state, token_network_state, our_address):
+    state_manager, channels = make_channels(chain_state, token_network_state, our_address, 3)
+
+    previous_state = state_manager.current_state
+    previous_channels = dict(
+        views.get_token_network_by_identifier(
+            previous_state,
+            token_network_state.address,
+        ).channelidentifiers_to_channels,
+    )
+
+    deposit_transaction = TransactionChannelNewBalance(our_address, 200, 2)
+    state_manager.dispatch(ContractReceiveChannelNewBalance(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        channels[0].identifier,
+        deposit_transaction,
+    ))
+
+    next_channels = views.get_token_network_by_identifier(
+        state_manager.current_state,
+        token_network_state.address,
+    ).channelidentifiers_to_channels
+
+    deposited_channel = channels[0].identifier
+    assert next_channels[deposited_channel] is not previous_channels[deposited_channel]
+    assert len(next_channels[deposited_channel].deposit_transaction_queue) == 1
+    assert len(previous_channels[deposited_channel].deposit_transaction_queue) == 0
+
+    for channel_state in channels[1:]:
+        channel_identifier = channel_state.identifier
+        assert next_channels[channel_identifier] is previous_channels[channel_identifier]
+
+
+def test_block_only_reaches_due_channels(chain_state, token_network_state, our_address):
+    state_manager, channels = make_channels(chain_state, token_network_state, our_address, 3)
+    deposited_channel, closed_channel, _ = channels
+
+    state_manager.dispatch(ContractReceiveChannelNewBalance(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        deposited_channel.identifier,
+        TransactionChannelNewBalance(our_address, 200, 2),
+    ))
+    deposit_deadline = deadlines.channel_deadline(
+        views.get_channelstate_by_token_network_identifier(
+            state_manager.current_state,
+            token_network_state.address,
+            deposited_channel.identifier,
+        ),
+    )
+
+    state_manager.dispatch(ContractReceiveChannelClosed(
+        factories.make_transaction_hash(),
+        closed_channel.partner_state.address,
+        token_network_state.address,
+        closed_channel.identifier,
+        2,
+    ))
+    settle_deadline = 2 + closed_channel.settle_timeout + 1
+
+    def channels_by_id():
+        return views.get_token_network_by_identifier(
+            state_manager.current_state,
+            token_network_state.address,
+        ).channelidentifiers_to_channels
+
+    previous_channels = dict(channels_by_id())
+    assert not state_manager.dispatch(Block(deposit_deadline - 1))
+    for channel_identifier, channel_state in channels_by_id().items():
+        assert channel_state is previous_channels[channel_identifier]
+
+    state_manager.dispatch(Block(deposit_deadline))
+    next_channels = channels_by_id()
+    assert not next_channels[deposited_channel.identifier].deposit_transaction_queue
+    assert next_channels[deposited_channel.identifier].our_state.contract_balance == 200
+    assert next_channels[closed_channel.identifier] is previous_channels[closed_channel.identifier]
+
+    # blocks may be skipped, every deadline up to the new block is due
+    assert not state_manager.dispatch(Block(settle_deadline - 1))
+    events = state_manager.dispatch(Block(settle_deadline + 1))
+    assert len(events) == 1
+    assert isinstance(events[0], ContractSendChannelSettle)
+    assert events[0].channel_identifier == closed_channel.identifier
+
+    # the channel is settling, it doesn't need the blocks anymore
+    assert not state_manager.dispatch(Block(settle_deadline + 2))
+    assert not any(state_manager.current_state.blocknumbers_to_channels.values())
+
+
+def make_payment_state_manager(our_address):
+    """ A node with the token network of the signed test transfers, every
+    state change is verified against a full deep copy.
+    """
+    chain_state = ChainState(random.Random(), 1, our_address, UNIT_CHAIN_ID)
+    token_network = TokenNetworkState(UNIT_TOKEN_NETWORK_ADDRESS, UNIT_TOKEN_ADDRESS)
+    payment_network = PaymentNetworkState(UNIT_PAYMENT_NETWORK_IDENTIFIER, [token_network])
+    chain_state.identifiers_to_paymentnetworks[UNIT_PAYMENT_NETWORK_IDENTIFIER] = payment_network
+
+    return StateManager(
+        node.state_transition,
+        chain_state,
+        copy_chain_state,
+        verify_copy_state=True,
+    )
+
+
+def open_payment_channel(state_manager, partner_address, our_balance=0, partner_balance=0):
+    channel_state = factories.make_channel(
+        our_balance=our_balance,
+        our_address=state_manager.current_state.our_address,
+        partner_balance=partner_balance,
+        partner_address=partner_address,
+        token_address=UNIT_TOKEN_ADDRESS,
+        payment_network_identifier=UNIT_PAYMENT_NETWORK_IDENTIFIER,
+        token_network_identifier=UNIT_TOKEN_NETWORK_ADDRESS,
+    )
+    state_manager.dispatch(ContractReceiveChannelNew(
+        factories.make_transaction_hash(),
+        UNIT_TOKEN_NETWORK_ADDRESS,
+        channel_state,
+    ))
+    return channel_state
+
+
+def make_unlock(channel_state, transfer, secret, pkey):
+    """ The Unlock of `transfer` sent by the partner of `channel_state`. """
+    message = Secret(
+        chain_id=UNIT_CHAIN_ID,
+        message_identifier=random.randint(0, 2 ** 32),
+        payment_identifier=transfer.payment_identifier,
+        nonce=transfer.balance_proof.nonce + 1,
+        token_network_address=UNIT_TOKEN_NETWORK_ADDRESS,
+        channel_identifier=channel_state.identifier,
+        transferred_amount=transfer.balance_proof.transferred_amount + transfer.lock.amount,
+        locked_amount=0,
+        locksroot=EMPTY_MERKLE_ROOT,
+        secret=secret,
+    )
+    message.sign(pkey)
+    return ReceiveUnlock(message.message_identifier, secret, balanceproof_from_envelope(message))
+
+
+def get_payment_task(state_manager, secrethash):
+    return state_manager.current_state.payment_mapping.secrethashes_to_task.get(secrethash)
+
+
+def test_copy_on_write_initiator_refund_and_reveal():
+    amount = UNIT_TRANSFER_AMOUNT
+    state_manager = make_payment_state_manager(factories.make_address())
+    our_address = state_manager.current_state.our_address
+    refund_channel = open_payment_channel(state_manager, HOP1, amount, amount)
+    payee_channel = open_payment_channel(state_manager, HOP2, amount)
+    routes = [
+        factories.route_from_channel(refund_channel),
+        factories.route_from_channel(payee_channel),
+    ]
+
+    description = factories.make_transfer_description(
+        initiator=our_address,
+        target=HOP3,
+        amount=amount,
+        secret=UNIT_SECRET,
+    )
+    events = state_manager.dispatch(ActionInitInitiator(description, routes))
+    sent = must_contain_entry(events, SendLockedTransfer, {'recipient': HOP1}).transfer
+
+    refund = factories.make_signed_transfer_for(
+        refund_channel,
+        amount,
+        our_address,
+        HOP3,
+        sent.lock.expiration - refund_channel.reveal_timeout - TRANSIT_BLOCKS,
+        UNIT_SECRET,
+        identifier=sent.payment_identifier,
+        pkey=HOP1_KEY,
+        sender=HOP1,
+    )
+    # the payment task stays registered under the first secrethash, so the
+    # new transfer reuses the secret
+    events = state_manager.dispatch(
+        ReceiveTransferRefundCancelRoute(HOP1, routes, refund, UNIT_SECRET),
+    )
+    resent = must_contain_entry(events, SendLockedTransfer, {'recipient': HOP2}).transfer
+
+    events = state_manager.dispatch(ReceiveSecretRequest(
+        resent.payment_identifier,
+        amount,
+        resent.lock.secrethash,
+        HOP3,
+    ))
+    assert must_contain_entry(events, SendRevealSecret, {'recipient': HOP3})
+
+    events = state_manager.dispatch(ReceiveSecretReveal(UNIT_SECRET, HOP2))
+    assert must_contain_entry(events, SendBalanceProof, {'recipient': HOP2})
+    assert get_payment_task(state_manager, sha3(UNIT_SECRET)) is None
+
+
+def test_copy_on_write_mediator_refund_reveal_and_unlock():
+    amount = UNIT_TRANSFER_AMOUNT
+    state_manager = make_payment_state_manager(factories.make_address())
+    payer_channel = open_payment_channel(state_manager, HOP1, partner_balance=amount)
+    refund_channel = open_payment_channel(state_manager, HOP2, amount, amount)
+    payee_channel = open_payment_channel(state_manager, HOP3, amount)
+
+    payer_transfer = factories.make_signed_transfer_for(
+        payer_channel,
+        amount,
+        UNIT_TRANSFER_INITIATOR,
+        factories.make_address(),
+        expiration=payer_channel.settle_timeout,
+        secret=UNIT_SECRET,
+        identifier=UNIT_TRANSFER_IDENTIFIER,
+        pkey=HOP1_KEY,
+        sender=HOP1,
+    )
+    routes = [
+        factories.route_from_channel(refund_channel),
+        factories.route_from_channel(payee_channel),
+    ]
+    events = state_manager.dispatch(ActionInitMediator(
+        routes,
+        factories.route_from_channel(payer_channel),
+        payer_transfer,
+    ))
+    sent = must_contain_entry(events, SendLockedTransfer, {'recipient': HOP2}).transfer
+
+    refund = factories.make_signed_transfer_for(
+        refund_channel,
+        amount,
+        UNIT_TRANSFER_INITIATOR,
+        payer_transfer.target,
+        sent.lock.expiration - refund_channel.reveal_timeout - TRANSIT_BLOCKS,
+        UNIT_SECRET,
+        identifier=UNIT_TRANSFER_IDENTIFIER,
+        pkey=HOP2_KEY,
+        sender=HOP2,
+    )
+    events = state_manager.dispatch(ReceiveTransferRefund(HOP2, refund, routes))
+    assert must_contain_entry(events, SendLockedTransfer, {'recipient': HOP3})
+
+    # the secret is revealed to the payer of the refund
+    events = state_manager.dispatch(ReceiveSecretReveal(UNIT_SECRET, HOP3))
+    assert must_contain_entry(events, SendRevealSecret, {'recipient': HOP2})
+    assert must_contain_entry(events, SendBalanceProof, {'recipient': HOP3})
+
+    state_manager.dispatch(make_unlock(payer_channel, payer_transfer, UNIT_SECRET, HOP1_KEY))
+    payer_channel_state = views.get_channelstate_by_token_network_and_partner(
+        state_manager.current_state,
+        UNIT_TOKEN_NETWORK_ADDRESS,
+        HOP1,
+    )
+    assert payer_channel_state.partner_state.balance_proof.transferred_amount == amount
+
+
+def test_copy_on_write_target_expired_lock_and_unlock():
+    amount = UNIT_TRANSFER_AMOUNT
+    state_manager = make_payment_state_manager(factories.make_address())
+    our_address = state_manager.current_state.our_address
+    payer_channel = open_payment_channel(state_manager, HOP1, partner_balance=amount)
+    unlock_channel = open_payment_channel(state_manager, HOP2, partner_balance=amount)
+
+    expired_transfer = factories.make_signed_transfer_for(
+        payer_channel,
+        amount,
+        UNIT_TRANSFER_INITIATOR,
+        our_address,
+        expiration=payer_channel.reveal_timeout * 3,
+        secret=UNIT_SECRET,
+        pkey=HOP1_KEY,
+        sender=HOP1,
+    )
+    route = factories.route_from_channel(payer_channel)
+    events = state_manager.dispatch(ActionInitTarget(route, expired_transfer))
+    assert must_contain_entry(events, SendSecretRequest, {'recipient': UNIT_TRANSFER_INITIATOR})
+
+    # the secret is never revealed, the blocks reach the task until its lock
+    # expires
+    for block_number in range(2, expired_transfer.lock.expiration + 2):
+        state_manager.dispatch(Block(block_number))
+    target_task = get_payment_task(state_manager, expired_transfer.lock.secrethash)
+    assert target_task.target_state.state == 'expired'
+
+    # a payment which is unlocked
+    secret = random_secret()
+    block_number = state_manager.current_state.block_number
+    transfer = factories.make_signed_transfer_for(
+        unlock_channel,
+        amount,
+        UNIT_TRANSFER_INITIATOR,
+        our_address,
+        expiration=block_number + unlock_channel.settle_timeout,
+        secret=secret,
+        pkey=HOP2_KEY,
+        sender=HOP2,
+    )
+    route = factories.route_from_channel(unlock_channel)
+    events = state_manager.dispatch(ActionInitTarget(route, transfer))
+    assert must_contain_entry(events, SendSecretRequest, {'recipient': UNIT_TRANSFER_INITIATOR})
+
+    events = state_manager.dispatch(ReceiveSecretReveal(secret, UNIT_TRANSFER_INITIATOR))
+    assert must_contain_entry(events, SendRevealSecret, {'recipient': HOP2})
+
+    state_manager.dispatch(make_unlock(unlock_channel, transfer, secret, HOP2_KEY))
+    assert get_payment_task(state_manager, transfer.lock.secrethash) is None
@@ -0,0 +1,32 @@
+from gevent.event import Event
+
+from raiden.network.transport.udp.datagram_server import BatchDatagramServer
+
+
+def test_batch_datagram_server():
+    batches = list()
+    received = Event()
+
+    def handle(datagrams):
+        batches.append(datagrams)
+        if sum(len(batch) for batch in batches) == 5:
+            received.set()
+
+    receiver = BatchDatagramServer(('127.0.0.1', 0), handle=handle, max_batch=3)
+    sender = BatchDatagramServer(('127.0.0.1', 0), handle=handle)
+    receiver.start()
+    sender.start()
+
+    try:
+        payloads = [bytes([number]) * (number + 1) for number in range(5)]
+        for payload in payloads:
+            sender.sendto(payload, receiver.address)
+
+        assert received.wait(timeout=5)
+    finally:
+        sender.stop()
+        receiver.stop()
+
+    assert all(len(batch) <= 3 for batch in batches)
+    assert [data for batch in batches for data, _ in batch] == payloads
+    assert all(address == sender.address for batch in batches for _, address in batch)
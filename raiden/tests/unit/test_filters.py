@@ -0,0 +1,380 @@
+from types import SimpleNamespace
+
+import pytest
+from eth_utils import encode_hex, event_abi_to_log_topic, to_normalized_address
+
+from raiden.blockchain import events
+from raiden.blockchain.events import BlockchainEvents, get_indexed_contract_events
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.tests.utils.factories import make_address
+from raiden.utils.filters import (
+    StatelessFilter,
+    get_entries_chunked,
+    get_entries_merged,
+    get_new_entries_merged,
+)
+
+TOKEN_NETWORK_CREATED = '0x' + '11' * 32
+SECRET_REVEALED = '0x' + '22' * 32
+CHANNEL_OPENED = '0x' + '33' * 32
+CHANNEL_IDENTIFIER = '0x{:064x}'.format(7)
+
+
+class FakeEth:
+    """ Serves eth_getLogs from a list of logs and records the requests, the
+    queries for more than `max_range` blocks are refused.
+    """
+
+    def __init__(self, logs, block_number, max_range=None):
+        self.logs = logs
+        self.blockNumber = block_number
+        self.max_range = max_range
+        self.requests = list()
+
+    def getLogs(self, filter_params):
+        self.requests.append(filter_params)
+
+        number_of_blocks = filter_params['toBlock'] - filter_params['fromBlock'] + 1
+        if self.max_range is not None and number_of_blocks > self.max_range:
+            raise ValueError('query returned more than 10000 results')
+
+        addresses = filter_params.get('address')
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        topics = filter_params.get('topics') or []
+
+        result = list()
+        for log in self.logs:
+            if not filter_params['fromBlock'] <= log['blockNumber'] <= filter_params['toBlock']:
+                continue
+            if addresses is not None and log['address'].lower() not in addresses:
+                continue
+
+            matches = True
+            for position, topic in enumerate(topics):
+                if topic is None:
+                    continue
+                expected_topics = topic if isinstance(topic, list) else [topic]
+                log_topics = log['topics']
+                if position >= len(log_topics) or log_topics[position] not in expected_topics:
+                    matches = False
+            if matches:
+                result.append(dict(log, topics=list(log['topics'])))
+
+        return result
+
+
+def make_log(address, block_number, *topics):
+    return {
+        'address': to_normalized_address(address),
+        'blockNumber': block_number,
+        'topics': list(topics),
+        'data': '0x',
+    }
+
+
+def make_filters(web3, registry, secret_registry, token_networks, from_block=0):
+    filters_params = [
+        (registry, [TOKEN_NETWORK_CREATED]),
+        (secret_registry, [SECRET_REVEALED]),
+        (token_networks[0], [None, CHANNEL_IDENTIFIER]),
+    ] + [
+        (token_network, None)
+        for token_network in token_networks
+    ]
+
+    return [
+        StatelessFilter(web3, {
+            'fromBlock': from_block,
+            'toBlock': 'latest',
+            'address': to_normalized_address(address),
+            'topics': topics,
+        })
+        for address, topics in filters_params
+    ]
+
+
+def test_get_new_entries_merged():
+    registry, secret_registry, unrelated = make_address(), make_address(), make_address()
+    token_networks = [make_address() for _ in range(3)]
+
+    logs = [
+        make_log(registry, 1, TOKEN_NETWORK_CREATED),
+        make_log(registry, 2, CHANNEL_OPENED),
+        make_log(secret_registry, 2, SECRET_REVEALED),
+        make_log(token_networks[0], 3, CHANNEL_OPENED, CHANNEL_IDENTIFIER),
+        make_log(token_networks[0], 3, CHANNEL_OPENED, '0x{:064x}'.format(8)),
+        make_log(token_networks[1], 4, CHANNEL_OPENED, CHANNEL_IDENTIFIER),
+        make_log(token_networks[2], 6, CHANNEL_OPENED),
+        make_log(unrelated, 4, TOKEN_NETWORK_CREATED),
+    ]
+    eth = FakeEth(logs, block_number=5)
+    web3 = SimpleNamespace(eth=eth)
+
+    separate_filters = make_filters(web3, registry, secret_registry, token_networks)
+    merged_filters = make_filters(web3, registry, secret_registry, token_networks)
+
+    expected = [stateless_filter.get_new_entries(5) for stateless_filter in separate_filters]
+    del eth.requests[:]
+
+    assert get_new_entries_merged(merged_filters, 5) == expected
+    assert len(eth.requests) == 1
+    assert [len(entries) for entries in expected] == [1, 1, 1, 2, 1, 0]
+
+    # the next poll only returns the logs of the new blocks
+    eth.blockNumber = 6
+    assert get_new_entries_merged(merged_filters) == [[], [], [], [], [], [logs[6]]]
+    assert len(eth.requests) == 2
+
+
+def test_get_new_entries_merged_block_ranges():
+    registry, secret_registry = make_address(), make_address()
+    token_networks = [make_address()]
+
+    logs = [
+        make_log(registry, 1, TOKEN_NETWORK_CREATED),
+        make_log(token_networks[0], 3, CHANNEL_OPENED, CHANNEL_IDENTIFIER),
+    ]
+    eth = FakeEth(logs, block_number=5)
+    web3 = SimpleNamespace(eth=eth)
+
+    filters = make_filters(web3, registry, secret_registry, token_networks)
+    late_filters = make_filters(web3, registry, secret_registry, token_networks, from_block=2)
+
+    # the filters polled for different blocks are queried separately
+    entries = get_new_entries_merged(filters + late_filters, 5)
+    assert len(eth.requests) == 2
+    assert entries[0] == [logs[0]]
+    assert entries[len(filters)] == []
+    assert entries[2] == entries[3] == entries[len(filters) + 3] == [logs[1]]
+
+    assert get_new_entries_merged([]) == []
+
+
+def test_get_new_entries_merged_failure():
+    registry, secret_registry = make_address(), make_address()
+    token_networks = [make_address()]
+
+    logs = [
+        make_log(registry, 1, TOKEN_NETWORK_CREATED),
+        make_log(token_networks[0], 3, CHANNEL_OPENED, CHANNEL_IDENTIFIER),
+    ]
+    eth = FakeEth(logs, block_number=5)
+    web3 = SimpleNamespace(eth=eth)
+
+    filters = make_filters(web3, registry, secret_registry, token_networks)
+    late_filters = make_filters(web3, registry, secret_registry, token_networks, from_block=3)
+    get_logs = eth.getLogs
+
+    def get_logs_timeout(filter_params):
+        if filter_params['fromBlock'] == 3:
+            raise TimeoutError('the node did not answer')
+        return get_logs(filter_params)
+
+    eth.getLogs = get_logs_timeout
+    with pytest.raises(TimeoutError):
+        get_new_entries_merged(filters + late_filters, 5)
+
+    # the entries of the group which was queried were not returned, neither
+    # group is considered fetched
+    assert [f.next_block for f in filters] == [0] * len(filters)
+    assert [f.next_block for f in late_filters] == [3] * len(late_filters)
+
+    eth.getLogs = get_logs
+    entries = get_new_entries_merged(filters + late_filters, 5)
+    assert entries[0] == [logs[0]]
+    assert entries[2] == entries[3] == [logs[1]]
+    assert entries[len(filters) + 2] == entries[len(filters) + 3] == [logs[1]]
+    assert [f.next_block for f in filters + late_filters] == [6] * len(filters + late_filters)
+
+
+def make_chunked_logs(registry, secret_registry, token_networks, number_of_blocks):
+    return [
+        make_log(token_networks[block_number % len(token_networks)], block_number, CHANNEL_OPENED)
+        for block_number in range(number_of_blocks)
+    ] + [
+        make_log(registry, 7, TOKEN_NETWORK_CREATED),
+        make_log(secret_registry, 42, SECRET_REVEALED),
+    ]
+
+
+@pytest.mark.parametrize('max_range', [None, 15])
+def test_get_entries_chunked(max_range):
+    registry, secret_registry = make_address(), make_address()
+    token_networks = [make_address() for _ in range(2)]
+    logs = make_chunked_logs(registry, secret_registry, token_networks, 100)
+
+    eth = FakeEth(logs, block_number=99)
+    web3 = SimpleNamespace(eth=eth)
+    filters = make_filters(web3, registry, secret_registry, token_networks)
+    expected = get_entries_merged(filters, 0, 99)
+
+    eth.max_range = max_range
+    chunks = list(get_entries_chunked(
+        filters,
+        from_block=0,
+        to_block=99,
+        chunk_size=10,
+        max_chunk_size=40,
+        concurrency=3,
+    ))
+
+    # the chunks are consecutive and cover the whole range
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == 99
+    for (_, previous_to, _), (chunk_from, _, _) in zip(chunks, chunks[1:]):
+        assert chunk_from == previous_to + 1
+
+    chunk_sizes = [chunk_to - chunk_from + 1 for chunk_from, chunk_to, _ in chunks]
+    if max_range is None:
+        assert max(chunk_sizes) == 40
+    else:
+        assert max(chunk_sizes) <= max_range
+
+    entries = [list() for _ in filters]
+    for _, _, chunk_entries in chunks:
+        for filter_entries, chunk_filter_entries in zip(entries, chunk_entries):
+            filter_entries.extend(chunk_filter_entries)
+    assert entries == expected
+
+
+def test_get_entries_chunked_failure():
+    registry, secret_registry = make_address(), make_address()
+    token_networks = [make_address()]
+    logs = make_chunked_logs(registry, secret_registry, token_networks, 10)
+
+    eth = FakeEth(logs, block_number=9, max_range=0)
+    web3 = SimpleNamespace(eth=eth)
+    filters = make_filters(web3, registry, secret_registry, token_networks)
+
+    # a block which can not be fetched is an error
+    with pytest.raises(ValueError):
+        list(get_entries_chunked(filters, 0, 9, chunk_size=4, max_chunk_size=8, concurrency=2))
+
+
+def make_event_abi(name, *inputs):
+    return {
+        'type': 'event',
+        'name': name,
+        'anonymous': False,
+        'inputs': [
+            {'name': input_name, 'type': input_type, 'indexed': position == 0}
+            for position, (input_name, input_type) in enumerate(inputs)
+        ],
+    }
+
+
+REGISTRY_ABI = [
+    make_event_abi(
+        'TokenNetworkCreated',
+        ('token_address', 'address'),
+        ('token_network_address', 'address'),
+    ),
+]
+TOKEN_NETWORK_ABI = [
+    make_event_abi(
+        'ChannelOpened',
+        ('channel_identifier', 'uint256'),
+        ('participant1', 'address'),
+        ('participant2', 'address'),
+        ('settle_timeout', 'uint256'),
+    ),
+    make_event_abi(
+        'ChannelClosed',
+        ('channel_identifier', 'uint256'),
+        ('closing_participant', 'address'),
+    ),
+]
+
+
+def event_topic(abi, name):
+    event_abi, = [event_abi for event_abi in abi if event_abi['name'] == name]
+    return encode_hex(event_abi_to_log_topic(event_abi))
+
+
+def make_decoded_log(address, block_number, log_index, topic, name, **args):
+    """ A log with its decoded event, see `decode_log`. """
+    log = make_log(address, block_number, topic)
+    log['logIndex'] = log_index
+    log['decoded'] = {
+        'event': name,
+        'args': args,
+        'logIndex': log_index,
+        'blockNumber': block_number,
+    }
+    return log
+
+
+def decode_log(abi, log):  # pylint: disable=unused-argument
+    return dict(log['decoded'], args=dict(log['decoded']['args']))
+
+
+def test_poll_blockchain_events_index(monkeypatch):
+    monkeypatch.setattr(events, 'decode_event', decode_log)
+
+    registry, token_network, token = make_address(), make_address(), make_address()
+    participant1, participant2 = make_address(), make_address()
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+
+    token_network_created = event_topic(REGISTRY_ABI, 'TokenNetworkCreated')
+    channel_opened = event_topic(TOKEN_NETWORK_ABI, 'ChannelOpened')
+    logs = [
+        make_decoded_log(
+            registry, 3, 0, token_network_created, 'TokenNetworkCreated',
+            token_address=to_normalized_address(token),
+            token_network_address=to_normalized_address(token_network),
+        ),
+    ] + [
+        make_decoded_log(
+            token_network, block_number, 0, channel_opened, 'ChannelOpened',
+            channel_identifier=channel_identifier,
+            participant1=to_normalized_address(participant1),
+            participant2=to_normalized_address(participant2),
+            settle_timeout=500,
+        )
+        for block_number, channel_identifier in ((5, 1), (7, 2))
+    ]
+    eth = FakeEth(logs, block_number=10)
+    web3 = SimpleNamespace(eth=eth)
+
+    blockchain_events = BlockchainEvents()
+    blockchain_events.storage = storage
+    for name, address, topics, abi, from_block in (
+            ('registry', registry, [token_network_created], REGISTRY_ABI, 0),
+            ('token network', token_network, None, TOKEN_NETWORK_ABI, 3),
+    ):
+        stateless_filter = StatelessFilter(web3, {
+            'fromBlock': from_block,
+            'toBlock': 'latest',
+            'address': to_normalized_address(address),
+            'topics': topics,
+        })
+        blockchain_events.add_event_listener(name, stateless_filter, abi)
+
+    assert len(list(blockchain_events.poll_blockchain_events(10))) == 3
+
+    expected = [
+        dict(log['decoded'], block_number=log['blockNumber'])
+        for log in logs
+    ]
+    for event in expected:
+        del event['blockNumber']
+
+    assert get_indexed_contract_events(storage, registry) == expected[:1]
+    # the token network has no events before its creation
+    assert get_indexed_contract_events(storage, token_network, 0, 'latest') == expected[1:]
+    assert get_indexed_contract_events(storage, token_network, 6, 10) == expected[2:]
+    assert get_indexed_contract_events(
+        storage,
+        token_network,
+        channel_identifiers=[1],
+    ) == expected[1:2]
+
+    # the blocks which are not polled yet are not indexed
+    assert get_indexed_contract_events(storage, token_network, 0, 11) is None
+    assert get_indexed_contract_events(storage, make_address()) is None
+
+    eth.blockNumber = 11
+    assert list(blockchain_events.poll_blockchain_events(11)) == []
+    assert get_indexed_contract_events(storage, token_network, 0, 11) == expected[1:]
@@ -0,0 +1,185 @@
+from types import SimpleNamespace
+
+import gevent
+import pytest
+from eth_utils import encode_hex, to_normalized_address
+from matrix_client.user import User
+
+from raiden.encoding import signing
+from raiden.messages import SecretRequest
+from raiden.network.transport import matrix
+from raiden.network.transport.matrix import MatrixTransport
+from raiden.tests.utils.factories import UNIT_SECRETHASH, make_privkey_address
+from raiden.transfer.mediated_transfer.events import CHANNEL_IDENTIFIER_GLOBAL_QUEUE
+from raiden.utils import eth_sign_sha3
+from raiden.utils.typing import QueueIdentifier
+
+
+class StubRoom:
+    def __init__(self, homeserver, room_id):
+        self.homeserver = homeserver
+        self.room_id = room_id
+        self.aliases = list()
+        self.listeners = list()
+        self.sender_id = None
+
+    def add_listener(self, callback, event_type=None):  # pylint: disable=unused-argument
+        self.listeners.append(callback)
+
+    def send_text(self, text):
+        self.homeserver.send_text(self, text)
+
+
+class StubClient:
+    def __init__(self, homeserver, user_id):
+        self.homeserver = homeserver
+        self.user_id = user_id
+        self.api = SimpleNamespace(_send=lambda *args, **kwargs: None)
+        self.rooms = dict()
+        self.account_data = dict()
+
+    def add_invite_listener(self, callback):
+        pass
+
+    def add_presence_listener(self, callback):
+        pass
+
+    def set_account_data(self, key, value):
+        self.account_data[key] = value
+
+    def get_user(self, user_id):
+        return self.homeserver.users[user_id]
+
+
+class StubHomeserver:
+    """ Delivers the events sent to a room to the listeners of the other
+    members, as done by the sync of the clients.
+    """
+
+    def __init__(self):
+        self.users = dict()
+        self.rooms = list()
+        self.events = list()
+
+    def add_user(self, privkey, address):
+        user_id = '@{}:stub'.format(to_normalized_address(address))
+        displayname = encode_hex(signing.sign(user_id.encode(), privkey, hasher=eth_sign_sha3))
+        self.users[user_id] = User(None, user_id, displayname)
+        return user_id
+
+    def join(self, client, room_id):
+        room = StubRoom(self, room_id)
+        room.sender_id = client.user_id
+        client.rooms[room_id] = room
+        self.rooms.append(room)
+        return room
+
+    def send_text(self, sender_room, text):
+        event = {
+            'type': 'm.room.message',
+            'sender': sender_room.sender_id,
+            'content': {'msgtype': 'm.text', 'body': text},
+        }
+        self.events.append(event)
+
+        for room in self.rooms:
+            if room.room_id == sender_room.room_id and room is not sender_room:
+                for listener in room.listeners:
+                    gevent.spawn(listener, room, event)
+
+
+def make_transport(homeserver, batch_latency):
+    privkey, address = make_privkey_address()
+    user_id = homeserver.add_user(privkey, address)
+    config = {
+        'server': 'http://stub',
+        'client_class': lambda *args, **kwargs: StubClient(homeserver, user_id),
+        'retries_before_backoff': 5,
+        'retry_interval': 5,
+        'batch_latency': batch_latency,
+    }
+
+    transport = MatrixTransport(config)
+    transport._raiden_service = SimpleNamespace(
+        address=address,
+        private_key=privkey,
+        sign=lambda message: message.sign(privkey),
+        handle_state_change=lambda state_change: None,
+    )
+    transport._running = True
+    return transport
+
+
+def connect(homeserver, transport1, transport2):
+    room_id = '!room:stub'
+
+    for transport, partner in ((transport1, transport2), (transport2, transport1)):
+        room = homeserver.join(transport._client, room_id)
+        room.add_listener(transport._handle_message, 'm.room.message')
+
+        partner_address = partner._raiden_service.address
+        transport._address_to_userids[partner_address].add(partner._user_id)
+        transport._set_room_id_for_address(partner_address, room_id)
+
+
+@pytest.mark.parametrize('batch_latency', [0, 0.01])
+def test_matrix_batch_messages(batch_latency, monkeypatch):
+    number_of_messages = 10
+    received = list()
+
+    def on_message(raiden, message):
+        received.append(message)
+        return True
+
+    monkeypatch.setattr(matrix, 'on_message', on_message)
+
+    homeserver = StubHomeserver()
+    sender = make_transport(homeserver, batch_latency)
+    receiver = make_transport(homeserver, batch_latency)
+    connect(homeserver, sender, receiver)
+
+    queue_identifier = QueueIdentifier(
+        receiver._raiden_service.address,
+        CHANNEL_IDENTIFIER_GLOBAL_QUEUE,
+    )
+    async_results = list()
+    for message_identifier in range(number_of_messages):
+        message = SecretRequest(message_identifier, 1, UNIT_SECRETHASH, 1)
+        sender._raiden_service.sign(message)
+        sender.send_async(queue_identifier, message)
+        async_results.append(sender._messageids_to_asyncresult[message_identifier])
+
+    try:
+        assert gevent.wait(async_results, timeout=5) == async_results
+    finally:
+        gevent.killall(sender.greenlets + receiver.greenlets)
+
+    assert all(async_result.get() for async_result in async_results)
+    assert [message.message_identifier for message in received] == list(range(number_of_messages))
+
+    # the messages and the Delivered messages are sent in one event each
+    if batch_latency:
+        assert len(homeserver.events) == 2
+    else:
+        assert len(homeserver.events) == 2 * number_of_messages
+
+
+def test_matrix_batch_max_size():
+    homeserver = StubHomeserver()
+    sender = make_transport(homeserver, 0.01)
+    receiver = make_transport(homeserver, 0.01)
+    connect(homeserver, sender, receiver)
+
+    # the events are not valid messages, only the sender's requests are checked
+    for room in receiver._client.rooms.values():
+        room.listeners.clear()
+
+    sender._batch_max_size = 1
+    room = sender._get_room_for_address(receiver._raiden_service.address)
+    for data in ('1', '2', '3'):
+        sender._send_immediate(receiver._raiden_service.address, data)
+    # a retry of a queued message is not sent twice
+    sender._send_immediate(receiver._raiden_service.address, '3')
+    sender._send_batch(room)
+
+    assert [event['content']['body'] for event in homeserver.events] == ['1', '2', '3']
@@ -1,6 +1,7 @@
 import pytest
 
-from raiden.messages import Ping
+from raiden.encoding import signing
+from raiden.messages import Ping, decode, recover_senders
 from raiden.tests.utils.messages import (
     make_direct_transfer,
     make_lock,
@@ -21,6 +22,44 @@ def test_signature():
     assert ping.sender == ADDRESS
 
 
+def test_sender_recovery_cache():
+    signing.recovery_cache.clear()
+
+    ping = Ping(nonce=0)
+    ping.sign(PRIVKEY)
+    assert ping.sender == ADDRESS
+    assert decode(ping.encode()).sender == ADDRESS
+    assert signing.recovery_cache.info()[:2] == (1, 1)
+
+    # the same signature over other data must not be recovered from the cache
+    other_ping = Ping(nonce=1)
+    other_ping.signature = ping.signature
+    assert other_ping.sender != ADDRESS
+    assert signing.recovery_cache.info()[:2] == (1, 2)
+
+
+def test_recover_senders():
+    signing.recovery_cache.clear()
+
+    privkeys_addresses = [make_privkey_address() for _ in range(5)]
+    messages = list()
+    for nonce, (privkey, _) in enumerate(privkeys_addresses):
+        ping = Ping(nonce=nonce)
+        ping.sign(privkey)
+        messages.append(decode(ping.encode()))
+
+    unsigned_ping = Ping(nonce=0)
+    recover_senders(messages + [unsigned_ping])
+    assert signing.recovery_cache.info().misses == len(messages)
+
+    senders = [message.sender for message in messages]
+    assert senders == [address for _, address in privkeys_addresses]
+    assert signing.recovery_cache.info().hits == len(messages)
+
+    signed_data = [(message._data_to_sign(), message.signature) for message in messages]
+    assert signing.recover_addresses(signed_data * 2) == senders * 2
+
+
 def test_mediated_transfer_out_of_bounds_values():
     for args in MEDIATED_TRANSFER_INVALID_VALUES:
         with pytest.raises(ValueError):
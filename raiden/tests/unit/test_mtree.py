@@ -1,11 +1,15 @@
+import random
+
 import pytest
 
 from raiden.exceptions import HashLengthNot32
 from raiden.utils import sha3
-from raiden.transfer.state import EMPTY_MERKLE_ROOT
+from raiden.transfer.state import EMPTY_MERKLE_ROOT, EMPTY_MERKLE_TREE
 from raiden.transfer.merkle_tree import (
     MERKLEROOT,
     compute_layers,
+    compute_layers_with,
+    compute_layers_without,
     compute_merkleproof_for,
     validate_proof,
     merkleroot,
@@ -143,3 +147,49 @@ def test_many(tree_up_to=10):
 
         reversed_tree = MerkleTreeState(compute_layers(reversed(leaves)))
         assert root == merkleroot(reversed_tree)
+
+
+def test_incremental_layers():
+    leaves = [sha3(str(value).encode()) for value in range(40)]
+    random.shuffle(leaves)
+
+    layers = EMPTY_MERKLE_TREE.layers
+    for number_of_leaves, leaf in enumerate(leaves, 1):
+        previous_layers = [list(layer) for layer in layers]
+        layers = compute_layers_with(layers, leaf)
+
+        assert layers == compute_layers(leaves[:number_of_leaves])
+        assert compute_layers_with(layers, leaf) is None
+
+    # the layers of the previous tree are not modified
+    assert previous_layers == compute_layers(leaves[:-1])
+
+    with pytest.raises(HashLengthNot32):
+        compute_layers_with(layers, b'not32bytes')
+
+    random.shuffle(leaves)
+    while leaves:
+        leaf = leaves.pop()
+        layers = compute_layers_without(layers, leaf)
+        assert compute_layers_without(layers, leaf) is None
+
+        if leaves:
+            assert layers == compute_layers(leaves)
+        else:
+            assert layers == [[]]
+
+
+def test_merkleproof_cache():
+    leaves = [sha3(str(value).encode()) for value in range(5)]
+    tree = MerkleTreeState(compute_layers(leaves))
+    root = merkleroot(tree)
+
+    proof = compute_merkleproof_for(tree, leaves[0])
+    proof.append(b'modified by the caller')
+
+    cached_proof = compute_merkleproof_for(tree, leaves[0])
+    assert cached_proof != proof
+    assert validate_proof(cached_proof, root, leaves[0])
+
+    with pytest.raises(ValueError):
+        compute_merkleproof_for(tree, sha3(b'unknown'))
@@ -1,6 +1,10 @@
+import os
+import random
+
 import pytest
 
-from raiden.encoding.format import Field, namedbuffer
+from raiden.encoding import messages
+from raiden.encoding.format import Field, Pad, buffer_for, namedbuffer, namedstruct
 from raiden.encoding.encoders import integer
 
 # pylint: disable=invalid-name
@@ -65,3 +69,70 @@ def test_namedbuffer_does_not_expose_internals():
 def test_namedbuffer_type_exposes_details():
     assert SingleByte.format == '>B'
     assert SingleByte.fields_spec == [byte]
+
+
+def random_value(field):
+    if field.encoder is None:
+        return os.urandom(field.size_bytes)
+    return random.randint(field.encoder.minimum, field.encoder.maximum)
+
+
+@pytest.mark.parametrize(
+    'klass',
+    list(messages.CMDID_MESSAGE.values()) + [messages.Lock],
+)
+def test_namedstruct_matches_namedbuffer(klass):
+    buffer_klass = namedbuffer('buffer', klass.fields_spec)
+    fields = [field for field in klass.fields_spec if not isinstance(field, Pad)]
+
+    for _ in range(10):
+        packed_buffer = buffer_klass(buffer_for(buffer_klass))
+        packed_struct = klass()
+
+        for field in fields:
+            value = random_value(field)
+            setattr(packed_buffer, field.name, value)
+            setattr(packed_struct, field.name, value)
+
+        data = packed_struct.encode()
+        assert data == packed_buffer.data
+
+        decoded = klass.decode(memoryview(data))
+        for field in fields:
+            assert getattr(decoded, field.name) == getattr(packed_buffer, field.name)
+
+
+def test_namedstruct_values():
+    packed = messages.Ping()
+    packed.cmdid = messages.PING
+
+    # the short values are left padded and the defaults are zeros
+    packed.signature = b'\x01'
+    assert packed.encode() == bytes([messages.PING]) + bytes(75) + b'\x01'
+
+    packed.signature = bytes(66)
+    with pytest.raises(ValueError):
+        packed.encode()
+
+    packed.signature = b''
+    packed.nonce = -1
+    with pytest.raises(ValueError):
+        packed.encode()
+
+    packed.nonce = 1
+    packed.cmdid = messages.PONG
+    with pytest.raises(ValueError):
+        packed.encode()
+
+    with pytest.raises(ValueError):
+        messages.Ping.decode(bytes(messages.Ping.size - 1))
+
+
+def test_namedstruct_decoder_long():
+    HugeIntStruct = namedstruct('HugeInt', [hugeint])
+    assert HugeIntStruct.format == '>100s'
+
+    packed = HugeIntStruct()
+    huge = 2 ** (8 * 100) - 1
+    packed.huge = huge
+    assert HugeIntStruct.decode(packed.encode()).huge == huge
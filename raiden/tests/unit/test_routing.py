@@ -0,0 +1,95 @@
+import random
+
+from raiden.routing import get_best_routes, score_by_distance
+from raiden.tests.utils import factories
+from raiden.transfer import token_network
+from raiden.transfer.state import NODE_NETWORK_REACHABLE, NODE_NETWORK_UNREACHABLE
+from raiden.transfer.state_change import ContractReceiveChannelNew, ContractReceiveRouteNew
+
+
+def test_get_best_routes(chain_state, payment_network_state, token_network_state, our_address):
+    pseudo_random_generator = random.Random()
+    (address_a, address_b, address_c, address_d, address_e, address_x, target) = [
+        factories.make_address()
+        for _ in range(7)
+    ]
+
+    def dispatch(state_change):
+        token_network.state_transition(
+            payment_network_state.address,
+            token_network_state,
+            state_change,
+            pseudo_random_generator,
+            chain_state.block_number,
+        )
+
+    balances = {
+        address_a: 100,
+        address_b: 50,
+        address_c: 100,
+        address_d: 10,
+        address_e: 200,
+    }
+    for partner_address, balance in balances.items():
+        channel_state = factories.make_channel(
+            our_balance=balance,
+            our_address=our_address,
+            partner_address=partner_address,
+            token_network_identifier=token_network_state.address,
+        )
+        dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            channel_state,
+        ))
+        chain_state.nodeaddresses_to_networkstates[partner_address] = NODE_NETWORK_REACHABLE
+
+    chain_state.nodeaddresses_to_networkstates[address_c] = NODE_NETWORK_UNREACHABLE
+
+    routes = [
+        (address_a, target),
+        (address_b, target),
+        (address_c, target),
+        (address_d, target),
+        (address_e, address_x),
+        (address_x, target),
+    ]
+    for participant1, participant2 in routes:
+        dispatch(ContractReceiveRouteNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            factories.make_channel_identifier(),
+            participant1,
+            participant2,
+        ))
+
+    def best_routes(**kwargs):
+        routes = get_best_routes(
+            chain_state,
+            token_network_state.address,
+            our_address,
+            target,
+            amount=20,
+            **kwargs,
+        )
+        return [route.node_address for route in routes]
+
+    # the channel of d doesn't have enough capacity and c is unreachable, the
+    # shortest paths come first, ordered by capacity
+    assert best_routes(previous_address=None) == [address_a, address_b, address_e]
+    assert best_routes(previous_address=None, max_routes=2) == [address_a, address_b]
+    assert best_routes(previous_address=address_a) == [address_b, address_e]
+
+    by_distance = best_routes(previous_address=None, score_route=score_by_distance)
+    assert sorted(by_distance[:2]) == by_distance[:2]
+    assert by_distance[2] == address_e
+
+    unknown_target = get_best_routes(
+        chain_state,
+        token_network_state.address,
+        our_address,
+        factories.make_address(),
+        20,
+        None,
+    )
+    assert unknown_target == []
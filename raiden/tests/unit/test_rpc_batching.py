@@ -0,0 +1,114 @@
+import json
+
+import gevent
+import pytest
+from gevent.pywsgi import WSGIServer
+
+from raiden.network.rpc.batching import BatchingHTTPProvider
+
+
+class StubNode:
+    """ A JSON-RPC server which answers every request with its method and
+    params, and records the HTTP requests it receives.
+    """
+
+    def __init__(self, batches_supported=True):
+        self.batches_supported = batches_supported
+        self.http_requests = list()
+
+    def __call__(self, environ, start_response):
+        body = json.loads(environ['wsgi.input'].read())
+        self.http_requests.append(body)
+
+        if not isinstance(body, list):
+            response = self.answer(body)
+        elif self.batches_supported:
+            response = [self.answer(request) for request in body]
+        else:
+            response = {
+                'jsonrpc': '2.0',
+                'id': None,
+                'error': {'code': -32600, 'message': 'batch requests are not supported'},
+            }
+
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [json.dumps(response).encode()]
+
+    @staticmethod
+    def answer(request):
+        return {
+            'jsonrpc': '2.0',
+            'id': request['id'],
+            'result': [request['method'], request['params']],
+        }
+
+
+@pytest.fixture
+def stub_node(request):
+    node = StubNode(batches_supported=getattr(request, 'param', True))
+    server = WSGIServer(('127.0.0.1', 0), node, log=None)
+    server.start()
+    node.endpoint_uri = 'http://127.0.0.1:{}'.format(server.server_port)
+    yield node
+    server.stop()
+
+
+def make_requests(provider, calls):
+    greenlets = [
+        gevent.spawn(provider.make_request, method, params)
+        for method, params in calls
+    ]
+    gevent.joinall(greenlets, raise_error=True)
+    return [greenlet.value['result'] for greenlet in greenlets]
+
+
+CALLS = [
+    ('eth_call', [{'to': '0x01', 'data': '0x0{}'.format(i % 5)}, 'latest'])
+    for i in range(20)
+] + [
+    ('eth_getBalance', ['0x02', 'latest']),
+    ('eth_getBalance', ['0x02', 'latest']),
+]
+
+
+def test_concurrent_requests_are_batched(stub_node):
+    provider = BatchingHTTPProvider(stub_node.endpoint_uri)
+
+    assert make_requests(provider, CALLS) == [[method, params] for method, params in CALLS]
+
+    # the identical calls are sent once, the other methods are always sent
+    batch, = stub_node.http_requests
+    assert len(batch) == 7
+    assert not provider.in_flight
+
+    # a request made alone is not batched, a call is not cached once answered
+    assert make_requests(provider, CALLS[:1]) == [[CALLS[0][0], CALLS[0][1]]]
+    assert stub_node.http_requests[1]['method'] == 'eth_call'
+
+
+def test_max_batch_size(stub_node):
+    provider = BatchingHTTPProvider(stub_node.endpoint_uri, max_batch_size=3)
+
+    assert make_requests(provider, CALLS) == [[method, params] for method, params in CALLS]
+    # the last request is sent on its own
+    assert [len(batch) for batch in stub_node.http_requests[:2]] == [3, 3]
+    assert stub_node.http_requests[2]['method'] == 'eth_getBalance'
+
+    with pytest.raises(ValueError):
+        BatchingHTTPProvider(stub_node.endpoint_uri, max_batch_size=0)
+
+
+@pytest.mark.parametrize('stub_node', [False], indirect=True)
+def test_batches_not_supported(stub_node):
+    provider = BatchingHTTPProvider(stub_node.endpoint_uri)
+
+    assert make_requests(provider, CALLS) == [[method, params] for method, params in CALLS]
+    assert not provider.batches_supported
+
+    # the rejected batch and then every request on its own
+    assert len(stub_node.http_requests) == 1 + 7
+    assert all(not isinstance(request, list) for request in stub_node.http_requests[1:])
+
+    del stub_node.http_requests[:]
+    make_requests(provider, CALLS)
+    assert len(stub_node.http_requests) == 7
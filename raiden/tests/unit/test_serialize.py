@@ -0,0 +1,246 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from raiden.exceptions import InvalidDBData
+from raiden.storage.serialize import MsgpackSerializer, PickleSerializer
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.events import EventPaymentSentFailed
+from raiden.transfer.mediated_transfer.state_change import ActionInitInitiator
+from raiden.transfer.state import RouteState, TransactionChannelNewBalance
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveRouteNew,
+)
+from raiden.utils import random_secret
+from raiden.utils.typing import QueueIdentifier
+
+
+def random_value(prng, depth=0):
+    """ Generates a random value with the types used by the state objects. """
+    choices = [
+        lambda: None,
+        lambda: prng.choice([True, False]),
+        lambda: prng.randint(-2**256, 2**256),
+        lambda: prng.randint(0, 200),
+        lambda: prng.random(),
+        lambda: bytes(prng.getrandbits(8) for _ in range(prng.choice([0, 3, 20, 32]))),
+        lambda: ''.join(prng.choice('abcé€') for _ in range(prng.randint(0, 10))),
+        lambda: factories.make_channel(prng.randint(0, 100), prng.randint(0, 100)),
+        lambda: RouteState(factories.make_address(), prng.randint(0, 2**256)),
+        lambda: QueueIdentifier(factories.make_address(), prng.randint(0, 2**256)),
+        lambda: EventPaymentSentFailed(
+            factories.make_address(),
+            factories.make_address(),
+            prng.randint(0, 2**64),
+            factories.make_address(),
+            'reason',
+        ),
+    ]
+
+    if depth < 3:
+        choices.extend([
+            lambda: [random_value(prng, depth + 1) for _ in range(prng.randint(0, 5))],
+            lambda: tuple(random_value(prng, depth + 1) for _ in range(prng.randint(0, 5))),
+            lambda: {
+                prng.randint(0, 2**64): random_value(prng, depth + 1)
+                for _ in range(prng.randint(0, 5))
+            },
+            lambda: {factories.make_address() for _ in range(prng.randint(0, 5))},
+            lambda: frozenset(prng.randint(0, 2**256) for _ in range(prng.randint(0, 5))),
+        ])
+
+    return prng.choice(choices)()
+
+
+def make_chain_state(
+        chain_state,
+        payment_network_id,
+        token_network_state,
+        our_address,
+        number_of_channels,
+):
+    state_manager = StateManager(node.state_transition, chain_state)
+    token_network_identifier = token_network_state.address
+
+    channels = list()
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network_state.token_address,
+            token_network_identifier=token_network_identifier,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_identifier,
+            channel_state,
+        ))
+        state_manager.dispatch(ContractReceiveRouteNew(
+            factories.make_transaction_hash(),
+            token_network_identifier,
+            channel_state.identifier,
+            our_address,
+            channel_state.partner_state.address,
+        ))
+        channels.append(channel_state)
+
+    for block_number, channel_state in enumerate(channels, 2):
+        deposit_transaction = TransactionChannelNewBalance(our_address, 200, block_number)
+        state_manager.dispatch(ContractReceiveChannelNewBalance(
+            factories.make_transaction_hash(),
+            token_network_identifier,
+            channel_state.identifier,
+            deposit_transaction,
+        ))
+        state_manager.dispatch(ActionTransferDirect(
+            token_network_identifier,
+            channel_state.partner_state.address,
+            block_number,
+            1,
+        ))
+
+        transfer_description = factories.make_transfer_description(
+            payment_network_identifier=payment_network_id,
+            token_network=token_network_identifier,
+            initiator=our_address,
+            target=channel_state.partner_state.address,
+            secret=random_secret(),
+        )
+        state_manager.dispatch(ActionInitInitiator(
+            transfer_description,
+            [factories.route_from_channel(channel_state)],
+        ))
+        state_manager.dispatch(Block(block_number))
+
+    return state_manager.current_state
+
+
+def test_msgpack_serializer_roundtrip_fuzz():
+    prng = random.Random(42)
+
+    for _ in range(500):
+        value = random_value(prng)
+        data = MsgpackSerializer.serialize(value)
+        assert MsgpackSerializer.deserialize(data) == value
+
+
+def test_msgpack_serializer_chain_state(
+        chain_state,
+        payment_network_id,
+        token_network_state,
+        our_address,
+):
+    chain_state = make_chain_state(
+        chain_state,
+        payment_network_id,
+        token_network_state,
+        our_address,
+        10,
+    )
+
+    data = MsgpackSerializer.serialize(chain_state)
+    restored_state = MsgpackSerializer.deserialize(data)
+
+    assert restored_state == chain_state
+    assert len(data) < len(PickleSerializer.serialize(chain_state))
+
+    # the restored state must behave as the original state
+    next_block = Block(chain_state.block_number + 1)
+    assert (
+        node.state_transition(restored_state, next_block).events ==
+        node.state_transition(chain_state, next_block).events
+    )
+    assert restored_state.pseudo_random_generator.random() == (
+        chain_state.pseudo_random_generator.random()
+    )
+
+
+def test_msgpack_serializer_keeps_shared_references():
+    channel_state = factories.make_channel()
+    shared_list = [channel_state]
+    value = {
+        'by_identifier': {channel_state.identifier: channel_state},
+        'by_partner': defaultdict(dict, {
+            channel_state.partner_state.address: {channel_state.identifier: channel_state},
+        }),
+        'lists': (shared_list, shared_list),
+    }
+
+    restored = MsgpackSerializer.deserialize(MsgpackSerializer.serialize(value))
+
+    restored_channel = restored['by_identifier'][channel_state.identifier]
+    partner_channels = restored['by_partner'][channel_state.partner_state.address]
+    assert partner_channels[channel_state.identifier] is restored_channel
+    assert restored['by_partner'].default_factory is dict
+    # lists and dicts are packed by msgpack and written by value
+    assert restored['lists'][0] == restored['lists'][1]
+    assert restored['lists'][0][0] is restored_channel
+    assert restored['lists'][1][0] is restored_channel
+
+
+def test_msgpack_serializer_keeps_namedtuple_types():
+    address = factories.make_address()
+    value = [
+        QueueIdentifier(address, 1),
+        QueueIdentifier(address, True),
+        QueueIdentifier(address, 1.0),
+        QueueIdentifier(address, 1),
+    ]
+
+    restored = MsgpackSerializer.deserialize(MsgpackSerializer.serialize(value))
+
+    assert restored == value
+    assert [type(queue.channel_identifier) for queue in restored] == [int, bool, float, int]
+    assert all(type(queue) is QueueIdentifier for queue in restored)
+
+
+def test_msgpack_serializer_reads_pickle_data():
+    channel_state = factories.make_channel()
+    data = PickleSerializer.serialize(channel_state)
+    assert MsgpackSerializer.deserialize(data) == channel_state
+
+
+def test_msgpack_serializer_rejects_invalid_data():
+    data = MsgpackSerializer.serialize(factories.make_channel())
+
+    with pytest.raises(InvalidDBData):
+        MsgpackSerializer.deserialize(data[:-1])
+
+    with pytest.raises(InvalidDBData):
+        MsgpackSerializer.deserialize(data + b'\x00')
+
+    # the format version follows the magic
+    with pytest.raises(InvalidDBData):
+        MsgpackSerializer.deserialize(data[:2] + b'\xff' + data[3:])
+
+    # same length, the class names of the schema table are length prefixed
+    not_allowed = data.replace(b'raiden.transfer.state:', b'collections.abcdefghi:')
+    assert not_allowed != data
+    with pytest.raises(InvalidDBData):
+        MsgpackSerializer.deserialize(not_allowed)
+
+    not_serializable = data.replace(b'raiden.transfer.state:', b'raiden.exceptions.....:')
+    with pytest.raises(InvalidDBData):
+        MsgpackSerializer.deserialize(not_serializable)
+
+
+def test_msgpack_serializer_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        MsgpackSerializer.serialize(object())
+
+    with pytest.raises(TypeError):
+        MsgpackSerializer.serialize(defaultdict(lambda: 0))
+
+
+def test_pickle_serializer_reads_msgpack_data():
+    channel_state = factories.make_channel()
+    data = MsgpackSerializer.serialize(channel_state)
+    assert PickleSerializer.deserialize(data) == channel_state
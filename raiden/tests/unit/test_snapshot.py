@@ -0,0 +1,178 @@
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.snapshot import ChainStateDeltas, Unchanged
+from raiden.storage.sqlite import SQLiteStorage
+from raiden.storage.wal import WriteAheadLog, restore_from_latest_snapshot
+from raiden.tests.utils import factories
+from raiden.transfer import node, views
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.state import TransactionChannelNewBalance
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveRouteNew,
+)
+
+
+def open_channels(wal, token_network_state, our_address, number_of_channels):
+    channels = list()
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network_state.token_address,
+            token_network_identifier=token_network_state.address,
+        )
+        wal.log_and_dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            channel_state,
+        ), 1)
+        channels.append(channel_state)
+
+    return channels
+
+
+def new_wal(chain_state, storage, full_snapshot_interval=10):
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+    return WriteAheadLog(
+        state_manager,
+        storage,
+        snapshot_deltas=ChainStateDeltas,
+        full_snapshot_interval=full_snapshot_interval,
+    )
+
+
+def deposit(wal, token_network_state, our_address, channel_state, block_number):
+    wal.log_and_dispatch(ContractReceiveChannelNewBalance(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        channel_state.identifier,
+        TransactionChannelNewBalance(our_address, 200, block_number),
+    ), block_number)
+
+
+def test_delta_only_contains_changed_channels(chain_state, token_network_state, our_address):
+    wal = new_wal(chain_state, SQLiteStorage(':memory:', PickleSerializer))
+    channels = open_channels(wal, token_network_state, our_address, 4)
+    base_state = wal.state_manager.current_state
+
+    deposit(wal, token_network_state, our_address, channels[0], 2)
+    wal.log_and_dispatch(Block(3), 3)
+    state = wal.state_manager.current_state
+
+    delta = ChainStateDeltas.diff(base_state, state)
+    token_network_delta = views.get_token_network_by_identifier(
+        delta,
+        token_network_state.address,
+    )
+
+    delta_channels = token_network_delta.channelidentifiers_to_channels
+    assert not isinstance(delta_channels[channels[0].identifier], Unchanged)
+    for channel_state in channels[1:]:
+        assert isinstance(delta_channels[channel_state.identifier], Unchanged)
+    assert isinstance(token_network_delta.network_graph, Unchanged)
+
+    restored_state = ChainStateDeltas.apply(base_state, delta)
+    assert restored_state == state
+
+    # both channel mappings must share the same objects
+    token_network = views.get_token_network_by_identifier(
+        restored_state,
+        token_network_state.address,
+    )
+    for channel_state in channels:
+        partner_channels = token_network.partneraddresses_to_channels[
+            channel_state.partner_state.address
+        ]
+        assert (
+            partner_channels[channel_state.identifier] is
+            token_network.channelidentifiers_to_channels[channel_state.identifier]
+        )
+
+
+def test_delta_of_unchanged_state(chain_state, token_network_state, our_address):
+    wal = new_wal(chain_state, SQLiteStorage(':memory:', PickleSerializer))
+    open_channels(wal, token_network_state, our_address, 2)
+    state = wal.state_manager.current_state
+
+    delta = ChainStateDeltas.diff(state, state)
+    token_network_delta = views.get_token_network_by_identifier(
+        delta,
+        token_network_state.address,
+    )
+    assert isinstance(token_network_delta, Unchanged)
+
+    assert ChainStateDeltas.apply(state, delta) == state
+
+
+def test_delta_too_many_changes(chain_state, token_network_state, our_address):
+    wal = new_wal(chain_state, SQLiteStorage(':memory:', PickleSerializer))
+    channels = open_channels(wal, token_network_state, our_address, 2)
+    base_state = wal.state_manager.current_state
+
+    for block_number, channel_state in enumerate(channels, 2):
+        deposit(wal, token_network_state, our_address, channel_state, block_number)
+
+    assert ChainStateDeltas.diff(base_state, wal.state_manager.current_state) is None
+
+
+def test_restore_from_delta_snapshot(chain_state, token_network_state, our_address):
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = new_wal(chain_state, storage, full_snapshot_interval=3)
+    channels = open_channels(wal, token_network_state, our_address, 5)
+
+    wal.snapshot()
+    base_state_change_id = wal.state_change_id
+    assert storage.get_latest_state_snapshot() is not None
+
+    deposit(wal, token_network_state, our_address, channels[0], 2)
+    wal.snapshot()
+
+    wal.log_and_dispatch(ContractReceiveRouteNew(
+        factories.make_transaction_hash(),
+        token_network_state.address,
+        factories.make_channel_identifier(),
+        factories.make_address(),
+        factories.make_address(),
+    ), 3)
+    wal.log_and_dispatch(ActionTransferDirect(
+        token_network_state.address,
+        channels[1].partner_state.address,
+        1,
+        10,
+    ), 3)
+    wal.snapshot()
+
+    # the second and third snapshots are deltas
+    latest_delta_id, _ = storage.get_latest_state_snapshot_delta(base_state_change_id)
+    assert latest_delta_id == wal.state_change_id
+    assert storage.get_latest_state_snapshot()[0] == base_state_change_id
+
+    deposit(wal, token_network_state, our_address, channels[2], 4)
+    wal.log_and_dispatch(Block(5), 5)
+
+    restored_wal = restore_from_latest_snapshot(
+        node.state_transition,
+        storage,
+        copy_chain_state,
+        snapshot_deltas=ChainStateDeltas,
+        full_snapshot_interval=3,
+    )
+    without_deltas = restore_from_latest_snapshot(
+        node.state_transition,
+        storage,
+        copy_chain_state,
+    )
+
+    current_state = wal.state_manager.current_state
+    assert restored_wal.state_manager.current_state == current_state
+    assert without_deltas.state_manager.current_state == current_state
+    assert restored_wal.snapshot_base[0] == base_state_change_id
+
+    # the fourth snapshot is a full snapshot
+    wal.snapshot()
+    assert storage.get_latest_state_snapshot()[0] == wal.state_change_id
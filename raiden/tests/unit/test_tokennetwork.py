@@ -1,9 +1,14 @@
 import copy
 import random
+from heapq import heappush
+
+import networkx
 
 from raiden.constants import UINT64_MAX
 from raiden.tests.utils import factories
-from raiden.transfer import node, channel, token_network
+from raiden.routing import get_ordered_partners
+from raiden.transfer import node, channel, routing_index, token_network
+from raiden.transfer.copy_on_write import copy_network_graph
 from raiden.transfer.state import HashTimeLockState
 from raiden.transfer.state_change import (
     ContractReceiveChannelNew,
@@ -14,7 +19,7 @@ from raiden.transfer.state_change import (
     ContractReceiveChannelBatchUnlock,
 )
 from raiden.transfer.mediated_transfer.state_change import ActionInitTarget
-from raiden.transfer.state import TokenNetworkState
+from raiden.transfer.state import TokenNetworkGraphState, TokenNetworkState
 from raiden.tests.utils.transfer import make_receive_transfer_mediated
 from raiden.utils import sha3
 
@@ -504,3 +509,50 @@ def test_routing_updates(
     assert new_channel_identifier not in graph_state.channel_identifier_to_participants
     assert len(graph_state.channel_identifier_to_participants) == 0
     assert len(graph_state.network.edges()) == 0
+
+
+def test_routing_index():
+    network_graph_state = TokenNetworkGraphState()
+    network = network_graph_state.network
+    addresses = [factories.make_address() for _ in range(30)]
+    our_address, target = addresses[:2]
+
+    def ordered_partners_networkx(network_graph):
+        paths = list()
+        for neighbor in networkx.all_neighbors(network_graph, our_address):
+            try:
+                length = networkx.shortest_path_length(network_graph, neighbor, target)
+                heappush(paths, (length, neighbor))
+            except (networkx.NetworkXNoPath, networkx.NodeNotFound):
+                pass
+        return sorted(paths)
+
+    pseudo_random_generator = random.Random(7)
+    for _ in range(50):
+        participant1, participant2 = pseudo_random_generator.sample(addresses, 2)
+        routing_index.add_edge(network, participant1, participant2)
+    for neighbor in addresses[2:6]:
+        routing_index.add_edge(network, our_address, neighbor)
+
+    expected = ordered_partners_networkx(network)
+    assert sorted(get_ordered_partners(network, our_address, target)) == expected
+
+    # the cached index and distances are updated with the graph
+    index = routing_index.get_routing_index(network)
+    assert index.targets_to_searches
+    routing_index.remove_edge(network, our_address, addresses[2])
+    routing_index.add_edge(network, addresses[3], target)
+    assert not index.targets_to_searches
+
+    expected = ordered_partners_networkx(network)
+    assert sorted(get_ordered_partners(network, our_address, target)) == expected
+    assert (1, addresses[3]) in expected
+
+    # the copy of the graph takes over the index, the index of the previous
+    # graph is built again if needed
+    new_network_graph_state = copy_network_graph(network_graph_state)
+    assert routing_index.get_routing_index(new_network_graph_state.network) is index
+    assert routing_index.get_routing_index(network) is not index
+
+    assert get_ordered_partners(network, factories.make_address(), target) == []
+    assert get_ordered_partners(network, our_address, factories.make_address()) == []
@@ -0,0 +1,175 @@
+import random
+from types import SimpleNamespace
+
+import gevent
+from gevent import server
+
+from raiden.messages import Delivered, Processed
+from raiden.network.discovery import Discovery
+from raiden.network.throttle import DummyPolicy
+from raiden.network.transport.udp.udp_transport import UDPTransport
+from raiden.tests.utils.factories import UNIT_CHAIN_ID, make_privkey_address
+from raiden.tests.utils.messages import make_direct_transfer
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.state import ChainState
+from raiden.utils.typing import QueueIdentifier
+
+CONFIG = {
+    'retry_interval': 0.1,
+    'retries_before_backoff': 5,
+    'nat_keepalive_retries': 5,
+    'nat_keepalive_timeout': 5,
+    'nat_invitation_timeout': 15,
+}
+
+
+def make_transport():
+    udpsocket = server._udp_socket(('127.0.0.1', 0))  # pylint: disable=protected-access
+    transport = UDPTransport(Discovery(), udpsocket, DummyPolicy(), CONFIG)
+
+    privkey, address = make_privkey_address()
+    transport.raiden = SimpleNamespace(address=address, privkey=privkey)
+    return transport
+
+
+def make_processed(transport, message_identifier):
+    message = Processed(message_identifier)
+    message.sign(transport.raiden.privkey)
+    return message
+
+
+def test_receive_batch_invalid_packet():
+    transport = make_transport()
+    dispatched = list()
+    transport._dispatch = dispatched.append
+
+    first = make_processed(transport, 1)
+    second = make_processed(transport, 2)
+
+    transport.receive_batch([
+        first.encode(),
+        b'\xff\x00',  # unknown cmdid
+        first.encode()[:10],  # truncated
+        second.encode(),
+    ])
+
+    assert [message.message_identifier for message in dispatched] == [1, 2]
+
+
+def test_receive_batch_handling_error():
+    transport = make_transport()
+    dispatched = list()
+
+    def dispatch(message):
+        dispatched.append(message)
+        if message.message_identifier == 1:
+            raise ValueError('invalid state')
+
+    transport._dispatch = dispatch
+
+    transport.receive_batch([
+        make_processed(transport, message_identifier).encode()
+        for message_identifier in (1, 2)
+    ])
+
+    assert [message.message_identifier for message in dispatched] == [1, 2]
+
+
+class Node:
+    """ The parts of the RaidenService used by the transport. """
+
+    def __init__(self, transport):
+        self.privkey, self.address = make_privkey_address()
+        self.transport = transport
+
+        chain_state = ChainState(random.Random(), 1, self.address, UNIT_CHAIN_ID)
+        self.wal = SimpleNamespace(
+            state_manager=StateManager(node.state_transition, chain_state),
+        )
+
+    def sign(self, message):
+        message.sign(self.privkey)
+
+    def handle_state_change(self, state_change):
+        pass
+
+
+class PartnerTransport(UDPTransport):
+    """ Accepts the balance proofs in the order of their nonces and, as the
+    node does, acknowledges every message it knows, even the rejected ones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accepted_nonces = list()
+
+    def receive_message(self, message):
+        if message.nonce == len(self.accepted_nonces) + 1:
+            self.accepted_nonces.append(message.nonce)
+
+        delivered = Delivered(message.message_identifier)
+        self.raiden.sign(delivered)
+        self.send_delivered(message.sender, delivered)
+
+
+class LossyTransport(UDPTransport):
+    """ Drops the first transmission of the packets in `lost`. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lost = set()
+
+    def maybe_sendraw(self, host_port, messagedata):
+        if messagedata in self.lost:
+            self.lost.remove(messagedata)
+            return
+
+        super().maybe_sendraw(host_port, messagedata)
+
+
+def start_node(transport_class, discovery, config):
+    udpsocket = server._udp_socket(('127.0.0.1', 0))  # pylint: disable=protected-access
+    transport = transport_class(discovery, udpsocket, DummyPolicy(), config)
+    raiden = Node(transport)
+
+    host, port = udpsocket.getsockname()
+    discovery.register(raiden.address, host, port)
+    transport.start(raiden, dict())
+
+    return raiden
+
+
+def test_send_window_lost_balance_proof():
+    """ A balance proof lost in the middle of a window must be retried before
+    the next balance proofs of the channel are sent.
+    """
+    config = dict(CONFIG, retry_interval=0.05, send_window=8)
+    discovery = Discovery()
+    sender = start_node(LossyTransport, discovery, config)
+    partner = start_node(PartnerTransport, discovery, config)
+
+    try:
+        sender.transport.get_health_events(partner.address).event_healthy.wait(timeout=5)
+
+        queue_identifier = QueueIdentifier(partner.address, 1)
+        results = list()
+        for nonce in range(1, 9):
+            message = make_direct_transfer(
+                message_identifier=nonce,
+                nonce=nonce,
+                transferred_amount=nonce,
+                recipient=partner.address,
+            )
+            sender.sign(message)
+            if nonce == 3:
+                sender.transport.lost.add(message.encode())
+
+            sender.transport.send_async(queue_identifier, message)
+            results.append(sender.transport.messageids_to_asyncresults[nonce])
+
+        assert len(gevent.wait(results, timeout=10)) == len(results)
+        assert partner.transport.accepted_nonces == list(range(1, 9))
+    finally:
+        sender.transport.stop_and_wait()
+        partner.transport.stop_and_wait()
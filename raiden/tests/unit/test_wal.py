@@ -1,18 +1,27 @@
 import sqlite3
 import os
+import time
+
+import gevent
 import pytest
 
-from raiden.exceptions import InvalidDBData
+from raiden.exceptions import InvalidDBData, RaidenError, RaidenUnrecoverableError
 from raiden.transfer.architecture import State, StateManager
 from raiden.storage.serialize import PickleSerializer
 from raiden.storage.sqlite import SQLiteStorage, RAIDEN_DB_VERSION
 from raiden.storage.wal import (
+    _run_in_child_process,
     restore_from_latest_snapshot,
     WriteAheadLog,
 )
 from raiden.tests.utils import factories
 from raiden.transfer.architecture import TransitionResult
-from raiden.transfer.events import EventPaymentSentFailed
+from raiden.transfer.events import (
+    EventPaymentReceivedSuccess,
+    EventPaymentSentFailed,
+    EventPaymentSentSuccess,
+    SendProcessed,
+)
 from raiden.transfer.state_change import (
     Block,
     ContractReceiveChannelBatchUnlock,
@@ -170,6 +179,142 @@ def test_write_read_events():
     assert isinstance(latest_event[1], EventPaymentSentFailed)
 
 
+def test_get_events_filters():
+    wal = new_wal()
+    token_network = factories.make_address()
+    token = factories.make_address()
+    partner = factories.make_address()
+    large_identifier = 2 ** 64 - 1
+
+    events_by_block = {
+        1: [
+            EventPaymentSentSuccess(b'pn', token_network, large_identifier, 5, partner),
+            SendProcessed(partner, 0, 1),
+        ],
+        2: [
+            EventPaymentReceivedSuccess(b'pn', token_network, 7, 3, partner),
+            EventPaymentSentFailed(b'pn', factories.make_address(), 8, partner, 'reason'),
+        ],
+        3: [
+            EventPaymentSentSuccess(b'pn', token_network, 9, 1, factories.make_address()),
+        ],
+    }
+    for block_number, events in events_by_block.items():
+        state_change_id = wal.storage.write_state_change(Block(block_number))
+        wal.storage.write_events(state_change_id, block_number, events)
+
+    payment_types = [
+        'EventPaymentSentSuccess',
+        'EventPaymentSentFailed',
+        'EventPaymentReceivedSuccess',
+    ]
+    payments = wal.storage.get_events(event_types=payment_types)
+    assert payments == [
+        (3, events_by_block[3][0]),
+        (2, events_by_block[2][0]),
+        (2, events_by_block[2][1]),
+        (1, events_by_block[1][0]),
+    ]
+
+    assert wal.storage.get_events(event_types=payment_types, limit=2, offset=1) == payments[1:3]
+    assert wal.storage.get_events(event_types=payment_types, offset=3) == payments[3:]
+    assert wal.storage.get_events(from_block=2, to_block=2) == [
+        (2, event) for event in events_by_block[2]
+    ]
+
+    by_token_network = wal.storage.get_events(
+        token_address=token,
+        token_network_identifiers=[token_network],
+        address=partner,
+    )
+    assert by_token_network == [
+        (2, events_by_block[2][0]),
+        (1, events_by_block[1][0]),
+    ]
+    assert wal.storage.get_events(address=partner, event_types=['SendProcessed']) == [
+        (1, events_by_block[1][1]),
+    ]
+    assert wal.storage.get_events(token_network_identifiers=[]) == []
+
+    assert wal.storage.get_events(payment_identifier=large_identifier) == [
+        (1, events_by_block[1][0]),
+    ]
+
+
+def test_blockchain_events_index():
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    registry = factories.make_address()
+    token_network = factories.make_address()
+
+    def make_event(block_number, log_index, channel_identifier=None):
+        event = {'block_number': block_number, 'logIndex': log_index, 'args': {}}
+        return (token_network, channel_identifier, block_number, log_index, event)
+
+    events = [
+        make_event(4, 0, 1),
+        make_event(3, 1, 2),
+        make_event(3, 0, 1),
+        make_event(5, 0),
+    ]
+    storage.write_blockchain_events(events[:2], [(token_network, 3, 4)])
+    # the events of a block polled twice are saved once
+    storage.write_blockchain_events(events, [(token_network, 4, 5), (registry, 0, 5)])
+
+    assert storage.get_blockchain_events_range(token_network) == (3, 5)
+    assert storage.get_blockchain_events_range(registry) == (0, 5)
+    assert storage.get_blockchain_events_range(factories.make_address()) is None
+
+    assert storage.get_blockchain_events(token_network, 0, 5) == [
+        events[2][4],
+        events[1][4],
+        events[0][4],
+        events[3][4],
+    ]
+    assert storage.get_blockchain_events(token_network, 4, 4) == [events[0][4]]
+    assert storage.get_blockchain_events(token_network, 0, 5, channel_identifiers=[1]) == [
+        events[2][4],
+        events[0][4],
+    ]
+    assert storage.get_blockchain_events(token_network, 0, 5, channel_identifiers=[]) == []
+    assert storage.get_blockchain_events(registry, 0, 5) == []
+
+    # a contiguous range extends the indexed range, a gap replaces it
+    storage.write_blockchain_events([], [(token_network, 0, 2)])
+    assert storage.get_blockchain_events_range(token_network) == (0, 5)
+    storage.write_blockchain_events([], [(token_network, 8, 9)])
+    assert storage.get_blockchain_events_range(token_network) == (8, 9)
+
+
+def test_events_columns_added_to_older_database(tmpdir):
+    dbpath = os.path.join(tmpdir, 'log.db')
+    event = EventPaymentReceivedSuccess(b'pn', b'tn', 7, 3, b'initiator')
+
+    conn = sqlite3.connect(dbpath)
+    conn.executescript('''
+        CREATE TABLE state_changes (identifier INTEGER PRIMARY KEY AUTOINCREMENT, data BINARY);
+        CREATE TABLE state_events (
+            identifier INTEGER PRIMARY KEY,
+            source_statechange_id INTEGER NOT NULL,
+            block_number INTEGER NOT NULL,
+            data BINARY
+        );
+    ''')
+    conn.execute('INSERT INTO state_changes(data) VALUES(?)', (b'',))
+    conn.execute(
+        'INSERT INTO state_events(source_statechange_id, block_number, data) VALUES(1, 5, ?)',
+        (PickleSerializer.serialize(event),),
+    )
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(dbpath, PickleSerializer)
+    assert storage.get_events(
+        event_types=['EventPaymentReceivedSuccess'],
+        address=b'initiator',
+        payment_identifier=7,
+    ) == [(5, event)]
+
+
 def test_restore_without_snapshot():
     wal = new_wal()
 
@@ -184,3 +329,228 @@ def test_restore_without_snapshot():
 
     aggregate = newwal.state_manager.current_state
     assert aggregate.state_changes == [Block(5), Block(7), Block(8)]
+
+
+def test_restore_streams_state_changes_in_chunks():
+    wal = new_wal()
+
+    blocks = [Block(block_number) for block_number in range(1, 12)]
+    for block in blocks[:4]:
+        wal.log_and_dispatch(block, block.block_number)
+
+    wal.storage.write_state_snapshot(wal.state_change_id, AccState())
+
+    for block in blocks[4:]:
+        wal.log_and_dispatch(block, block.block_number)
+
+    chunks = list(wal.storage.iterate_serialized_statechanges(5, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [identifier for chunk in chunks for identifier, _ in chunk] == list(range(5, 12))
+    assert wal.storage.count_statechanges(5) == 7
+
+    newwal = restore_from_latest_snapshot(
+        state_transtion_acc,
+        wal.storage,
+        chunk_size=3,
+    )
+
+    aggregate = newwal.state_manager.current_state
+    assert aggregate.state_changes == blocks[4:]
+
+    with pytest.raises(ValueError):
+        next(wal.storage.iterate_serialized_statechanges(0, chunk_size=0))
+
+
+def state_transition_event(state, state_change):  # pylint: disable=unused-argument
+    return TransitionResult(state, [EventPaymentSentFailed(2, 3, 1, 'address', 'whatever')])
+
+
+def test_group_commit_batches_concurrent_state_changes():
+    state_manager = StateManager(state_transition_event, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = WriteAheadLog(state_manager, storage, max_batch_latency=0.01)
+
+    transactions = list()
+    write_batch = storage.write_state_changes_and_events
+
+    def write_state_changes_and_events(batch):
+        transactions.append(len(batch))
+        return write_batch(batch)
+
+    storage.write_state_changes_and_events = write_state_changes_and_events
+
+    def log_and_check(block_number):
+        events = wal.log_and_dispatch(Block(block_number), block_number)
+
+        # the state change and its events must be durable once the events are returned
+        state_changes = storage.get_statechanges_by_identifier(0, 'latest')
+        assert Block(block_number) in state_changes
+        return events
+
+    greenlets = [gevent.spawn(log_and_check, block_number) for block_number in range(1, 6)]
+    gevent.joinall(greenlets, raise_error=True)
+
+    assert transactions == [5]
+    assert all(len(greenlet.value) == 1 for greenlet in greenlets)
+    assert wal.state_change_id == 5
+
+    state_changes = storage.get_statechanges_by_identifier(0, 'latest')
+    assert state_changes == [Block(block_number) for block_number in range(1, 6)]
+    assert len(storage.get_events_by_identifier(0, 'latest')) == 5
+
+
+def test_group_commit_snapshot_flushes_pending_batch():
+    state_manager = StateManager(state_transtion_acc, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = WriteAheadLog(state_manager, storage, max_batch_latency=60)
+
+    greenlet = gevent.spawn(wal.log_and_dispatch, Block(5), 5)
+    gevent.sleep(0)
+    assert not greenlet.ready()
+
+    wal.snapshot()
+    greenlet.get(timeout=1)
+
+    state_change_id, snapshot = storage.get_latest_state_snapshot()
+    assert state_change_id == 1
+    assert snapshot.state_changes == [Block(5)]
+
+
+def test_group_commit_failure_rolls_back_the_state():
+    state_manager = StateManager(state_transtion_acc, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = WriteAheadLog(state_manager, storage, max_batch_latency=60)
+
+    greenlet = gevent.spawn(wal.log_and_dispatch, Block(1), 1)
+    gevent.sleep(0)
+    wal.flush()
+    greenlet.get(timeout=1)
+
+    def write_state_changes_and_events(batch):
+        raise sqlite3.OperationalError('disk I/O error')
+
+    storage.write_state_changes_and_events = write_state_changes_and_events
+
+    def log_and_dispatch_error(block_number):
+        with pytest.raises(sqlite3.OperationalError):
+            wal.log_and_dispatch(Block(block_number), block_number)
+
+    greenlets = [gevent.spawn(log_and_dispatch_error, n) for n in (2, 3)]
+    gevent.sleep(0)
+    assert state_manager.current_state.state_changes == [Block(1), Block(2), Block(3)]
+
+    wal.flush()
+    gevent.joinall(greenlets, raise_error=True)
+
+    # the in-memory state matches the saved state changes
+    assert state_manager.current_state.state_changes == [Block(1)]
+    assert wal.state_change_id == 1
+
+    with pytest.raises(RaidenUnrecoverableError):
+        wal.log_and_dispatch(Block(4), 4)
+    assert state_manager.current_state.state_changes == [Block(1)]
+
+
+def test_background_snapshot():
+    state_manager = StateManager(state_transtion_acc, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+    wal = WriteAheadLog(state_manager, storage, background_snapshots=True)
+
+    wal.log_and_dispatch(Block(1), 1)
+    wal.snapshot()
+
+    # the snapshot is only captured, it is saved by another greenlet
+    assert storage.get_latest_state_snapshot() is None
+
+    # the captured state is not affected by the new state changes, and a
+    # snapshot requested while the previous one is being saved is skipped
+    wal.log_and_dispatch(Block(2), 2)
+    wal.snapshot()
+
+    wal.wait_for_snapshot()
+    state_change_id, snapshot = storage.get_latest_state_snapshot()
+    assert state_change_id == 1
+    assert snapshot.state_changes == [Block(1)]
+
+    statistics = wal.last_snapshot_statistics
+    assert statistics.state_change_id == 1
+    assert statistics.base_state_change_id is None
+    assert statistics.size == len(PickleSerializer.serialize(snapshot))
+
+    wal.snapshot()
+    wal.wait_for_snapshot()
+    state_change_id, snapshot = storage.get_latest_state_snapshot()
+    assert state_change_id == 2
+    assert snapshot.state_changes == [Block(1), Block(2)]
+
+
+def test_run_in_child_process():
+    ticks = list()
+
+    def ticker():
+        while True:
+            ticks.append(1)
+            gevent.sleep(0.001)
+
+    def busy(seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            pass
+        return os.getpid()
+
+    ticker_greenlet = gevent.spawn(ticker)
+    try:
+        # the hub runs the ticker while the child is busy
+        assert _run_in_child_process(busy, 0.2) != os.getpid()
+        assert len(ticks) > 10
+    finally:
+        ticker_greenlet.kill()
+
+    with pytest.raises(RaidenError):
+        _run_in_child_process(PickleSerializer.serialize, lambda: None)
+
+
+def test_group_commit_invalid_latency():
+    state_manager = StateManager(state_transition_noop, None)
+    storage = SQLiteStorage(':memory:', PickleSerializer)
+
+    with pytest.raises(ValueError):
+        WriteAheadLog(state_manager, storage, max_batch_latency=-1)
+
+
+def test_storage_pragmas(tmpdir):
+    dbpath = os.path.join(tmpdir, 'log.db')
+    storage = SQLiteStorage(
+        dbpath,
+        PickleSerializer,
+        journal_mode='wal',
+        synchronous='normal',
+        cache_size=-1024,
+        mmap_size=1024 * 1024,
+        read_connections=2,
+    )
+
+    assert storage.conn.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+    assert storage.conn.execute('PRAGMA synchronous').fetchone() == (1,)
+    assert storage.conn.execute('PRAGMA cache_size').fetchone() == (-1024,)
+
+    with storage._read_connection() as conn:  # pylint: disable=protected-access
+        assert conn is not storage.conn
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute('INSERT INTO state_changes(identifier, data) VALUES(null, ?)', ('',))
+
+    # the read-only connections see the committed state changes
+    storage.write_state_change(Block(1))
+    assert storage.get_statechanges_by_identifier(0, 'latest') == [Block(1)]
+
+
+@pytest.mark.parametrize('config', [
+    {'journal_mode': 'invalid'},
+    {'synchronous': '1; DROP TABLE state_changes'},
+    {'cache_size': '1'},
+    {'mmap_size': -1},
+    {'read_connections': -1},
+])
+def test_storage_invalid_config(config):
+    with pytest.raises(ValueError):
+        SQLiteStorage(':memory:', PickleSerializer, **config)
@@ -0,0 +1,118 @@
+from raiden.tests.utils import factories
+from raiden.transfer import node
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.events import EventPaymentSentSuccess, SendDirectTransfer, SendProcessed
+from raiden.transfer.mediated_transfer.events import CHANNEL_IDENTIFIER_GLOBAL_QUEUE
+from raiden.transfer.state import MESSAGE_QUEUE_CHUNK_SIZE, MessageQueueState
+from raiden.transfer.state_change import (
+    ActionTransferDirect,
+    ContractReceiveChannelNew,
+    ReceiveProcessed,
+)
+
+
+def open_channels(chain_state, token_network_state, our_address, number_of_channels):
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    channels = list()
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network_state.token_address,
+            token_network_identifier=token_network_state.address,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            channel_state,
+        ))
+        channels.append(channel_state)
+
+    return state_manager, channels
+
+
+def test_message_index(chain_state, token_network_state, our_address):
+    state_manager, channels = open_channels(chain_state, token_network_state, our_address, 2)
+
+    direct_transfers = list()
+    for channel_state in channels * 2:
+        events = state_manager.dispatch(ActionTransferDirect(
+            token_network_state.address,
+            channel_state.partner_state.address,
+            1,
+            10,
+        ))
+        direct_transfers.extend(e for e in events if isinstance(e, SendDirectTransfer))
+
+    previous_state = state_manager.current_state
+    for direct_transfer in direct_transfers:
+        queueids = node.get_queueids_by_message_identifier(
+            previous_state,
+            direct_transfer.message_identifier,
+        )
+        assert queueids == (direct_transfer.queue_identifier,)
+
+    acknowledged = direct_transfers[0]
+    events = state_manager.dispatch(ReceiveProcessed(acknowledged.message_identifier))
+    assert any(isinstance(e, EventPaymentSentSuccess) for e in events)
+
+    current_state = state_manager.current_state
+    queue = current_state.queueids_to_queues[acknowledged.queue_identifier]
+    assert acknowledged not in queue
+    assert direct_transfers[2] in queue
+    assert not node.get_queueids_by_message_identifier(
+        current_state,
+        acknowledged.message_identifier,
+    )
+
+    # the index of the previous state is not modified
+    assert node.get_queueids_by_message_identifier(
+        previous_state,
+        acknowledged.message_identifier,
+    )
+
+    # states from older snapshots don't have the index and their queues are
+    # lists
+    del current_state.messageidentifiers_to_queueids
+    current_state.queueids_to_queues = {
+        queueid: list(queue)
+        for queueid, queue in current_state.queueids_to_queues.items()
+    }
+    acknowledged = direct_transfers[3]
+    events = state_manager.dispatch(ReceiveProcessed(acknowledged.message_identifier))
+    assert any(isinstance(e, EventPaymentSentSuccess) for e in events)
+
+    current_state = state_manager.current_state
+    queue = current_state.queueids_to_queues[acknowledged.queue_identifier]
+    assert list(queue) == [direct_transfers[1]]
+
+
+def test_message_queue_shares_chunks():
+    messages = [
+        SendProcessed(factories.make_address(), CHANNEL_IDENTIFIER_GLOBAL_QUEUE, identifier)
+        for identifier in range(MESSAGE_QUEUE_CHUNK_SIZE * 3)
+    ]
+    # a repeated message identifier keeps the order of the messages
+    messages.append(SendProcessed(messages[0].recipient, CHANNEL_IDENTIFIER_GLOBAL_QUEUE, 1))
+
+    queue = MessageQueueState.from_messages(messages)
+    assert list(queue) == messages
+    assert len(queue) == len(messages)
+    assert messages[1] in queue
+
+    next_queue, removed = queue.remove(1)
+    assert removed == [messages[1], messages[-1]]
+    assert list(next_queue) == messages[:1] + messages[2:-1]
+    assert messages[1] not in next_queue
+    assert len(next_queue) == len(messages) - 2
+
+    # the previous queue is not modified and only the modified chunks are
+    # copied
+    assert list(queue) == messages
+    assert next_queue.chunks[1] is queue.chunks[1]
+    assert next_queue.chunks[2] is queue.chunks[2]
+
+    assert queue.remove(len(messages) * 2) == (queue, [])
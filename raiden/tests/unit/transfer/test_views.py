@@ -0,0 +1,93 @@
+from raiden.tests.utils import factories
+from raiden.transfer import node, views
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.copy_on_write import copy_chain_state
+from raiden.transfer.state_change import (
+    Block,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+)
+
+
+def open_channels(chain_state, token_network_state, our_address, number_of_channels):
+    state_manager = StateManager(node.state_transition, chain_state, copy_chain_state)
+
+    channels = list()
+    for _ in range(number_of_channels):
+        channel_state = factories.make_channel(
+            our_balance=100,
+            our_address=our_address,
+            partner_balance=100,
+            token_address=token_network_state.token_address,
+            token_network_identifier=token_network_state.address,
+        )
+        state_manager.dispatch(ContractReceiveChannelNew(
+            factories.make_transaction_hash(),
+            token_network_state.address,
+            channel_state,
+        ))
+        channels.append(channel_state)
+
+    return state_manager, channels
+
+
+def test_views_indexes(chain_state, payment_network_state, token_network_state, our_address):
+    state_manager, channels = open_channels(chain_state, token_network_state, our_address, 3)
+    closed_channel, settling_channel, open_channel = channels
+    payment_network_id = payment_network_state.address
+    token_address = token_network_state.token_address
+
+    def channel_identifiers(view):
+        channel_states = view(state_manager.current_state, payment_network_id, token_address)
+        return [channel_state.identifier for channel_state in channel_states]
+
+    all_identifiers = sorted(channel_state.identifier for channel_state in channels)
+    assert channel_identifiers(views.get_channelstate_open) == all_identifiers
+
+    for channel_state in (closed_channel, settling_channel):
+        state_manager.dispatch(ContractReceiveChannelClosed(
+            factories.make_transaction_hash(),
+            channel_state.partner_state.address,
+            token_network_state.address,
+            channel_state.identifier,
+            2,
+        ))
+    assert channel_identifiers(views.get_channelstate_open) == [open_channel.identifier]
+    assert channel_identifiers(views.get_channelstate_closed) == sorted([
+        closed_channel.identifier,
+        settling_channel.identifier,
+    ])
+
+    # the status of the channel is changed by a block
+    state_manager.dispatch(Block(2 + settling_channel.settle_timeout + 1))
+    assert channel_identifiers(views.get_channelstate_closed) == []
+    assert channel_identifiers(views.get_channelstate_settling) == sorted([
+        closed_channel.identifier,
+        settling_channel.identifier,
+    ])
+
+    current_state = state_manager.current_state
+    partner_addresses = {channel_state.partner_state.address for channel_state in channels}
+    assert views.all_neighbour_nodes(current_state) == partner_addresses
+    partner_channels = views.list_channelstate_for_partner(
+        current_state,
+        payment_network_id,
+        open_channel.partner_state.address,
+    )
+    assert [channel_state.identifier for channel_state in partner_channels] == [
+        open_channel.identifier,
+    ]
+    assert views.search_payment_network_by_token_network_id(
+        current_state,
+        token_network_state.address,
+    ).address == payment_network_id
+
+    # states restored from older snapshots rebuild the indexes
+    statuses_to_channelids = current_state.channelstatuses_to_channelids
+    partneraddresses_to_channelids = current_state.partneraddresses_to_channelids
+    del current_state.channelstatuses_to_channelids
+    del current_state.partneraddresses_to_channelids
+    del current_state.tokennetworkidentifiers_to_paymentnetworkidentifiers
+    assert channel_identifiers(views.get_channelstate_open) == [open_channel.identifier]
+    assert current_state.channelstatuses_to_channelids == statuses_to_channelids
+    assert current_state.partneraddresses_to_channelids == partneraddresses_to_channelids
@@ -122,6 +122,11 @@ class ContractReceiveStateChange(StateChange):
         self.transaction_hash = transaction_hash
 
 
+def deepcopy_state(state, state_change):  # pylint: disable=unused-argument
+    """ Copy strategy that clones the whole state tree. """
+    return deepcopy(state)
+
+
 class StateManager:
     """ The mutable storage for the application state, this storage can do
     state transitions by applying the StateChanges to the current State.
@@ -129,20 +134,39 @@ class StateManager:
     __slots__ = (
         'state_transition',
         'current_state',
+        'copy_state',
+        'verify_copy_state',
     )
 
-    def __init__(self, state_transition, current_state):
+    def __init__(
+            self,
+            state_transition,
+            current_state,
+            copy_state=deepcopy_state,
+            verify_copy_state=False,
+    ):
         """ Initialize the state manager.
 
         Args:
             state_transition: function that can apply a StateChange message.
             current_state: current application state.
+            copy_state: function `copy_state(state, state_change)` which
+                returns a copy of the state that the state transition can
+                modify in place, the given state must be left untouched.
+            verify_copy_state: test mode, every state change is also applied
+                to a full deep copy of the state and the results of both
+                strategies are compared.
         """
         if not callable(state_transition):
             raise ValueError('state_transition must be a callable')
 
+        if not callable(copy_state):
+            raise ValueError('copy_state must be a callable')
+
         self.state_transition = state_transition
         self.current_state = current_state
+        self.copy_state = copy_state
+        self.verify_copy_state = verify_copy_state
 
     def dispatch(self, state_change: StateChange) -> List[Event]:
         """ Apply the `state_change` in the current machine and return the
@@ -159,15 +183,19 @@ class StateManager:
         """
         assert isinstance(state_change, StateChange)
 
-        # the state objects must be treated as immutable, so make a copy of the
-        # current state and pass the copy to the state machine to be modified.
-        next_state = deepcopy(self.current_state)
+        if self.verify_copy_state:
+            iteration = self._dispatch_and_verify(state_change)
+        else:
+            # the state objects must be treated as immutable, so make a copy of
+            # the current state and pass the copy to the state machine to be
+            # modified.
+            next_state = self.copy_state(self.current_state, state_change)
 
-        # update the current state by applying the change
-        iteration = self.state_transition(
-            next_state,
-            state_change,
-        )
+            # update the current state by applying the change
+            iteration = self.state_transition(
+                next_state,
+                state_change,
+            )
 
         assert isinstance(iteration, TransitionResult)
 
@@ -179,6 +207,34 @@ class StateManager:
 
         return events
 
+    def _dispatch_and_verify(self, state_change: StateChange) -> 'TransitionResult':
+        """ Apply the `state_change` with both `copy_state` and a full deep
+        copy, and check that the results are the same.
+        """
+        previous_state = deepcopy(self.current_state)
+        expected = self.state_transition(
+            deepcopy(self.current_state),
+            deepcopy(state_change),
+        )
+
+        next_state = self.copy_state(self.current_state, state_change)
+        iteration = self.state_transition(
+            next_state,
+            state_change,
+        )
+
+        assert self.current_state == previous_state, (
+            f'copy_state allowed {state_change!r} to modify the previous state'
+        )
+        assert iteration.new_state == expected.new_state, (
+            f'copy_state produced a different state for {state_change!r}'
+        )
+        assert iteration.events == expected.events, (
+            f'copy_state produced different events for {state_change!r}'
+        )
+
+        return iteration
+
     def __eq__(self, other):
         return (
             isinstance(other, StateManager) and
@@ -38,7 +38,8 @@ from raiden.transfer.mediated_transfer.events import (
 from raiden.transfer.merkle_tree import (
     LEAVES,
     merkleroot,
-    compute_layers,
+    compute_layers_with,
+    compute_layers_without,
     compute_merkleproof_for,
 )
 from raiden.transfer.state import (
@@ -1006,11 +1007,9 @@ def compute_merkletree_with(
     # Use None to inform the caller the lockshash is already known
     result = None
 
-    leaves = merkletree.layers[LEAVES]
-    if lockhash not in leaves:
-        leaves = list(leaves)
-        leaves.append(lockhash)
-        result = MerkleTreeState(compute_layers(leaves))
+    layers = compute_layers_with(merkletree.layers, lockhash)
+    if layers is not None:
+        result = MerkleTreeState(layers)
 
     return result
 
@@ -1022,13 +1021,10 @@ def compute_merkletree_without(
     # Use None to inform the caller the lockshash is unknown
     result = None
 
-    leaves = merkletree.layers[LEAVES]
-    if lockhash in leaves:
-        leaves = list(leaves)
-        leaves.remove(lockhash)
-
-        if leaves:
-            result = MerkleTreeState(compute_layers(leaves))
+    layers = compute_layers_without(merkletree.layers, lockhash)
+    if layers is not None:
+        if layers[LEAVES]:
+            result = MerkleTreeState(layers)
         else:
             result = EMPTY_MERKLE_TREE
 
@@ -0,0 +1,494 @@
+""" Structural sharing for the ChainState.
+
+The state machine mutates the state it receives in place, so the StateManager
+has to hand it a copy of the current state. Deep copying the whole ChainState
+makes the cost of every state change proportional to the size of the node
+(every token network, channel, merkle tree and network graph is cloned), even
+when the transition only touches a single channel or a message queue.
+
+`copy_chain_state` clones only the path of the state tree that the given state
+change can modify:
+
+    ChainState -> PaymentNetworkState -> TokenNetworkState -> NettingChannelState
+
+Containers on this path are shallow copied and the leaves which can be
+modified are deep copied, everything else is shared between the previous and
+the next state. The previous state must be treated as immutable, it is never
+modified by the transition.
+
+A `Block` only reaches the channels and payment tasks whose deadline has
+passed, see `raiden.transfer.deadlines`, only those are copied. State changes
+which can affect any part of the tree (e.g. `ActionLeaveAllNetworks`) fall
+back to a full deep copy.
+"""
+from collections import defaultdict
+from copy import copy, deepcopy
+
+from raiden.transfer import deadlines, routing_index
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+    ReceiveTransferRefundCancelRoute,
+)
+from raiden.transfer.state import (
+    ChainState,
+    InitiatorTask,
+    MediatorTask,
+    TargetTask,
+    TokenNetworkGraphState,
+    TokenNetworkState,
+)
+from raiden.transfer.state_change import (
+    ActionChangeNodeNetworkState,
+    ActionChannelClose,
+    ActionInitChain,
+    ActionNewTokenNetwork,
+    ActionTransferDirect,
+    Block,
+    ContractReceiveChannelBatchUnlock,
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveNewPaymentNetwork,
+    ContractReceiveNewTokenNetwork,
+    ContractReceiveRouteClosed,
+    ContractReceiveRouteNew,
+    ContractReceiveSecretReveal,
+    ContractReceiveUpdateTransfer,
+    ReceiveDelivered,
+    ReceiveProcessed,
+    ReceiveTransferDirect,
+    ReceiveUnlock,
+)
+from raiden.utils import typing
+
+# State changes that are dispatched to a single channel by its identifier
+CHANNEL_BY_ID_STATE_CHANGES = (
+    ActionChannelClose,
+    ContractReceiveChannelNewBalance,
+    ContractReceiveChannelSettled,
+    ContractReceiveUpdateTransfer,
+)
+
+# State changes that modify the token network graph used for routing
+NETWORK_GRAPH_STATE_CHANGES = (
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveRouteClosed,
+    ContractReceiveRouteNew,
+)
+
+# State changes that are dispatched to a payment task by its secrethash
+PAYMENT_TASK_STATE_CHANGES = (
+    ActionInitInitiator,
+    ActionInitMediator,
+    ActionInitTarget,
+    ContractReceiveSecretReveal,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+    ReceiveTransferRefundCancelRoute,
+    ReceiveUnlock,
+)
+
+# Indexes of the ChainState, mappings of buckets which are replaced instead of
+# modified in place
+INDEX_ATTRIBUTES = (
+    'blocknumbers_to_channels',
+    'blocknumbers_to_secrethashes',
+    'channelstatuses_to_channelids',
+    'messageidentifiers_to_queueids',
+    'partneraddresses_to_channelids',
+    'tokennetworkidentifiers_to_paymentnetworkidentifiers',
+)
+
+
+def copy_root(chain_state: ChainState) -> ChainState:
+    """ Shallow copy the ChainState.
+
+    The attributes that are modified by `node.update_queues` and the indexes
+    are always copied, the message queues and the buckets of the indexes are
+    never modified in place by the state machine, only replaced.
+    """
+    new_chain_state = copy(chain_state)
+    new_chain_state.pseudo_random_generator = deepcopy(chain_state.pseudo_random_generator)
+    new_chain_state.pending_transactions = list(chain_state.pending_transactions)
+    new_chain_state.queueids_to_queues = dict(chain_state.queueids_to_queues)
+
+    # states restored from snapshots older than the indexes don't have them,
+    # they are rebuilt by the state machine
+    for index_name in INDEX_ATTRIBUTES:
+        index = getattr(chain_state, index_name, None)
+        if index is not None:
+            setattr(new_chain_state, index_name, dict(index))
+
+    return new_chain_state
+
+
+def copy_payment_network(
+        chain_state: ChainState,
+        payment_network_identifier: typing.PaymentNetworkID,
+):
+    """ Replace the payment network `payment_network_identifier` of
+    `chain_state` with a shallow copy and return it, or None if the payment
+    network is unknown.
+    """
+    ids_to_paymentnetworks = dict(chain_state.identifiers_to_paymentnetworks)
+    chain_state.identifiers_to_paymentnetworks = ids_to_paymentnetworks
+
+    payment_network_state = ids_to_paymentnetworks.get(payment_network_identifier)
+
+    if payment_network_state is not None:
+        payment_network_state = copy(payment_network_state)
+        payment_network_state.tokenidentifiers_to_tokennetworks = dict(
+            payment_network_state.tokenidentifiers_to_tokennetworks,
+        )
+        payment_network_state.tokenaddresses_to_tokennetworks = dict(
+            payment_network_state.tokenaddresses_to_tokennetworks,
+        )
+        ids_to_paymentnetworks[payment_network_identifier] = payment_network_state
+
+    return payment_network_state
+
+
+def copy_token_network(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+        copy_graph: bool,
+) -> typing.Optional[TokenNetworkState]:
+    """ Replace the token network `token_network_identifier` of `chain_state`,
+    and the payment network it belongs to, with shallow copies.
+
+    The channels are shared with the previous state, use `copy_channel` and
+    `copy_partner_channels` for the channels which may be modified.
+    """
+    payment_network_identifier = None
+    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
+        if token_network_identifier in payment_network_state.tokenidentifiers_to_tokennetworks:
+            payment_network_identifier = payment_network_state.address
+            break
+
+    if payment_network_identifier is None:
+        return None
+
+    payment_network_state = copy_payment_network(chain_state, payment_network_identifier)
+    ids_to_tokens = payment_network_state.tokenidentifiers_to_tokennetworks
+    addrs_to_tokens = payment_network_state.tokenaddresses_to_tokennetworks
+
+    token_network_state = copy(ids_to_tokens[token_network_identifier])
+    token_network_state.channelidentifiers_to_channels = dict(
+        token_network_state.channelidentifiers_to_channels,
+    )
+    token_network_state.partneraddresses_to_channels = defaultdict(
+        dict,
+        token_network_state.partneraddresses_to_channels,
+    )
+
+    if copy_graph:
+        token_network_state.network_graph = copy_network_graph(token_network_state.network_graph)
+
+    ids_to_tokens[token_network_identifier] = token_network_state
+    addrs_to_tokens[token_network_state.token_address] = token_network_state
+
+    return token_network_state
+
+
+def copy_network_graph(network_graph_state: TokenNetworkGraphState) -> TokenNetworkGraphState:
+    """ Copy the graph of the token network, the routing index of the graph
+    is moved to the copy and updated with it.
+    """
+    new_network_graph_state = deepcopy(network_graph_state)
+    routing_index.move_routing_index(
+        network_graph_state.network,
+        new_network_graph_state.network,
+    )
+
+    return new_network_graph_state
+
+
+def copy_partner_index(token_network_state: TokenNetworkState, partner_address: typing.Address):
+    """ Replace the partner's entry of `partneraddresses_to_channels` with a
+    copy, this must be done before the entry is modified.
+    """
+    partner_channels = token_network_state.partneraddresses_to_channels.get(partner_address)
+
+    if partner_channels is not None:
+        token_network_state.partneraddresses_to_channels[partner_address] = dict(partner_channels)
+
+
+def copy_channel(token_network_state: TokenNetworkState, channel_identifier: typing.ChannelID):
+    """ Replace the channel `channel_identifier` with a deep copy in both
+    channel mappings of `token_network_state`.
+    """
+    ids_to_channels = token_network_state.channelidentifiers_to_channels
+    channel_state = ids_to_channels.get(channel_identifier)
+
+    if channel_state is None:
+        return
+
+    new_channel_state = deepcopy(channel_state)
+    ids_to_channels[channel_identifier] = new_channel_state
+
+    partner_address = channel_state.partner_state.address
+    copy_partner_index(token_network_state, partner_address)
+    partner_channels = token_network_state.partneraddresses_to_channels.get(partner_address, {})
+
+    if channel_identifier in partner_channels:
+        partner_channels[channel_identifier] = new_channel_state
+
+
+def copy_partner_channels(token_network_state: TokenNetworkState, partner_address: typing.Address):
+    """ Deep copy all the channels with `partner_address`. """
+    partner_channels = token_network_state.partneraddresses_to_channels.get(partner_address, {})
+
+    for channel_identifier in list(partner_channels.keys()):
+        copy_channel(token_network_state, channel_identifier)
+
+    copy_partner_index(token_network_state, partner_address)
+
+
+def copy_payment_task(chain_state: ChainState, secrethash: typing.SecretHash):
+    """ Replace the payment mapping with a shallow copy and the task for
+    `secrethash` with a deep copy.
+    """
+    payment_mapping = copy(chain_state.payment_mapping)
+    payment_mapping.secrethashes_to_task = dict(payment_mapping.secrethashes_to_task)
+    chain_state.payment_mapping = payment_mapping
+
+    sub_task = payment_mapping.secrethashes_to_task.get(secrethash)
+    if sub_task is not None:
+        sub_task = deepcopy(sub_task)
+        payment_mapping.secrethashes_to_task[secrethash] = sub_task
+
+    return sub_task
+
+
+def payment_task_secrethash(state_change) -> typing.SecretHash:
+    # pylint: disable=unidiomatic-typecheck
+    if type(state_change) == ActionInitInitiator:
+        return state_change.transfer.secrethash
+
+    if type(state_change) in (ReceiveTransferRefund, ReceiveTransferRefundCancelRoute):
+        return state_change.transfer.lock.secrethash
+
+    if type(state_change) == ActionInitMediator:
+        return state_change.from_transfer.lock.secrethash
+
+    if type(state_change) == ActionInitTarget:
+        return state_change.transfer.lock.secrethash
+
+    return state_change.secrethash
+
+
+def payment_task_token_network(state_change) -> typing.Optional[typing.TokenNetworkID]:
+    """ Return the token network used to create a new task, or None if the
+    state change can only be dispatched to an existing task.
+    """
+    # pylint: disable=unidiomatic-typecheck
+    if type(state_change) == ActionInitInitiator:
+        return state_change.transfer.token_network_identifier
+
+    if type(state_change) == ActionInitMediator:
+        return state_change.from_transfer.balance_proof.token_network_identifier
+
+    if type(state_change) == ActionInitTarget:
+        return state_change.transfer.balance_proof.token_network_identifier
+
+    return None
+
+
+def payment_task_channels(sub_task, state_change) -> typing.Set[typing.ChannelID]:
+    """ Return the identifiers of the channels which may be modified by
+    dispatching `state_change` to the payment task `sub_task`.
+
+    A task only operates on the channels it has a transfer with, and on the
+    channels from the routes given by the state change.
+    """
+    channel_identifiers = set()
+
+    if isinstance(sub_task, InitiatorTask):
+        initiator_state = sub_task.manager_state.initiator
+        if initiator_state is not None:
+            channel_identifiers.add(initiator_state.channel_identifier)
+
+    elif isinstance(sub_task, MediatorTask):
+        for pair in sub_task.mediator_state.transfers_pair:
+            channel_identifiers.add(pair.payer_transfer.balance_proof.channel_identifier)
+            channel_identifiers.add(pair.payee_transfer.balance_proof.channel_identifier)
+
+    elif isinstance(sub_task, TargetTask):
+        channel_identifiers.add(sub_task.channel_identifier)
+
+    routes = list(getattr(state_change, 'routes', None) or [])
+    routes.append(getattr(state_change, 'from_route', None))
+    routes.append(getattr(state_change, 'route', None))
+    for route in routes:
+        if route is not None:
+            channel_identifiers.add(route.channel_identifier)
+
+    balance_proofs = [
+        getattr(state_change, 'balance_proof', None),
+        getattr(getattr(state_change, 'transfer', None), 'balance_proof', None),
+        getattr(getattr(state_change, 'from_transfer', None), 'balance_proof', None),
+    ]
+    for balance_proof in balance_proofs:
+        if balance_proof is not None:
+            channel_identifiers.add(balance_proof.channel_identifier)
+
+    return channel_identifiers
+
+
+def copy_for_payment_task(chain_state: ChainState, state_change) -> ChainState:
+    secrethash = payment_task_secrethash(state_change)
+    sub_task = copy_payment_task(chain_state, secrethash)
+
+    token_network_identifiers = set()
+    if sub_task is not None:
+        token_network_identifiers.add(sub_task.token_network_identifier)
+
+    init_token_network_identifier = payment_task_token_network(state_change)
+    if init_token_network_identifier is not None:
+        token_network_identifiers.add(init_token_network_identifier)
+
+    channel_identifiers = payment_task_channels(sub_task, state_change)
+    for token_network_identifier in token_network_identifiers:
+        token_network_state = copy_token_network(
+            chain_state,
+            token_network_identifier,
+            copy_graph=False,
+        )
+
+        if token_network_state is not None:
+            for channel_identifier in channel_identifiers:
+                copy_channel(token_network_state, channel_identifier)
+
+    return chain_state
+
+
+def copy_for_block(chain_state: ChainState, state_change: Block) -> ChainState:
+    """ Copy the channels and payment tasks whose deadline is reached by the
+    block, only those receive the Block state change.
+    """
+    due_channels, due_secrethashes = deadlines.get_due(chain_state, state_change.block_number)
+
+    tokennetworks_to_channels = defaultdict(list)
+    for token_network_identifier, channel_identifier in due_channels:
+        tokennetworks_to_channels[token_network_identifier].append(channel_identifier)
+
+    for token_network_identifier, channel_identifiers in tokennetworks_to_channels.items():
+        token_network_state = copy_token_network(
+            chain_state,
+            token_network_identifier,
+            copy_graph=False,
+        )
+
+        if token_network_state is not None:
+            for channel_identifier in channel_identifiers:
+                copy_channel(token_network_state, channel_identifier)
+
+    if due_secrethashes:
+        payment_mapping = copy(chain_state.payment_mapping)
+        payment_mapping.secrethashes_to_task = dict(payment_mapping.secrethashes_to_task)
+        chain_state.payment_mapping = payment_mapping
+
+        for secrethash in due_secrethashes:
+            sub_task = payment_mapping.secrethashes_to_task.get(secrethash)
+            if sub_task is not None:
+                payment_mapping.secrethashes_to_task[secrethash] = deepcopy(sub_task)
+
+    return chain_state
+
+
+def copy_for_token_network(chain_state: ChainState, state_change) -> ChainState:
+    token_network_state = copy_token_network(
+        chain_state,
+        state_change.token_network_identifier,
+        copy_graph=type(state_change) in NETWORK_GRAPH_STATE_CHANGES,
+    )
+
+    if token_network_state is None:
+        return chain_state
+
+    # pylint: disable=unidiomatic-typecheck
+    state_change_type = type(state_change)
+
+    if state_change_type in CHANNEL_BY_ID_STATE_CHANGES + (ContractReceiveChannelClosed,):
+        copy_channel(token_network_state, state_change.channel_identifier)
+
+    elif state_change_type == ContractReceiveChannelNew:
+        partner_address = state_change.channel_state.partner_state.address
+        copy_partner_index(token_network_state, partner_address)
+
+    elif state_change_type == ContractReceiveChannelBatchUnlock:
+        copy_partner_channels(token_network_state, state_change.participant)
+        copy_partner_channels(token_network_state, state_change.partner)
+
+    elif state_change_type == ActionTransferDirect:
+        copy_partner_channels(token_network_state, state_change.receiver_address)
+
+    elif state_change_type == ReceiveTransferDirect:
+        copy_channel(token_network_state, state_change.balance_proof.channel_identifier)
+
+    return chain_state
+
+
+def copy_chain_state(chain_state: ChainState, state_change) -> ChainState:
+    """ Return a copy of `chain_state` that can be given to
+    `node.state_transition` together with `state_change`.
+
+    Only the parts of the state tree which can be modified by the state change
+    are copied, the rest is shared with `chain_state`.
+    """
+    # pylint: disable=unidiomatic-typecheck
+    if chain_state is None:
+        return None
+
+    state_change_type = type(state_change)
+
+    is_token_network_change = (
+        state_change_type in CHANNEL_BY_ID_STATE_CHANGES or
+        state_change_type in NETWORK_GRAPH_STATE_CHANGES or
+        state_change_type in (
+            ActionTransferDirect,
+            ContractReceiveChannelBatchUnlock,
+            ReceiveTransferDirect,
+        )
+    )
+
+    if state_change_type in (ActionInitChain, ReceiveDelivered, ReceiveProcessed):
+        next_state = copy_root(chain_state)
+
+    elif state_change_type == ActionChangeNodeNetworkState:
+        next_state = copy_root(chain_state)
+        next_state.nodeaddresses_to_networkstates = dict(
+            chain_state.nodeaddresses_to_networkstates,
+        )
+
+    elif state_change_type == ContractReceiveNewPaymentNetwork:
+        next_state = copy_root(chain_state)
+        next_state.identifiers_to_paymentnetworks = dict(
+            chain_state.identifiers_to_paymentnetworks,
+        )
+
+    elif state_change_type in (ActionNewTokenNetwork, ContractReceiveNewTokenNetwork):
+        next_state = copy_root(chain_state)
+        copy_payment_network(next_state, state_change.payment_network_identifier)
+
+    elif is_token_network_change:
+        next_state = copy_for_token_network(copy_root(chain_state), state_change)
+
+    elif state_change_type in PAYMENT_TASK_STATE_CHANGES:
+        next_state = copy_for_payment_task(copy_root(chain_state), state_change)
+
+    elif state_change_type == Block:
+        next_state = copy_for_block(copy_root(chain_state), state_change)
+
+    else:
+        next_state = deepcopy(chain_state)
+
+    return next_state
@@ -0,0 +1,289 @@
+""" Block deadlines of the channels and payment tasks.
+
+A `Block` state change only has an effect on a channel once a deposit is
+confirmed or the settlement period of the closed channel is over, and on a
+mediator or target task once one of its locks gets close to the expiration.
+Instead of dispatching every block to every channel and task, the ChainState
+keeps an index of the block number from which each of them must receive the
+`Block` state changes.
+
+Entries are never removed from the index when a deadline changes, the index
+is rescheduled whenever a channel or task is modified and an entry found
+before the actual deadline is rescheduled again, dispatching a block to a
+channel or task before its deadline has no effect. Once its deadline is
+reached a channel or task receives every block until the deadline moves
+again, as if every block was dispatched to it.
+
+The buckets of the index are frozensets shared with the previous states, they
+are replaced and never modified in place.
+"""
+from raiden.settings import DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK
+from raiden.transfer import channel, views
+from raiden.transfer.mediated_transfer.mediator import get_pending_transfer_pairs
+from raiden.transfer.state import (
+    CHANNEL_STATE_CLOSED,
+    ChainState,
+    MediatorTask,
+    NettingChannelState,
+    TargetTask,
+)
+from raiden.transfer.state_change import (
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+)
+from raiden.utils import typing
+
+ChannelKey = typing.Tuple[typing.TokenNetworkID, typing.ChannelID]
+
+# State changes which can move the deadline of a channel to an earlier block,
+# the other state changes only postpone it
+CHANNEL_DEADLINE_STATE_CHANGES = (
+    ContractReceiveChannelClosed,
+    ContractReceiveChannelNew,
+    ContractReceiveChannelNewBalance,
+)
+
+
+def channel_deadline(channel_state: NettingChannelState) -> typing.Optional[typing.BlockNumber]:
+    """ Return the first block number which has an effect on `channel_state`,
+    or None if no block has an effect on it.
+    """
+    deadlines = list()
+
+    if channel.get_status(channel_state) == CHANNEL_STATE_CLOSED:
+        closed_block_number = channel_state.close_transaction.finished_block_number
+        deadlines.append(closed_block_number + channel_state.settle_timeout + 1)
+
+    if channel_state.deposit_transaction_queue:
+        # the queue is a heap, the first deposit is the oldest one
+        deposit_block_number = channel_state.deposit_transaction_queue[0].block_number
+        deadlines.append(deposit_block_number + DEFAULT_NUMBER_OF_CONFIRMATIONS_BLOCK + 1)
+
+    return min(deadlines, default=None)
+
+
+def mediator_deadline(mediator_state, channelidentifiers_to_channels):
+    deadlines = list()
+
+    for pair in get_pending_transfer_pairs(mediator_state.transfers_pair):
+        payer_channel = channelidentifiers_to_channels.get(
+            pair.payer_transfer.balance_proof.channel_identifier,
+        )
+        payer_expiration = pair.payer_transfer.lock.expiration
+
+        # the secret is revealed on-chain once it is not safe to wait
+        if payer_channel is not None:
+            deadlines.append(payer_expiration - payer_channel.reveal_timeout)
+        else:
+            deadlines.append(0)
+
+        if pair.payer_state != 'payer_expired':
+            deadlines.append(payer_expiration + 1)
+
+        if pair.payee_state != 'payee_expired':
+            deadlines.append(pair.payee_transfer.lock.expiration + 1)
+
+    return min(deadlines, default=None)
+
+
+def target_deadline(target_state, channel_state):
+    if channel_state is None:
+        return None
+
+    secret_known = channel.is_secret_known(
+        channel_state.partner_state,
+        target_state.transfer.lock.secrethash,
+    )
+
+    # the expired lock can't be claimed anymore
+    if target_state.state == 'expired' and not secret_known:
+        return None
+
+    return target_state.transfer.lock.expiration - channel_state.reveal_timeout
+
+
+def payment_task_deadline(
+        chain_state: ChainState,
+        sub_task,
+) -> typing.Optional[typing.BlockNumber]:
+    """ Return the first block number which has an effect on `sub_task`, or
+    None if no block has an effect on it. Initiator tasks don't handle blocks.
+    """
+    if isinstance(sub_task, MediatorTask):
+        token_network_state = views.get_token_network_by_identifier(
+            chain_state,
+            sub_task.token_network_identifier,
+        )
+        if token_network_state is None:
+            return None
+
+        return mediator_deadline(
+            sub_task.mediator_state,
+            token_network_state.channelidentifiers_to_channels,
+        )
+
+    if isinstance(sub_task, TargetTask):
+        channel_state = views.get_channelstate_by_token_network_identifier(
+            chain_state,
+            sub_task.token_network_identifier,
+            sub_task.channel_identifier,
+        )
+        return target_deadline(sub_task.target_state, channel_state)
+
+    return None
+
+
+def _schedule(chain_state, index, key, deadline):
+    if deadline is None:
+        return
+
+    # a deadline that already passed is due at the next block
+    block_number = max(deadline, chain_state.block_number + 1)
+
+    bucket = index.get(block_number, frozenset())
+    if key not in bucket:
+        index[block_number] = bucket | {key}
+
+
+def _rebuild_index(chain_state: ChainState):
+    """ Schedule every channel and task, for states restored from snapshots
+    older than the index.
+    """
+    chain_state.blocknumbers_to_channels = dict()
+    chain_state.blocknumbers_to_secrethashes = dict()
+
+    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
+        token_networks = payment_network_state.tokenidentifiers_to_tokennetworks
+        for token_network_state in token_networks.values():
+            schedule_token_network(chain_state, token_network_state)
+
+    for secrethash in chain_state.payment_mapping.secrethashes_to_task:
+        schedule_payment_task(chain_state, secrethash)
+
+
+def get_channels_index(chain_state: ChainState) -> typing.Dict:
+    if getattr(chain_state, 'blocknumbers_to_channels', None) is None:
+        _rebuild_index(chain_state)
+
+    return chain_state.blocknumbers_to_channels
+
+
+def get_secrethashes_index(chain_state: ChainState) -> typing.Dict:
+    if getattr(chain_state, 'blocknumbers_to_secrethashes', None) is None:
+        _rebuild_index(chain_state)
+
+    return chain_state.blocknumbers_to_secrethashes
+
+
+def schedule_channel(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+        channel_identifier: typing.ChannelID,
+):
+    """ Update the deadline of the channel, this must be called after the
+    channel is modified.
+    """
+    channel_state = views.get_channelstate_by_token_network_identifier(
+        chain_state,
+        token_network_identifier,
+        channel_identifier,
+    )
+
+    if channel_state is not None:
+        _schedule(
+            chain_state,
+            get_channels_index(chain_state),
+            (token_network_identifier, channel_identifier),
+            channel_deadline(channel_state),
+        )
+
+
+def schedule_token_network(chain_state: ChainState, token_network_state):
+    """ Update the deadlines of all the channels of `token_network_state`. """
+    index = get_channels_index(chain_state)
+
+    for channel_state in token_network_state.channelidentifiers_to_channels.values():
+        _schedule(
+            chain_state,
+            index,
+            (token_network_state.address, channel_state.identifier),
+            channel_deadline(channel_state),
+        )
+
+
+def schedule_payment_task(chain_state: ChainState, secrethash: typing.SecretHash):
+    """ Update the deadline of the payment task, this must be called after
+    the task is modified.
+    """
+    sub_task = chain_state.payment_mapping.secrethashes_to_task.get(secrethash)
+
+    if sub_task is not None:
+        _schedule(
+            chain_state,
+            get_secrethashes_index(chain_state),
+            secrethash,
+            payment_task_deadline(chain_state, sub_task),
+        )
+
+
+def _due_block_numbers(index, block_number, new_block_number):
+    if new_block_number - block_number > len(index):
+        return [
+            scheduled_block_number
+            for scheduled_block_number in index
+            if block_number < scheduled_block_number <= new_block_number
+        ]
+
+    return [
+        scheduled_block_number
+        for scheduled_block_number in range(block_number + 1, new_block_number + 1)
+        if scheduled_block_number in index
+    ]
+
+
+def get_due(
+        chain_state: ChainState,
+        new_block_number: typing.BlockNumber,
+) -> typing.Tuple[typing.List[ChannelKey], typing.List[typing.SecretHash]]:
+    """ Return the channels and payment tasks which must receive the block
+    `new_block_number`, sorted to dispatch them in a deterministic order.
+    """
+    channels = set()
+    channels_index = get_channels_index(chain_state)
+    due_block_numbers = _due_block_numbers(
+        channels_index,
+        chain_state.block_number,
+        new_block_number,
+    )
+    for block_number in due_block_numbers:
+        channels.update(channels_index[block_number])
+
+    secrethashes = set()
+    secrethashes_index = get_secrethashes_index(chain_state)
+    due_block_numbers = _due_block_numbers(
+        secrethashes_index,
+        chain_state.block_number,
+        new_block_number,
+    )
+    for block_number in due_block_numbers:
+        secrethashes.update(secrethashes_index[block_number])
+
+    return sorted(channels), sorted(secrethashes)
+
+
+def pop_due(
+        chain_state: ChainState,
+        new_block_number: typing.BlockNumber,
+) -> typing.Tuple[typing.List[ChannelKey], typing.List[typing.SecretHash]]:
+    """ Same as `get_due`, the returned entries are removed from the index.
+    The due channels and tasks must be scheduled again after the block is
+    dispatched to them.
+    """
+    due = get_due(chain_state, new_block_number)
+
+    for index in (get_channels_index(chain_state), get_secrethashes_index(chain_state)):
+        for block_number in _due_block_numbers(index, chain_state.block_number, new_block_number):
+            del index[block_number]
+
+    return due
@@ -462,3 +462,12 @@ class SendProcessed(SendMessageEvent):
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+
+# Events returned by the payment history of the API, they are kept when the
+# database is compacted
+EVENTS_PAYMENT_HISTORY_RELATED = (
+    EventPaymentSentSuccess,
+    EventPaymentSentFailed,
+    EventPaymentReceivedSuccess,
+)
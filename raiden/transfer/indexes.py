@@ -0,0 +1,245 @@
+""" Secondary indexes of the ChainState used by the views.
+
+The views are called by the REST API on every request, walking every payment
+network, token network and channel for each of them is too slow for a node
+with thousands of channels. The state machine keeps these indexes up to
+date:
+
+- `tokennetworkidentifiers_to_paymentnetworkidentifiers`, the payment network
+  of each token network.
+- `channelstatuses_to_channelids`, the channels of a token network by their
+  status, keyed by `(token_network_identifier, status)`.
+- `partneraddresses_to_channelids`, the channels of every token network by
+  partner, as `(token_network_identifier, channel_identifier)` keys.
+
+The channels must be indexed again whenever their status can change or they
+are removed, see `index_channel`. The buckets are frozensets which are
+replaced instead of modified in place, the mappings are copied by
+`copy_on_write.copy_root`.
+"""
+from raiden.transfer import channel
+from raiden.transfer.state import (
+    CHANNEL_ALL_VALID_STATES,
+    ChainState,
+    MediatorTask,
+    TargetTask,
+)
+from raiden.utils import typing
+
+ChannelKey = typing.Tuple[typing.TokenNetworkID, typing.ChannelID]
+
+
+def _rebuild_indexes(chain_state: ChainState):
+    """ Index every token network and channel, for states restored from
+    snapshots older than the indexes.
+    """
+    chain_state.tokennetworkidentifiers_to_paymentnetworkidentifiers = dict()
+    chain_state.channelstatuses_to_channelids = dict()
+    chain_state.partneraddresses_to_channelids = dict()
+
+    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
+        index_payment_network(chain_state, payment_network_state)
+
+
+def get_paymentnetwork_index(chain_state: ChainState) -> typing.Dict:
+    index = getattr(chain_state, 'tokennetworkidentifiers_to_paymentnetworkidentifiers', None)
+
+    if index is None:
+        _rebuild_indexes(chain_state)
+        index = chain_state.tokennetworkidentifiers_to_paymentnetworkidentifiers
+
+    return index
+
+
+def get_status_index(chain_state: ChainState) -> typing.Dict:
+    if getattr(chain_state, 'channelstatuses_to_channelids', None) is None:
+        _rebuild_indexes(chain_state)
+
+    return chain_state.channelstatuses_to_channelids
+
+
+def get_partner_index(chain_state: ChainState) -> typing.Dict:
+    if getattr(chain_state, 'partneraddresses_to_channelids', None) is None:
+        _rebuild_indexes(chain_state)
+
+    return chain_state.partneraddresses_to_channelids
+
+
+def _add(index, key, value):
+    bucket = index.get(key, frozenset())
+    if value not in bucket:
+        index[key] = bucket | {value}
+
+
+def _discard(index, key, value):
+    bucket = index.get(key)
+    if bucket is not None and value in bucket:
+        bucket = bucket - {value}
+
+        if bucket:
+            index[key] = bucket
+        else:
+            del index[key]
+
+
+def index_payment_network(chain_state: ChainState, payment_network_state):
+    token_networks = payment_network_state.tokenidentifiers_to_tokennetworks
+
+    for token_network_state in token_networks.values():
+        index_token_network(chain_state, payment_network_state.address, token_network_state)
+
+
+def index_token_network(
+        chain_state: ChainState,
+        payment_network_identifier: typing.PaymentNetworkID,
+        token_network_state,
+):
+    """ Index `token_network_state` and all of its channels, this must be
+    called after the token network is added or its channels are modified.
+    """
+    get_paymentnetwork_index(chain_state)[token_network_state.address] = payment_network_identifier
+
+    for channel_state in token_network_state.channelidentifiers_to_channels.values():
+        index_channel(chain_state, token_network_state.address, channel_state.identifier)
+
+
+def unindex_token_network(chain_state: ChainState, token_network_state):
+    """ Remove `token_network_state` and its channels from the indexes, this
+    must be called before the token network is removed.
+    """
+    for channel_state in token_network_state.channelidentifiers_to_channels.values():
+        unindex_channel(
+            chain_state,
+            token_network_state.address,
+            channel_state.identifier,
+            channel_state.partner_state.address,
+        )
+
+    get_paymentnetwork_index(chain_state).pop(token_network_state.address, None)
+
+
+def get_payment_network(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+):
+    payment_network_identifier = get_paymentnetwork_index(chain_state).get(
+        token_network_identifier,
+    )
+    payment_network_state = chain_state.identifiers_to_paymentnetworks.get(
+        payment_network_identifier,
+    )
+
+    if payment_network_state is not None:
+        return payment_network_state
+
+    # the token network is not indexed if it was added to the state without
+    # the state machine
+    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
+        if token_network_identifier in payment_network_state.tokenidentifiers_to_tokennetworks:
+            return payment_network_state
+
+    return None
+
+
+def get_token_network(chain_state: ChainState, token_network_identifier: typing.TokenNetworkID):
+    payment_network_state = get_payment_network(chain_state, token_network_identifier)
+
+    if payment_network_state is not None:
+        return payment_network_state.tokenidentifiers_to_tokennetworks.get(
+            token_network_identifier,
+        )
+
+    return None
+
+
+def unindex_channel(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+        channel_identifier: typing.ChannelID,
+        partner_address: typing.Address = None,
+):
+    """ Remove the channel from the indexes. The channel is only removed from
+    the partner index if `partner_address` is given.
+    """
+    status_index = get_status_index(chain_state)
+    for status in CHANNEL_ALL_VALID_STATES:
+        _discard(status_index, (token_network_identifier, status), channel_identifier)
+
+    if partner_address is not None:
+        _discard(
+            get_partner_index(chain_state),
+            partner_address,
+            (token_network_identifier, channel_identifier),
+        )
+
+
+def index_channel(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+        channel_identifier: typing.ChannelID,
+        partner_address: typing.Address = None,
+):
+    """ Update the entries of the channel, this must be called after the
+    channel is added or removed, or its status may have changed.
+    `partner_address` is required to remove a channel which was deleted.
+    """
+    token_network_state = get_token_network(chain_state, token_network_identifier)
+    channel_state = None
+    if token_network_state is not None:
+        channel_state = token_network_state.channelidentifiers_to_channels.get(
+            channel_identifier,
+        )
+
+    if channel_state is None:
+        unindex_channel(chain_state, token_network_identifier, channel_identifier, partner_address)
+        return
+
+    status_index = get_status_index(chain_state)
+    status = channel.get_status(channel_state)
+    status_key = (token_network_identifier, status)
+
+    if channel_identifier not in status_index.get(status_key, ()):
+        unindex_channel(chain_state, token_network_identifier, channel_identifier)
+        _add(status_index, status_key, channel_identifier)
+
+    _add(
+        get_partner_index(chain_state),
+        channel_state.partner_state.address,
+        (token_network_identifier, channel_identifier),
+    )
+
+
+def get_channelids_by_status(
+        chain_state: ChainState,
+        token_network_identifier: typing.TokenNetworkID,
+        status: str,
+) -> typing.FrozenSet[typing.ChannelID]:
+    return get_status_index(chain_state).get((token_network_identifier, status), frozenset())
+
+
+def get_channelkeys_by_partner(
+        chain_state: ChainState,
+        partner_address: typing.Address,
+) -> typing.FrozenSet[ChannelKey]:
+    return get_partner_index(chain_state).get(partner_address, frozenset())
+
+
+def index_payment_task(chain_state: ChainState, sub_task):
+    """ Update the entries of the channels used by `sub_task`, the mediator
+    and target tasks close their channels when a lock is about to expire.
+    """
+    if isinstance(sub_task, MediatorTask):
+        for pair in sub_task.mediator_state.transfers_pair:
+            for transfer in (pair.payer_transfer, pair.payee_transfer):
+                index_channel(
+                    chain_state,
+                    sub_task.token_network_identifier,
+                    transfer.balance_proof.channel_identifier,
+                )
+
+    elif isinstance(sub_task, TargetTask):
+        index_channel(
+            chain_state,
+            sub_task.token_network_identifier,
+            sub_task.channel_identifier,
+        )
@@ -1,3 +1,6 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
 from raiden.utils import split_in_pairs
 from raiden.exceptions import HashLengthNot32
 from raiden.utils import sha3
@@ -6,6 +9,12 @@ from raiden.utils import sha3
 LEAVES = 0
 MERKLEROOT = -1
 
+# Number of proofs kept by `compute_merkleproof_for`
+MERKLEPROOF_CACHE_SIZE = 1024
+
+# (merkleroot, element) -> proof, the root identifies the tree
+_merkleproof_cache = OrderedDict()
+
 
 def hash_pair(first, second):
     """ Computes the keccak hash of the elements ordered topologically.
@@ -60,6 +69,91 @@ def compute_layers(elements):
     return tree
 
 
+def find_leaf(layers, element):
+    """ Return the position of `element` in the sorted leaves of `layers`,
+    or None if it is not a leaf.
+    """
+    leaves = layers[LEAVES]
+    idx = bisect_left(leaves, element)
+
+    if idx < len(leaves) and leaves[idx] == element:
+        return idx
+
+    return None
+
+
+def _compute_layers_from(layers, leaves, changed):
+    """ Computes the layers of the merkletree with the sorted `leaves`, the
+    leaves before the position `changed` must be the same as the leaves of
+    `layers`.
+
+    Only the hashes to the right of the changed position are computed, the
+    hashes of the pairs on its left are the same on every layer.
+    """
+    tree = [leaves]
+
+    layer = leaves
+    while len(layer) > 1:
+        unchanged_pairs = changed // 2
+
+        depth = len(tree)
+        if depth < len(layers):
+            next_layer = layers[depth][:unchanged_pairs]
+        else:
+            next_layer = []
+
+        paired_items = split_in_pairs(layer[unchanged_pairs * 2:])
+        next_layer.extend(hash_pair(a, b) for a, b in paired_items)
+        tree.append(next_layer)
+
+        layer = next_layer
+        changed = unchanged_pairs
+
+    return tree
+
+
+def compute_layers_with(layers, element):
+    """ Computes the layers of the merkletree `layers` with the additional
+    leaf `element`, or None if it is already a leaf.
+
+    `layers` must have been computed by one of the `compute_layers`
+    functions, the leaves are sorted.
+    """
+    if not isinstance(element, (str, bytes)):
+        raise ValueError('all elements must be str')
+
+    if len(element) != 32:
+        raise HashLengthNot32()
+
+    leaves = layers[LEAVES]
+    idx = bisect_left(leaves, element)
+
+    if idx < len(leaves) and leaves[idx] == element:
+        return None
+
+    new_leaves = leaves[:idx]
+    new_leaves.append(element)
+    new_leaves.extend(leaves[idx:])
+
+    return _compute_layers_from(layers, new_leaves, idx)
+
+
+def compute_layers_without(layers, element):
+    """ Computes the layers of the merkletree `layers` without the leaf
+    `element`, or None if it is not a leaf. The layers of a tree without
+    leaves are `[[]]`.
+    """
+    idx = find_leaf(layers, element)
+
+    if idx is None:
+        return None
+
+    leaves = layers[LEAVES]
+    new_leaves = leaves[:idx] + leaves[idx + 1:]
+
+    return _compute_layers_from(layers, new_leaves, idx)
+
+
 def compute_merkleproof_for(merkletree, element):
     """ Containment proof for element.
 
@@ -69,7 +163,28 @@ def compute_merkleproof_for(merkletree, element):
     Raises:
         IndexError: If the element is not part of the merkletree.
     """
-    idx = merkletree.layers[LEAVES].index(element)
+    cache_key = (merkleroot(merkletree), element)
+    proof = _merkleproof_cache.get(cache_key)
+
+    if proof is None:
+        proof = _compute_merkleproof_for(merkletree, element)
+
+        _merkleproof_cache[cache_key] = proof
+        if len(_merkleproof_cache) > MERKLEPROOF_CACHE_SIZE:
+            _merkleproof_cache.popitem(last=False)
+    else:
+        _merkleproof_cache.move_to_end(cache_key)
+
+    # the caller may modify the proof
+    return list(proof)
+
+
+def _compute_merkleproof_for(merkletree, element):
+    idx = find_leaf(merkletree.layers, element)
+
+    # the leaves of trees not created by compute_layers may not be sorted
+    if idx is None:
+        idx = merkletree.layers[LEAVES].index(element)
 
     proof = []
     for layer in merkletree.layers:
@@ -1,5 +1,7 @@
 from raiden.transfer import (
     channel,
+    deadlines,
+    indexes,
     token_network,
     views,
 )
@@ -31,6 +33,7 @@ from raiden.transfer.state import (
     TokenNetworkState,
     InitiatorTask,
     MediatorTask,
+    MessageQueueState,
     TargetTask,
 )
 from raiden.transfer.state_change import (
@@ -68,6 +71,101 @@ from raiden.transfer.mediated_transfer.state_change import (
 )
 from raiden.utils import typing
 
+# The index of the message queues is split in buckets by message identifier,
+# copying the ChainState only copies the mapping of the buckets and a state
+# change only copies the buckets it modifies.
+MESSAGE_INDEX_BUCKETS = 256
+
+
+def get_message_index(chain_state: ChainState) -> typing.Dict:
+    """ Return the index of the message queues, rebuilding it for states
+    restored from snapshots older than the index.
+    """
+    message_index = getattr(chain_state, 'messageidentifiers_to_queueids', None)
+
+    if message_index is None:
+        message_index = dict()
+        chain_state.messageidentifiers_to_queueids = message_index
+
+        for queueid, queue in chain_state.queueids_to_queues.items():
+            for message in queue:
+                index_message(chain_state, message.message_identifier, queueid)
+
+    return message_index
+
+
+def get_message_queue(
+        chain_state: ChainState,
+        queueid: typing.QueueIdentifier,
+) -> MessageQueueState:
+    """ Return the queue `queueid`, converting the lists of the states
+    restored from older snapshots.
+    """
+    queue = chain_state.queueids_to_queues.get(queueid)
+
+    if queue is None:
+        return MessageQueueState()
+
+    if not isinstance(queue, MessageQueueState):
+        queue = MessageQueueState.from_messages(queue)
+
+    return queue
+
+
+def get_queueids_by_message_identifier(
+        chain_state: ChainState,
+        message_identifier: typing.MessageID,
+) -> typing.Tuple[typing.QueueIdentifier, ...]:
+    """ Return the identifiers of the queues which contain a message with
+    `message_identifier`.
+    """
+    bucket = get_message_index(chain_state).get(message_identifier % MESSAGE_INDEX_BUCKETS, {})
+    return bucket.get(message_identifier, ())
+
+
+def index_message(
+        chain_state: ChainState,
+        message_identifier: typing.MessageID,
+        queueid: typing.QueueIdentifier,
+):
+    message_index = get_message_index(chain_state)
+    key = message_identifier % MESSAGE_INDEX_BUCKETS
+
+    # The buckets are shared with the previous state, so they are replaced
+    # instead of modified in place.
+    bucket = dict(message_index.get(key, {}))
+    queueids = bucket.get(message_identifier, ())
+
+    if queueid not in queueids:
+        bucket[message_identifier] = queueids + (queueid,)
+        message_index[key] = bucket
+
+
+def unindex_message(
+        chain_state: ChainState,
+        message_identifier: typing.MessageID,
+        removed_queueids: typing.Iterable[typing.QueueIdentifier],
+):
+    message_index = get_message_index(chain_state)
+    key = message_identifier % MESSAGE_INDEX_BUCKETS
+
+    bucket = dict(message_index.get(key, {}))
+    queueids = tuple(
+        queueid
+        for queueid in bucket.get(message_identifier, ())
+        if queueid not in removed_queueids
+    )
+
+    if queueids:
+        bucket[message_identifier] = queueids
+    else:
+        bucket.pop(message_identifier, None)
+
+    if bucket:
+        message_index[key] = bucket
+    else:
+        message_index.pop(key, None)
+
 
 def get_networks(
         chain_state: ChainState,
@@ -101,34 +199,43 @@ def get_token_network_by_token_address(
     return token_network_state
 
 
-def subdispatch_to_all_channels(
+def subdispatch_to_due_channels(
         chain_state: ChainState,
-        state_change: StateChange,
-        block_number: typing.BlockNumber,
+        state_change: Block,
+        due_channels: typing.List[deadlines.ChannelKey],
 ) -> TransitionResult:
     events = list()
 
-    for payment_network in chain_state.identifiers_to_paymentnetworks.values():
-        for token_network_state in payment_network.tokenaddresses_to_tokennetworks.values():
-            for channel_state in token_network_state.channelidentifiers_to_channels.values():
-                result = channel.state_transition(
-                    channel_state,
-                    state_change,
-                    chain_state.pseudo_random_generator,
-                    block_number,
-                )
-                events.extend(result.events)
+    for token_network_identifier, channel_identifier in due_channels:
+        channel_state = views.get_channelstate_by_token_network_identifier(
+            chain_state,
+            token_network_identifier,
+            channel_identifier,
+        )
+
+        if channel_state is not None:
+            result = channel.state_transition(
+                channel_state,
+                state_change,
+                chain_state.pseudo_random_generator,
+                state_change.block_number,
+            )
+            events.extend(result.events)
+
+            deadlines.schedule_channel(chain_state, token_network_identifier, channel_identifier)
+            indexes.index_channel(chain_state, token_network_identifier, channel_identifier)
 
     return TransitionResult(chain_state, events)
 
 
-def subdispatch_to_all_lockedtransfers(
+def subdispatch_to_due_lockedtransfers(
         chain_state: ChainState,
-        state_change: StateChange,
+        state_change: Block,
+        due_secrethashes: typing.List[typing.SecretHash],
 ) -> TransitionResult:
     events = list()
 
-    for secrethash in chain_state.payment_mapping.secrethashes_to_task.keys():
+    for secrethash in due_secrethashes:
         result = subdispatch_to_paymenttask(chain_state, state_change, secrethash)
         events.extend(result.events)
 
@@ -208,6 +315,9 @@ def subdispatch_to_paymenttask(
         if sub_iteration and sub_iteration.new_state is None:
             del chain_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        deadlines.schedule_payment_task(chain_state, secrethash)
+        indexes.index_payment_task(chain_state, sub_task)
+
     return TransitionResult(chain_state, events)
 
 
@@ -310,6 +420,9 @@ def subdispatch_mediatortask(
         elif secrethash in chain_state.payment_mapping.secrethashes_to_task:
             del chain_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        deadlines.schedule_payment_task(chain_state, secrethash)
+        indexes.index_payment_task(chain_state, sub_task)
+
     return TransitionResult(chain_state, events)
 
 
@@ -367,6 +480,9 @@ def subdispatch_targettask(
         elif secrethash in chain_state.payment_mapping.secrethashes_to_task:
             del chain_state.payment_mapping.secrethashes_to_task[secrethash]
 
+        deadlines.schedule_payment_task(chain_state, secrethash)
+        indexes.index_payment_task(chain_state, sub_task)
+
     return TransitionResult(chain_state, events)
 
 
@@ -400,6 +516,13 @@ def maybe_add_tokennetwork(
         ids_to_tokens[token_network_identifier] = token_network_state
         addrs_to_tokens[token_address] = token_network_state
 
+        deadlines.schedule_token_network(chain_state, token_network_state)
+        indexes.index_token_network(
+            chain_state,
+            payment_network_identifier,
+            token_network_state,
+        )
+
 
 def sanity_check(iteration: TransitionResult):
     assert isinstance(iteration.new_state, ChainState)
@@ -410,17 +533,22 @@ def handle_block(
         state_change: Block,
 ) -> TransitionResult:
     block_number = state_change.block_number
+
+    # Only the channels and tasks whose deadline is reached by this block are
+    # affected by it
+    due_channels, due_secrethashes = deadlines.pop_due(chain_state, block_number)
     chain_state.block_number = block_number
 
     # Subdispatch Block state change
-    channels_result = subdispatch_to_all_channels(
+    channels_result = subdispatch_to_due_channels(
         chain_state,
         state_change,
-        block_number,
+        due_channels,
     )
-    transfers_result = subdispatch_to_all_lockedtransfers(
+    transfers_result = subdispatch_to_due_lockedtransfers(
         chain_state,
         state_change,
+        due_secrethashes,
     )
     events = channels_result.events + transfers_result.events
     return TransitionResult(chain_state, events)
@@ -440,6 +568,42 @@ def handle_chain_init(
     return TransitionResult(chain_state, events)
 
 
+def get_indexed_channels(
+        chain_state: ChainState,
+        state_change: StateChange,
+) -> typing.List[typing.Tuple[typing.ChannelID, typing.Address]]:
+    """ Return the channels and partners whose index entries may be changed
+    by `state_change`, this must be called before the state change is
+    dispatched because the channels may be removed by it.
+    """
+    token_network_identifier = state_change.token_network_identifier
+
+    if type(state_change) == ContractReceiveChannelBatchUnlock:
+        indexed_channels = list()
+        for partner_address in (state_change.participant, state_change.partner):
+            channel_keys = indexes.get_channelkeys_by_partner(chain_state, partner_address)
+            for identifier, channel_identifier in channel_keys:
+                if identifier == token_network_identifier:
+                    indexed_channels.append((channel_identifier, partner_address))
+
+        return indexed_channels
+
+    channel_identifier = getattr(state_change, 'channel_identifier', None)
+    if channel_identifier is None:
+        return []
+
+    channel_state = views.get_channelstate_by_token_network_identifier(
+        chain_state,
+        token_network_identifier,
+        channel_identifier,
+    )
+    partner_address = None
+    if channel_state is not None:
+        partner_address = channel_state.partner_state.address
+
+    return [(channel_identifier, partner_address)]
+
+
 def handle_token_network_action(
         chain_state: ChainState,
         state_change: StateChange,
@@ -457,6 +621,8 @@ def handle_token_network_action(
 
     events = list()
     if token_network_state:
+        indexed_channels = get_indexed_channels(chain_state, state_change)
+
         pseudo_random_generator = chain_state.pseudo_random_generator
         iteration = token_network.state_transition(
             payment_network_id,
@@ -471,6 +637,7 @@ def handle_token_network_action(
                 chain_state,
                 state_change.token_network_identifier,
             )
+            indexes.unindex_token_network(chain_state, token_network_state)
 
             del payment_network_state.tokenaddresses_to_tokennetworks[
                 token_network_state.token_address
@@ -479,23 +646,42 @@ def handle_token_network_action(
                 token_network_state.address
             ]
 
+        if type(state_change) in deadlines.CHANNEL_DEADLINE_STATE_CHANGES:
+            deadlines.schedule_channel(
+                chain_state,
+                state_change.token_network_identifier,
+                state_change.channel_identifier,
+            )
+
+        for channel_identifier, partner_address in indexed_channels:
+            indexes.index_channel(
+                chain_state,
+                state_change.token_network_identifier,
+                channel_identifier,
+                partner_address,
+            )
+
         events = iteration.events
 
     return TransitionResult(chain_state, events)
 
 
 def handle_delivered(chain_state: ChainState, state_change: ReceiveDelivered) -> TransitionResult:
-    # TODO: improve the complexity of this algorithm
-    for queueid, queue in chain_state.queueids_to_queues.items():
-        if queueid[1] == 'global':
-            remove = []
+    message_identifier = state_change.message_identifier
+    queueids_to_queues = chain_state.queueids_to_queues
+
+    global_queueids = [
+        queueid
+        for queueid in get_queueids_by_message_identifier(chain_state, message_identifier)
+        if queueid[1] == 'global'
+    ]
 
-            for pos, message in enumerate(queue):
-                if message.message_identifier == state_change.message_identifier:
-                    remove.append(pos)
+    for queueid in global_queueids:
+        queue = get_message_queue(chain_state, queueid)
+        queueids_to_queues[queueid], _ = queue.remove(message_identifier)
 
-            for removepos in reversed(remove):
-                queue.pop(removepos)
+    if global_queueids:
+        unindex_message(chain_state, message_identifier, global_queueids)
 
     return TransitionResult(chain_state, [])
 
@@ -536,6 +722,11 @@ def handle_leave_all_networks(chain_state: ChainState) -> TransitionResult:
     for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
         for token_network_state in payment_network_state.tokenaddresses_to_tokennetworks.values():
             events.extend(_get_channels_close_events(chain_state, token_network_state))
+            indexes.index_token_network(
+                chain_state,
+                payment_network_state.address,
+                token_network_state,
+            )
 
     return TransitionResult(chain_state, events)
 
@@ -551,6 +742,11 @@ def handle_new_payment_network(
     if payment_network_identifier not in chain_state.identifiers_to_paymentnetworks:
         chain_state.identifiers_to_paymentnetworks[payment_network_identifier] = payment_network
 
+        for token_network_state in payment_network.tokenidentifiers_to_tokennetworks.values():
+            deadlines.schedule_token_network(chain_state, token_network_state)
+
+        indexes.index_payment_network(chain_state, payment_network)
+
     return TransitionResult(chain_state, events)
 
 
@@ -662,31 +858,36 @@ def handle_processed(
         chain_state: ChainState,
         state_change: ReceiveProcessed,
 ) -> TransitionResult:
-    # TODO: improve the complexity of this algorithm
     events = list()
-    for queue in chain_state.queueids_to_queues.values():
-        remove = []
+    message_identifier = state_change.message_identifier
+    queueids_to_queues = chain_state.queueids_to_queues
+    queueids = get_queueids_by_message_identifier(chain_state, message_identifier)
+
+    for queueid in queueids:
+        queue = get_message_queue(chain_state, queueid)
 
         # TODO: ensure Processed message came from the correct peer
-        for pos, message in enumerate(queue):
-            if message.message_identifier == state_change.message_identifier:
-                if type(message) == SendDirectTransfer:
-                    channel_state = views.get_channelstate_by_token_network_and_partner(
-                        chain_state,
-                        message.balance_proof.token_network_identifier,
-                        message.recipient,
-                    )
-                    events.append(EventPaymentSentSuccess(
-                        channel_state.payment_network_identifier,
-                        channel_state.token_network_identifier,
-                        message.payment_identifier,
-                        message.balance_proof.transferred_amount,
-                        message.recipient,
-                    ))
-                remove.append(pos)
-
-        for removepos in reversed(remove):
-            queue.pop(removepos)
+        queue, removed = queue.remove(message_identifier)
+        for message in removed:
+            if type(message) == SendDirectTransfer:
+                channel_state = views.get_channelstate_by_token_network_and_partner(
+                    chain_state,
+                    message.balance_proof.token_network_identifier,
+                    message.recipient,
+                )
+                events.append(EventPaymentSentSuccess(
+                    channel_state.payment_network_identifier,
+                    channel_state.token_network_identifier,
+                    message.payment_identifier,
+                    message.balance_proof.transferred_amount,
+                    message.recipient,
+                ))
+
+        if removed:
+            queueids_to_queues[queueid] = queue
+
+    if queueids:
+        unindex_message(chain_state, message_identifier, queueids)
 
     return TransitionResult(chain_state, events)
 
@@ -1083,8 +1284,11 @@ def update_queues(iteration: TransitionResult, state_change):
 
     for event in iteration.events:
         if isinstance(event, SendMessageEvent):
-            queue = chain_state.queueids_to_queues.setdefault(event.queue_identifier, [])
-            queue.append(event)
+            # The queues are persistent, appending returns a new queue which
+            # shares its chunks with the queue of the previous state
+            queue = get_message_queue(chain_state, event.queue_identifier)
+            chain_state.queueids_to_queues[event.queue_identifier] = queue.append(event)
+            index_message(chain_state, event.message_identifier, event.queue_identifier)
 
         if isinstance(event, ContractSendEvent):
             chain_state.pending_transactions.append(event)
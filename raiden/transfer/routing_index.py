@@ -0,0 +1,171 @@
+""" Adjacency index of the token network graphs used for route finding.
+
+The `TokenNetworkGraphState` keeps the networkx graph of the channels, it is
+part of the ChainState and it is saved with the snapshots. The route finding
+doesn't use the networkx graph directly, it uses a `RoutingIndex` which is
+kept outside of the ChainState, in a weak mapping keyed by the networkx graph
+it mirrors:
+
+- The index is built lazily from the graph the first time it is needed, e.g.
+  after a restore from a snapshot.
+- The graph is modified only through `add_edge` and `remove_edge`, these
+  update the index of the graph incrementally.
+- The copy on write of the graph moves the index to the new graph, the
+  previous graphs are immutable and their indexes are built again if they
+  are ever used.
+
+The distances from the neighbors of a node to a target are computed with a
+single BFS from the target, which is cached and resumed for the next
+payments to the same target until the topology of the network changes.
+"""
+import weakref
+from collections import OrderedDict, deque
+
+import networkx
+
+from raiden.utils import typing
+
+# Number of targets for which the searches are kept
+SEARCHES_CACHE_SIZE = 128
+
+_routing_indexes = weakref.WeakKeyDictionary()
+
+
+class BreadthFirstSearch:
+    """ Distances found so far by a BFS from `target`, and the nodes whose
+    neighbors are not visited yet.
+    """
+
+    __slots__ = (
+        'distances',
+        'queue',
+    )
+
+    def __init__(self, target: typing.Address, target_in_graph: bool):
+        self.distances = dict()
+        self.queue = deque()
+
+        if target_in_graph:
+            self.distances[target] = 0
+            self.queue.append(target)
+
+
+class RoutingIndex:
+    """ Adjacency sets of the participants of a token network. """
+
+    def __init__(self, network_graph: networkx.Graph = None):
+        self.adjacency = dict()
+        self.targets_to_searches = OrderedDict()
+
+        if network_graph is not None:
+            for node, neighbors in network_graph.adjacency():
+                self.adjacency[node] = set(neighbors)
+
+    def __contains__(self, address: typing.Address) -> bool:
+        return address in self.adjacency
+
+    def neighbors(self, address: typing.Address) -> typing.Set[typing.Address]:
+        return self.adjacency.get(address, set())
+
+    def add_edge(self, participant1: typing.Address, participant2: typing.Address):
+        neighbors1 = self.adjacency.setdefault(participant1, set())
+        neighbors2 = self.adjacency.setdefault(participant2, set())
+
+        if participant2 not in neighbors1:
+            neighbors1.add(participant2)
+            neighbors2.add(participant1)
+            self.targets_to_searches.clear()
+
+    def remove_edge(self, participant1: typing.Address, participant2: typing.Address):
+        # the nodes are kept, as done by networkx
+        self.adjacency[participant1].discard(participant2)
+        self.adjacency[participant2].discard(participant1)
+        self.targets_to_searches.clear()
+
+    def distances_to(
+            self,
+            target: typing.Address,
+            sources: typing.Iterable[typing.Address] = None,
+    ) -> typing.Dict[typing.Address, int]:
+        """ Return the number of hops to `target` from the nodes which have a
+        path to it. If `sources` is given the search stops once the distances
+        of the `sources` are known, the returned dict may not have the other
+        nodes. The result is cached and must not be modified.
+        """
+        search = self.targets_to_searches.get(target)
+
+        if search is None:
+            search = BreadthFirstSearch(target, target in self.adjacency)
+            self.targets_to_searches[target] = search
+
+            if len(self.targets_to_searches) > SEARCHES_CACHE_SIZE:
+                self.targets_to_searches.popitem(last=False)
+        else:
+            self.targets_to_searches.move_to_end(target)
+
+        distances = search.distances
+        queue = search.queue
+
+        missing = None
+        if sources is not None:
+            missing = {source for source in sources if source not in distances}
+
+        # the channels are bidirectional, the BFS from the target gives the
+        # distances to the target. The search is resumed by the next call.
+        while queue and (missing is None or missing):
+            node = queue.popleft()
+            next_distance = distances[node] + 1
+
+            for neighbor in self.adjacency[node]:
+                if neighbor not in distances:
+                    distances[neighbor] = next_distance
+                    queue.append(neighbor)
+
+                    if missing:
+                        missing.discard(neighbor)
+
+        return distances
+
+
+def get_routing_index(network_graph: networkx.Graph) -> RoutingIndex:
+    routing_index = _routing_indexes.get(network_graph)
+
+    if routing_index is None:
+        routing_index = RoutingIndex(network_graph)
+        _routing_indexes[network_graph] = routing_index
+
+    return routing_index
+
+
+def move_routing_index(network_graph: networkx.Graph, new_network_graph: networkx.Graph):
+    """ Reuse the index of `network_graph` for its copy `new_network_graph`,
+    `network_graph` must not be modified afterwards.
+    """
+    routing_index = _routing_indexes.pop(network_graph, None)
+
+    if routing_index is not None:
+        _routing_indexes[new_network_graph] = routing_index
+
+
+def add_edge(
+        network_graph: networkx.Graph,
+        participant1: typing.Address,
+        participant2: typing.Address,
+):
+    network_graph.add_edge(participant1, participant2)
+
+    routing_index = _routing_indexes.get(network_graph)
+    if routing_index is not None:
+        routing_index.add_edge(participant1, participant2)
+
+
+def remove_edge(
+        network_graph: networkx.Graph,
+        participant1: typing.Address,
+        participant2: typing.Address,
+):
+    network_graph.remove_edge(participant1, participant2)
+
+    routing_index = _routing_indexes.get(network_graph)
+    if routing_index is not None:
+        routing_index.remove_edge(participant1, participant2)
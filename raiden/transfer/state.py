@@ -7,7 +7,6 @@ from functools import total_ordering
 import networkx
 
 from raiden.constants import UINT256_MAX, UINT64_MAX
-from raiden.encoding.format import buffer_for
 from raiden.encoding import messages
 from raiden.transfer.architecture import State
 from raiden.transfer.merkle_tree import merkleroot
@@ -48,6 +47,10 @@ NODE_NETWORK_UNKNOWN = 'unknown'
 NODE_NETWORK_UNREACHABLE = 'unreachable'
 NODE_NETWORK_REACHABLE = 'reachable'
 
+# Maximum number of messages in a chunk of a MessageQueueState, adding or
+# removing a message copies one chunk and the tuple of the chunks
+MESSAGE_QUEUE_CHUNK_SIZE = 64
+
 
 def balanceproof_from_envelope(envelope_message):
     return BalanceProofSignedState(
@@ -102,14 +105,20 @@ class ChainState(State):
 
     __slots__ = (
         'block_number',
+        'blocknumbers_to_channels',
+        'blocknumbers_to_secrethashes',
         'chain_id',
+        'channelstatuses_to_channelids',
         'identifiers_to_paymentnetworks',
+        'messageidentifiers_to_queueids',
         'nodeaddresses_to_networkstates',
         'our_address',
+        'partneraddresses_to_channelids',
         'payment_mapping',
         'pending_transactions',
         'pseudo_random_generator',
         'queueids_to_queues',
+        'tokennetworkidentifiers_to_paymentnetworkidentifiers',
     )
 
     def __init__(
@@ -126,14 +135,23 @@ class ChainState(State):
             raise ValueError('chain_id must be of ChainID type')
 
         self.block_number = block_number
+        # Index of the block deadlines, see `raiden.transfer.deadlines`
+        self.blocknumbers_to_channels = dict()
+        self.blocknumbers_to_secrethashes = dict()
         self.chain_id = chain_id
+        # Indexes of the views, see `raiden.transfer.indexes`
+        self.channelstatuses_to_channelids = dict()
         self.identifiers_to_paymentnetworks = dict()
+        # Index of the message queues, see `node.update_queues`
+        self.messageidentifiers_to_queueids = dict()
         self.nodeaddresses_to_networkstates = dict()
         self.our_address = our_address
+        self.partneraddresses_to_channelids = dict()
         self.payment_mapping = PaymentMappingState()
         self.pending_transactions = list()
         self.pseudo_random_generator = pseudo_random_generator
         self.queueids_to_queues = dict()
+        self.tokennetworkidentifiers_to_paymentnetworkidentifiers = dict()
 
     def __repr__(self):
         return '<ChainState block:{} networks:{} qty_transfers:{} chain_id:{}>'.format(
@@ -146,7 +164,10 @@ class ChainState(State):
     def __eq__(self, other):
         return (
             isinstance(other, ChainState) and
-            self.pseudo_random_generator == other.pseudo_random_generator and
+            (
+                self.pseudo_random_generator.getstate() ==
+                other.pseudo_random_generator.getstate()
+            ) and
             self.block_number == other.block_number and
             self.queueids_to_queues == other.queueids_to_queues and
             self.identifiers_to_paymentnetworks == other.identifiers_to_paymentnetworks and
@@ -269,7 +290,10 @@ class TokenNetworkGraphState(State):
     def __eq__(self, other):
         return (
             isinstance(other, TokenNetworkGraphState) and
-            self.network == other.network and
+            (
+                networkx.to_dict_of_dicts(self.network) ==
+                networkx.to_dict_of_dicts(other.network)
+            ) and
             self.channel_identifier_to_participants == other.channel_identifier_to_participants
         )
 
@@ -277,6 +301,106 @@ class TokenNetworkGraphState(State):
         return not self.__eq__(other)
 
 
+class MessageQueueState(State):
+    """ The messages sent to a partner which were not acknowledged yet, in
+    the order they were sent.
+
+    The queue is persistent, `append` and `remove` return a new queue which
+    shares the unmodified chunks with this one. The messages are split in
+    chunks mapping a message identifier to its messages, so that removing a
+    message copies a single chunk instead of the whole queue.
+    """
+
+    __slots__ = (
+        'chunks',
+        'size',
+    )
+
+    def __init__(self, chunks: typing.Tuple[typing.Dict, ...] = (), size: int = 0):
+        self.chunks = chunks
+        self.size = size
+
+    @classmethod
+    def from_messages(cls, queued_messages: typing.Iterable) -> 'MessageQueueState':
+        queue = cls()
+        for message in queued_messages:
+            queue = queue.append(message)
+        return queue
+
+    def append(self, message) -> 'MessageQueueState':
+        message_identifier = message.message_identifier
+        chunks = self.chunks
+
+        # A repeated message identifier starts a new chunk, otherwise the
+        # message would be iterated before the messages sent in between
+        last_chunk = chunks[-1] if chunks else None
+        if (
+            last_chunk is None or
+            len(last_chunk) >= MESSAGE_QUEUE_CHUNK_SIZE or
+            message_identifier in last_chunk
+        ):
+            chunks = chunks + ({message_identifier: (message,)},)
+        else:
+            last_chunk = dict(last_chunk)
+            last_chunk[message_identifier] = (message,)
+            chunks = chunks[:-1] + (last_chunk,)
+
+        return MessageQueueState(chunks, self.size + 1)
+
+    def remove(
+            self,
+            message_identifier: typing.MessageID,
+    ) -> typing.Tuple['MessageQueueState', typing.List]:
+        """ Return the queue without the messages with `message_identifier`,
+        and the removed messages.
+        """
+        removed = list()
+        chunks = list()
+
+        for chunk in self.chunks:
+            if message_identifier in chunk:
+                chunk = dict(chunk)
+                removed.extend(chunk.pop(message_identifier))
+
+            if chunk:
+                chunks.append(chunk)
+
+        if not removed:
+            return self, removed
+
+        return MessageQueueState(tuple(chunks), self.size - len(removed)), removed
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            for queued_messages in chunk.values():
+                yield from queued_messages
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, message):
+        return any(
+            message in chunk.get(message.message_identifier, ())
+            for chunk in self.chunks
+        )
+
+    def __repr__(self):
+        return '<MessageQueueState messages:{} chunks:{}>'.format(
+            self.size,
+            len(self.chunks),
+        )
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, MessageQueueState) and
+            self.size == other.size and
+            list(self) == list(other)
+        )
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class PaymentMappingState(State):
     """ Global map from secrethash to a transfer task.
     This mapping is used to quickly dispatch state changes by secrethash, for
@@ -632,11 +756,11 @@ class HashTimeLockState(State):
         if not isinstance(secrethash, typing.T_Keccak256):
             raise ValueError('secrethash must be a keccak256 instance')
 
-        packed = messages.Lock(buffer_for(messages.Lock))
+        packed = messages.Lock()
         packed.amount = amount
         packed.expiration = expiration
         packed.secrethash = secrethash
-        encoded = bytes(packed.data)
+        encoded = packed.encode()
 
         self.amount = amount
         self.expiration = expiration
@@ -1,4 +1,4 @@
-from raiden.transfer import channel, views
+from raiden.transfer import channel, routing_index, views
 from raiden.transfer.architecture import TransitionResult
 from raiden.transfer.state import CHANNEL_STATE_UNUSABLE
 from raiden.transfer.events import EventPaymentSentFailed
@@ -75,7 +75,8 @@ def handle_channelnew(token_network_state, state_change):
     our_address = channel_state.our_state.address
     partner_address = channel_state.partner_state.address
 
-    token_network_state.network_graph.network.add_edge(
+    routing_index.add_edge(
+        token_network_state.network_graph.network,
         our_address,
         partner_address,
     )
@@ -119,7 +120,8 @@ def handle_closed(
     participant1, participant2 = network_graph_state.channel_identifier_to_participants[
         state_change.channel_identifier
     ]
-    token_network_state.network_graph.network.remove_edge(
+    routing_index.remove_edge(
+        token_network_state.network_graph.network,
         participant1,
         participant2,
     )
@@ -212,7 +214,8 @@ def handle_batch_unlock(
 def handle_newroute(token_network_state, state_change):
     events = list()
 
-    token_network_state.network_graph.network.add_edge(
+    routing_index.add_edge(
+        token_network_state.network_graph.network,
         state_change.participant1,
         state_change.participant2,
     )
@@ -230,7 +233,8 @@ def handle_closeroute(token_network_state, state_change):
     participant1, participant2 = network_graph_state.channel_identifier_to_participants[
         state_change.channel_identifier
     ]
-    token_network_state.network_graph.network.remove_edge(
+    routing_index.remove_edge(
+        token_network_state.network_graph.network,
         participant1,
         participant2,
     )
@@ -1,4 +1,4 @@
-from raiden.transfer import channel
+from raiden.transfer import channel, indexes
 from raiden.transfer.architecture import ContractSendEvent
 from raiden.transfer.state import (
     CHANNEL_STATE_OPENED,
@@ -26,15 +26,7 @@ def all_neighbour_nodes(chain_state: ChainState) -> typing.Set[typing.Address]:
     """ Return the identifiers for all nodes accross all payment networks which
     have a channel open with this one.
     """
-    addresses = set()
-
-    for payment_network in chain_state.identifiers_to_paymentnetworks.values():
-        for token_network in payment_network.tokenidentifiers_to_tokennetworks.values():
-            channel_states = token_network.channelidentifiers_to_channels.values()
-            for channel_state in channel_states:
-                addresses.add(channel_state.partner_state.address)
-
-    return addresses
+    return set(indexes.get_partner_index(chain_state))
 
 
 def block_number(chain_state: ChainState) -> int:
@@ -73,7 +65,10 @@ def get_pending_transactions(chain_state: ChainState) -> typing.List[ContractSen
 
 
 def get_all_messagequeues(chain_state: ChainState) -> typing.Dict:
-    return chain_state.queueids_to_queues
+    return {
+        queueid: list(queue)
+        for queueid, queue in chain_state.queueids_to_queues.items()
+    }
 
 
 def get_networkstatuses(chain_state: ChainState) -> typing.Dict:
@@ -132,11 +127,7 @@ def get_token_network_registry_by_token_network_identifier(
         chain_state: ChainState,
         token_network_identifier: typing.Address,
 ) -> typing.Optional[PaymentNetworkState]:
-    for payment_network in chain_state.identifiers_to_paymentnetworks.values():
-        if token_network_identifier in payment_network.tokenidentifiers_to_tokennetworks:
-            return payment_network
-
-    return None
+    return indexes.get_payment_network(chain_state, token_network_identifier)
 
 
 def get_token_network_identifier_by_token_address(
@@ -239,16 +230,7 @@ def get_token_network_by_identifier(
         chain_state: ChainState,
         token_network_id: typing.TokenAddress,
 ) -> typing.Optional[TokenNetworkState]:
-
-    token_network_state = None
-    for payment_network_state in chain_state.identifiers_to_paymentnetworks.values():
-        token_network_state = payment_network_state.tokenidentifiers_to_tokennetworks.get(
-            token_network_id,
-        )
-        if token_network_state:
-            return token_network_state
-
-    return token_network_state
+    return indexes.get_token_network(chain_state, token_network_id)
 
 
 def get_channelstate_for(
@@ -379,17 +361,45 @@ def get_channelstate_for_receiving(
     return result
 
 
+def get_channelstate_by_status(
+        chain_state: ChainState,
+        payment_network_id: typing.PaymentNetworkID,
+        token_address: typing.TokenAddress,
+        status: str,
+) -> typing.List[NettingChannelState]:
+    """Return the state of the channels in a token network with the given
+    status, in ascending order of identifiers."""
+    token_network = get_token_network_by_token_address(
+        chain_state,
+        payment_network_id,
+        token_address,
+    )
+
+    if token_network is None:
+        return []
+
+    channel_identifiers = indexes.get_channelids_by_status(
+        chain_state,
+        token_network.address,
+        status,
+    )
+    return [
+        token_network.channelidentifiers_to_channels[channel_identifier]
+        for channel_identifier in sorted(channel_identifiers)
+    ]
+
+
 def get_channelstate_open(
         chain_state: ChainState,
         payment_network_id: typing.PaymentNetworkID,
         token_address: typing.TokenAddress,
 ) -> typing.List[NettingChannelState]:
     """Return the state of open channels in a token network."""
-    return get_channelstate_filter(
+    return get_channelstate_by_status(
         chain_state,
         payment_network_id,
         token_address,
-        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_OPENED,
+        CHANNEL_STATE_OPENED,
     )
 
 
@@ -399,11 +409,11 @@ def get_channelstate_closing(
         token_address: typing.TokenAddress,
 ) -> typing.List[NettingChannelState]:
     """Return the state of closing channels in a token network."""
-    return get_channelstate_filter(
+    return get_channelstate_by_status(
         chain_state,
         payment_network_id,
         token_address,
-        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_CLOSING,
+        CHANNEL_STATE_CLOSING,
     )
 
 
@@ -413,11 +423,11 @@ def get_channelstate_closed(
         token_address: typing.TokenAddress,
 ) -> typing.List[NettingChannelState]:
     """Return the state of closed channels in a token network."""
-    return get_channelstate_filter(
+    return get_channelstate_by_status(
         chain_state,
         payment_network_id,
         token_address,
-        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_CLOSED,
+        CHANNEL_STATE_CLOSED,
     )
 
 
@@ -427,11 +437,11 @@ def get_channelstate_settling(
         token_address: typing.TokenAddress,
 ) -> typing.List[NettingChannelState]:
     """Return the state of settling channels in a token network."""
-    return get_channelstate_filter(
+    return get_channelstate_by_status(
         chain_state,
         payment_network_id,
         token_address,
-        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_SETTLING,
+        CHANNEL_STATE_SETTLING,
     )
 
 
@@ -441,11 +451,11 @@ def get_channelstate_settled(
         token_address: typing.TokenAddress,
 ) -> typing.List[NettingChannelState]:
     """Return the state of settled channels in a token network."""
-    return get_channelstate_filter(
+    return get_channelstate_by_status(
         chain_state,
         payment_network_id,
         token_address,
-        lambda channel_state: channel.get_status(channel_state) == CHANNEL_STATE_SETTLED,
+        CHANNEL_STATE_SETTLED,
     )
 
 
@@ -487,6 +497,26 @@ def list_channelstate_for_tokennetwork(
     return result
 
 
+def list_channelstate_for_partner(
+        chain_state: ChainState,
+        payment_network_id: typing.PaymentNetworkID,
+        partner_address: typing.Address,
+) -> typing.List[NettingChannelState]:
+    """ Return the channels with `partner_address` in all the token networks
+    of the payment network. """
+    result = []
+    channel_keys = indexes.get_channelkeys_by_partner(chain_state, partner_address)
+
+    for token_network_id, channel_id in sorted(channel_keys):
+        payment_network = indexes.get_payment_network(chain_state, token_network_id)
+
+        if payment_network is not None and payment_network.address == payment_network_id:
+            token_network = payment_network.tokenidentifiers_to_tokennetworks[token_network_id]
+            result.append(token_network.channelidentifiers_to_channels[channel_id])
+
+    return result
+
+
 def list_all_channelstate(chain_state: ChainState) -> typing.List[NettingChannelState]:
     result = []
     for payment_network in chain_state.identifiers_to_paymentnetworks.values():
@@ -502,18 +532,8 @@ def list_all_channelstate(chain_state: ChainState) -> typing.List[NettingChannel
 def search_payment_network_by_token_network_id(
         chain_state: ChainState,
         token_network_id: typing.Address,
-) -> typing.Optional['TokenNetworkState']:
-
-    payment_network_state = None
-    for payment_network in chain_state.identifiers_to_paymentnetworks.values():
-        token_network_state = payment_network.tokenidentifiers_to_tokennetworks.get(
-            token_network_id,
-        )
-
-        if token_network_state:
-            return payment_network_state
-
-    return payment_network_state
+) -> typing.Optional[PaymentNetworkState]:
+    return indexes.get_payment_network(chain_state, token_network_id)
 
 
 def filter_channels_by_partneraddress(
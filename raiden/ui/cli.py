@@ -37,7 +37,7 @@ from requests.exceptions import (
     ConnectTimeout,
     RequestException,
 )
-from web3 import Web3, HTTPProvider
+from web3 import Web3
 
 from raiden import constants
 from raiden.accounts import AccountManager
@@ -55,13 +55,21 @@ from raiden.exceptions import (
 from raiden.log_config import configure_logging
 from raiden.network.blockchain_service import BlockChainService
 from raiden.network.discovery import ContractDiscovery
+from raiden.network.rpc.batching import BatchingHTTPProvider
 from raiden.network.rpc.client import JSONRPCClient
 from raiden.network.sockfactory import SocketFactory
 from raiden.network.throttle import TokenBucket
 from raiden.network.transport import MatrixTransport, UDPTransport
 from raiden.network.utils import get_free_port
 from raiden.settings import (
+    DEFAULT_DATABASE_COMPACTION,
+    DEFAULT_DATABASE_MAX_BATCH_LATENCY,
+    DEFAULT_DATABASE_SERIALIZER,
     DEFAULT_NAT_KEEPALIVE_RETRIES,
+    DEFAULT_RPC_MAX_BATCH_SIZE,
+    DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY,
+    DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+    DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
     ETHERSCAN_API,
     INITIAL_PORT,
     ORACLE_BLOCKNUMBER_DRIFT_TOLERANCE,
@@ -93,7 +101,9 @@ from raiden_contracts.constants import (
     CONTRACT_SECRET_REGISTRY,
     CONTRACT_TOKEN_NETWORK_REGISTRY,
 )
-from raiden.storage.sqlite import RAIDEN_DB_VERSION
+from raiden.storage import compaction
+from raiden.storage.serialize import PickleSerializer
+from raiden.storage.sqlite import RAIDEN_DB_VERSION, SQLiteStorage
 
 
 log = structlog.get_logger(__name__)
@@ -386,6 +396,46 @@ def options(func):
             default='ropsten',
             show_default=True,
         ),
+        option(
+            '--database-max-batch-latency',
+            help=(
+                'Maximum time in seconds a state change waits to be saved in the '
+                'same database transaction as other state changes. Zero saves '
+                'every state change in its own transaction.'
+            ),
+            default=DEFAULT_DATABASE_MAX_BATCH_LATENCY,
+            type=float,
+            show_default=True,
+        ),
+        option(
+            '--database-compaction/--no-database-compaction',
+            help=(
+                'After every full snapshot delete the state changes and events '
+                'which are not needed to restore the node, the payment history '
+                'is kept. See also the compact-db command.'
+            ),
+            default=DEFAULT_DATABASE_COMPACTION,
+            show_default=True,
+        ),
+        option(
+            '--database-archive-path',
+            help=(
+                'Append the state changes and events deleted by the compaction '
+                'to this gzip file.'
+            ),
+            type=click.Path(dir_okay=False, writable=True, resolve_path=True),
+        ),
+        option(
+            '--database-serializer',
+            help=(
+                'Format used to save the state changes, events and snapshots. '
+                'The msgpack format is smaller and does not depend on the layout '
+                'of the Python classes, it can read databases written with pickle.'
+            ),
+            type=click.Choice(['pickle', 'msgpack']),
+            default=DEFAULT_DATABASE_SERIALIZER,
+            show_default=True,
+        ),
         option_group(
             'Ethereum Node Options',
             option(
@@ -413,6 +463,17 @@ def options(func):
                 type=str,
                 show_default=True,
             ),
+            option(
+                '--eth-rpc-max-batch-size',
+                help=(
+                    'Maximum number of JSON-RPC requests sent to the ethereum node '
+                    'in a single batch. The concurrent requests are batched, with '
+                    '1 every request is sent on its own.'
+                ),
+                default=DEFAULT_RPC_MAX_BATCH_SIZE,
+                type=click.IntRange(min=1),
+                show_default=True,
+            ),
         ),
         option_group(
             'UDP Transport Options',
@@ -443,6 +504,30 @@ def options(func):
                 type=int,
                 show_default=True,
             ),
+            option(
+                '--send-window',
+                help=(
+                    'Maximum number of unacknowledged messages, which are not '
+                    'specific to a channel, e.g. Processed and SecretRequest, sent to '
+                    'a node. One sends the messages one at a time. The messages of a '
+                    'channel are always sent one at a time.'
+                ),
+                default=DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
+                type=click.IntRange(min=1),
+                show_default=True,
+            ),
+            option(
+                '--delivered-batch-latency',
+                help=(
+                    'Maximum time in seconds a delivery acknowledgement waits to be '
+                    'sent in the same packet as other acknowledgements for the same '
+                    'node. Zero sends every acknowledgement in its own packet, '
+                    'which is required by nodes older than this option.'
+                ),
+                default=DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+                type=float,
+                show_default=True,
+            ),
             option(
                 '--nat',
                 help=(
@@ -476,6 +561,18 @@ def options(func):
                 type=MatrixServerType(['auto', '<url>']),
                 show_default=True,
             ),
+            option(
+                '--matrix-batch-latency',
+                help=(
+                    'Maximum time in seconds a message waits to be sent in the '
+                    'same room event as other messages for the same room. Zero '
+                    'sends every message in its own event, which is required by '
+                    'nodes older than this option.'
+                ),
+                default=DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY,
+                type=float,
+                show_default=True,
+            ),
         ),
         option_group(
             'Logging Options',
@@ -568,6 +665,14 @@ def run_app(
         transport,
         matrix_server,
         network_id,
+        database_max_batch_latency=DEFAULT_DATABASE_MAX_BATCH_LATENCY,
+        database_compaction=DEFAULT_DATABASE_COMPACTION,
+        database_archive_path=None,
+        send_window=DEFAULT_TRANSPORT_UDP_SEND_WINDOW,
+        delivered_batch_latency=DEFAULT_TRANSPORT_UDP_DELIVERED_BATCH_LATENCY,
+        matrix_batch_latency=DEFAULT_TRANSPORT_MATRIX_BATCH_LATENCY,
+        eth_rpc_max_batch_size=DEFAULT_RPC_MAX_BATCH_SIZE,
+        database_serializer=DEFAULT_DATABASE_SERIALIZER,
         extra_config=None,
         **kwargs,
 ):
@@ -605,9 +710,12 @@ def run_app(
         config['transport']['udp']['external_port'] = mapped_socket.external_port
     config['transport_type'] = transport
     config['transport']['matrix']['server'] = matrix_server
+    config['transport']['matrix']['batch_latency'] = matrix_batch_latency
     config['transport']['udp']['nat_keepalive_retries'] = DEFAULT_NAT_KEEPALIVE_RETRIES
     timeout = max_unresponsive_time / DEFAULT_NAT_KEEPALIVE_RETRIES
     config['transport']['udp']['nat_keepalive_timeout'] = timeout
+    config['transport']['udp']['send_window'] = send_window
+    config['transport']['udp']['delivered_batch_latency'] = delivered_batch_latency
 
     privatekey_hex = hexlify(privatekey_bin)
     config['privatekey_hex'] = privatekey_hex
@@ -616,7 +724,7 @@ def run_app(
     if not parsed_eth_rpc_endpoint.scheme:
         eth_rpc_endpoint = f'http://{eth_rpc_endpoint}'
 
-    web3 = Web3(HTTPProvider(eth_rpc_endpoint))
+    web3 = Web3(BatchingHTTPProvider(eth_rpc_endpoint, max_batch_size=eth_rpc_max_batch_size))
 
     try:
         node_version = web3.version.node  # pylint: disable=no-member
@@ -662,6 +770,10 @@ def run_app(
         f'v{RAIDEN_DB_VERSION}_log.db',
     )
     config['database_path'] = database_path
+    config['database_max_batch_latency'] = database_max_batch_latency
+    config['database_compaction'] = database_compaction
+    config['database_archive_path'] = database_archive_path
+    config['database_serializer'] = database_serializer
     print(
         '\nYou are connected to the \'{}\' network and the DB path is: {}'.format(
             constants.ID_TO_NETWORKNAME.get(net_id) or net_id,
@@ -1271,6 +1383,58 @@ def smoketest(ctx, debug, local_matrix, **kwargs):  # pylint: disable=unused-arg
         sys.exit(1)
 
 
+@run.command('compact-db')
+@click.option(
+    '--database-path',
+    help='Path of the database, it is printed when the node starts.',
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+    required=True,
+)
+@click.option(
+    '--archive-path',
+    help='Append the deleted state changes and events to this gzip file.',
+    type=click.Path(dir_okay=False, writable=True, resolve_path=True),
+)
+@click.option(
+    '--vacuum/--no-vacuum',
+    help=(
+        'Rebuild the database file, required once to return the free space of '
+        'databases created before the incremental vacuum was enabled.'
+    ),
+    default=False,
+    show_default=True,
+)
+def compact_db(database_path, archive_path, vacuum):
+    """ Delete the state changes and events of a stopped node which are not
+    needed to restore its state, the payment history is kept.
+    """
+    db_lock = filelock.FileLock(os.path.join(os.path.dirname(database_path), '.lock'))
+    try:
+        db_lock.acquire(timeout=0)
+    except filelock.Timeout:
+        click.secho('The database is in use, stop the node first.', fg='red')
+        sys.exit(1)
+
+    try:
+        storage = SQLiteStorage(database_path, PickleSerializer)
+        statistics = compaction.compact(storage, archive_path=archive_path)
+
+        if statistics is None:
+            click.secho('The database has no snapshot, nothing to compact.', fg='yellow')
+        else:
+            click.echo(
+                f'Deleted {statistics.deleted_state_changes} state changes, '
+                f'{statistics.deleted_events} events and '
+                f'{statistics.deleted_snapshots} snapshots.',
+            )
+
+        if vacuum:
+            storage.vacuum()
+            click.echo('Database vacuumed.')
+    finally:
+        db_lock.release()
+
+
 @run.command(
     help=(
         'Start an echo node.\n'
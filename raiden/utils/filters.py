@@ -1,6 +1,10 @@
+from collections import defaultdict, deque
+
 from eth_utils import (
     decode_hex,
+    encode_hex,
     event_abi_to_log_topic,
+    to_normalized_address,
 )
 from web3 import Web3
 from web3.utils.abi import filter_by_type
@@ -8,12 +12,23 @@ from web3.utils.events import get_event_data
 from eth_utils import to_checksum_address
 from web3.utils.filters import construct_event_filter_params, LogFilter
 from pkg_resources import DistributionNotFound
+import structlog
 from gevent.lock import Semaphore
+from gevent.pool import Pool
 
 from raiden_contracts.contract_manager import CONTRACT_MANAGER
 from raiden_contracts.constants import CONTRACT_TOKEN_NETWORK, ChannelEvent
 
-from raiden.utils.typing import Address, ChannelID, BlockSpecification, Dict
+from raiden.utils.typing import (
+    Address,
+    BlockSpecification,
+    ChannelID,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 try:
     from eth_tester.exceptions import BlockNotFound
@@ -21,6 +36,8 @@ except (ModuleNotFoundError, DistributionNotFound):
     class BlockNotFound(Exception):
         pass
 
+log = structlog.get_logger(__name__)  # pylint: disable=invalid-name
+
 
 def get_filter_args_for_specific_event_from_channel(
         token_network_address: Address,
@@ -113,24 +130,99 @@ class StatelessFilter(LogFilter):
 
     def get_new_entries(self, block_number: int = None):
         with self._lock:
-            filter_params = self.filter_params.copy()
-            filter_params['fromBlock'] = max(
-                filter_params.get('fromBlock', 0),
-                self._last_block + 1,
-            )
-            # This logic may contain a race condition. It's possible that after
-            # `web.eth.blockNumber` and before `web3.eth.getLogs` a new block is mined.
-            # This is okay because any new logs on this new block will be fetched on the
-            # next call to `get_new_entries`
-            if block_number is None:
-                block_number = self.web3.eth.blockNumber
-            if self.filter_params.get('toBlock') in (None, 'latest', 'pending'):
-                filter_params['toBlock'] = block_number or 'latest'
-            self._last_block = filter_params.get('toBlock') or block_number
+            filter_params, last_block = self._new_entries_params(block_number)
             try:
-                return self.web3.eth.getLogs(filter_params)
+                entries = self.web3.eth.getLogs(filter_params)
             except BlockNotFound:
-                return []
+                entries = []
+
+            self._last_block = last_block
+            return entries
+
+    @property
+    def next_block(self) -> BlockSpecification:
+        """ The first block queried by the next `get_new_entries`. """
+        from_block = self.filter_params.get('fromBlock', 0)
+        if not isinstance(from_block, int):
+            return from_block
+        return max(from_block, self._last_block + 1)
+
+    def mark_fetched(self, block_number: int):
+        """ Consider the entries up to block_number fetched, for entries
+        fetched for several filters at once, see `get_entries_chunked`.
+        """
+        with self._lock:
+            self._last_block = block_number
+
+    def _new_entries_params(self, block_number: int = None) -> Tuple[Dict, int]:
+        """ The filter params for the blocks after the last query, and the
+        last block of the query. The blocks are considered fetched only once
+        the logs are returned, the caller updates `_last_block`.
+        """
+        filter_params = self.filter_params.copy()
+        filter_params['fromBlock'] = max(
+            filter_params.get('fromBlock', 0),
+            self._last_block + 1,
+        )
+        # This logic may contain a race condition. It's possible that after
+        # `web.eth.blockNumber` and before `web3.eth.getLogs` a new block is mined.
+        # This is okay because any new logs on this new block will be fetched on the
+        # next call to `get_new_entries`
+        if block_number is None:
+            block_number = self.web3.eth.blockNumber
+        if self.filter_params.get('toBlock') in (None, 'latest', 'pending'):
+            filter_params['toBlock'] = block_number or 'latest'
+        last_block = filter_params.get('toBlock') or block_number
+        return filter_params, last_block
+
+    def match(self, log: Dict) -> bool:
+        """ True if the log was emitted by the address of the filter and
+        matches its topics.
+        """
+        addresses = self.filter_params.get('address')
+        if addresses is not None:
+            if not isinstance(addresses, list):
+                addresses = [addresses]
+
+            normalized_addresses = [to_normalized_address(address) for address in addresses]
+            if to_normalized_address(log['address']) not in normalized_addresses:
+                return False
+
+        log_topics = [_topic_to_hex(topic) for topic in log['topics']]
+        for position, topic in enumerate(self.filter_params.get('topics') or []):
+            # None matches any topic, a list matches any of its topics
+            if topic is None:
+                continue
+
+            if position >= len(log_topics):
+                return False
+
+            expected_topics = topic if isinstance(topic, list) else [topic]
+            if log_topics[position] not in [_topic_to_hex(topic) for topic in expected_topics]:
+                return False
+
+        return True
+
+    def includes_all_events(self, abi: Dict) -> bool:
+        """ True if the filter returns all the events of the contract with
+        the given `abi`.
+        """
+        topics = self.filter_params.get('topics')
+        if not topics:
+            return True
+
+        if any(topic is not None for topic in topics[1:]):
+            return False
+
+        if topics[0] is None:
+            return True
+
+        event_topics = topics[0] if isinstance(topics[0], list) else [topics[0]]
+        abi_topics = {
+            encode_hex(event_abi_to_log_topic(event_abi))
+            for event_abi in filter_by_type('event', abi)
+        }
+        return abi_topics.issubset(_topic_to_hex(topic) for topic in event_topics)
 
     def get_all_entries(self, block_number: int = None):
         with self._lock:
@@ -144,3 +236,215 @@ class StatelessFilter(LogFilter):
                 return self.web3.eth.getLogs(filter_params)
             except BlockNotFound:
                 return []
+
+
+def _topic_to_hex(topic) -> str:
+    if isinstance(topic, int):
+        return '0x{:064x}'.format(topic)
+    if isinstance(topic, str):
+        return topic.lower()
+    return encode_hex(topic)
+
+
+def _merge_topics(topics_of_filters: List[Optional[List]]) -> Optional[List]:
+    """ The topics of a query which returns the logs of all the filters, only
+    the event topic is merged, the other topics are checked by
+    `StatelessFilter.match`.
+    """
+    event_topics = set()
+
+    for topics in topics_of_filters:
+        if not topics or topics[0] is None:
+            return None
+
+        event_topic = topics[0]
+        if isinstance(event_topic, list):
+            event_topics.update(_topic_to_hex(topic) for topic in event_topic)
+        else:
+            event_topics.add(_topic_to_hex(event_topic))
+
+    return [sorted(event_topics)]
+
+
+def get_entries_merged(
+        filters: List['StatelessFilter'],
+        from_block: int,
+        to_block: int,
+) -> List[List[Dict]]:
+    """ The entries of every filter in the block range, in the order of the
+    filters, the filters are not updated.
+
+    A single eth_getLogs is done for all the addresses of the filters, the
+    logs are then handed to the filters they match.
+    """
+    filters_params = [
+        dict(stateless_filter.filter_params, fromBlock=from_block, toBlock=to_block)
+        for stateless_filter in filters
+    ]
+
+    if len(filters) == 1:
+        merged_params = filters_params[0]
+    else:
+        addresses = set()
+        for filter_params in filters_params:
+            address = filter_params.get('address')
+            if address is None:
+                # a filter for the logs of every contract
+                addresses = None
+                break
+            if isinstance(address, list):
+                addresses.update(to_normalized_address(item) for item in address)
+            else:
+                addresses.add(to_normalized_address(address))
+
+        merged_params = {
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': sorted(addresses) if addresses is not None else None,
+            'topics': _merge_topics([
+                filter_params.get('topics')
+                for filter_params in filters_params
+            ]),
+        }
+
+    try:
+        logs = filters[0].web3.eth.getLogs(merged_params)
+    except BlockNotFound:
+        logs = []
+
+    if len(filters) == 1:
+        return [logs]
+
+    return [
+        [log for log in logs if stateless_filter.match(log)]
+        for stateless_filter in filters
+    ]
+
+
+def get_new_entries_merged(
+        filters: List['StatelessFilter'],
+        block_number: int = None,
+) -> List[List[Dict]]:
+    """ Same as calling `get_new_entries` for every filter, returns the
+    entries of every filter in the same order.
+
+    The filters which are polled for the same block range are queried
+    together with `get_entries_merged`. Usually every filter is polled for the
+    same blocks, and a single request is done no matter the number of filters.
+    """
+    if not filters:
+        return []
+
+    if block_number is None:
+        block_number = filters[0].web3.eth.blockNumber
+
+    # The locks are always acquired in the order of the filters
+    for stateless_filter in filters:
+        stateless_filter._lock.acquire()
+
+    try:
+        block_ranges_to_filters = defaultdict(list)
+        for position, stateless_filter in enumerate(filters):
+            filter_params, last_block = stateless_filter._new_entries_params(block_number)
+            key = (
+                id(stateless_filter.web3),
+                filter_params['fromBlock'],
+                filter_params['toBlock'],
+            )
+            block_ranges_to_filters[key].append((position, stateless_filter, last_block))
+
+        entries = [None] * len(filters)
+        fetched = list()
+        for (_, from_block, to_block), group in block_ranges_to_filters.items():
+            group_entries = get_entries_merged(
+                [stateless_filter for _, stateless_filter, _ in group],
+                from_block,
+                to_block,
+            )
+            fetched.extend(zip(group, group_entries))
+
+        # The filters are only advanced once every group is queried, if a
+        # query fails none of the entries are returned, so all the blocks are
+        # fetched again by the next poll
+        for (position, stateless_filter, last_block), filter_entries in fetched:
+            stateless_filter._last_block = last_block
+            entries[position] = filter_entries
+
+        return entries
+    finally:
+        for stateless_filter in filters:
+            stateless_filter._lock.release()
+
+
+def get_entries_chunked(
+        filters: List['StatelessFilter'],
+        from_block: int,
+        to_block: int,
+        chunk_size: int,
+        max_chunk_size: int,
+        concurrency: int,
+) -> Iterator[Tuple[int, int, List[List[Dict]]]]:
+    """ Yields the consecutive chunks of the block range in order, as the
+    first and last block of the chunk with the entries of every filter, the
+    filters are not updated.
+
+    Up to `concurrency` chunks are fetched at once with `get_entries_merged`.
+    A chunk which can not be fetched, e.g. the ethereum node timed out or
+    refused a query with too many results, is split in two and the next
+    chunks are smaller, after every fetched chunk the size of the chunks is
+    doubled up to `max_chunk_size`.
+    """
+    pool = Pool(concurrency)
+    pending = deque()
+    next_block = from_block
+
+    def fetch_entries(chunk_from, chunk_to):
+        # the errors are handled by the caller, instead of being printed by
+        # the hub
+        try:
+            return get_entries_merged(filters, chunk_from, chunk_to), None
+        except Exception as error:  # pylint: disable=broad-except
+            return None, error
+
+    def fetch(chunk_from, chunk_to):
+        return chunk_from, chunk_to, pool.spawn(fetch_entries, chunk_from, chunk_to)
+
+    def schedule():
+        nonlocal next_block
+
+        while len(pending) < concurrency and next_block <= to_block:
+            chunk_to = min(next_block + chunk_size - 1, to_block)
+            pending.append(fetch(next_block, chunk_to))
+            next_block = chunk_to + 1
+
+    try:
+        schedule()
+
+        while pending:
+            chunk_from, chunk_to, greenlet = pending.popleft()
+            entries, error = greenlet.get()
+
+            if error is not None:
+                if chunk_from == chunk_to:
+                    raise error
+
+                chunk_size = max(1, (chunk_to - chunk_from + 1) // 2)
+                log.warning(
+                    'Fetching the logs failed, retrying with smaller chunks',
+                    from_block=chunk_from,
+                    to_block=chunk_to,
+                    chunk_size=chunk_size,
+                    error=error,
+                )
+
+                middle = chunk_from + chunk_size - 1
+                pending.appendleft(fetch(middle + 1, chunk_to))
+                pending.appendleft(fetch(chunk_from, middle))
+                continue
+
+            yield chunk_from, chunk_to, entries
+
+            chunk_size = min(chunk_size * 2, max_chunk_size)
+            schedule()
+    finally:
+        pool.kill()
@@ -295,7 +295,10 @@ def wait_for_transfer_success(
     """
     found = False
     while not found:
-        state_events = raiden.wal.storage.get_events_by_identifier(0, 'latest')
+        state_events = raiden.wal.storage.get_events(
+            event_types=[EventPaymentReceivedSuccess.__name__],
+            payment_identifier=payment_identifier,
+        )
         for event_tuple in state_events:
             event = event_tuple[1]
             found = (